@@ -0,0 +1,83 @@
+"""
+How long it takes to load model instances that use DiffModelMixin, which
+every DittoItemModel, like Bookmark, does.
+
+Creates 10,000 Bookmarks, each with 4KB of `raw` JSON, in a temporary
+database. Times fetching them all, with and without `raw`, and then
+instantiating models from already-fetched rows, which is the part
+DiffModelMixin affects.
+
+Run it from the root of the repository:
+
+    PYTHONPATH=.:src DJANGO_SETTINGS_MODULE=tests.settings \\
+        python benchmarks/diff_model_mixin.py
+"""
+
+import json
+import timeit
+
+import django
+
+django.setup()
+
+from django.db import connection  # noqa: E402
+
+from ditto.pinboard.models import Account, Bookmark  # noqa: E402
+
+ROWS = 10000
+REPEAT = 10
+
+
+def create_bookmarks():
+    account = Account.objects.create(username="bench", url="https://example.org")
+    raw = json.dumps({"extended": "x" * 4000})
+    Bookmark.objects.bulk_create(
+        [
+            Bookmark(
+                account=account,
+                title=f"Bookmark {i}",
+                url=f"https://example.org/{i}",
+                raw=raw,
+            )
+            for i in range(ROWS)
+        ],
+        batch_size=1000,
+    )
+
+
+def best_time(func):
+    return min(timeit.repeat(func, number=1, repeat=REPEAT))
+
+
+def main():
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        create_bookmarks()
+
+        fields = [f.attname for f in Bookmark._meta.concrete_fields]
+        rows = list(Bookmark.objects.values_list(*fields))
+
+        def load():
+            return [Bookmark.from_db("default", fields, row) for row in rows]
+
+        def load_and_change():
+            for bookmark in load():
+                bookmark.is_private = True
+
+        fetch = best_time(lambda: list(Bookmark.objects.all()))
+        instantiate = best_time(load)
+        change = best_time(load_and_change)
+        deferred = best_time(lambda: list(Bookmark.objects.defer("raw")))
+
+        print(f"{ROWS} Bookmarks, best of {REPEAT}:")
+        print(f"  Fetch from the database:        {fetch:.3f}s")
+        print(f"  Fetch with `raw` deferred:      {deferred:.3f}s")
+        print(f"  Instantiate from fetched rows:  {instantiate:.3f}s")
+        print(f"  Instantiate and change a field: {change:.3f}s")
+        print(f"  Instantiation per row:          {instantiate / ROWS * 1e6:.1f}µs")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+How long it takes to render a grid of Flickr Photos, using several size
+URLs for each one, like the templates do.
+
+Creates 50 Photos in a temporary database and renders them, with the URLs
+pointing at flickr.com, and again with DITTO_FLICKR_USE_LOCAL_MEDIA, once the
+local images have been generated.
+
+Run it from the root of the repository:
+
+    PYTHONPATH=.:src DJANGO_SETTINGS_MODULE=tests.settings \\
+        python benchmarks/flickr_photo_grid.py
+"""
+
+import timeit
+
+import django
+
+django.setup()
+
+from django.db import connection  # noqa: E402
+from django.template import Context, Template  # noqa: E402
+
+from ditto.flickr import app_settings  # noqa: E402
+from ditto.flickr.factories import PhotoFactory  # noqa: E402
+from ditto.flickr.models import Photo  # noqa: E402
+
+PHOTOS = 50
+REPEAT = 10
+
+GRID = Template(
+    """
+{% for photo in photos %}
+  <a href="{{ photo.large_url }}">
+    <img src="{{ photo.small_320_url }}"
+         srcset="{{ photo.small_320_url }} 1x, {{ photo.medium_640_url }} 2x"
+         width="{{ photo.small_320_width }}" height="{{ photo.small_320_height }}">
+  </a>
+  <img src="{{ photo.large_square_url }}" width="150" height="150">
+{% endfor %}
+"""
+)
+
+
+def best_time(func):
+    return min(timeit.repeat(func, number=1, repeat=REPEAT))
+
+
+def main():
+    old_name = connection.creation.create_test_db(verbosity=0)
+    default_use_local = app_settings.FLICKR_USE_LOCAL_MEDIA
+    try:
+        PhotoFactory.create_batch(PHOTOS)
+
+        def render_fetched():
+            photos = list(Photo.objects.select_related("user"))
+            return GRID.render(Context({"photos": photos}))
+
+        photos = list(Photo.objects.select_related("user"))
+
+        def render_again():
+            return GRID.render(Context({"photos": photos}))
+
+        app_settings.FLICKR_USE_LOCAL_MEDIA = False
+        remote = best_time(render_fetched)
+
+        app_settings.FLICKR_USE_LOCAL_MEDIA = True
+        # Generate the local images first, so we only time making the URLs:
+        render_fetched()
+        local = best_time(render_fetched)
+        local_again = best_time(render_again)
+
+        print(f"{PHOTOS} Photos, 4 sizes each, best of {REPEAT}:")
+        print(f"  Remote URLs:                      {remote * 1000:.1f}ms")
+        print(f"  Local URLs:                       {local * 1000:.1f}ms")
+        print(f"  Local URLs, same Photos again:    {local_again * 1000:.1f}ms")
+        print(f"  Per Photo, local:                 {local / PHOTOS * 1e6:.0f}µs")
+    finally:
+        app_settings.FLICKR_USE_LOCAL_MEDIA = default_use_local
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+How long it takes, and how much memory, to make Flickr thumbnails from large
+JPEG originals, with and without the DraftDownscale processor.
+
+Creates 12 and 40 megapixel JPEGs in a temporary directory, then makes a few
+sizes of image from each with the ditto.flickr.imagegenerators specs. Each
+one is made in a new process, so that its peak memory use can be measured.
+Measuring memory only works on Linux.
+
+Run it from the root of the repository:
+
+    PYTHONPATH=.:src DJANGO_SETTINGS_MODULE=tests.settings \\
+        python benchmarks/image_downscale.py
+"""
+
+import multiprocessing
+import tempfile
+import timeit
+from pathlib import Path
+
+import django
+
+django.setup()
+
+from django.core.files import File  # noqa: E402
+from PIL import Image  # noqa: E402
+
+from ditto.core.imageprocessors import DraftDownscale  # noqa: E402
+from ditto.flickr import imagegenerators  # noqa: E402
+
+ORIGINALS = {"12MP": (4240, 2832), "40MP": (7728, 5152)}
+SPECS = ("Square", "Small320", "Large1600")
+REPEAT = 3
+
+
+def make_original(path, size):
+    "Saves a noisy JPEG, which is as slow to decode as a real photo."
+    bands = [Image.effect_noise(size, 64) for _ in range(3)]
+    Image.merge("RGB", bands).save(path, "JPEG", quality=90)
+
+
+def generate(path, spec_name, *, draft):
+    with Path(path).open("rb") as f:
+        spec = getattr(imagegenerators, spec_name)(source=File(f, name=path))
+        if not draft:
+            spec.processors = [
+                p for p in spec.processors if not isinstance(p, DraftDownscale)
+            ]
+        spec.generate()
+
+
+def memory_kb(key):
+    "Returns a value, like VmRSS, from /proc/self/status, in KB."
+    for line in Path("/proc/self/status").read_text().splitlines():
+        if line.startswith(f"{key}:"):
+            return int(line.split()[1])
+    return 0
+
+
+def measure(path, spec_name, draft):
+    """
+    Run in a new process. Returns the best time to make the image, and how
+    much the process's peak memory use increased, in MB.
+    """
+    # Reset the peak memory use (VmHWM) to the current use (Linux only):
+    Path("/proc/self/clear_refs").write_text("5")
+    before = memory_kb("VmRSS")
+    seconds = min(
+        timeit.repeat(
+            lambda: generate(path, spec_name, draft=draft), number=1, repeat=REPEAT
+        )
+    )
+    return seconds, (memory_kb("VmHWM") - before) / 1024
+
+
+def main():
+    context = multiprocessing.get_context("spawn")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        print(f"Best of {REPEAT}, and increase in peak memory:")
+        for original, size in ORIGINALS.items():
+            path = str(Path(tmp_dir) / f"{original}.jpg")
+            make_original(path, size)
+
+            for spec_name in SPECS:
+                results = []
+                for draft in (False, True):
+                    with context.Pool(1) as pool:
+                        results.append(pool.apply(measure, (path, spec_name, draft)))
+                (plain_time, plain_mb), (draft_time, draft_mb) = results
+                print(
+                    f"  {original} to {spec_name:<10} "
+                    f"without: {plain_time * 1000:6.0f}ms {plain_mb:6.1f}MB   "
+                    f"with DraftDownscale: {draft_time * 1000:6.0f}ms "
+                    f"{draft_mb:6.1f}MB"
+                )
+
+
+if __name__ == "__main__":
+    main()
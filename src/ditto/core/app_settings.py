@@ -22,3 +22,63 @@ CORE_DATE_YEAR_FORMAT = getattr(settings, "DITTO_CORE_DATE_YEAR_FORMAT", "%Y")
 CORE_DATE_YEAR_MONTH_FORMAT = getattr(
     settings, "DITTO_CORE_DATE_YEAR_MONTH_FORMAT", "%b %Y"
 )
+
+# How many seconds to cache counts of items for, eg when paginating.
+CORE_COUNT_CACHE_TIMEOUT = getattr(settings, "DITTO_CORE_COUNT_CACHE_TIMEOUT", 3600)
+
+# How many seconds to cache the numbers of items on each day before today for,
+# eg on day archive pages. They're forgotten when that day's items change.
+CORE_DAY_COUNTS_CACHE_TIMEOUT = getattr(
+    settings, "DITTO_CORE_DAY_COUNTS_CACHE_TIMEOUT", 60 * 60 * 24 * 30
+)
+
+# How to compress fields holding raw API data, like Tweet.raw, when saving:
+# "zlib", "zstd" (requires Python 3.14+ or the zstandard package), or None.
+CORE_RAW_COMPRESSION = getattr(settings, "DITTO_CORE_RAW_COMPRESSION", "zlib")
+
+# Whether to keep a list of the images generated from downloaded originals, eg
+# Flickr thumbnails, in the database, rather than asking the storage whether
+# each one exists when its URL is used.
+CORE_IMAGE_CACHE_MANIFEST = getattr(settings, "DITTO_CORE_IMAGE_CACHE_MANIFEST", False)
+
+# Whether to stop more than one process on a server making the same image from
+# a downloaded original at once, eg when several show the same page. And how
+# many seconds the others wait before using the remote image instead.
+CORE_IMAGE_GENERATION_LOCK = getattr(
+    settings, "DITTO_CORE_IMAGE_GENERATION_LOCK", False
+)
+CORE_IMAGE_GENERATION_WAIT = getattr(settings, "DITTO_CORE_IMAGE_GENERATION_WAIT", 3)
+
+# How the views that serve downloaded files, like Flickr Photos' originals,
+# hand them to the web server: "X-Accel-Redirect" (nginx), "X-Sendfile" (eg,
+# Apache with mod_xsendfile) or None, for Django to send them itself.
+CORE_SENDFILE_HEADER = getattr(settings, "DITTO_CORE_SENDFILE_HEADER", None)
+
+# With X-Accel-Redirect, the internal nginx location that serves MEDIA_ROOT.
+CORE_SENDFILE_ACCEL_PREFIX = getattr(
+    settings, "DITTO_CORE_SENDFILE_ACCEL_PREFIX", "/protected-media/"
+)
+
+# When downloading files with several workers, eg with fetch_flickr_originals,
+# the most to fetch from any one host at once.
+CORE_DOWNLOADS_PER_HOST = getattr(settings, "DITTO_CORE_DOWNLOADS_PER_HOST", 4)
+
+# Where to keep partly-downloaded large files, like Flickr videos, so they can
+# be resumed. Default is a "ditto-downloads" directory in the temporary
+# directory (FILE_UPLOAD_TEMP_DIR, or the system's).
+CORE_DOWNLOADS_PARTIAL_DIR = getattr(settings, "DITTO_CORE_DOWNLOADS_PARTIAL_DIR", None)
+
+# The most calls to make to each service's API, as an average number per
+# second, and how many can be made at once. Set a service to None for no limit.
+# Any services in the DITTO_CORE_RATE_LIMITS setting replace these defaults.
+CORE_RATE_LIMITS = {
+    # Flickr allows 3,600 calls an hour:
+    "flickr": {"per_second": 1, "burst": 5},
+    # Last.fm allows 5 a second, averaged over 5 minutes:
+    "lastfm": {"per_second": 5, "burst": 5},
+    # Pinboard allows one call every 3 seconds:
+    "pinboard": {"per_second": 1 / 3, "burst": 1},
+    # Twitter mostly allows 900 calls per 15 minutes:
+    "twitter": {"per_second": 1, "burst": 5},
+    **getattr(settings, "DITTO_CORE_RATE_LIMITS", {}),
+}
@@ -9,6 +9,10 @@ class DittoCoreConfig(AppConfig):
     # Maintain pre Django 3.2 default behaviour:
     default_auto_field = "django.db.models.AutoField"
 
+    def ready(self):
+        import ditto.core.checks
+        import ditto.core.signals  # noqa: F401
+
 
 class Apps:
     """Methods for seeing which Ditto apps are installed/enabled.
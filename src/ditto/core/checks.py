@@ -0,0 +1,30 @@
+from django.core.checks import Error, Tags, register
+
+from . import app_settings
+from .fields import get_zstd
+
+
+@register(Tags.compatibility)
+def check_raw_compression(app_configs=None, **kwargs):
+    checks = []
+    method = app_settings.CORE_RAW_COMPRESSION
+
+    if method not in ("zlib", "zstd", None):
+        checks.append(
+            Error(
+                f"DITTO_CORE_RAW_COMPRESSION can't be {method!r}.",
+                hint="Set it to 'zlib', 'zstd' or None.",
+                id="ditto.core.E001",
+            )
+        )
+    elif method == "zstd" and get_zstd() is None:
+        checks.append(
+            Error(
+                "Using zstd for DITTO_CORE_RAW_COMPRESSION requires the "
+                "zstandard package, or Python 3.14+.",
+                hint="Install zstandard",
+                id="ditto.core.E002",
+            )
+        )
+
+    return checks
@@ -0,0 +1,137 @@
+import base64
+import zlib
+
+from django.db import models
+from django.db.models.query_utils import DeferredAttribute
+
+from . import app_settings
+
+# Stored values that start with one of these are compressed; anything else
+# is plain text. The raw JSON we store never starts with one of these.
+ZLIB_PREFIX = "zlib:"
+ZSTD_PREFIX = "zstd:"
+
+
+def get_zstd():
+    """
+    Returns a module with zstd compress() and decompress() functions, or None.
+    Uses compression.zstd in Python 3.14+, or the zstandard package.
+    """
+    try:
+        from compression import zstd
+    except ImportError:
+        try:
+            import zstandard as zstd
+        except ImportError:
+            return None
+    return zstd
+
+
+def is_compressed(value):
+    "Is value a string compressed by compress_text()?"
+    return isinstance(value, str) and value.startswith((ZLIB_PREFIX, ZSTD_PREFIX))
+
+
+def compress_text(value, method="zlib"):
+    """
+    Returns the string value compressed with method ("zlib" or "zstd"),
+    base64-encoded and prefixed with the method, eg "zlib:eJzLSM3JyQcABiwCFQ==".
+    If method is None, or compressing doesn't make value any shorter, value is
+    returned unchanged.
+    """
+    if not method or not value or is_compressed(value):
+        return value
+
+    data = value.encode("utf-8")
+
+    if method == "zlib":
+        prefix, data = ZLIB_PREFIX, zlib.compress(data)
+    elif method == "zstd":
+        zstd = get_zstd()
+        if zstd is None:
+            msg = "Compressing with zstd requires Python 3.14+ or zstandard"
+            raise ImportError(msg)
+        prefix, data = ZSTD_PREFIX, zstd.compress(data)
+    else:
+        msg = f"Unknown compression method: {method}"
+        raise ValueError(msg)
+
+    compressed = prefix + base64.b64encode(data).decode("ascii")
+    return compressed if len(compressed) < len(value) else value
+
+
+def decompress_text(value):
+    """
+    Returns the original string from one made by compress_text().
+    Uncompressed strings, and None, are returned unchanged.
+    """
+    if not is_compressed(value):
+        return value
+
+    method, _, encoded = value.partition(":")
+    data = base64.b64decode(encoded)
+
+    if method == "zlib":
+        data = zlib.decompress(data)
+    else:
+        zstd = get_zstd()
+        if zstd is None:
+            msg = "Decompressing zstd data requires Python 3.14+ or zstandard"
+            raise ImportError(msg)
+        data = zstd.decompress(data)
+
+    return data.decode("utf-8")
+
+
+class CompressedTextAttribute(DeferredAttribute):
+    """
+    The descriptor for CompressedTextField.
+    Values loaded from the database are kept compressed until they're first
+    accessed, and are only compressed again when saved if they've been
+    accessed or changed.
+    """
+
+    def __get__(self, instance, cls=None):
+        if instance is None:
+            return self
+        value = super().__get__(instance, cls)
+        if is_compressed(value):
+            value = decompress_text(value)
+            instance.__dict__[self.field.attname] = value
+        return value
+
+    def __set__(self, instance, value):
+        instance.__dict__[self.field.attname] = value
+
+
+class CompressedTextField(models.TextField):
+    """
+    A TextField that compresses its value when saving, using the method in
+    the DITTO_CORE_RAW_COMPRESSION setting, and decompresses it when it's
+    accessed on the model instance.
+
+    Rows saved before compression was enabled, or with it disabled, are
+    stored as plain text and read as normal. The compress_ditto_raw
+    management command converts existing rows.
+
+    Note that values(), values_list() and lookups like __contains use the
+    stored text, which may be compressed. Use decompress_text() on values
+    from values() and values_list() if needed.
+    """
+
+    descriptor_class = CompressedTextAttribute
+
+    def pre_save(self, model_instance, add):
+        # Avoid decompressing a value that hasn't been accessed, only to
+        # compress it again:
+        try:
+            return model_instance.__dict__[self.attname]
+        except KeyError:
+            return super().pre_save(model_instance, add)
+
+    def get_db_prep_save(self, value, connection):
+        if not hasattr(value, "as_sql"):
+            value = compress_text(
+                self.get_prep_value(value), app_settings.CORE_RAW_COMPRESSION
+            )
+        return super().get_db_prep_save(value, connection)
@@ -0,0 +1,245 @@
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from django.conf import settings
+from imagekit.cachefiles import ImageCacheFile
+from imagekit.cachefiles.backends import CacheFileState, Simple
+
+from . import app_settings
+from .models import GeneratedImage
+
+try:
+    import fcntl
+except ImportError:
+    # eg, on Windows.
+    fcntl = None
+
+# How many lock files to share between all the images that might be made:
+LOCK_FILES = 4096
+
+# How many original files' generated images ManifestCacheFileBackend
+# remembers, and for how many seconds:
+MANIFEST_SOURCES = 1000
+MANIFEST_TTL = 300
+
+
+class ImageLockError(Exception):
+    "Raised when another process is still making an image, after waiting."
+
+
+@contextmanager
+def image_lock(name, wait):
+    """
+    A context manager that stops more than one process, on this server,
+    making the same image at once. Yields True if it had to wait for
+    another process to finish first, otherwise False.
+
+    name -- The name of the image, eg an ImageCacheFile's name.
+    wait -- The most seconds to wait for another process before raising
+        ImageLockError.
+
+    Images share a fixed number of lock files, so occasionally two different
+    images will wait for each other. Does nothing where fcntl isn't available.
+    """
+    if fcntl is None:
+        yield False
+        return
+
+    directory = os.path.join(
+        settings.FILE_UPLOAD_TEMP_DIR or tempfile.gettempdir(), "ditto-image-locks"
+    )
+    os.makedirs(directory, exist_ok=True)
+    key = int(hashlib.sha256(name.encode("utf-8")).hexdigest(), 16) % LOCK_FILES
+    path = os.path.join(directory, f"{key}.lock")
+
+    with open(path, "a") as f:
+        deadline = time.monotonic() + wait
+        waited = False
+        while True:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    msg = f"{name} is being made by another process"
+                    raise ImageLockError(msg) from None
+                waited = True
+                time.sleep(0.05)
+        try:
+            yield waited
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class LockingCacheFileBackend(Simple):
+    """
+    An imagekit cache file backend that, if the
+    DITTO_CORE_IMAGE_GENERATION_LOCK setting is True, only lets one process
+    at a time make each image, like a Flickr Photo's thumbnail.
+
+    Without it, when several processes show the same new page at once, each
+    one makes all of its images. With it, the others wait for up to
+    DITTO_CORE_IMAGE_GENERATION_WAIT seconds, then use the image that was
+    made, or raise ImageLockError if it's still being made.
+
+    Images that already exist, which is most of them whenever a URL is used,
+    are found without locking.
+    """
+
+    def generate_now(self, file, force=False):  # noqa: FBT002
+        if not app_settings.CORE_IMAGE_GENERATION_LOCK:
+            super().generate_now(file, force=force)
+            return
+
+        if not force and self.get_state(file) == CacheFileState.EXISTS:
+            return
+
+        with image_lock(file.name, app_settings.CORE_IMAGE_GENERATION_WAIT):
+            if not force and self._exists(file):
+                # Another process made it since we checked.
+                self.set_state(file, CacheFileState.EXISTS)
+                return
+            # We know it doesn't exist, whatever state another process
+            # might have left it in, eg GENERATING:
+            super().generate_now(file, force=True)
+
+
+class ManifestCacheFileBackend(LockingCacheFileBackend):
+    """
+    An imagekit cache file backend that records each generated image, like a
+    Flickr Photo's thumbnail, as a GeneratedImage in the database.
+
+    imagekit's own backends ask the storage whether a generated file exists
+    whenever its URL is used, unless they've cached the answer. With remote
+    storage that's a request for every image on every page. This only checks
+    the storage when the file isn't in the manifest, ie when it's about to
+    be generated.
+
+    The names of all the images generated from one original file are fetched
+    from the manifest in one query, and remembered by this process for
+    MANIFEST_TTL seconds, for up to MANIFEST_SOURCES original files.
+
+    If generated files are deleted from the storage, delete their
+    GeneratedImages too, or they won't be made again.
+
+    Like LockingCacheFileBackend, it only lets one process at a time make
+    each image if DITTO_CORE_IMAGE_GENERATION_LOCK is True.
+    """
+
+    def __init__(self):
+        # Maps the names of original files to a tuple of when we fetched
+        # their generated images' names, and a set of those names. The least
+        # recently used are first.
+        self._sources = OrderedDict()
+        self._sources_lock = threading.Lock()
+
+    def get_state(self, file, check_if_unknown=True):  # noqa: FBT002
+        if file.name in self._get_names(self._get_source_name(file)):
+            return CacheFileState.EXISTS
+
+        if not check_if_unknown:
+            return None
+
+        if self._exists(file):
+            # Generated before we started keeping the manifest:
+            self.set_state(file, CacheFileState.EXISTS)
+            return CacheFileState.EXISTS
+
+        return CacheFileState.DOES_NOT_EXIST
+
+    def set_state(self, file, state):
+        source_name = self._get_source_name(file)
+        if state == CacheFileState.EXISTS:
+            GeneratedImage.objects.get_or_create(
+                name=file.name, defaults={"source_name": source_name}
+            )
+            self._get_names(source_name).add(file.name)
+        elif state == CacheFileState.DOES_NOT_EXIST:
+            GeneratedImage.objects.filter(name=file.name).delete()
+            self._get_names(source_name).discard(file.name)
+
+    def _get_source_name(self, file):
+        return getattr(file.generator.source, "name", "")
+
+    def _get_names(self, source_name):
+        """
+        Returns the set of names of the images generated from one original
+        file, fetching them from the manifest if we haven't recently.
+        """
+        now = time.monotonic()
+        with self._sources_lock:
+            fetched = self._sources.get(source_name)
+            if fetched is not None and now - fetched[0] < MANIFEST_TTL:
+                self._sources.move_to_end(source_name)
+                return fetched[1]
+
+        names = set(
+            GeneratedImage.objects.filter(source_name=source_name).values_list(
+                "name", flat=True
+            )
+        )
+        with self._sources_lock:
+            self._sources[source_name] = (now, names)
+            self._sources.move_to_end(source_name)
+            while len(self._sources) > MANIFEST_SOURCES:
+                self._sources.popitem(last=False)
+        return names
+
+
+_backends = {}
+
+
+def get_cachefile_backend():
+    """
+    Returns the imagekit cache file backend that ditto's image specs should
+    use: a ManifestCacheFileBackend if the DITTO_CORE_IMAGE_CACHE_MANIFEST
+    setting is True, or a LockingCacheFileBackend if
+    DITTO_CORE_IMAGE_GENERATION_LOCK is True. Otherwise None, to use
+    imagekit's default.
+    """
+    if app_settings.CORE_IMAGE_CACHE_MANIFEST:
+        backend_class = ManifestCacheFileBackend
+    elif app_settings.CORE_IMAGE_GENERATION_LOCK:
+        backend_class = LockingCacheFileBackend
+    else:
+        return None
+
+    if backend_class not in _backends:
+        _backends[backend_class] = backend_class()
+    return _backends[backend_class]
+
+
+class ManifestSpecMixin:
+    """
+    Mixed in to ditto's ImageSpecs so that they use the backend from
+    get_cachefile_backend().
+    """
+
+    def __init__(self, *args, **kwargs):
+        # imagekit uses its default backend if this is None:
+        self.cachefile_backend = get_cachefile_backend()
+        super().__init__(*args, **kwargs)
+
+
+def generate_images(source, generators, *, force=False):
+    """
+    Makes the images of a source file, like a Photo's original_file, for each
+    of the imagekit generators, eg ditto.flickr.imagegenerators.Square,
+    unless they already exist.
+
+    force -- If True, make them even if they already exist.
+
+    Returns the number of images made.
+    """
+    count = 0
+    for generator in generators:
+        file = ImageCacheFile(generator(source=source))
+        if force or not file.cachefile_backend.exists(file):
+            file.generate(force=True)
+            count += 1
+    return count
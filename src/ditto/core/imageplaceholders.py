@@ -0,0 +1,47 @@
+import base64
+from io import BytesIO
+
+from PIL import Image, ImageOps
+
+# The longest side of placeholder images, in pixels:
+PLACEHOLDER_SIZE = 16
+
+
+def make_placeholder(file):
+    """
+    Makes a tiny, blurry version of an image, for showing while the real
+    image loads, and finds its most common colour.
+
+    file -- A file-like object of the original image. It's read from the
+        start and left at the start again afterwards.
+
+    Returns a tuple of a JPEG data: URI, like 'data:image/jpeg;base64,...',
+    and a colour, like '#a1b2c3'. Or a tuple of two empty strings if the file
+    isn't an image Pillow can open.
+    """
+    file.seek(0)
+    try:
+        with Image.open(file) as img:
+            # JPEGs can be decoded at a fraction of their size, which is much
+            # quicker for large photos:
+            img.draft("RGB", (PLACEHOLDER_SIZE * 4, PLACEHOLDER_SIZE * 4))
+            small = ImageOps.exif_transpose(img).convert("RGB")
+            small.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE))
+    except Exception:  # noqa: BLE001
+        # eg, it isn't an image, or it's a broken one.
+        return "", ""
+    finally:
+        file.seek(0)
+
+    f = BytesIO()
+    small.save(f, "JPEG", quality=50)
+    data = base64.b64encode(f.getvalue()).decode("ascii")
+    return f"data:image/jpeg;base64,{data}", get_dominant_color(small)
+
+
+def get_dominant_color(img):
+    "Returns the most common of a few colours in an RGB image, like '#a1b2c3'."
+    palette_img = img.quantize(colors=4)
+    _, index = max(palette_img.getcolors())
+    r, g, b = palette_img.getpalette()[index * 3 : index * 3 + 3]
+    return f"#{r:02x}{g:02x}{b:02x}"
@@ -0,0 +1,95 @@
+import math
+
+from PIL import ExifTags, Image
+
+# Image modes that Image.reduce() works with:
+REDUCIBLE_MODES = ("1", "L", "LA", "I", "F", "RGB", "RGBA", "RGBX", "CMYK", "YCbCr")
+
+# How to turn an image the right way up for each EXIF Orientation value,
+# like imagekit's Transpose processor does:
+ORIENTATION_STEPS = {
+    2: [Image.Transpose.FLIP_LEFT_RIGHT],
+    3: [Image.Transpose.ROTATE_180],
+    4: [Image.Transpose.FLIP_TOP_BOTTOM],
+    5: [Image.Transpose.ROTATE_270, Image.Transpose.FLIP_LEFT_RIGHT],
+    6: [Image.Transpose.ROTATE_270],
+    7: [Image.Transpose.ROTATE_90, Image.Transpose.FLIP_LEFT_RIGHT],
+    8: [Image.Transpose.ROTATE_90],
+}
+
+
+class DraftDownscale:
+    """
+    An imagekit processor that quickly makes a large image smaller, to just
+    above the size that the processors after it will resize it to. It should
+    be the first processor, so that the image hasn't been decoded yet.
+
+    JPEGs are decoded at a reduced scale (1/2, 1/4 or 1/8) using Pillow's
+    draft mode, so most of their pixels are never decoded at all. Other
+    images are shrunk by a whole-number factor with Image.reduce().
+
+    eg, to make a 75px square from a 40 megapixel JPEG:
+        processors = [
+            DraftDownscale(75, 75, fill=True),
+            Transpose(),
+            ResizeToFill(75, 75),
+        ]
+    """
+
+    def __init__(self, width, height, *, fill=False, reducing_gap=2.0):
+        """
+        width, height -- The size the image will be resized to afterwards.
+        fill -- True if the image will be cropped to fill the size, like
+            ResizeToFill. False if it will fit within it, like ResizeToFit.
+        reducing_gap -- How many times bigger than the final size to keep the
+            image, so that the final resize still has enough pixels to make a
+            good-quality image.
+        """
+        self.width = width
+        self.height = height
+        self.fill = fill
+        self.reducing_gap = reducing_gap
+
+    def process(self, img):
+        orientation = self._get_orientation(img)
+        width, height = self._get_target_size(img.size, orientation)
+
+        if width >= img.size[0] or height >= img.size[1]:
+            # It's not big enough to be worth it.
+            return img
+
+        if img.format in ("JPEG", "MPO") and img.draft(None, (width, height)):
+            return img
+
+        factor = min(img.size[0] // width, img.size[1] // height)
+        if factor < 2 or img.mode not in REDUCIBLE_MODES:
+            return img
+
+        # The new image won't have the original's EXIF data, so the Transpose
+        # processor wouldn't be able to rotate it. So do that here:
+        img = img.reduce(factor)
+        for method in ORIENTATION_STEPS.get(orientation, []):
+            img = img.transpose(method)
+        return img
+
+    def _get_orientation(self, img):
+        try:
+            return img.getexif().get(ExifTags.Base.Orientation, 1)
+        except Exception:  # noqa: BLE001
+            # Some images have broken EXIF data.
+            return 1
+
+    def _get_target_size(self, size, orientation):
+        """
+        Returns the smallest (width, height) that the image can be reduced to
+        and still be big enough, before it's rotated.
+        """
+        # Orientations that swap the width and height:
+        rotated = orientation in (5, 6, 7, 8)
+        width, height = (size[1], size[0]) if rotated else size
+
+        scales = (self.width / width, self.height / height)
+        scale = (max(scales) if self.fill else min(scales)) * self.reducing_gap
+
+        target = (math.ceil(width * scale), math.ceil(height * scale))
+        return (target[1], target[0]) if rotated else target
@@ -1,4 +1,9 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import django
 from django.core.management.base import BaseCommand
+from django.db import connections
 
 
 class DittoBaseCommand(BaseCommand):
@@ -56,9 +61,65 @@ class DittoBaseCommand(BaseCommand):
                     )
                 )
 
+    def output_progress(self, done, total):
+        """
+        For passing as the `progress` function when fetching files, if
+        verbosity is 2 or more.
+        """
+        noun = self.singular_noun if total == 1 else self.plural_noun
+        self.stdout.write(f"Finished {done} of {total} {noun}")
+
     def format_messages(self, messages):
         if len(messages) == 1:
             return messages[0]
         else:
             # On separate lines, and start a newline first.
             return "{}{}".format("\n", "\n".join(messages))
+
+
+class DittoProcessPoolCommand(DittoBaseCommand):
+    """
+    For commands that do the same slow thing, like resizing an image, for
+    many tasks, using several processes.
+
+    Adds a --workers option, and a run_tasks() method.
+    """
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+
+        parser.add_argument(
+            "--workers",
+            action="store",
+            type=int,
+            default=None,
+            help="How many processes to use (default is the number of CPUs)",
+        )
+
+    def get_workers(self, options):
+        "The number of processes to use."
+        return options["workers"] or os.cpu_count() or 1
+
+    def run_tasks(self, func, tasks, workers):
+        """
+        Yields the result of func(*task) for each task, in order.
+
+        func -- A module-level function, so it can be passed to other
+            processes. Its arguments and result must be picklable.
+        tasks -- A list of tuples of arguments for func.
+        workers -- How many processes to use. If 1, or there's only one task,
+            they're all done in this process.
+        """
+        if workers == 1 or len(tasks) < 2:
+            for task in tasks:
+                yield func(*task)
+            return
+
+        # Each process makes its own database connection:
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, initializer=django.setup) as pool:
+            yield from pool.map(
+                func,
+                *zip(*tasks, strict=True),
+                chunksize=max(1, min(50, len(tasks) // (workers * 4))),
+            )
@@ -0,0 +1,95 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import models, transaction
+
+from ditto.core import app_settings
+from ditto.core.fields import CompressedTextField, compress_text, decompress_text
+
+
+class Command(BaseCommand):
+    """Compresses the raw API data in every CompressedTextField, eg Tweet.raw
+    and Photo.exif_raw, using the DITTO_CORE_RAW_COMPRESSION setting.
+    Rows are converted in batches, so this can be stopped and run again.
+
+    Should be run after first installing this version of Ditto, and after
+    changing the DITTO_CORE_RAW_COMPRESSION setting.
+
+    ./manage.py compress_ditto_raw
+
+    Or, to store everything uncompressed again:
+
+    ./manage.py compress_ditto_raw --decompress
+    """
+
+    help = "Compresses, or decompresses, the raw API data stored by Ditto."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--decompress",
+            action="store_true",
+            default=False,
+            help="Store all the data uncompressed",
+        )
+        parser.add_argument(
+            "--batch-size",
+            action="store",
+            type=int,
+            default=500,
+            help="How many rows to convert at a time (default 500)",
+        )
+
+    def handle(self, *args, **options):
+        method = None if options["decompress"] else app_settings.CORE_RAW_COMPRESSION
+
+        for model in apps.get_models():
+            fields = [
+                field
+                for field in model._meta.concrete_fields
+                if isinstance(field, CompressedTextField)
+            ]
+            if fields:
+                count = self.convert_model(model, fields, method, options["batch_size"])
+                if options.get("verbosity", 1) > 0:
+                    self.stdout.write(
+                        f"{model._meta.label}: Updated {count} "
+                        f"{model._meta.verbose_name_plural}"
+                    )
+
+    def convert_model(self, model, fields, method, batch_size):
+        """
+        Re-saves the stored values of fields on all of a model's rows, using
+        method ("zlib", "zstd" or None), where they're different.
+        Returns the number of rows changed.
+        """
+        attnames = [field.attname for field in fields]
+        queryset = model._base_manager.order_by("pk")
+        count = 0
+        last_pk = None
+
+        while True:
+            batch = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+            rows = list(batch.values_list("pk", *attnames)[:batch_size])
+            if not rows:
+                return count
+            last_pk = rows[-1][0]
+
+            changed = []
+            for pk, *values in rows:
+                new_values = [
+                    compress_text(decompress_text(value), method) for value in values
+                ]
+                if new_values != values:
+                    obj = model(pk=pk)
+                    for attname, new_value in zip(attnames, new_values, strict=True):
+                        # A Value() expression so the field doesn't compress it:
+                        setattr(
+                            obj,
+                            attname,
+                            models.Value(new_value, output_field=models.TextField()),
+                        )
+                    changed.append(obj)
+
+            if changed:
+                with transaction.atomic():
+                    model._base_manager.bulk_update(changed, attnames)
+                count += len(changed)
@@ -0,0 +1,132 @@
+from django.apps import apps
+from django.core.management.base import CommandError
+from django.db import transaction
+
+from ditto.core.imageplaceholders import make_placeholder
+from ditto.core.management.commands import DittoProcessPoolCommand
+from ditto.core.management.commands.generate_ditto_thumbnails import get_sources
+
+
+def make_source_placeholder(model_label, field_name, pk, name):
+    """
+    Makes the placeholder for one original file. Called by the process pool,
+    so it's given the names of things rather than the objects.
+    Returns a tuple of the object's pk, its placeholder, its dominant colour,
+    and an error message or None.
+    """
+    model = apps.get_model(model_label)
+    source = getattr(model(**{field_name: name}), field_name)
+    try:
+        with source.open("rb") as f:
+            placeholder, color = make_placeholder(f)
+    except Exception as e:  # noqa: BLE001
+        # eg, the original is missing.
+        return pk, "", "", f"{name}: {e}"
+    if not placeholder:
+        return pk, "", "", f"{name}: Not an image"
+    return pk, placeholder, color, None
+
+
+class Command(DittoProcessPoolCommand):
+    """Sets the placeholders, and dominant colours, of downloaded Flickr
+    photos and Twitter images that don't have them yet. New downloads get
+    them automatically, so this is for files downloaded before that, or
+    imported from an archive some other way.
+
+    For all Flickr Photos and Twitter Media without a placeholder:
+        ./manage.py generate_ditto_placeholders
+
+    For only Flickr Photos, replacing any existing placeholders:
+        ./manage.py generate_ditto_placeholders --app=flickr --force
+
+    To use four processes (the default is one per CPU):
+        ./manage.py generate_ditto_placeholders --workers=4
+    """
+
+    help = "Sets placeholders for downloaded Flickr and Twitter images"
+
+    singular_noun = "Placeholder"
+    plural_noun = "Placeholders"
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+
+        parser.add_argument(
+            "--app",
+            action="append",
+            dest="app_names",
+            help=(
+                "Only set placeholders for this app's images, eg 'flickr'. "
+                "Can be used more than once. Default is all apps."
+            ),
+        )
+
+        parser.add_argument(
+            "--batch-size",
+            action="store",
+            type=int,
+            default=500,
+            help="How many objects to save at a time (default 500)",
+        )
+
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            default=False,
+            help="Set placeholders even for objects that already have one",
+        )
+
+    def handle(self, *args, **options):
+        sources = get_sources()
+        app_names = options["app_names"] or list(sources)
+        for app_name in app_names:
+            if app_name not in sources:
+                msg = f"'{app_name}' isn't an installed app with images."
+                raise CommandError(msg)
+
+        verbosity = options.get("verbosity", 1)
+        workers = self.get_workers(options)
+        count = 0
+        errors = []
+
+        for app_name in app_names:
+            model, field_name, _ = sources[app_name]
+            queryset = model._base_manager.exclude(**{field_name: ""})
+            if not options["force"]:
+                queryset = queryset.filter(placeholder="")
+            tasks = [
+                (model._meta.label, field_name, pk, name)
+                for pk, name in queryset.order_by("pk").values_list("pk", field_name)
+            ]
+
+            changed = []
+            for done, (pk, placeholder, color, error) in enumerate(
+                self.run_tasks(make_source_placeholder, tasks, workers), start=1
+            ):
+                if error:
+                    errors.append(error)
+                else:
+                    changed.append(
+                        model(pk=pk, placeholder=placeholder, dominant_color=color)
+                    )
+                if len(changed) >= options["batch_size"] or done == len(tasks):
+                    count += self.save(model, changed)
+                    changed = []
+                if verbosity > 1:
+                    self.stdout.write(
+                        f"Finished {done} of {len(tasks)} {app_name} original files"
+                    )
+
+        if verbosity > 0:
+            noun = self.singular_noun if count == 1 else self.plural_noun
+            self.stdout.write(f"Set {count} {noun}")
+            if errors:
+                messages = self.format_messages(errors)
+                self.stderr.write(f"Failed to set {self.plural_noun}: {messages}")
+
+    def save(self, model, objs):
+        "Saves the placeholders of objs, without saving anything else."
+        if objs:
+            with transaction.atomic():
+                model._base_manager.bulk_update(objs, ["placeholder", "dominant_color"])
+        return len(objs)
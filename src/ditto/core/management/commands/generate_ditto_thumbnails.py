@@ -0,0 +1,176 @@
+from functools import partial
+
+from django.apps import apps
+from django.core.management.base import CommandError
+
+from ditto.core.imagecache import generate_images
+from ditto.core.management.commands import DittoProcessPoolCommand
+
+
+def get_sources():
+    """
+    Returns a dict of the installed apps with images that imagekit makes
+    smaller versions of. Each value is a tuple of the model, its field for
+    the original file, and a dict of its size names and imagekit generators.
+    """
+    sources = {}
+
+    if apps.is_installed("ditto.flickr"):
+        from ditto.flickr.imagegenerators import variant_formats
+
+        photo = apps.get_model("flickr", "Photo")
+        generators = {}
+        for size, info in photo.PHOTO_SIZES.items():
+            if "generator" in info:
+                generators[size] = info["generator"]
+                # And versions in other formats, eg 'small_320_webp':
+                for image_format in variant_formats():
+                    generators[f"{size}_{image_format.lower()}"] = partial(
+                        info["generator"], image_format=image_format
+                    )
+        sources["flickr"] = (photo, "original_file", generators)
+
+    if apps.is_installed("ditto.twitter"):
+        media = apps.get_model("twitter", "Media")
+        sources["twitter"] = (
+            media,
+            "image_file",
+            {size: info["generator"] for size, info in media.IMAGE_SIZES.items()},
+        )
+
+    return sources
+
+
+def generate_source_images(model_label, field_name, name, generators, force):
+    """
+    Makes the images for one original file. Called by the process pool, so
+    it's given the names of things rather than the objects.
+    Returns a tuple of the number of images made and an error message or None.
+    """
+    model = apps.get_model(model_label)
+    source = getattr(model(**{field_name: name}), field_name)
+    try:
+        return generate_images(source, generators, force=force), None
+    except Exception as e:  # noqa: BLE001
+        # eg, the original is missing or isn't a valid image.
+        return 0, f"{name}: {e}"
+
+
+class Command(DittoProcessPoolCommand):
+    """Generates the smaller versions of downloaded Flickr photos and Twitter
+    images, which would otherwise be made when they're first viewed. Images
+    that already exist are skipped, so this can be stopped and run again.
+
+    For all sizes of all images:
+        ./manage.py generate_ditto_thumbnails
+
+    Flickr sizes can also be made in other formats, if Pillow supports them,
+    eg 'flickr:small_320_webp'. These are included in all of Flickr's sizes.
+
+    For all sizes of Flickr Photos, and Twitter thumbnails:
+        ./manage.py generate_ditto_thumbnails --size=flickr --size=twitter:thumb
+
+    To use four processes (the default is one per CPU):
+        ./manage.py generate_ditto_thumbnails --workers=4
+    """
+
+    help = "Generates smaller versions of downloaded Flickr and Twitter images"
+
+    singular_noun = "Image"
+    plural_noun = "Images"
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+
+        parser.add_argument(
+            "--size",
+            action="append",
+            dest="sizes",
+            help=(
+                "Only generate this size, eg 'flickr:square', or all of an "
+                "app's sizes, eg 'flickr'. Can be used more than once. "
+                "Default is all sizes."
+            ),
+        )
+
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            default=False,
+            help="Generate images even if they already exist",
+        )
+
+    def handle(self, *args, **options):
+        sources = get_sources()
+        chosen = self.get_generators(sources, options["sizes"])
+
+        tasks = []
+        for app_name, generators in chosen.items():
+            model, field_name, _ = sources[app_name]
+            names = (
+                model.objects.exclude(**{field_name: ""})
+                .order_by("pk")
+                .values_list(field_name, flat=True)
+            )
+            tasks += [
+                (model._meta.label, field_name, name, generators, options["force"])
+                for name in names
+            ]
+
+        verbosity = options.get("verbosity", 1)
+        workers = self.get_workers(options)
+        generated = skipped = 0
+        errors = []
+
+        for done, (count, error) in enumerate(
+            self.run_tasks(generate_source_images, tasks, workers), start=1
+        ):
+            generated += count
+            if error:
+                errors.append(error)
+            else:
+                skipped += len(tasks[done - 1][3]) - count
+            if verbosity > 1:
+                self.stdout.write(f"Finished {done} of {len(tasks)} original files")
+
+        if verbosity > 0:
+            noun = self.singular_noun if generated == 1 else self.plural_noun
+            self.stdout.write(
+                f"Generated {generated} {noun}, skipped {skipped} that already existed"
+            )
+            if errors:
+                messages = self.format_messages(errors)
+                self.stderr.write(f"Failed to generate {self.plural_noun}: {messages}")
+
+    def get_generators(self, sources, sizes):
+        """
+        Returns a dict of app names, like 'flickr', and lists of the imagekit
+        generators to use for that app's images.
+        sizes -- A list like ['flickr', 'twitter:thumb'], or None for all.
+        """
+        if not sizes:
+            return {
+                app_name: list(generators.values())
+                for app_name, (_, _, generators) in sources.items()
+            }
+
+        chosen = {}
+        for size in sizes:
+            app_name, _, size_name = size.partition(":")
+            if app_name not in sources:
+                msg = f"'{app_name}' isn't an installed app with images."
+                raise CommandError(msg)
+            generators = sources[app_name][2]
+            if size_name and size_name not in generators:
+                msg = (
+                    f"'{size_name}' isn't a {app_name} size. "
+                    f"Choose from: {', '.join(generators)}"
+                )
+                raise CommandError(msg)
+
+            app_generators = chosen.setdefault(app_name, [])
+            for name in [size_name] if size_name else generators:
+                if generators[name] not in app_generators:
+                    app_generators.append(generators[name])
+
+        return chosen
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from ditto.core.models import DailyItemCount
+
+
+class Command(BaseCommand):
+    """Re-creates all of the DailyItemCounts from all of the Photos, Scrobbles,
+    Bookmarks, Tweets, etc.
+
+    Running migrate creates them if there are none. This should be run after
+    adding an Account for a User whose items have already been fetched.
+
+    ./manage.py rebuild_ditto_daily_counts
+    """
+
+    help = "Re-creates the counts of items per day from all the Ditto apps."
+
+    def handle(self, *args, **options):
+        count = DailyItemCount.objects.rebuild()
+
+        if options.get("verbosity", 1) > 0:
+            self.stdout.write(f"Created {count} Daily Item Counts")
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from ditto.core.models import TimelineItem
+
+
+class Command(BaseCommand):
+    """Re-creates all of the TimelineItems from all of the Photos, Scrobbles,
+    Bookmarks, Tweets, etc.
+
+    Running migrate creates them if there are none. This should be run after
+    adding an Account for a User whose items have already been fetched.
+
+    ./manage.py rebuild_ditto_timeline
+    """
+
+    help = "Re-creates the timeline of items from all the Ditto apps."
+
+    def handle(self, *args, **options):
+        count = TimelineItem.objects.rebuild()
+
+        if options.get("verbosity", 1) > 0:
+            self.stdout.write(f"Created {count} Timeline Items")
@@ -1,11 +1,587 @@
-from django.db import models
+import datetime
+import operator
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import reduce
 
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import models, transaction
+from django.db.models import Count, Q, Sum, prefetch_related_objects
+from django.db.models.functions import ExtractYear, TruncDate
+from django.utils import timezone
 
-class PublicItemManager(models.Manager):
+from .app_settings import CORE_DAY_COUNTS_CACHE_TIMEOUT
+from .utils import bump_content_version, fill_annual_counts, get_content_version
+
+# While TimelineManager.batch_updates() is active, the items waiting to have
+# their TimelineItems updated, as {model: {pk: item}}:
+_batched_items = ContextVar("ditto_timeline_batched_items", default=None)
+
+
+def _day_range(date):
+    "Returns the datetimes of the start of a day and of the next day."
+    since = datetime.datetime.combine(date, datetime.time.min)
+    until = since + datetime.timedelta(days=1)
+    if settings.USE_TZ:
+        since = timezone.make_aware(since)
+        until = timezone.make_aware(until)
+    return since, until
+
+
+def _day_runs(dates):
+    """
+    Groups dates into runs of consecutive days. Yields a tuple of the
+    datetimes of the start of each run and of the day after it ends.
+    """
+    run_start = run_end = None
+    for date in sorted(dates):
+        if run_end is not None and date == run_end + datetime.timedelta(days=1):
+            run_end = date
+            continue
+        if run_start is not None:
+            yield _day_range(run_start)[0], _day_range(run_end)[1]
+        run_start = run_end = date
+    if run_start is not None:
+        yield _day_range(run_start)[0], _day_range(run_end)[1]
+
+
+def _local_date(dt):
+    "The date of a datetime in the current time zone."
+    return timezone.localtime(dt).date() if settings.USE_TZ else dt.date()
+
+
+class DittoItemQuerySet(models.QuerySet):
+    """
+    For models, like DittoItemModels, that have a `raw_fields` attribute
+    listing their fields which store the full JSON from an API. These can be
+    large and are rarely needed, so we often don't load them.
+    """
+
+    def defer_raw(self):
+        "Don't load the model's raw_fields until they're accessed."
+        return self.defer(*getattr(self.model, "raw_fields", ()))
+
+    def with_raw(self):
+        """
+        Load all the fields, undoing defer_raw() and any other defer().
+        eg, Tweet.public_objects.with_raw()
+        """
+        return self.defer(None)
+
+
+class DittoItemManager(models.Manager.from_queryset(DittoItemQuerySet)):
+    """
+    Returns all items, with all their fields.
+    Has the defer_raw() and with_raw() methods of DittoItemQuerySet.
+    """
+
+
+class PublicItemManager(DittoItemManager):
     """
     Only returns items that are public.
     Should be used on ALL public pages of the site.
+    Doesn't load the model's raw_fields until they're accessed; use
+    with_raw() if you'll need them for many items.
     """
 
     def get_queryset(self):
-        return super().get_queryset().filter(is_private=False)
+        return super().get_queryset().filter(is_private=False).defer_raw()
+
+
+class TimelineManager(models.Manager):
+    """
+    For keeping the TimelineItem index in step with the DittoItemModel child
+    classes (Photos, Scrobbles, Bookmarks, Tweets...) that it points to.
+    """
+
+    # The most items of one kind that batch_updates() will hold before
+    # updating their TimelineItems:
+    _batch_chunk_size = 2000
+
+    def update_for_item(self, item):
+        """
+        Create, update or delete the TimelineItems for a single item, eg a
+        Photo or a Tweet, based on its get_timeline_entries().
+        Called whenever a DittoItemModel child is saved.
+        Within batch_updates() this is put off until the batch ends.
+        """
+        batch = _batched_items.get()
+        if batch is None:
+            self.update_for_items([item])
+            return
+
+        model_items = batch[type(item)]
+        model_items[item.pk] = item
+        if len(model_items) >= self._batch_chunk_size:
+            batch.pop(type(item))
+            self.update_for_items(model_items.values())
+
+    @contextmanager
+    def batch_updates(self):
+        """
+        Within this, saving a DittoItemModel child doesn't update its
+        TimelineItems and DailyItemCounts. Instead update_for_items() is
+        called once, for each kind of item saved, when the block ends. For
+        fetchers that save a page of items one at a time, eg:
+
+            with TimelineItem.objects.batch_updates():
+                for data in results:
+                    Scrobble.objects.update_or_create(...)
+
+        Can be nested; only the outermost block does the updating.
+        """
+        if _batched_items.get() is not None:
+            yield
+            return
+
+        batch = defaultdict(dict)
+        token = _batched_items.set(batch)
+        update = True
+        try:
+            yield
+        except Exception:
+            # Unless the saves are about to be rolled back, still update the
+            # timeline for the items that were saved:
+            update = not transaction.get_connection().in_atomic_block
+            raise
+        finally:
+            _batched_items.reset(token)
+            if update:
+                for model_items in batch.values():
+                    self.update_for_items(model_items.values())
+
+    def update_for_items(self, items):
+        """
+        Create, update or delete the TimelineItems for several items of one
+        kind, eg a page of Photos, using a few queries in total rather than a
+        few per item. For use after saving items in bulk, which bypasses
+        their save() methods.
+
+        items -- A list of one kind of DittoItemModel child.
+        """
+        items = list(items)
+        if not items:
+            return
+
+        # Anything get_timeline_entries() needs, if not already fetched:
+        prefetch_related_objects(items, *items[0].timeline_prefetch_related)
+
+        app_name = items[0]._meta.app_label
+        existing = defaultdict(dict)
+        for row in self.filter(
+            app_name=app_name, object_id__in=[item.pk for item in items]
+        ):
+            existing[row.object_id][row.variety_name] = row
+
+        new_rows = []
+        changed_rows = []
+        old_rows = []
+        # The (variety_name, time) of any rows we add, change or delete:
+        changed = []
+
+        for item in items:
+            item_rows = existing.pop(item.pk, {})
+
+            for variety_name, post_time, is_private in self._get_entries(item):
+                row = item_rows.pop(variety_name, None)
+                if row is None:
+                    new_rows.append(
+                        self.model(
+                            app_name=app_name,
+                            variety_name=variety_name,
+                            object_id=item.pk,
+                            post_time=post_time,
+                            is_private=is_private,
+                        )
+                    )
+                    changed.append((variety_name, post_time))
+                elif row.post_time != post_time or row.is_private != is_private:
+                    changed.extend(
+                        [(variety_name, row.post_time), (variety_name, post_time)]
+                    )
+                    row.post_time = post_time
+                    row.is_private = is_private
+                    changed_rows.append(row)
+
+            # Anything left over is a variety the item no longer appears in:
+            old_rows.extend(item_rows.values())
+            changed.extend(
+                (row.variety_name, row.post_time) for row in item_rows.values()
+            )
+
+        if new_rows:
+            self.bulk_create(new_rows)
+        if changed_rows:
+            self.bulk_update(changed_rows, ["post_time", "is_private"])
+        if old_rows:
+            self.filter(pk__in=[row.pk for row in old_rows]).delete()
+
+        self._changed(app_name, changed)
+
+    def update_for_queryset(self, queryset, chunk_size=2000):
+        """
+        Call update_for_items() for every item in a QuerySet of one kind of
+        DittoItemModel child, chunk_size at a time. For use after
+        queryset.update() calls, which bypass the models' save() methods.
+        """
+        queryset = queryset.prefetch_related(*queryset.model.timeline_prefetch_related)
+        items = []
+        for item in queryset.iterator(chunk_size=chunk_size):
+            items.append(item)
+            if len(items) >= chunk_size:
+                self.update_for_items(items)
+                items = []
+        self.update_for_items(items)
+
+    def delete_for_item(self, item):
+        "Delete all the TimelineItems for a single item, eg a Photo or a Tweet."
+        batch = _batched_items.get()
+        if batch is not None:
+            batch[type(item)].pop(item.pk, None)
+        app_name = item._meta.app_label
+        rows = self.filter(app_name=app_name, object_id=item.pk)
+        changed = list(rows.values_list("variety_name", "post_time"))
+        if changed:
+            rows.delete()
+            self._changed(app_name, changed)
+
+    def rebuild(self, chunk_size=2000):
+        """
+        Delete all TimelineItems and re-create them from every item of every
+        installed DittoItemModel child class.
+        Needed when items have been created or changed without calling their
+        save() methods, or when Accounts have been added for Users whose
+        items were already saved.
+        Returns the number of TimelineItems created.
+        """
+        from .models import DittoItemModel
+
+        count = 0
+
+        with transaction.atomic():
+            self.all().delete()
+
+            for model in apps.get_models():
+                if not issubclass(model, DittoItemModel):
+                    continue
+
+                queryset = model.objects.defer_raw().prefetch_related(
+                    *model.timeline_prefetch_related
+                )
+                rows = []
+                for item in queryset.iterator(chunk_size=chunk_size):
+                    rows.extend(
+                        self.model(
+                            app_name=model._meta.app_label,
+                            variety_name=variety_name,
+                            object_id=item.pk,
+                            post_time=post_time,
+                            is_private=is_private,
+                        )
+                        for variety_name, post_time, is_private in (
+                            self._get_entries(item)
+                        )
+                    )
+                    if len(rows) >= chunk_size:
+                        self.bulk_create(rows)
+                        count += len(rows)
+                        rows = []
+
+                if rows:
+                    self.bulk_create(rows)
+                    count += len(rows)
+
+        # Every day's cached counts might now be wrong.
+        bump_content_version("timeline")
+
+        return count
+
+    def get_day_counts(self, date):
+        """
+        Returns a dict of the numbers of public TimelineItems on a single day,
+        in the current time zone, from a single grouped query. eg:
+            {('flickr', 'photo-taken'): 3, ('twitter', 'tweet'): 6}
+
+        Counts for days before today are cached for
+        CORE_DAY_COUNTS_CACHE_TIMEOUT seconds; they're forgotten if any of
+        that day's TimelineItems change.
+
+        date -- A datetime.date.
+        """
+        if date >= timezone.localdate():
+            # Today, or the future, can still have new items added.
+            return self._count_day(date)
+
+        key = self._day_counts_key(date)
+        counts = cache.get(key)
+        if counts is None:
+            counts = self._count_day(date)
+            cache.set(key, counts, CORE_DAY_COUNTS_CACHE_TIMEOUT)
+        return counts
+
+    def _count_day(self, date):
+        "Does the querying for get_day_counts()."
+        since, until = _day_range(date)
+
+        return {
+            (row["app_name"], row["variety_name"]): row["count"]
+            for row in self.filter(
+                is_private=False, post_time__gte=since, post_time__lt=until
+            )
+            .values("app_name", "variety_name")
+            .annotate(count=Count("id"))
+            .order_by()
+        }
+
+    def _day_counts_key(self, date):
+        version = get_content_version("timeline")
+        return f"ditto:day_counts:{version}:{date.isoformat()}"
+
+    def _changed(self, app_name, changed):
+        """
+        Called after an item's TimelineItems have been added, changed or
+        deleted. Forgets any cached get_day_counts() for those days, and
+        updates the DailyItemCounts for them.
+
+        app_name -- eg, 'flickr'.
+        changed -- A list of (variety_name, datetime) tuples.
+        """
+        from .models import DailyItemCount
+
+        dates = defaultdict(set)
+        for variety_name, post_time in changed:
+            dates[variety_name].add(_local_date(post_time))
+
+        if dates:
+            cache.delete_many(
+                [self._day_counts_key(d) for d in set().union(*dates.values())]
+            )
+            for variety_name, variety_dates in dates.items():
+                DailyItemCount.objects.update_days(
+                    app_name, variety_name, variety_dates
+                )
+
+    def _get_entries(self, item):
+        "The item's timeline entries, ignoring any that have no time."
+        return [entry for entry in item.get_timeline_entries() if entry[1]]
+
+
+class DailyItemCountManager(models.Manager):
+    """
+    For keeping the DailyItemCounts up to date, and fetching annual and daily
+    counts from them.
+    """
+
+    def get_annual_counts(self, app_name, variety_name, account=None):
+        """
+        Returns a list of dicts, sorted by year, like:
+            [ {'year': 2015, 'count': 1234}, {'year': 2016, 'count': 9876} ]
+        including any years with no items between the first and last.
+
+        app_name -- eg, 'flickr'.
+        variety_name -- eg, 'photo-taken'.
+        account -- The identifier of one account, eg a Flickr User's NSID, or
+                   None for the items of all accounts.
+        """
+        qs = self.filter(app_name=app_name, variety_name=variety_name)
+        if account:
+            qs = qs.filter(account=account)
+        qs = (
+            qs.annotate(year=ExtractYear("date"))
+            .values("year")
+            .annotate(total=Sum("count"))
+            .order_by()
+        )
+        return fill_annual_counts({row["year"]: row["total"] for row in qs})
+
+    def get_daily_counts(self, year, app_name=None, variety_name=None, account=None):
+        """
+        Returns a list of dicts, one for every day of the year, like:
+            [ {'date': date(2015, 1, 1), 'count': 12}, ... ]
+
+        year -- eg, 2015.
+        app_name -- eg, 'flickr', or None for all of them.
+        variety_name -- eg, 'photo-taken', or None for all of the app's.
+        account -- The identifier of one account, eg a Flickr User's NSID, or
+                   None for the items of all accounts.
+        """
+        qs = self.filter(date__year=year)
+        if account:
+            qs = qs.filter(account=account)
+        if app_name is not None:
+            qs = qs.filter(app_name=app_name)
+        if variety_name is not None:
+            qs = qs.filter(variety_name=variety_name)
+
+        counts = dict(
+            qs.values("date").annotate(total=Sum("count")).values_list("date", "total")
+        )
+
+        day = datetime.date(year, 1, 1)
+        days = []
+        while day.year == year:
+            days.append({"date": day, "count": counts.get(day, 0)})
+            day += datetime.timedelta(days=1)
+        return days
+
+    def update_for_items(self, variety_name, items):
+        """
+        Re-count the days that some items are on, for one variety. For use
+        when something that affects their counts has changed without changing
+        their TimelineItems, eg a second account favoriting a Tweet.
+
+        variety_name -- eg, 'favorite'.
+        items -- A QuerySet or list of one kind of DittoItemModel child.
+        """
+        items = list(items)
+        if not items:
+            return
+        app_name = items[0]._meta.app_label
+        variety = self._get_varieties(app_name).get((app_name, variety_name))
+        if variety is None:
+            return
+        date_field = variety[1]
+        dates = {
+            _local_date(getattr(item, date_field))
+            for item in items
+            if getattr(item, date_field)
+        }
+        self.update_days(app_name, variety_name, dates)
+
+    def update_days(self, app_name, variety_name, dates):
+        """
+        Re-count the items of one variety, eg flickr 'photo-taken', on some
+        days, and replace that variety's DailyItemCounts for those days.
+
+        app_name -- eg, 'flickr'.
+        variety_name -- eg, 'photo-taken'.
+        dates -- An iterable of datetime.dates.
+        """
+        variety = self._get_varieties(app_name).get((app_name, variety_name))
+        if variety is None:
+            return
+        queryset, date_field, account_field = variety
+
+        dates = set(dates)
+        if not dates:
+            return
+
+        # Count all the days at once, only looking at items on those days,
+        # with one range for each run of consecutive days:
+        days_q = reduce(
+            operator.or_,
+            (
+                Q(**{f"{date_field}__gte": since, f"{date_field}__lt": until})
+                for since, until in _day_runs(dates)
+            ),
+        )
+        range_qs = queryset.filter(days_q)
+        rows = [
+            self.model(
+                app_name=app_name,
+                variety_name=variety_name,
+                account=account,
+                date=date,
+                count=n,
+            )
+            for (date, account), n in self._count(
+                range_qs, account_field, TruncDate(date_field)
+            )
+            if date in dates
+        ]
+
+        with transaction.atomic():
+            self.filter(
+                app_name=app_name, variety_name=variety_name, date__in=dates
+            ).delete()
+            self.bulk_create(rows)
+
+    def rebuild(self):
+        """
+        Delete all DailyItemCounts and re-create them by counting the items of
+        every variety of every installed DittoItemModel child class.
+        Returns the number of DailyItemCounts created.
+        """
+        count = 0
+
+        with transaction.atomic():
+            self.all().delete()
+
+            for (app_name, variety_name), variety in self._get_varieties().items():
+                queryset, date_field, account_field = variety
+                queryset = queryset.filter(**{f"{date_field}__isnull": False})
+                rows = [
+                    self.model(
+                        app_name=app_name,
+                        variety_name=variety_name,
+                        account=account,
+                        date=date,
+                        count=n,
+                    )
+                    for (date, account), n in self._count(
+                        queryset, account_field, TruncDate(date_field)
+                    )
+                ]
+                self.bulk_create(rows, batch_size=2000)
+                count += len(rows)
+
+        return count
+
+    def _count(self, queryset, account_field, date=None):
+        """
+        Counts the items in queryset for each account, ignoring items with no
+        account.
+        If date is an expression, like TruncDate('post_time'), the counts are
+        also grouped by it, and the keys are (date, account) tuples.
+        Returns a list of (key, count) tuples.
+        """
+        if date is None:
+            fields = [account_field]
+        else:
+            queryset = queryset.annotate(day=date)
+            fields = ["day", account_field]
+
+        rows = (
+            queryset.values(*fields)
+            .annotate(total=Count("pk", distinct=True))
+            .order_by()
+        )
+
+        return [
+            (
+                row[account_field]
+                if date is None
+                else (row["day"], row[account_field]),
+                row["total"],
+            )
+            for row in rows
+            if row[account_field]
+        ]
+
+    def _get_varieties(self, app_name=None):
+        """
+        Returns a dict of all the varieties of the installed DittoItemModel
+        child classes that have daily counts, like:
+            {('flickr', 'photo-taken'): (queryset, 'taken_time', 'user__nsid')}
+
+        app_name -- eg, 'flickr', to only get that app's varieties.
+        """
+        from .models import DittoItemModel
+
+        if app_name is None:
+            model_classes = apps.get_models()
+        else:
+            try:
+                model_classes = apps.get_app_config(app_name).get_models()
+            except LookupError:
+                model_classes = []
+
+        varieties = {}
+        for model in model_classes:
+            if issubclass(model, DittoItemModel):
+                for variety_name, variety in model.get_daily_count_varieties().items():
+                    varieties[(model._meta.app_label, variety_name)] = variety
+        return varieties
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimelineItem',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('app_name', models.CharField(help_text="eg, 'flickr' or 'twitter'.", max_length=20)),
+                ('variety_name', models.CharField(help_text="eg, 'photo-uploaded' or 'favorite'.", max_length=30)),
+                ('object_id', models.PositiveIntegerField(help_text='The ID of the Photo, Tweet, etc.')),
+                ('post_time', models.DateTimeField(help_text="The time the item is listed at. Usually its post_time, but could be different, eg the taken_time for 'photo-taken'.")),
+                ('is_private', models.BooleanField(default=False, help_text='If true, this item will not be shown on public-facing pages.')),
+            ],
+            options={
+                'ordering': ['-post_time', '-object_id'],
+                'indexes': [models.Index(fields=['is_private', 'post_time'], name='ditto_core__is_priv_019161_idx'), models.Index(fields=['app_name', 'object_id'], name='ditto_core__app_nam_36fc1c_idx')],
+                'constraints': [models.UniqueConstraint(fields=('app_name', 'variety_name', 'object_id'), name='ditto_core_timelineitem_unique_item')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ditto_core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyItemCount',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('app_name', models.CharField(help_text="eg, 'flickr' or 'twitter'.", max_length=20)),
+                ('variety_name', models.CharField(help_text="eg, 'photo-uploaded' or 'favorite'.", max_length=30)),
+                ('account', models.CharField(help_text="eg, a Flickr User's NSID or a Twitter User's screen_name.", max_length=255)),
+                ('date', models.DateField()),
+                ('count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['date'],
+                'constraints': [models.UniqueConstraint(fields=('app_name', 'variety_name', 'account', 'date'), name='ditto_core_dailyitemcount_unique_day')],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-17 08:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ditto_core', '0002_dailyitemcount'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GeneratedImage',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text="The generated file's name in the storage.", max_length=255, unique=True)),
+                ('source_name', models.CharField(db_index=True, help_text='The name of the original file it was generated from.', max_length=255)),
+                ('time_created', models.DateTimeField(auto_now_add=True, help_text='The time the file was generated.')),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+    ]
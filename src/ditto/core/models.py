@@ -1,8 +1,14 @@
 from django.db import models
-from django.forms.models import model_to_dict
 from django.utils import timezone
 
-from .managers import PublicItemManager
+from .fields import CompressedTextField
+from .imageplaceholders import make_placeholder
+from .managers import (
+    DailyItemCountManager,
+    DittoItemManager,
+    PublicItemManager,
+    TimelineManager,
+)
 from .utils import truncate_string
 
 
@@ -29,12 +35,37 @@ class DiffModelMixin:
     Set some of its properties.
     Call `myObj.has_changed` to see if any fields are different to in the DB.
 
-    From http://stackoverflow.com/a/13842223/250962
+    A field's initial value is only remembered when it's first set after the
+    object has been created, so loading objects that are never changed, eg
+    in list views, costs nothing extra.
+    Fields that were deferred when the object was loaded aren't tracked.
+
+    Set `diff_fields` to a list of field names to only track those fields,
+    or to an empty list to not track any.
+
+    Originally from http://stackoverflow.com/a/13842223/250962
     """
 
+    # None tracks all editable fields:
+    diff_fields = None
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.__initial = self._dict
+        # Maps attnames of changed fields to their initial values.
+        # Anything set before this exists (ie, in __init__()) isn't tracked.
+        self.__dict__["_diff_initial"] = {}
+
+    def __setattr__(self, name, value):
+        initial = self.__dict__.get("_diff_initial")
+        if (
+            initial is not None
+            and name not in initial
+            and name in self.__dict__
+            and name in self._get_diff_attnames()
+        ):
+            # Not self.__dict__[name], which could still be compressed:
+            initial[name] = getattr(self, name)
+        super().__setattr__(name, value)
 
     @property
     def diff(self):
@@ -42,10 +73,13 @@ class DiffModelMixin:
         of before/after changes. eg:
         `{'categories': (None, [1, 3, 5]), 'rank': (0, 42)}`
         """
-        d1 = self.__initial
-        d2 = self._dict
-        diffs = [(k, (v, d2[k])) for k, v in d1.items() if v != d2[k]]
-        return dict(diffs)
+        attnames = self._get_diff_attnames()
+        diffs = {}
+        for attname, old in self.__dict__.get("_diff_initial", {}).items():
+            new = getattr(self, attname)
+            if old != new:
+                diffs[attnames[attname]] = (old, new)
+        return diffs
 
     @property
     def has_changed(self):
@@ -64,11 +98,51 @@ class DiffModelMixin:
     def save(self, *args, **kwargs):
         "Saves model and set initial state."
         super().save(*args, **kwargs)
-        self.__initial = self._dict
+        self.__dict__["_diff_initial"] = {}
 
-    @property
-    def _dict(self):
-        return model_to_dict(self, fields=[field.name for field in self._meta.fields])
+    @classmethod
+    def _get_diff_attnames(cls):
+        """Returns a dict mapping the attnames of the tracked fields to their
+        names, eg {'user_id': 'user'}. Worked out once per class.
+        """
+        try:
+            return cls.__dict__["_diff_attnames"]
+        except KeyError:
+            attnames = {
+                field.attname: field.name
+                for field in cls._meta.concrete_fields
+                if field.editable
+                and (cls.diff_fields is None or field.name in cls.diff_fields)
+            }
+            cls._diff_attnames = attnames
+            return attnames
+
+
+class ImagePlaceholderModelMixin(models.Model):
+    """
+    For models with a downloaded image, like Flickr Photos. Stores a tiny,
+    blurry version of the image, and its most common colour, to show in
+    pages while the real image loads.
+
+    Set them with set_placeholder() before saving the image's file.
+    """
+
+    placeholder = models.TextField(
+        blank=True,
+        help_text="A tiny version of the image, as a data: URI. Set automatically.",
+    )
+    dominant_color = models.CharField(
+        blank=True,
+        max_length=7,
+        help_text="The image's most common colour, eg '#a1b2c3'. Set automatically.",
+    )
+
+    class Meta:
+        abstract = True
+
+    def set_placeholder(self, file):
+        "Sets placeholder and dominant_color from an image file, without saving."
+        self.placeholder, self.dominant_color = make_placeholder(file)
 
 
 class DittoItemModel(TimeStampedModelMixin, DiffModelMixin, models.Model):
@@ -85,6 +159,11 @@ class DittoItemModel(TimeStampedModelMixin, DiffModelMixin, models.Model):
     # Used in templates.
     ditto_item_name = "set__ditto_item_name__in_child_class"
 
+    # Can be overridden for child classes.
+    # Lookups to prefetch when getting the timeline entries for lots of items
+    # at once. eg, ("user__account_set",)
+    timeline_prefetch_related = ()
+
     title = models.CharField(blank=True, max_length=255)
     permalink = models.URLField(
         blank=True, help_text="URL of the item on the service's website."
@@ -125,14 +204,18 @@ class DittoItemModel(TimeStampedModelMixin, DiffModelMixin, models.Model):
         null=True, blank=True, max_digits=9, decimal_places=6
     )
 
-    raw = models.TextField(blank=True, help_text="eg, the raw JSON from the API.")
+    raw = CompressedTextField(blank=True, help_text="eg, the raw JSON from the API.")
 
     # All Items (eg, used in Admin):
-    objects = models.Manager()
+    objects = DittoItemManager()
 
     # All Items which aren't private. Should ALWAYS be used for public pages:
     public_objects = PublicItemManager()
 
+    # Fields holding data straight from the API, which aren't loaded by
+    # public_objects (or by DittoItemQuerySet.defer_raw()):
+    raw_fields = ("raw",)
+
     class Meta:
         abstract = True
         get_latest_by = "post_time"
@@ -151,6 +234,33 @@ class DittoItemModel(TimeStampedModelMixin, DiffModelMixin, models.Model):
         else:
             self.post_year = None
         super().save(*args, **kwargs)
+        TimelineItem.objects.update_for_item(self)
+
+    def get_timeline_entries(self):
+        """
+        Child classes should return a list of tuples, one for each variety
+        (as used in ditto.core.views.DittoAppsMixin) this item should be listed
+        in, like:
+            [("photo-uploaded", self.post_time, self.is_private)]
+        Each tuple is:
+            (variety_name, the datetime to list it at, whether it's private)
+        Used to keep the TimelineItems up to date.
+        """
+        return []
+
+    @classmethod
+    def get_daily_count_varieties(cls):
+        """
+        Child classes should return a dict with a key for each variety
+        (as in get_timeline_entries()) whose items are counted in the
+        DailyItemCounts, like:
+            {"photo-taken": (Photo.public_photo_objects.all(), "taken_time",
+                             "user__nsid")}
+        Each value is:
+            (QuerySet of the items to count, the datetime field to count them
+             by, the lookup for the identifier of the item's account)
+        """
+        return {}
 
     def _summary_source(self):
         """
@@ -176,3 +286,125 @@ class DittoItemModel(TimeStampedModelMixin, DiffModelMixin, models.Model):
             .replace("\n", " ")
             .replace("\r", " ")
         )
+
+
+class TimelineItem(models.Model):
+    """
+    A denormalized index of all the items from all the Ditto apps, so that we
+    can get, say, the most recent public items across all apps, or the counts
+    of items on a day, with a single query.
+
+    There is one TimelineItem for each variety an item appears in. eg, a Photo
+    has one for 'photo-uploaded' and another for 'photo-taken'.
+
+    Kept up to date when items are saved or deleted. Can be re-created with
+    the `rebuild_ditto_timeline` management command.
+    """
+
+    app_name = models.CharField(max_length=20, help_text="eg, 'flickr' or 'twitter'.")
+    variety_name = models.CharField(
+        max_length=30, help_text="eg, 'photo-uploaded' or 'favorite'."
+    )
+    object_id = models.PositiveIntegerField(
+        help_text="The ID of the Photo, Tweet, etc."
+    )
+    post_time = models.DateTimeField(
+        help_text=(
+            "The time the item is listed at. Usually its post_time, but "
+            "could be different, eg the taken_time for 'photo-taken'."
+        )
+    )
+    is_private = models.BooleanField(
+        default=False,
+        help_text="If true, this item will not be shown on public-facing pages.",
+    )
+
+    objects = TimelineManager()
+
+    # All TimelineItems which aren't private:
+    public_objects = PublicItemManager()
+
+    class Meta:
+        ordering = ["-post_time", "-object_id"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["app_name", "variety_name", "object_id"],
+                name="ditto_core_timelineitem_unique_item",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["is_private", "post_time"]),
+            models.Index(fields=["app_name", "object_id"]),
+        ]
+
+    def __str__(self):
+        return f"{self.app_name} {self.variety_name} {self.object_id}"
+
+
+class DailyItemCount(models.Model):
+    """
+    The number of items of each variety on each day, eg the number of Photos
+    taken by one Flickr User on 2015-01-01. Used for annual counts and
+    calendars, without having to count all of the items each time.
+
+    There's one row for each account with any items on the day. Counts for
+    all accounts are the sum of those. So a Tweet favorited by two accounts
+    is counted twice in the total number of favorites.
+
+    Kept up to date whenever TimelineItems change. Can be re-created with the
+    `rebuild_ditto_daily_counts` management command.
+    """
+
+    app_name = models.CharField(max_length=20, help_text="eg, 'flickr' or 'twitter'.")
+    variety_name = models.CharField(
+        max_length=30, help_text="eg, 'photo-uploaded' or 'favorite'."
+    )
+    account = models.CharField(
+        max_length=255,
+        help_text="eg, a Flickr User's NSID or a Twitter User's screen_name.",
+    )
+    date = models.DateField()
+    count = models.PositiveIntegerField(default=0)
+
+    objects = DailyItemCountManager()
+
+    class Meta:
+        ordering = ["date"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["app_name", "variety_name", "account", "date"],
+                name="ditto_core_dailyitemcount_unique_day",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.app_name} {self.variety_name} {self.account} {self.date}"
+
+
+class GeneratedImage(models.Model):
+    """
+    A record of an image file generated by imagekit from a downloaded
+    original, eg a thumbnail of a Flickr Photo. Used by
+    ditto.core.imagecache.ManifestCacheFileBackend so that it doesn't have to
+    ask the storage whether a file exists every time its URL is used.
+    """
+
+    name = models.CharField(
+        max_length=255,
+        unique=True,
+        help_text="The generated file's name in the storage.",
+    )
+    source_name = models.CharField(
+        max_length=255,
+        db_index=True,
+        help_text="The name of the original file it was generated from.",
+    )
+    time_created = models.DateTimeField(
+        auto_now_add=True, help_text="The time the file was generated."
+    )
+
+    class Meta:
+        ordering = ["name"]
+
+    def __str__(self):
+        return self.name
@@ -1,8 +1,20 @@
 # ruff: noqa
+import base64
+import binascii
+import hashlib
+import json
 import math
 from functools import reduce
 
-from django.core.paginator import InvalidPage, Page, Paginator
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet, FieldDoesNotExist, ValidationError
+from django.core.paginator import EmptyPage, InvalidPage, Page, Paginator
+from django.db import connections
+from django.db.models import Q, QuerySet
+from django.utils.functional import cached_property
+
+from . import app_settings
+from .utils import get_content_version
 
 # From https://djangosnippets.org/snippets/773/
 # Lets us do better pagination, so we don't need to show *every* page.
@@ -12,6 +24,9 @@ __all__ = (
     "ExPaginator",
     "DiggPaginator",
     "QuerySetDiggPaginator",
+    "KeysetPaginator",
+    "CachedCount",
+    "EstimatedCount",
 )
 
 
@@ -183,9 +198,14 @@ class DiggPaginator(ExPaginator):
     >>> DiggPaginator(range(1,1000), 10, body=5, padding=3)
     Traceback (most recent call last):
     ValueError: padding too large for body (max 2)
+
+    ``count_provider`` can be a callable that's passed the object_list and
+    returns the number of items, to use instead of an exact COUNT(*) query.
+    eg, ``CachedCount()`` or ``EstimatedCount()``.
     """
 
     def __init__(self, *args, **kwargs):
+        self.count_provider = kwargs.pop("count_provider", None)
         self.body = kwargs.pop("body", 10)
         self.tail = kwargs.pop("tail", 2)
         self.align_left = kwargs.pop("align_left", False)
@@ -199,6 +219,12 @@ class DiggPaginator(ExPaginator):
             raise ValueError("padding too large for body (max %d)" % max_padding)
         super().__init__(*args, **kwargs)
 
+    @cached_property
+    def count(self):
+        if self.count_provider is None:
+            return super().count
+        return self.count_provider(self.object_list)
+
     def page(self, number, *args, **kwargs):
         """Return a standard ``Page`` instance with custom, digg-specific
         page ranges attached.
@@ -310,6 +336,435 @@ class QuerySetDiggPaginator(DiggPaginator, Paginator):
     pass
 
 
+class CachedCount:
+    """
+    A count_provider for DiggPaginator that caches the count of a QuerySet.
+
+    The cache key is made from the QuerySet's SQL and the content version of
+    its model's app, so the count is re-calculated whenever anything in that
+    app is saved or deleted, or after DITTO_CORE_COUNT_CACHE_TIMEOUT seconds.
+
+    PaginatedListView uses it by default.
+    """
+
+    def __init__(self, timeout=None):
+        self._timeout = timeout
+
+    @property
+    def timeout(self):
+        "Read when used, so that changes to the setting are noticed."
+        if self._timeout is None:
+            return app_settings.CORE_COUNT_CACHE_TIMEOUT
+        return self._timeout
+
+    def __call__(self, object_list):
+        if not isinstance(object_list, QuerySet):
+            return len(object_list)
+
+        try:
+            sql, params = object_list.query.sql_with_params()
+        except EmptyResultSet:
+            return 0
+
+        app_label = object_list.model._meta.app_label
+        digest = hashlib.md5(f"{sql}{params}".encode("utf-8")).hexdigest()
+        key = "ditto:count:{}:{}:{}".format(
+            app_label, get_content_version(app_label), digest
+        )
+
+        count = cache.get(key)
+        if count is None:
+            count = object_list.count()
+            cache.set(key, count, self.timeout)
+        return count
+
+
+class EstimatedCount:
+    """
+    A count_provider for DiggPaginator that uses the database's statistics
+    about a table to estimate the count of an unfiltered QuerySet, like
+    Scrobble.objects.all(). This is nearly instant, but may be slightly out,
+    so the final pages might be empty or missing.
+
+    Only works with PostgreSQL and MySQL. For other databases, filtered
+    QuerySets, or estimates smaller than `threshold` (when an exact count is
+    quick anyway), uses the `fallback` count_provider, or an exact count.
+
+    Use it in a PaginatedListView by setting:
+
+        paginator_count_provider = EstimatedCount(fallback=CachedCount())
+    """
+
+    def __init__(self, fallback=None, threshold=10000):
+        self.fallback = fallback
+        self.threshold = threshold
+
+    def __call__(self, object_list):
+        if isinstance(object_list, QuerySet) and self._is_unfiltered(object_list):
+            estimate = self._estimate_table_rows(object_list)
+            if estimate is not None and estimate >= self.threshold:
+                return estimate
+
+        if self.fallback is not None:
+            return self.fallback(object_list)
+        elif isinstance(object_list, QuerySet):
+            return object_list.count()
+        else:
+            return len(object_list)
+
+    def _is_unfiltered(self, queryset):
+        "Will the QuerySet return every row in its model's table?"
+        query = queryset.query
+        return not (
+            query.where
+            or query.distinct
+            or query.is_sliced
+            or query.combinator
+            or query.group_by is not None
+        )
+
+    def _estimate_table_rows(self, queryset):
+        "Returns the estimated number of rows in the table, or None."
+        connection = connections[queryset.db]
+        table = queryset.model._meta.db_table
+
+        if connection.vendor == "postgresql":
+            sql = "SELECT reltuples FROM pg_class WHERE relname = %s"
+        elif connection.vendor == "mysql":
+            sql = (
+                "SELECT table_rows FROM information_schema.tables "
+                "WHERE table_schema = DATABASE() AND table_name = %s"
+            )
+        else:
+            return None
+
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [table])
+            row = cursor.fetchone()
+
+        # PostgreSQL uses -1 for tables that haven't been analyzed yet.
+        if row is None or row[0] is None or row[0] < 0:
+            return None
+        return int(row[0])
+
+
+class KeysetPaginator:
+    """
+    An alternative to DiggPaginator for QuerySets, which doesn't need a
+    COUNT(*) or an OFFSET to fetch a page. Instead each page "seeks" to the items after (or before)
+    the first/last item on the previous page, using the QuerySet's first
+    ordering field (eg, post_time) plus the primary key to break ties.
+    So page 15,000 is as quick to fetch as page 1.
+
+    Use it in a PaginatedListView by setting:
+
+        paginator_class = KeysetPaginator
+
+    Rather than page numbers, pages are identified by tokens like:
+
+        "1"            The first page.
+        "last"         The last page.
+        "a.<cursor>"   The page after the item described by <cursor>.
+        "b.<cursor>"   The page before the item described by <cursor>.
+
+    Other numbers are still accepted, so that old links keep working, but use
+    an OFFSET to find the page.
+
+    The pages have the same leading_range, main_range, trailing_range and
+    page_range attributes as DiggPaginator's, but these can only include the
+    pages we know about without counting: the first page, the current page
+    (if it has a number) and "last".
+
+    Items whose ordering field is NULL are not included.
+
+    Its ``count`` is only found if something, like a template, asks for it.
+    It uses the ``count_provider``, if one is supplied, or else a
+    ``CachedCount()``, so it's not re-counted for every page.
+    """
+
+    is_keyset = True
+
+    first_page = 1
+    last_page = "last"
+
+    def __init__(
+        self, object_list, per_page, orphans=0, allow_empty_first_page=True, **kwargs
+    ):
+        # kwargs might include DiggPaginator's body, tail, etc, which we ignore.
+        self.count_provider = kwargs.get("count_provider") or CachedCount()
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.allow_empty_first_page = allow_empty_first_page
+        self.order_field, self.descending = self._get_ordering()
+
+    @cached_property
+    def count(self):
+        "The total number of items, from the count_provider."
+        return self.count_provider(self.object_list)
+
+    def page(self, number, softlimit=False):
+        """
+        Returns a KeysetPage for the token `number`.
+
+        If softlimit is True then an invalid token, or one that is past the end
+        of the items (eg, because they're now ordered differently) returns
+        the last page, or first page, rather than raising InvalidPage.
+        """
+        number = str(number)
+
+        try:
+            if number == str(self.first_page):
+                return self._first_page()
+            elif number == self.last_page:
+                return self._last_page()
+            elif number[:2] in ("a.", "b."):
+                value, pk = self._decode_cursor(number[2:])
+                page = self._cursor_page(value, pk, after=(number[0] == "a"))
+            else:
+                page = self._numbered_page(self._validate_number(number))
+        except InvalidPage:
+            if softlimit:
+                return self._first_page()
+            raise
+
+        if len(page) == 0:
+            if softlimit:
+                return self._last_page()
+            msg = "That page contains no results"
+            raise EmptyPage(msg)
+
+        return page
+
+    def _first_page(self):
+        items = list(self._ordered()[: self.per_page + 1])
+        has_next = len(items) > self.per_page
+
+        if len(items) == 0 and not self.allow_empty_first_page:
+            msg = "That page contains no results"
+            raise EmptyPage(msg)
+
+        return KeysetPage(
+            items[: self.per_page],
+            self.first_page,
+            self,
+            has_next=has_next,
+            has_previous=False,
+        )
+
+    def _last_page(self):
+        items = list(self._ordered(reverse=True)[: self.per_page + 1])
+        has_previous = len(items) > self.per_page
+        items = items[: self.per_page]
+        items.reverse()
+        number = self.last_page if has_previous else self.first_page
+        return KeysetPage(
+            items, number, self, has_next=False, has_previous=has_previous
+        )
+
+    def _numbered_page(self, number):
+        "For old-style page numbers. Uses an OFFSET."
+        bottom = (number - 1) * self.per_page
+        items = list(self._ordered()[bottom : bottom + self.per_page + 1])
+        return KeysetPage(
+            items[: self.per_page],
+            number,
+            self,
+            has_next=len(items) > self.per_page,
+            has_previous=True,
+        )
+
+    def _cursor_page(self, value, pk, *, after):
+        """
+        The page of items after (or before) the item with this value of the
+        ordering field and this pk.
+        """
+        # Get one extra item so we know if there's another page beyond this.
+        items = list(
+            self._ordered(reverse=not after).filter(
+                self._seek_filter(value, pk, after=after)
+            )[: self.per_page + 1]
+        )
+        has_more = len(items) > self.per_page
+        items = items[: self.per_page]
+
+        if after:
+            has_next = has_more
+            has_previous = True
+        else:
+            items.reverse()
+            has_next = True
+            has_previous = has_more
+
+        return KeysetPage(
+            items, None, self, has_next=has_next, has_previous=has_previous
+        )
+
+    def _ordered(self, *, reverse=False):
+        "The QuerySet ordered by the ordering field and then pk."
+        descending = self.descending != reverse
+        prefix = "-" if descending else ""
+        return self.object_list.filter(
+            **{f"{self.order_field}__isnull": False}
+        ).order_by(f"{prefix}{self.order_field}", f"{prefix}pk")
+
+    def _seek_filter(self, value, pk, *, after):
+        "A Q object that finds items after, or before, this value and pk."
+        # Going "after" an item in a descending list means smaller values.
+        lookup = "lt" if self.descending == after else "gt"
+        return Q(**{f"{self.order_field}__{lookup}": value}) | Q(
+            **{self.order_field: value, f"pk__{lookup}": pk}
+        )
+
+    def _get_ordering(self):
+        """
+        Returns a tuple of the name of the first ordering field, and whether
+        it's descending. eg ('post_time', True).
+        """
+        query = self.object_list.query
+        if query.order_by:
+            ordering = query.order_by
+        elif query.default_ordering:
+            ordering = self.object_list.model._meta.ordering
+        else:
+            ordering = None
+
+        if not ordering or not isinstance(ordering[0], str):
+            msg = "KeysetPaginator needs a QuerySet ordered by a field name."
+            raise ValueError(msg)
+
+        field = ordering[0]
+        if field.startswith("-"):
+            return (field[1:], True)
+        else:
+            return (field, False)
+
+    def _get_model_field(self):
+        "The model field we're ordering by, or None if it's an annotation."
+        try:
+            return self.object_list.model._meta.get_field(self.order_field)
+        except FieldDoesNotExist:
+            return None
+
+    def _validate_number(self, number):
+        try:
+            number = int(number)
+        except ValueError:
+            msg = "That page number is not an integer"
+            raise InvalidPage(msg)
+        if number < 1:
+            msg = "That page number is less than 1"
+            raise EmptyPage(msg)
+        return number
+
+    def encode_cursor(self, obj):
+        "Make the string identifying obj's position in the list."
+        field = self._get_model_field()
+        if field is None:
+            value = getattr(obj, self.order_field)
+        else:
+            value = field.value_to_string(obj)
+        data = json.dumps([self.order_field, value, obj.pk])
+        # Without the padding, so it doesn't need escaping in URLs:
+        cursor = base64.urlsafe_b64encode(data.encode("utf-8")).decode("ascii")
+        return cursor.rstrip("=")
+
+    def _decode_cursor(self, cursor):
+        """
+        Returns a tuple of the ordering field's value and the pk from a string
+        made by encode_cursor().
+        Raises InvalidPage if it's not valid, or it was for a different
+        ordering field.
+        """
+        try:
+            padding = "=" * (-len(cursor) % 4)
+            data = base64.urlsafe_b64decode((cursor + padding).encode("ascii"))
+            order_field, value, pk = json.loads(data)
+        except (binascii.Error, UnicodeError, TypeError, ValueError):
+            msg = "That page is not valid"
+            raise InvalidPage(msg)
+
+        if order_field != self.order_field:
+            msg = "That page is for a different ordering"
+            raise InvalidPage(msg)
+
+        field = self._get_model_field()
+        if field is not None:
+            try:
+                value = field.to_python(value)
+            except ValidationError:
+                msg = "That page is not valid"
+                raise InvalidPage(msg)
+
+        return (value, pk)
+
+
+class KeysetPage(Page):
+    """
+    A page from KeysetPaginator.
+
+    Its number is 1 for the first page, "last" for the last page, an integer
+    for old-style numbered pages, or None.
+
+    next_page_number() and previous_page_number() return the tokens to use
+    for the neighbouring pages, so templates can use them like DiggPage's.
+    """
+
+    def __init__(self, object_list, number, paginator, *, has_next, has_previous):
+        super().__init__(object_list, number, paginator)
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+        self.leading_range = [paginator.first_page] if has_previous else []
+        self.main_range = [number] if number is not None else []
+        self.trailing_range = [paginator.last_page] if has_next else []
+        self.page_range = reduce(
+            lambda x, y: x + ((x and y) and [False]) + y,
+            [self.leading_range, self.main_range, self.trailing_range],
+        )
+
+    def __repr__(self):
+        return f"<Page {self.number}>"
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def next_page_number(self):
+        if not self.has_next():
+            msg = "That page contains no results"
+            raise EmptyPage(msg)
+        return "a.{}".format(self.paginator.encode_cursor(self.object_list[-1]))
+
+    def previous_page_number(self):
+        if not self.has_previous():
+            msg = "That page number is less than 1"
+            raise EmptyPage(msg)
+        return "b.{}".format(self.paginator.encode_cursor(self.object_list[0]))
+
+    def start_index(self):
+        """
+        The 1-based index of the first item on this page, or None for pages
+        fetched using a cursor, because they don't know their position.
+        The last page's index uses the paginator's count.
+        """
+        if len(self) == 0:
+            return 0
+        elif self.number == self.paginator.last_page:
+            return max(1, self.paginator.count - len(self) + 1)
+        elif self.number is None:
+            return None
+        return (self.number - 1) * self.paginator.per_page + 1
+
+    def end_index(self):
+        "The 1-based index of the last item on this page, or None."
+        start = self.start_index()
+        if start is None:
+            return None
+        return start + len(self) - 1 if len(self) else 0
+
+
 # if __name__ == "__main__":
 # import doctest
 # doctest.testmod()
@@ -0,0 +1,71 @@
+import sys
+
+from django.apps import apps
+from django.db.models.signals import m2m_changed, post_delete, post_migrate, post_save
+from django.dispatch import receiver
+
+from .apps import ditto_apps
+from .models import DailyItemCount, DittoItemModel, TimelineItem
+from .utils import bump_content_version
+
+
+@receiver(post_delete, dispatch_uid="ditto.core.delete_timeline_items")
+def delete_timeline_items(sender, instance, **kwargs):
+    "When any Photo, Tweet, etc is deleted, delete its TimelineItems too."
+    if isinstance(instance, DittoItemModel):
+        TimelineItem.objects.delete_for_item(instance)
+
+
+@receiver(post_save, dispatch_uid="ditto.core.bump_content_version_on_save")
+@receiver(post_delete, dispatch_uid="ditto.core.bump_content_version_on_delete")
+@receiver(m2m_changed, dispatch_uid="ditto.core.bump_content_version_on_m2m")
+def bump_app_content_version(sender, **kwargs):
+    """
+    When anything in one of the Ditto apps changes, change that app's content
+    version, so that cached counts, etc, are no longer used.
+    """
+    if kwargs.get("action", "").startswith("pre_"):
+        # Wait for the m2m_changed signal that's sent after the change.
+        return
+    app_label = sender._meta.app_label
+    if app_label in ditto_apps.all():
+        bump_content_version(app_label)
+
+
+def has_ditto_items():
+    "Are there any Photos, Tweets, etc at all?"
+    return any(
+        model.objects.exists()
+        for model in apps.get_models()
+        if issubclass(model, DittoItemModel)
+    )
+
+
+@receiver(post_migrate, dispatch_uid="ditto.core.fill_timeline")
+def fill_timeline(sender, verbosity=1, stdout=sys.stdout, **kwargs):
+    """
+    After migrating, eg when upgrading from a version of Ditto without the
+    timeline, create the TimelineItems if there are none but there are
+    items. The same as running the rebuild_ditto_timeline command.
+    """
+    if sender.label != "ditto_core" or TimelineItem.objects.exists():
+        return
+    if has_ditto_items():
+        count = TimelineItem.objects.rebuild()
+        if verbosity > 0:
+            stdout.write(f"Created {count} Timeline Items\n")
+
+
+@receiver(post_migrate, dispatch_uid="ditto.core.fill_daily_counts")
+def fill_daily_counts(sender, verbosity=1, stdout=sys.stdout, **kwargs):
+    """
+    After migrating, eg when upgrading from a version of Ditto without
+    DailyItemCounts, create them if there are none but there are items.
+    The same as running the rebuild_ditto_daily_counts command.
+    """
+    if sender.label != "ditto_core" or DailyItemCount.objects.exists():
+        return
+    if has_ditto_items():
+        count = DailyItemCount.objects.rebuild()
+        if verbosity > 0:
+            stdout.write(f"Created {count} Daily Item Counts\n")
@@ -6,6 +6,7 @@ from django.utils.safestring import mark_safe
 
 from ditto.core import app_settings
 from ditto.core.apps import ditto_apps
+from ditto.core.models import DailyItemCount
 
 register = template.Library()
 
@@ -20,6 +21,27 @@ def get_enabled_apps():
     return ditto_apps.enabled()
 
 
+@register.simple_tag
+def daily_item_counts(year, app_name=None, variety_name=None, account=None):
+    """
+    Get the number of items on every day of a year, eg for drawing a
+    calendar heatmap. Returns a list of dicts, sorted by date, like:
+        [ {'date': date(2016, 1, 1), 'count': 3}, ... ]
+
+    Arguments:
+    year -- eg, 2016.
+
+    Keyword arguments:
+    app_name -- eg, 'flickr', or None (for all apps).
+    variety_name -- eg, 'photo-taken', or None (for all the app's varieties).
+    account -- eg, a Flickr User's NSID or a Twitter User's screen_name, or
+                None (for all accounts).
+    """
+    return DailyItemCount.objects.get_daily_counts(
+        year, app_name=app_name, variety_name=variety_name, account=account
+    )
+
+
 @register.simple_tag(takes_context=True)
 def query_string(context, key, value):
     """
@@ -68,6 +90,26 @@ def width_height(w, h, max_w, max_h):
     return format_html('width="{}" height="{}"', width, height)
 
 
+@register.simple_tag
+def placeholder_style(item):
+    """Returns a style attribute for an <img>, to show the placeholder of
+    an item with an ImagePlaceholderModelMixin, like a Flickr Photo, behind
+    the image until it loads. eg:
+        style="background: #a1b2c3 url(data:image/jpeg;base64,...) 50% / cover"
+
+    Returns an empty string if the item has no placeholder.
+    """
+    if item.placeholder:
+        return format_html(
+            'style="background: {} url({}) 50% / cover no-repeat"',
+            item.dominant_color or "transparent",
+            item.placeholder,
+        )
+    elif item.dominant_color:
+        return format_html('style="background-color: {}"', item.dominant_color)
+    return ""
+
+
 @register.simple_tag
 def display_time(dt, *, link_to_day=False, granularity=0, case=None):
     """Return the HTML to display the time a Photo, Tweet, etc.
@@ -16,6 +16,12 @@ urlpatterns = [
     # view=views.TagDetailView.as_view(),
     # name='tag_detail'
     # ),
+    re_path(
+        # /2016/counts.json?app=twitter&variety=favorite
+        r"^(?P<year>[0-9]{4})/counts\.json$",
+        view=views.DailyCountsView.as_view(),
+        name="daily_counts",
+    ),
     re_path(
         # /2016/04/18/twitter/favorites
         r"^(?P<year>[0-9]{4})/(?P<month>[0-9]{2})/(?P<day>[0-9]{2})(?:/(?P<app>[a-z]+))?(?:/(?P<variety>[a-z\/]+|))?$",
@@ -1,5 +1,7 @@
+import time
 from datetime import datetime, timezone
 
+from django.core.cache import cache
 from django.db.models import Count
 from django.utils.html import strip_tags
 from django.utils.text import Truncator
@@ -64,9 +66,7 @@ def get_annual_item_counts(qs, field_name="post_year"):
             {'post_year': 2018, 'count': 789},
         ]
 
-    So the rest of this function is all about filling in those gaps.
-
-    Used in all the annual_[thing]_counts() template tags.
+    So fill_annual_counts() fills in those gaps.
 
     Arguments:
         qs -- The QuerySet.
@@ -80,30 +80,69 @@ def get_annual_item_counts(qs, field_name="post_year"):
         .order_by(field_name)
     )
 
+    # Translate qs into {2015: 123, 2016: 456, 2018: 789}:
+    return fill_annual_counts({row[field_name]: row["count"] for row in qs})
+
+
+def fill_annual_counts(counts):
+    """
+    Takes a dict of years and counts, which might have gaps, like:
+        {2015: 123, 2016: 456, 2018: 789}
+    and returns a list of dicts with 'year' and 'count' keys, with an element
+    for every year between the first and last, even if it had no items, in
+    which case its count is 0. eg:
+        [
+            {'year': 2015, 'count': 123},
+            {'year': 2016, 'count': 456},
+            {'year': 2017, 'count': 0},
+            {'year': 2018, 'count': 789},
+        ]
+
+    Returns an empty list if counts is empty.
+    """
     # Just in case. eg, trying to get counts for a private Twitter account:
-    if len(qs) == 0:
+    if len(counts) == 0:
         return []
 
-    # Make a set of years like {2015, 2016, 2018}:
-    years_with_counts = {y[field_name] for y in qs}
-
-    # Make a set of years with no gaps like {2015, 2016, 2017, 2018}:
-    all_years = sorted(set(range(min(years_with_counts), max(years_with_counts) + 1)))
-
-    # Translate original qs into {'2015': 123, '2016': 456, '2018': 789}:
-    qs_dict = {}
-    for row in qs:
-        qs_dict[str(row[field_name])] = row["count"]
-
-    # Make the final list of dicts.
-    # An element for every year between min and max, even if it had no items,
-    # in which case its count is 0.
-    results = []
-    for y in all_years:
-        try:
-            count = qs_dict[str(y)]
-        except KeyError:
-            count = 0
-        results.append({"year": y, "count": count})
-
-    return results
+    return [
+        {"year": y, "count": counts.get(y, 0)}
+        for y in range(min(counts), max(counts) + 1)
+    ]
+
+
+def _content_version_key(app_label):
+    return f"ditto:content_version:{app_label}"
+
+
+def get_content_version(app_label):
+    """
+    Returns a number that changes whenever anything in a Ditto app changes.
+    Use it in cache keys for things that should be invalidated when the
+    app's data changes. eg:
+        key = f"my_thing:{get_content_version('flickr')}"
+
+    app_label -- eg, 'flickr' or 'twitter'.
+    """
+    key = _content_version_key(app_label)
+    version = cache.get(key)
+    if version is None:
+        # Start from the current time, so that if the version has been evicted
+        # from the cache, we won't re-use a previous version number.
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key, 0)
+    return version
+
+
+def bump_content_version(app_label):
+    """
+    Change the number returned by get_content_version(), so that anything
+    cached using the old number won't be used again.
+
+    app_label -- eg, 'flickr' or 'twitter'.
+    """
+    key = _content_version_key(app_label)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # It's not in the cache.
+        cache.set(key, time.time_ns(), None)
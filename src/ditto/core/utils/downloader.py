@@ -1,69 +1,443 @@
+import base64
+import binascii
 import contextlib
+import hashlib
+import json
 import os
 import re
-import shutil
+import tempfile
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from urllib.parse import urlparse
 
 import requests
+import urllib3
+from django.conf import settings
+from django.core.files.uploadedfile import TemporaryUploadedFile, UploadedFile
+
+from ditto.core import app_settings
 
 
 class DownloadException(Exception):  # noqa: N818
     pass
 
 
+class DownloadedFile(TemporaryUploadedFile):
+    """
+    A file downloaded by FileDownloader, in a temporary file until it's saved.
+
+    Like an uploaded file, when saved to a FileField using the default
+    FileSystemStorage the temporary file is moved, rather than copied, into
+    place. It's deleted when closed, if it's still there.
+
+    As well as name, content_type and size (in bytes) it has:
+        url -- The URL it was downloaded from.
+        duration -- How many seconds the download took.
+    """
+
+    def __init__(self, name, content_type, url, path=None):
+        """
+        path -- Optional path of an existing, completely downloaded, file to
+            use instead of a new temporary file. It's deleted when closed too.
+        """
+        if path is None:
+            super().__init__(name, content_type, size=0, charset=None)
+        else:
+            UploadedFile.__init__(
+                self,
+                open(path, "rb"),  # noqa: SIM115
+                name,
+                content_type,
+                os.path.getsize(path),
+                None,
+            )
+        self.path = path
+        self.url = url
+        self.duration = None
+
+    def close(self):
+        super().close()
+        if self.path is not None:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(self.path)
+
+
+def get_digests(headers, *, whole_body=True):
+    """
+    Returns a dict of any checksums of the whole file in a response's headers,
+    like {"sha256": "<hex digest>", "md5": "<hex digest>"}.
+
+    headers -- The response's headers.
+    whole_body -- False if the response was for only part of the file, in
+        which case Content-MD5, which is the checksum of the body, is ignored.
+    """
+    digests = {}
+    algorithms = {"md5": "md5", "sha-256": "sha256", "sha-512": "sha512"}
+
+    # eg 'sha-256=X48E9qOokqqrvdts8nOJRJN3OWDUoyWxBf7kbu9DBPE=' (RFC 3230)
+    # or 'sha-256=:X48E9qOokqqrvdts8nOJRJN3OWDUoyWxBf7kbu9DBPE=:' (RFC 9530):
+    values = [headers.get("Repr-Digest", ""), headers.get("Digest", "")]
+    if whole_body and headers.get("Content-MD5"):
+        values.append("md5=" + headers["Content-MD5"])
+
+    for value in values:
+        for item in value.split(","):
+            algorithm, _, encoded = item.strip().partition("=")
+            algorithm = algorithms.get(algorithm.lower())
+            if algorithm and encoded:
+                with contextlib.suppress(binascii.Error, ValueError):
+                    digests[algorithm] = base64.b64decode(encoded.strip(":")).hex()
+
+    return digests
+
+
+class PartialDownload:
+    """
+    A file partly downloaded by FileDownloader.download(..., resume=True),
+    kept between runs so that the download can carry on where it stopped.
+
+    It's a file of the bytes downloaded so far, and a JSON ledger recording
+    what they're part of: the URL, filename, content type, total size, any
+    ETag or Last-Modified header, and any checksums the server sent.
+    Both are kept in the DITTO_CORE_DOWNLOADS_PARTIAL_DIR directory.
+    """
+
+    def __init__(self, url):
+        self.url = url
+
+        directory = app_settings.CORE_DOWNLOADS_PARTIAL_DIR
+        if not directory:
+            directory = os.path.join(
+                settings.FILE_UPLOAD_TEMP_DIR or tempfile.gettempdir(),
+                "ditto-downloads",
+            )
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        self.directory = directory
+        self.path = os.path.join(directory, f"{key}.part")
+        self.ledger_path = os.path.join(directory, f"{key}.json")
+
+        self.info = self._load()
+
+    def _load(self):
+        "Returns the ledger's info about the file, or {} if there isn't any."
+        try:
+            with open(self.ledger_path) as f:
+                info = json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+        if info.get("url") != self.url or not os.path.exists(self.path):
+            return {}
+        return info
+
+    @property
+    def size(self):
+        "How many bytes have been downloaded so far."
+        if not self.info:
+            return 0
+        try:
+            return os.path.getsize(self.path)
+        except FileNotFoundError:
+            return 0
+
+    @property
+    def is_complete(self):
+        "Whether we have as many bytes as the server said there'd be."
+        total = self.info.get("size")
+        return bool(self.info) and total is not None and self.size >= total
+
+    def get_range_headers(self):
+        "Returns the headers for requesting the rest of the file."
+        if self.size == 0:
+            return {}
+
+        headers = {"Range": f"bytes={self.size}-"}
+        # So that if the file has changed, the server sends all of it:
+        etag = self.info.get("etag")
+        validator = etag if etag and not etag.startswith("W/") else None
+        validator = validator or self.info.get("last_modified")
+        if validator:
+            headers["If-Range"] = validator
+        return headers
+
+    def start(self, **info):
+        "Starts again, with an empty file, downloading the file info describes."
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.path, "wb"):
+            pass
+        self.info = {"url": self.url, **info}
+        self.save()
+
+    def save(self):
+        "Writes the ledger to disk."
+        temp_path = f"{self.ledger_path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(self.info, f)
+        os.replace(temp_path, self.ledger_path)
+
+    def verify(self):
+        """
+        Checks the complete file's size, and checksums, against what the
+        server said they'd be. Raises DownloadException if they don't match.
+        """
+        total = self.info.get("size")
+        if total is not None and self.size != total:
+            msg = f"Expected {total} bytes but got {self.size} when fetching {self.url}"
+            raise DownloadException(msg)
+
+        for algorithm, expected in self.info.get("digests", {}).items():
+            digest = hashlib.new(algorithm)
+            with open(self.path, "rb") as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    digest.update(chunk)
+            if digest.hexdigest() != expected:
+                msg = f"The {algorithm} checksum didn't match when fetching {self.url}"
+                raise DownloadException(msg)
+
+    def forget(self):
+        "Deletes the ledger, leaving the file."
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(self.ledger_path)
+        self.info = {}
+
+    def discard(self):
+        "Deletes the ledger and the file."
+        self.forget()
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(self.path)
+
+
 class FileDownloader:
     """
-    For downloading a file from a URL and saving it into /tmp/.
+    For downloading a file from a URL into a temporary file.
+
+    All downloads share one requests Session, so connections to the same
+    host are kept alive and re-used, including by several threads at once.
 
     Use like:
         from ditto.core.utils.downloader import filedownloader
-        filepath = filedownloader.download(my_url, ['image/jpg'])
 
-    filepath would be like '/tmp/image.jpg'
+        with filedownloader.download(my_url, ['image/jpg']) as downloaded:
+            my_obj.image_file.save(downloaded.name, downloaded)
+
+    downloaded is a DownloadedFile.
+
+    For large files, use download(my_url, ['video/mp4'], resume=True). If the
+    connection drops it carries on from where it stopped, and if it still
+    can't finish, the next call for the same URL carries on from there.
     """
 
-    path = "/tmp/"
+    # Seconds to wait for the connection, and between bytes:
+    timeout = (10, 60)
+
+    chunk_size = 64 * 1024
+
+    # How many times a resumable download carries on after the connection
+    # drops, before giving up until next time:
+    resume_attempts = 3
 
-    def download(self, url, acceptable_content_types):
+    def __init__(self):
+        self._session = None
+        self._session_lock = threading.Lock()
+
+    @property
+    def session(self):
+        "The shared requests Session, created when first needed."
+        with self._session_lock:
+            if self._session is None:
+                # Keep as many connections to each host as we might use at once:
+                adapter = requests.adapters.HTTPAdapter(
+                    pool_maxsize=max(10, app_settings.CORE_DOWNLOADS_PER_HOST)
+                )
+                self._session = requests.Session()
+                self._session.mount("https://", adapter)
+                self._session.mount("http://", adapter)
+            return self._session
+
+    def download(self, url, acceptable_content_types, *, resume=False):
         """
-        Downloads a file from a URL and saves it into /tmp/.
-        Returns the filepath.
+        Downloads a file from a URL into a temporary file, in chunks.
+        Returns a DownloadedFile.
 
         Expects:
             url -- The URL of the file to fetch.
             acceptable_content_types -- A list of MIME types the request must
                 match. eg:['image/jpeg', 'image/jpg', 'image/png', 'image/gif']
+            resume -- If True, use HTTP Range requests to carry on after the
+                connection drops, now or the next time this URL is fetched,
+                and verify the file's size and any checksums before returning.
 
         Raises DownloadException if something goes wrong.
         """
+        if resume:
+            return self._download_resumable(url, acceptable_content_types)
+
+        start = time.monotonic()
         try:
-            # From http://stackoverflow.com/a/13137873/250962
-            r = requests.get(url, stream=True)
-            if r.status_code == 200:
+            with self.session.get(url, stream=True, timeout=self.timeout) as r:
+                if r.status_code != 200:
+                    msg = f"Got status code {r.status_code} when fetching {url}"
+                    raise DownloadException(msg)
+
+                content_type = self._check_content_type(
+                    url, r, acceptable_content_types
+                )
+                filename = self._get_filename(url, r)
+
+                downloaded = DownloadedFile(filename, content_type, url)
                 try:
-                    if r.headers["Content-Type"] in acceptable_content_types:
-                        # Where we'll temporarily save the file:
-                        filename = self.make_filename(url, r.headers)
-                        filepath = f"{self.path}{filename}"
-                        # Save the file there:
-                        with open(filepath, "wb") as f:
-                            r.raw.decode_content = True
-                            shutil.copyfileobj(r.raw, f)
-                        return filepath
-
-                    else:
-                        msg = "Invalid content type ({}) when fetching {}".format(
-                            r.headers["content_type"], url
-                        )
-                        raise DownloadException(msg)
-                except KeyError as err:
-                    msg = f"No content_type headers found when fetching {url}"
+                    for chunk in r.iter_content(chunk_size=self.chunk_size):
+                        downloaded.write(chunk)
+                        downloaded.size += len(chunk)
+                except requests.exceptions.RequestException:
+                    downloaded.close()
+                    raise
+
+        except requests.exceptions.RequestException as err:
+            msg = f"Something when wrong when fetching {url}: {err}"
+            raise DownloadException(msg) from err
+
+        downloaded.flush()
+        downloaded.seek(0)
+        downloaded.duration = time.monotonic() - start
+        return downloaded
+
+    def _download_resumable(self, url, acceptable_content_types):
+        """
+        Downloads a file using a PartialDownload, carrying on from any bytes
+        downloaded before. Returns a DownloadedFile.
+        """
+        start = time.monotonic()
+        partial = PartialDownload(url)
+        attempts = 0
+
+        while not partial.is_complete:
+            try:
+                self._continue_download(partial, acceptable_content_types)
+            except requests.exceptions.RequestException as err:
+                attempts += 1
+                if attempts > self.resume_attempts:
+                    msg = (
+                        f"Something when wrong when fetching {url}, "
+                        f"with {partial.size} bytes so far: {err}"
+                    )
                     raise DownloadException(msg) from err
             else:
+                if not partial.is_complete and partial.info.get("size") is None:
+                    # We don't know how big it should be, so this is it:
+                    break
+
+        try:
+            partial.verify()
+        except DownloadException:
+            partial.discard()
+            raise
+
+        info = partial.info
+        partial.forget()
+        downloaded = DownloadedFile(
+            info["filename"], info["content_type"], url, path=partial.path
+        )
+        downloaded.duration = time.monotonic() - start
+        return downloaded
+
+    def _continue_download(self, partial, acceptable_content_types):
+        """
+        Makes one request for the rest of a PartialDownload's file, and
+        appends what it gets to the file.
+
+        Raises a requests RequestException if the connection fails, or
+        DownloadException for other problems.
+        """
+        url = partial.url
+        headers = partial.get_range_headers()
+
+        with self.session.get(
+            url, headers=headers, stream=True, timeout=self.timeout
+        ) as r:
+            if r.status_code == 206 and headers:
+                # eg 'bytes 1000-4999/5000'
+                m = re.match(r"bytes (\d+)-", r.headers.get("Content-Range", ""))
+                if m is None or int(m.group(1)) != partial.size:
+                    partial.discard()
+                    msg = f"Got an unexpected Content-Range when fetching {url}"
+                    raise DownloadException(msg)
+                self._check_content_type(url, r, acceptable_content_types)
+                digests = get_digests(r.headers, whole_body=False)
+                if digests:
+                    partial.info.setdefault("digests", {}).update(digests)
+                    partial.save()
+
+            elif r.status_code == 200:
+                # A new download, or the server sent the whole file again:
+                content_type = self._check_content_type(
+                    url, r, acceptable_content_types
+                )
+                content_length = r.headers.get("Content-Length")
+                partial.start(
+                    filename=self._get_filename(url, r),
+                    content_type=content_type,
+                    size=int(content_length) if content_length else None,
+                    etag=r.headers.get("ETag"),
+                    last_modified=r.headers.get("Last-Modified"),
+                    digests=get_digests(r.headers),
+                )
+
+            else:
+                if r.status_code == 416:
+                    # Our partial file doesn't match the one on the server:
+                    partial.discard()
                 msg = f"Got status code {r.status_code} when fetching {url}"
                 raise DownloadException(msg)
-        except requests.exceptions.RequestException as err:
-            msg = f"Something when wrong when fetching {url}: {err}"
-            raise DownloadException(msg) from err
+
+            with open(partial.path, "ab") as f:
+                for chunk in self._iter_received(r):
+                    f.write(chunk)
+
+    def _iter_received(self, response):
+        """
+        Yields the response's content as it's received. Unlike iter_content()
+        this doesn't wait for a whole chunk, so if the connection drops we
+        keep everything received before that.
+        """
+        read1 = getattr(response.raw, "read1", None)
+        if read1 is None:
+            # urllib3 before v2.
+            yield from response.iter_content(chunk_size=self.chunk_size)
+            return
+
+        try:
+            while chunk := read1(self.chunk_size, decode_content=True):
+                yield chunk
+        except urllib3.exceptions.HTTPError as err:
+            raise requests.exceptions.ConnectionError(err) from err
+
+    def _check_content_type(self, url, response, acceptable_content_types):
+        """
+        Returns the response's Content-Type, or raises DownloadException if
+        it's missing or isn't one of acceptable_content_types.
+        """
+        content_type = response.headers.get("Content-Type")
+        if content_type is None:
+            msg = f"No content_type headers found when fetching {url}"
+            raise DownloadException(msg)
+        if content_type not in acceptable_content_types:
+            msg = f"Invalid content type ({content_type}) when fetching {url}"
+            raise DownloadException(msg)
+        return content_type
+
+    def _get_filename(self, url, response):
+        """
+        Returns the filename for the file being downloaded, or raises
+        DownloadException if there isn't one.
+        """
+        filename = self.make_filename(url, response.headers)
+        if filename == "":
+            msg = f"Couldn't find a filename when fetching {url}"
+            raise DownloadException(msg)
+        return filename
 
     def make_filename(self, url, headers=None):
         """
@@ -99,3 +473,116 @@ class FileDownloader:
 
 
 filedownloader = FileDownloader()
+
+
+class DownloadPool:
+    """
+    For running many downloads at once in a pool of threads, with at most
+    `per_host` of them fetching from the same host at a time.
+
+    Only the downloading happens in the threads. The results are returned to
+    the calling thread, which should do anything else, like saving files to
+    storage or models to the database.
+
+    Use like:
+        from ditto.core.utils.downloader import DownloadPool, filedownloader
+
+        jobs = [
+            (url, functools.partial(filedownloader.download, url, types), obj)
+            for url, obj in things_to_fetch
+        ]
+        for obj, future in DownloadPool(workers=8).run(jobs):
+            try:
+                downloaded = future.result()
+            except DownloadException:
+                ...
+
+    With workers=1 each job is run in turn in the calling thread.
+    """
+
+    def __init__(self, workers=4, per_host=None, progress=None):
+        """
+        workers -- The maximum number of downloads at once.
+        per_host -- The maximum number of downloads at once from any one host.
+            Default is the DITTO_CORE_DOWNLOADS_PER_HOST setting.
+        progress -- Optional function, called in the calling thread after each
+            job has finished, with the number finished and the total number.
+        """
+        if per_host is None:
+            per_host = app_settings.CORE_DOWNLOADS_PER_HOST
+
+        self.workers = max(1, workers)
+        self.per_host = max(1, per_host)
+        self.progress = progress
+
+    def run(self, jobs):
+        """
+        Runs the jobs, and yields a (data, future) tuple for each one as it
+        finishes. future.result() returns what the job's function returned, or
+        raises what it raised.
+
+        jobs -- An iterable of (url, func, data) tuples. func is called with no
+            arguments to do the download. url is only used to find its host.
+            data is anything you want returned with the result.
+        """
+        # Waiting jobs, in a queue per host, in the order they were given:
+        queues = OrderedDict()
+        total = 0
+        for job in jobs:
+            host = urlparse(job[0]).netloc
+            queues.setdefault(host, deque()).append(job)
+            total += 1
+
+        if self.workers == 1:
+            yield from self._run_in_turn(queues, total)
+        else:
+            yield from self._run_in_threads(queues, total)
+
+    def _run_in_turn(self, queues, total):
+        finished = 0
+        for queue in queues.values():
+            for _url, func, data in queue:
+                future = Future()
+                try:
+                    future.set_result(func())
+                except Exception as err:  # noqa: BLE001
+                    future.set_exception(err)
+                finished += 1
+                self._report(finished, total)
+                yield data, future
+
+    def _run_in_threads(self, queues, total):
+        running = {}
+        running_per_host = Counter()
+        finished = 0
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            while queues or running:
+                # Start as many jobs as we're allowed, taking one from each
+                # host's queue in turn:
+                started = True
+                while started and len(running) < self.workers:
+                    started = False
+                    for host in list(queues):
+                        if len(running) >= self.workers:
+                            break
+                        if running_per_host[host] >= self.per_host:
+                            continue
+                        _url, func, data = queues[host].popleft()
+                        if not queues[host]:
+                            del queues[host]
+                        running[executor.submit(func)] = (host, data)
+                        running_per_host[host] += 1
+                        started = True
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    host, data = running.pop(future)
+                    running_per_host[host] -= 1
+                    finished += 1
+                    self._report(finished, total)
+                    yield data, future
+
+    def _report(self, finished, total):
+        if self.progress is not None:
+            self.progress(finished, total)
@@ -0,0 +1,78 @@
+import threading
+import time
+
+from ditto.core import app_settings
+
+
+class RateLimiter:
+    """
+    A token bucket, for limiting how often something, like calling an API,
+    happens. One can be shared by several threads.
+
+    Tokens are added at `rate` per second, up to a maximum of `burst`, and
+    each call to wait() takes one, waiting until it's available if need be.
+    Because tokens build up while requests are in progress, a slow request
+    isn't followed by any extra waiting.
+
+    Use like:
+        limiter = RateLimiter(2, burst=5)
+
+        for page in pages:
+            limiter.wait()
+            call_the_api(page)
+    """
+
+    def __init__(self, rate, burst=1):
+        """
+        rate -- The average number of calls per second. None for no limit.
+        burst -- The most calls that can be made at once, after a pause.
+        """
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        """
+        Waits until the next call can be made.
+        Returns the number of seconds waited.
+        """
+        if not self.rate:
+            return 0
+
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            # Take a token now, even if it won't exist until later, so that
+            # other threads wait for the ones after it:
+            self._tokens -= 1
+            delay = -self._tokens / self.rate if self._tokens < 0 else 0
+
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(service):
+    """
+    Returns the RateLimiter shared by everything that calls a service's API,
+    eg "flickr", as configured in the DITTO_CORE_RATE_LIMITS setting.
+    """
+    config = app_settings.CORE_RATE_LIMITS.get(service) or {}
+    rate = config.get("per_second")
+    burst = max(1, config.get("burst", 1))
+
+    with _limiters_lock:
+        limiter = _limiters.get(service)
+        # Make a new one if there isn't one, or the setting's changed:
+        if limiter is None or (limiter.rate, limiter.burst) != (rate, burst):
+            limiter = _limiters[service] = RateLimiter(rate, burst)
+        return limiter
@@ -1,19 +1,25 @@
 import datetime
-from itertools import chain
-from operator import attrgetter
+import mimetypes
+import os
+from collections import defaultdict
+from urllib.parse import quote
 
 from django.core.exceptions import ImproperlyConfigured
 from django.core.paginator import InvalidPage
-from django.http import Http404
+from django.db.models import Q
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse
 from django.shortcuts import redirect
 from django.urls import reverse
+from django.utils.cache import patch_cache_control
 from django.utils.encoding import force_str
 from django.utils.translation import gettext as _
 from django.views.generic import DayArchiveView as DjangoDayArchiveView
-from django.views.generic import ListView, TemplateView
+from django.views.generic import ListView, TemplateView, View
 
+from . import app_settings
 from .apps import ditto_apps
-from .paginator import DiggPaginator
+from .models import DailyItemCount, TimelineItem
+from .paginator import CachedCount, DiggPaginator
 
 if ditto_apps.is_installed("flickr"):
     from ditto.flickr.models import Photo
@@ -29,12 +35,21 @@ if ditto_apps.is_installed("twitter"):
 
 
 class PaginatedListView(ListView):
-    """Use this instead of ListView to provide standardised pagination."""
+    """Use this instead of ListView to provide standardised pagination.
+
+    For very long lists, set `paginator_class = KeysetPaginator` to use
+    pagination that doesn't COUNT all the items or use an OFFSET.
+    """
 
     paginator_class = DiggPaginator
     paginate_by = 50
     page_kwarg = "p"
 
+    # A callable to use instead of an exact COUNT(*) of items on every page.
+    # eg, CachedCount() or EstimatedCount(), or None for an exact count each
+    # time. See ditto.core.paginator.
+    paginator_count_provider = CachedCount()
+
     # See ditto.core.paginator for what these mean:
     paginator_body = 5
     paginator_margin = 2
@@ -67,17 +82,22 @@ class PaginatedListView(ListView):
             margin=self.paginator_margin,
             padding=self.paginator_padding,
             tail=self.paginator_tail,
+            count_provider=self.paginator_count_provider,
         )
         page_kwarg = self.page_kwarg
         page = self.kwargs.get(page_kwarg) or self.request.GET.get(page_kwarg) or 1
-        try:
-            page_number = int(page)
-        except ValueError as err:
-            if page == "last":
-                page_number = paginator.num_pages
-            else:
-                msg = _("Page is not 'last', nor can it be converted to an int.")
-                raise Http404(msg) from err
+        if getattr(paginator, "is_keyset", False):
+            # KeysetPaginator understands 'last' and its own page tokens.
+            page_number = page
+        else:
+            try:
+                page_number = int(page)
+            except ValueError as err:
+                if page == "last":
+                    page_number = paginator.num_pages
+                else:
+                    msg = _("Page is not 'last', nor can it be converted to an int.")
+                    raise Http404(msg) from err
         try:
             page = paginator.page(page_number, softlimit=True)
             return (paginator, page, page.object_list, page.has_other_pages())
@@ -155,7 +175,7 @@ class DittoAppsMixin:
                             "slug": "listens",
                             "name": "scrobble",
                             "context_object_name": "lastfm_scrobble_list",
-                            "queryset": Scrobble.objects.all().prefetch_related(
+                            "queryset": Scrobble.objects.defer_raw().prefetch_related(
                                 "artist", "track"
                             ),
                         },
@@ -415,27 +435,63 @@ class HomeView(DittoAppsMixin, TemplateView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
 
-        # Put all querysets for available apps in this list:
-        querysets = []
-
-        for app_name, variety_name in self.get_app_varieties_to_display():
-            qs = self.get_queryset_for_app_variety(app_name, variety_name)
+        # The most recent items from all apps, sorted by post_time descending.
+        timeline = self.get_timeline_queryset().values_list(
+            "app_name", "variety_name", "object_id"
+        )[: self.items_to_list]
 
-            if self.include_twitter_replies is False:  # noqa: SIM102
-                # Don't want to include Tweets that are replies on the home page.
-                if app_name == "twitter" and variety_name == "tweet":
-                    qs = qs.filter(in_reply_to_screen_name__exact="")
+        # Get all the items for each app_variety in one query each:
+        ids = defaultdict(list)
+        for app_name, variety_name, object_id in timeline:
+            ids[(app_name, variety_name)].append(object_id)
 
-            querysets.append(qs[: self.items_to_list])
+        items = {
+            app_variety: self.get_queryset_for_app_variety(*app_variety).in_bulk(
+                object_ids
+            )
+            for app_variety, object_ids in ids.items()
+        }
 
-        # Aggregate the individual items from all querysets into one list,
-        # sorted by post_time descending.
-        context["object_list"] = sorted(
-            chain(*querysets), key=attrgetter("post_time"), reverse=True
-        )[: self.items_to_list]
+        # Put them in the timeline's order. Checking they exist, just in case
+        # a TimelineItem is out of date.
+        context["object_list"] = [
+            items[(app_name, variety_name)][object_id]
+            for app_name, variety_name, object_id in timeline
+            if object_id in items[(app_name, variety_name)]
+        ]
 
         return context
 
+    def get_timeline_queryset(self):
+        """
+        The public TimelineItems for all the app_varieties we're displaying,
+        most recent first.
+        """
+        app_varieties = self.get_app_varieties_to_display()
+
+        if len(app_varieties) == 0:
+            return TimelineItem.objects.none()
+
+        q = Q()
+        for app_name, variety_name in app_varieties:
+            q |= Q(app_name=app_name, variety_name=variety_name)
+
+        qs = TimelineItem.public_objects.filter(q)
+
+        if self.include_twitter_replies is False and ("twitter", "tweet") in (
+            app_varieties
+        ):
+            # Don't want to include Tweets that are replies on the home page.
+            qs = qs.exclude(
+                app_name="twitter",
+                variety_name="tweet",
+                object_id__in=Tweet.objects.exclude(
+                    in_reply_to_screen_name__exact=""
+                ).values("pk"),
+            )
+
+        return qs
+
     def get_app_varieties_to_display(self):
         """
         Get the union of self.app_varieties and the varieties that are
@@ -522,12 +578,11 @@ class DayArchiveView(DittoAppsMixin, DjangoDayArchiveView):
         Returns an OrderedDict like:
             [ ('twitter_tweet_list', 6), (...), ]
 
-        Most of this is adapted from standard DayArchiveView methods, so that
-        we can run it against each queryset in turn, rather than only
-        self.queryset.
+        Most of this is adapted from standard DayArchiveView methods.
 
-        And we need to set date_field for each variety in turn, rather than
-        assume each variety uses self.date_field.
+        All the counts are fetched in a single query from the TimelineItems,
+        rather than one query for each app and variety, and cached for days
+        before today.
         """
 
         # From get_dated_items():
@@ -543,48 +598,35 @@ class DayArchiveView(DittoAppsMixin, DjangoDayArchiveView):
             self.get_day_format(),
         )
 
-        # From _make_single_date_lookup():
-        since = self._make_date_lookup_arg(date)
-        until = self._make_date_lookup_arg(date + datetime.timedelta(days=1))
-
         # Adapted from get_dated_queryset():
 
         # allow_future = self.get_allow_future()
         allow_empty = self.get_allow_empty()
 
+        # The TimelineItems' post_time is whichever date_field each variety uses.
+        # eg, {('flickr', 'photo-taken'): 3, ('twitter', 'tweet'): 6}
+        timeline_counts = TimelineItem.objects.get_day_counts(date)
+
         # Want to keep them in the same order as get_queryset_names() provides.
         counts = []
 
         for app_name, variety_name in self.get_app_varieties():
-            date_field = self.get_date_field_for_app_variety(app_name, variety_name)
-            qs = self.get_queryset_for_app_variety(app_name, variety_name)
-            qs = qs.filter(
-                **{
-                    f"{date_field}__gte": since,
-                    f"{date_field}__lt": until,
-                }
-            )
-            paginate_by = self.get_paginate_by(qs)
-            # if not allow_future:
-            # now = timezone.now() if self.uses_datetime_field else timezone_today()
-            # qs = qs.filter(**{'%s__lte' % date_field: now})
-            if not allow_empty:
-                # When pagination is enabled, it's better to do a cheap query
-                # than to load the unpaginated queryset in memory.
-                is_empty = len(qs) == 0 if paginate_by is None else not qs.exists()
-                if is_empty:
-                    raise Http404(
-                        _("No %(verbose_name_plural)s available")
-                        % {
-                            "verbose_name_plural": force_str(
-                                qs.model._meta.verbose_name_plural
-                            )
-                        }
-                    )
+            count = timeline_counts.get((app_name, variety_name), 0)
+
+            if not allow_empty and count == 0:
+                qs = self.get_queryset_for_app_variety(app_name, variety_name)
+                raise Http404(
+                    _("No %(verbose_name_plural)s available")
+                    % {
+                        "verbose_name_plural": force_str(
+                            qs.model._meta.verbose_name_plural
+                        )
+                    }
+                )
 
             counts.append(
                 {
-                    "count": qs.count(),
+                    "count": count,
                     "app_name": app_name,
                     "variety_name": variety_name,
                     "app_slug": self.get_app_slug_from_name(app_name),
@@ -601,6 +643,114 @@ class DayArchiveView(DittoAppsMixin, DjangoDayArchiveView):
         return counts
 
 
+class DailyCountsView(View):
+    """The number of items on every day of a year, as JSON, eg for
+    drawing a calendar heatmap.
+    eg /2016/counts.json?app=flickr&variety=photo-taken&account=35034346050@N01
+
+    The optional GET arguments are:
+        app -- eg, 'flickr'. If missing, counts items from all apps.
+        variety -- eg, 'photo-taken'. If missing, counts all of app's varieties.
+        account -- eg, a Flickr User's NSID or a Twitter User's screen_name.
+
+    Returns JSON like:
+        {"year": 2016, "counts": [{"date": "2016-01-01", "count": 3}, ...]}
+    """
+
+    def get(self, request, *args, **kwargs):
+        year = int(kwargs["year"])
+        app_name = request.GET.get("app") or None
+        variety_name = request.GET.get("variety") or None
+        account = request.GET.get("account") or None
+
+        if app_name is not None and not ditto_apps.is_enabled(app_name):
+            raise Http404(_("Invalid app"))
+
+        counts = DailyItemCount.objects.get_daily_counts(
+            year, app_name=app_name, variety_name=variety_name, account=account
+        )
+
+        return JsonResponse({"year": year, "counts": counts})
+
+
+class ProtectedFileView(View):
+    """Serves one of an item's downloaded files, like a Flickr Photo's
+    original_file, if the item is public or the user has permission to view
+    that kind of item, eg 'flickr.view_photo'. Otherwise returns a 404.
+
+    Child classes should set `model` and define get_object() and is_public().
+    Set `field_name`, eg in the URL conf:
+        PhotoFileView.as_view(field_name="original_file")
+
+    The file is sent by the front-end web server if the
+    DITTO_CORE_SENDFILE_HEADER setting is 'X-Accel-Redirect' (nginx) or
+    'X-Sendfile' (eg, Apache's mod_xsendfile). Otherwise Django sends it,
+    which is fine in development, but ties up a worker for large files.
+    """
+
+    model = None
+    field_name = None
+
+    def get(self, request, *args, **kwargs):
+        obj = self.get_object()
+        is_public = self.is_public(obj)
+        if not is_public and not self.has_permission(request):
+            raise Http404(
+                _("No %(verbose_name)s found matching the query")
+                % {"verbose_name": self.model._meta.verbose_name}
+            )
+
+        file = getattr(obj, self.field_name)
+        if not file:
+            raise Http404(_("No file found"))
+
+        response = self.get_file_response(file)
+        if not is_public:
+            # So that shared caches don't keep private files:
+            patch_cache_control(response, private=True)
+        return response
+
+    def get_object(self):
+        "Should return the item, or raise Http404."
+        raise NotImplementedError
+
+    def is_public(self, obj):
+        "Should return True if anyone can see the item's files."
+        raise NotImplementedError
+
+    def has_permission(self, request):
+        user = getattr(request, "user", None)
+        if user is None:
+            return False
+        opts = self.model._meta
+        return user.has_perm(f"{opts.app_label}.view_{opts.model_name}")
+
+    def get_file_response(self, file):
+        """
+        Returns a response that sends the file, a FieldFile, either by
+        telling the web server where it is, or by sending it ourselves.
+        """
+        header = app_settings.CORE_SENDFILE_HEADER
+        content_type = mimetypes.guess_type(file.name)[0]
+
+        if header == "X-Accel-Redirect":
+            response = HttpResponse(content_type=content_type)
+            # The URL of an internal nginx location for MEDIA_ROOT:
+            response[header] = app_settings.CORE_SENDFILE_ACCEL_PREFIX + quote(
+                file.name
+            )
+        elif header == "X-Sendfile":
+            response = HttpResponse(content_type=content_type)
+            response[header] = file.path
+        else:
+            return FileResponse(file.open("rb"), content_type=content_type)
+
+        response["Content-Disposition"] = (
+            f"inline; filename*=UTF-8''{quote(os.path.basename(file.name))}"
+        )
+        return response
+
+
 # class TagListView(TemplateView):
 # "Doesn't really do anything at the moment."
 # template_name = 'ditto/tag_list.html'
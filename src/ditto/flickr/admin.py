@@ -47,6 +47,7 @@ class AccountAdmin(admin.ModelAdmin):
             {
                 "classes": ("collapse",),
                 "fields": (
+                    "photos_updated_time",
                     "time_created",
                     "time_modified",
                 ),
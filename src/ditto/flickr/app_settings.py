@@ -12,3 +12,9 @@ FLICKR_DIR_PHOTOS_FORMAT = getattr(
 )
 
 FLICKR_USE_LOCAL_MEDIA = getattr(settings, "DITTO_FLICKR_USE_LOCAL_MEDIA", False)
+
+# How many seconds a Flickr User's data is used for, after it was fetched,
+# before it's fetched again from the API. 0 to fetch it every time.
+FLICKR_USER_CACHE_TTL = getattr(
+    settings, "DITTO_FLICKR_USER_CACHE_TTL", 60 * 60 * 24 * 7
+)
@@ -1,15 +1,19 @@
 import calendar
 import datetime
-import os
-import time
+import functools
 
 import flickrapi
-from django.core.files import File
 from flickrapi.exceptions import FlickrError
 
 from ditto.core.utils import datetime_now
-from ditto.core.utils.downloader import DownloadException, filedownloader
-from ditto.flickr.models import Account, User
+from ditto.core.utils.downloader import (
+    DownloadException,
+    DownloadPool,
+    filedownloader,
+)
+from ditto.core.utils.ratelimit import get_rate_limiter
+from ditto.flickr import app_settings
+from ditto.flickr.models import Account, Photo, User
 
 from . import FetchError
 from .savers import PhotoSaver, PhotosetSaver, UserSaver
@@ -22,14 +26,26 @@ from .savers import PhotoSaver, PhotosetSaver, UserSaver
 
 # CLASSES HERE:
 #
+# RateLimitedFlickrAPI
 # Fetcher
 #   UserIdFetcher
 #   UserFetcher
 #   PhotosFetcher
 #       RecentPhotosFetcher
+#       UpdatedPhotosFetcher
 #   PhotosetsFetcher
 
 
+class RateLimitedFlickrAPI(flickrapi.FlickrAPI):
+    """A FlickrAPI that waits for the shared Flickr RateLimiter before every
+    API call, so that all fetchers, in any thread, keep within the limit.
+    """
+
+    def do_flickr_call(self, *args, **kwargs):
+        get_rate_limiter("flickr").wait()
+        return super().do_flickr_call(*args, **kwargs)
+
+
 class Fetcher:
     """Parent class for children that will call the Flickr API to fetch data.
 
@@ -83,7 +99,7 @@ class Fetcher:
 
         if account.has_credentials():
             self.account = account
-            self.api = flickrapi.FlickrAPI(
+            self.api = RateLimitedFlickrAPI(
                 self.account.api_key, self.account.api_secret, format="parsed-json"
             )
         else:
@@ -108,7 +124,6 @@ class Fetcher:
         while self.page_number <= self.total_pages and self._not_failed():
             self._fetch_page(**kwargs)
             self.page_number += 1
-            time.sleep(0.5)  # Being nice.
 
     def _fetch_page(self, **kwargs):
         try:
@@ -238,8 +253,24 @@ class UserFetcher(Fetcher):
         self.results = [info["person"]]
 
     def _save_results(self):
+        # The User's avatar as of the last time we fetched them, if we have:
+        old_avatar = (
+            User.objects.filter(nsid=self.results[0]["nsid"])
+            .values("iconserver", "iconfarm", "avatar")
+            .first()
+        )
+
         user_obj = UserSaver().save_user(self.results[0], datetime_now())
-        self._fetch_and_save_avatar(user_obj)
+
+        # Only download the avatar if it's new, or has changed:
+        if (
+            not old_avatar
+            or not old_avatar["avatar"]
+            or old_avatar["iconserver"] != int(user_obj.iconserver)
+            or old_avatar["iconfarm"] != int(user_obj.iconfarm)
+        ):
+            self._fetch_and_save_avatar(user_obj)
+
         self.return_value["user"] = {"name": user_obj.name}
         self.results_count = 1
 
@@ -249,27 +280,36 @@ class UserFetcher(Fetcher):
         user -- User object.
         """
         try:
-            avatar_filepath = filedownloader.download(
+            downloaded = filedownloader.download(
                 user.original_icon_url,
                 ["image/jpeg", "image/jpg", "image/png", "image/gif"],
             )
-
-            with open(avatar_filepath, "rb") as f:
-                user.avatar.save(os.path.basename(avatar_filepath), File(f))
         except DownloadException:
             pass
+        else:
+            with downloaded:
+                user.avatar.save(downloaded.name, downloaded)
 
 
 class PhotosFetcher(Fetcher):
-    """Parent class for fetching and saving data about Photos for an Account."""
+    """Parent class for fetching and saving data about Photos for an Account.
+
+    If self.workers is more than 1, the extra data about each photo is fetched
+    in that many threads at once, and each photo is saved as soon as all its
+    data has arrived.
+    """
 
     def __init__(self, *args, **kwargs):
         # Will match Flickr IDs with their User object.
         # eg '35034346050@N01' => User
         # When we fetch a user's data, because we need it to save a photo/tag,
-        # we add their object to this, so we don't fetch again this time.
+        # or find it was fetched recently enough in the DB, we add their
+        # object to this, so we don't fetch again this time.
         self.fetched_users = {}
 
+        # How many photos to fetch extra data for at once:
+        self.workers = 1
+
         super().__init__(*args, **kwargs)
 
     def _call_api(self):
@@ -283,6 +323,15 @@ class PhotosFetcher(Fetcher):
         """Before saving we need to go through the big list of photos we've
         fetched, and fetch more detailed info to add to each photo's data.
         """
+        self._skip_unchanged_photos()
+
+        # Get all the photos' owners we've fetched recently, in one query:
+        self._add_fresh_users([photo["owner"] for photo in self.results])
+
+        if self.workers > 1:
+            self._fetch_and_save_extra_concurrently()
+            return
+
         extra_results = []
 
         for _i, photo in enumerate(self.results):
@@ -303,12 +352,129 @@ class PhotosFetcher(Fetcher):
         # Replace self.results with our new array that contains more info.
         self.results = extra_results
 
+    def _skip_unchanged_photos(self):
+        """
+        Removes from self.results any photos that haven't changed on Flickr
+        since we last fetched them, so we don't fetch their info, sizes and
+        EXIF again.
+
+        This only works if the list of photos was fetched with the
+        'last_update' extra, which gives each photo a 'lastupdate' unixtime.
+        Viewing a photo doesn't change that, so if the 'views' extra was also
+        fetched, the view counts of unchanged photos are updated here.
+        """
+        listed = {
+            int(photo["id"]): photo for photo in self.results if "lastupdate" in photo
+        }
+        if not listed:
+            return
+
+        unchanged = set()
+        viewed = []
+        stored_photos = Photo.objects.filter(flickr_id__in=listed).only(
+            "flickr_id", "last_update_time", "view_count"
+        )
+        for stored in stored_photos:
+            photo = listed[stored.flickr_id]
+            last_update_time = datetime.datetime.fromtimestamp(
+                int(photo["lastupdate"]), tz=datetime.timezone.utc
+            )
+            if stored.last_update_time != last_update_time:
+                continue
+            unchanged.add(stored.flickr_id)
+            if "views" in photo and int(photo["views"]) != stored.view_count:
+                stored.view_count = int(photo["views"])
+                viewed.append(stored)
+
+        if viewed:
+            Photo.objects.bulk_update(viewed, ["view_count"])
+
+        self.results = [
+            photo for photo in self.results if int(photo["id"]) not in unchanged
+        ]
+
+    def _fetch_and_save_extra_concurrently(self):
+        """
+        Fetches the extra data for the photos in self.results in several
+        threads, limited by the Flickr rate limiter rather than each call's
+        latency, and saves each photo as soon as its data has all arrived.
+
+        The threads only call the API. Fetching any missing users, and saving
+        the photos, happens in this thread. Then self.results is emptied,
+        so there's nothing left for _save_results() to save.
+        """
+        jobs = [
+            (
+                self.api.REST_URL,
+                functools.partial(self._fetch_photo_data, photo["id"]),
+                photo,
+            )
+            for photo in self.results
+        ]
+
+        saver = PhotoSaver()
+        pool = DownloadPool(workers=self.workers, per_host=self.workers)
+        for photo, future in pool.run(jobs):
+            # Raises any FetchError from the thread:
+            data = future.result()
+
+            self._fetch_user_if_missing(photo["owner"])
+            self._fetch_tag_authors_if_missing(data["info"])
+
+            saver.save_photo(
+                {
+                    "fetch_time": datetime_now(),
+                    "user_obj": self.fetched_users[photo["owner"]],
+                    **data,
+                }
+            )
+            self.results_count += 1
+
+        self.results = []
+
+    def _fetch_photo_data(self, photo_id):
+        """
+        Returns a dict of the 'info', 'sizes' and 'exif' data about a photo,
+        from the Flickr API. Only calls the API, so is safe to use in
+        another thread.
+        photo_id -- The Flickr photo ID.
+        """
+        return {
+            "info": self._fetch_photo_info(photo_id, fetch_tag_authors=False),
+            "sizes": self._fetch_photo_sizes(photo_id),
+            "exif": self._fetch_photo_exif(photo_id),
+        }
+
+    def _add_fresh_users(self, flickr_user_ids):
+        """
+        Adds any of the users that were fetched within the last
+        FLICKR_USER_CACHE_TTL seconds, and aren't in self.fetched_users, from
+        the DB to self.fetched_users. So we won't fetch them again.
+        flickr_user_ids -- An iterable of Flickr IDs, eg '35034346050@N01'.
+        """
+        if not app_settings.FLICKR_USER_CACHE_TTL:
+            return
+
+        missing_ids = set(flickr_user_ids).difference(self.fetched_users)
+        if missing_ids:
+            min_fetch_time = datetime_now() - datetime.timedelta(
+                seconds=app_settings.FLICKR_USER_CACHE_TTL
+            )
+            self.fetched_users.update(
+                User.objects.filter(fetch_time__gte=min_fetch_time).in_bulk(
+                    missing_ids, field_name="nsid"
+                )
+            )
+
     def _fetch_user_if_missing(self, flickr_user_id):
         """
-        If we don't have flickr_user_id in self.fetched_users, then fetch, and
-        save, that user from the API. Then add their User to self.fetched_users.
+        If we don't have flickr_user_id in self.fetched_users, or fetched
+        recently in the DB, then fetch, and save, that user from the API.
+        Then add their User to self.fetched_users.
         flickr_user_id -- The user's ID on Flickr, eg '35034346050@N01'.
         """
+        self._add_fresh_users([flickr_user_id])
+
         if self.fetched_users.get(flickr_user_id, None) is None:
             results = UserFetcher(account=self.account).fetch(nsid=flickr_user_id)
             if results["success"] is False:
@@ -317,11 +483,13 @@ class PhotosFetcher(Fetcher):
             # Get the user we just saved. A bit clunky!
             self.fetched_users[flickr_user_id] = User.objects.get(nsid=flickr_user_id)
 
-    def _fetch_photo_info(self, photo_id):
+    def _fetch_photo_info(self, photo_id, *, fetch_tag_authors=True):
         """Calls the photos.getInfo() method of the Flickr API and returns the
         info about the photo.
         https://www.flickr.com/services/api/explore/flickr.photos.getInfo
         photo_id -- The Flickr photo ID.
+        fetch_tag_authors -- Whether to also fetch any of the users who added
+            the photo's tags that we don't have yet.
         """
         try:
             results = self.api.photos.getInfo(photo_id=photo_id)
@@ -329,14 +497,21 @@ class PhotosFetcher(Fetcher):
             msg = f"Error when fetching photo info (photo {photo_id}): {err}"
             raise FetchError(msg) from err
 
-        # Each tag on the photo is added by a specific Flickr user.
-        # (Usually, but not always, the photo owner.)
-        # Check that we've got info about that user in our DB.
-        for tag in results["photo"]["tags"]["tag"]:
-            self._fetch_user_if_missing(tag["author"])
+        if fetch_tag_authors:
+            self._fetch_tag_authors_if_missing(results["photo"])
 
         return results["photo"]
 
+    def _fetch_tag_authors_if_missing(self, photo_info):
+        """
+        Each tag on the photo is added by a specific Flickr user.
+        (Usually, but not always, the photo owner.)
+        Check that we've got info about that user in our DB.
+        photo_info -- The photo's data from photos.getInfo().
+        """
+        for tag in photo_info["tags"]["tag"]:
+            self._fetch_user_if_missing(tag["author"])
+
     def _fetch_photo_sizes(self, photo_id):
         """Calls the photos.getSizes() method of the Flickr API and returns the
         photo's sizes.
@@ -365,9 +540,7 @@ class PhotosFetcher(Fetcher):
 
     def _save_results(self):
         """Save all the data we've fetched about photos to the DB."""
-        saver = PhotoSaver()
-        for photo in self.results:
-            saver.save_photo(photo)
+        PhotoSaver().save_photos(self.results)
         self.results_count += len(self.results)
 
 
@@ -391,12 +564,13 @@ class RecentPhotosFetcher(PhotosFetcher):
         # Maximum date of photos to return, if end is passed in:
         self.max_date = None
 
-    def fetch(self, days=None, start=None, end=None):
+    def fetch(self, days=None, start=None, end=None, workers=1):
         """Fetch all of the Account's user's photos, by default.
         days  - The number of days back to look, by upload date, or
                 'all' to fetch all photos.
         start - The start date of a range in YYYY-MM-DD,YYYY-MM-DD format
         end   - The end date of a range in YYYY-MM-DD,YYYY-MM-DD format
+        workers - How many photos to fetch extra data for at once.
         """
 
         if days and (start or end):
@@ -436,6 +610,8 @@ class RecentPhotosFetcher(PhotosFetcher):
             msg = "Either set days or start and/or end."
             raise FetchError(msg)
 
+        self.workers = workers
+
         return super().fetch()
 
     def _call_api(self):
@@ -447,6 +623,9 @@ class RecentPhotosFetcher(PhotosFetcher):
             "user_id": self.account.user.nsid,
             "per_page": self.items_per_page,
             "page": self.page_number,
+            # So we can skip photos that haven't changed since we last
+            # fetched them:
+            "extras": "last_update,views",
         }
 
         if self.min_date:
@@ -477,6 +656,85 @@ class RecentPhotosFetcher(PhotosFetcher):
         self.results += results["photos"]["photo"]
 
 
+class UpdatedPhotosFetcher(PhotosFetcher):
+    """Fetches and saves data about an Account's Photos that have changed on
+    Flickr since we last did this. eg, their titles, tags, privacy or location
+    have been edited, no matter how long ago they were uploaded.
+
+    The most recent update time of the photos fetched is stored on the Account
+    as photos_updated_time, and used as the starting point next time. If the
+    Account doesn't have one yet, ALL photos are fetched.
+    """
+
+    def __init__(self, account):
+        super().__init__(account)
+
+        # Only fetch photos updated since this time:
+        self.min_date = account.photos_updated_time
+
+        # The most recent update time of all the photos listed:
+        self.max_last_update_time = None
+
+    def fetch(self, workers=1):
+        """Fetch all of the Account's user's photos updated since last time.
+        workers - How many photos to fetch extra data for at once.
+        """
+        self.workers = workers
+
+        results = super().fetch()
+
+        # Only move the Account on once everything's been saved, so that if
+        # anything failed we'll try those photos again next time:
+        if results["success"] and self.max_last_update_time is not None:
+            self.account.photos_updated_time = self.max_last_update_time
+            self.account.save(update_fields=["photos_updated_time"])
+
+        return results
+
+    def _call_api(self):
+        """Fetch one page of results, containing very basic info about the
+        Photos."""
+
+        if self.min_date:
+            min_unixtime = calendar.timegm(self.min_date.timetuple())
+        else:
+            # Flickr requires a date, so use one from before Flickr existed:
+            min_unixtime = calendar.timegm(datetime.date(2000, 1, 1).timetuple())
+
+        try:
+            results = self.api.photos.recentlyUpdated(
+                min_date=min_unixtime,
+                per_page=self.items_per_page,
+                page=self.page_number,
+                # So we can skip photos that we fetched since their update:
+                extras="last_update,views",
+            )
+        except FlickrError as err:
+            msg = f"Error when fetching updated photos (page {self.page_number}): {err}"
+            raise FetchError(msg) from err
+
+        if (
+            self.page_number == 1
+            and "photos" in results
+            and "pages" in results["photos"]
+        ):
+            # First time, set the total_pages there are to fetch.
+            self.total_pages = int(results["photos"]["pages"])
+
+        for photo in results["photos"]["photo"]:
+            last_update_time = datetime.datetime.fromtimestamp(
+                int(photo["lastupdate"]), tz=datetime.timezone.utc
+            )
+            if (
+                self.max_last_update_time is None
+                or last_update_time > self.max_last_update_time
+            ):
+                self.max_last_update_time = last_update_time
+
+        # Add the list of photos' data from this page on to our total list:
+        self.results += results["photos"]["photo"]
+
+
 class PhotosetsFetcher(Fetcher):
     def _call_api(self):
         """Fetch one page of results.
@@ -562,13 +820,10 @@ class PhotosetsFetcher(Fetcher):
                 photos += results["photoset"]["photo"]
 
             page_number += 1
-            time.sleep(0.5)  # Being nice.
 
         return photos
 
     def _save_results(self):
         """Save all the data we've fetched about photosets to the DB."""
-        saver = PhotosetSaver()
-        for photoset in self.results:
-            saver.save_photoset(photoset)
+        PhotosetSaver().save_photosets(self.results)
         self.results_count += len(self.results)
@@ -1,8 +1,10 @@
-import os
+import functools
 
-from django.core.files import File
-
-from ditto.core.utils.downloader import DownloadException, filedownloader
+from ditto.core.utils.downloader import (
+    DownloadException,
+    DownloadPool,
+    filedownloader,
+)
 from ditto.flickr.models import Photo
 
 from . import FetchError
@@ -46,7 +48,7 @@ class OriginalFilesFetcher:
 
         self.account = account
 
-    def fetch(self, *, fetch_all=False):
+    def fetch(self, *, fetch_all=False, workers=1, progress=None):
         """
         Download and save original photos and videos for all Photo objects
         (or just those that don't already have them).
@@ -55,44 +57,73 @@ class OriginalFilesFetcher:
 
         fetch_all -- Boolean. Fetch ALL photos/videos, even if we've already
                         got them?
+        workers -- Integer. How many files to download at once.
+        progress -- Optional function, called after each file with the
+                        number of files done so far and the total.
         """
         # Might already have success=False from __init__():
         if "success" not in self.return_value:
-            self._fetch_files(fetch_all)
+            self._fetch_files(fetch_all, workers, progress)
 
             self.return_value["fetched"] = self.results_count
 
         return self.return_value
 
-    def _fetch_files(self, fetch_all):
+    def _fetch_files(self, fetch_all, workers=1, progress=None):
         """
         Download and save original photos and videos for all Photo objects
         (or just those that don't already have them).
 
         fetch_all -- Boolean. Fetch ALL photos/videos, even if we've already
                         got them?
+        workers -- Integer. How many files to download at once.
+        progress -- Optional function, as for fetch().
         """
 
-        photos = Photo.objects.filter(user=self.account.user)
+        photos = Photo.objects.filter(user=self.account.user).select_related("user")
 
         if not fetch_all:
             photos = photos.filter(original_file="")
 
-        error_messages = []
-
+        files = []
         for photo in photos:
-            try:
-                self._fetch_and_save_file(photo=photo, media_type="photo")
-                self.results_count += 1
-            except FetchError as e:
-                error_messages.append(str(e))
-
+            files.append((photo, "photo"))
             if photo.media == "video":
+                files.append((photo, "video"))
+
+        error_messages = []
+
+        if workers > 1:
+            # Download in several threads but save them all in this one:
+            jobs = []
+            for photo, media_type in files:
+                url, acceptable_content_types = self._get_url(photo, media_type)
+                download = functools.partial(
+                    filedownloader.download,
+                    url,
+                    acceptable_content_types,
+                    resume=(media_type == "video"),
+                )
+                jobs.append((url, download, (photo, media_type)))
+
+            pool = DownloadPool(workers=workers, progress=progress)
+            for (photo, media_type), future in pool.run(jobs):
+                try:
+                    downloaded = future.result()
+                except DownloadException as e:
+                    error_messages.append(str(e))
+                else:
+                    self._save_file(photo, media_type, downloaded)
+                    self.results_count += 1
+        else:
+            for i, (photo, media_type) in enumerate(files, start=1):
                 try:
-                    self._fetch_and_save_file(photo=photo, media_type="video")
+                    self._fetch_and_save_file(photo=photo, media_type=media_type)
                     self.results_count += 1
                 except FetchError as e:
                     error_messages.append(str(e))
+                if progress is not None:
+                    progress(i, len(files))
 
         if len(error_messages) > 0:
             self.return_value["success"] = False
@@ -110,7 +141,28 @@ class OriginalFilesFetcher:
 
         Raises FetchError if something goes wrong.
         """
+        url, acceptable_content_types = self._get_url(photo, media_type)
+
+        try:
+            # Downloads the file into a temporary file. Videos can be big, so
+            # if the download's interrupted, carry on from there next time:
+            downloaded = filedownloader.download(
+                url, acceptable_content_types, resume=(media_type == "video")
+            )
+        except DownloadException as err:
+            raise FetchError(err) from err
 
+        self._save_file(photo, media_type, downloaded)
+
+    def _get_url(self, photo, media_type):
+        """
+        Returns a tuple of the URL of a Photo's photo or video file and a
+        list of the content types it's allowed to have.
+
+        Expects:
+            photo -- A Photo object.
+            media_type -- String, either 'photo' or 'video'.
+        """
         if media_type == "video":
             url = photo.remote_video_original_url
             # Accepted video formats:
@@ -129,21 +181,23 @@ class OriginalFilesFetcher:
                 "image/gif",
             ]
 
-        filepath = False
-        try:
-            # Saves the file to /tmp/:
-            filepath = filedownloader.download(url, acceptable_content_types)
-        except DownloadException as err:
-            raise FetchError(err) from err
+        return url, acceptable_content_types
 
-        if filepath:
-            # Reopen file and save to the Photo:
-            with open(filepath, "rb") as reopened_file:
-                django_file = File(reopened_file)
+    def _save_file(self, photo, media_type, downloaded):
+        """
+        Saves a downloaded video or photo file to the Photo object.
 
+        Expects:
+            photo -- A Photo object.
+            media_type -- String, either 'photo' or 'video'.
+            downloaded -- A DownloadedFile, or None.
+        """
+        if downloaded:
+            # Closing it deletes the temporary file, if it wasn't moved:
+            with downloaded:
                 if media_type == "video":
-                    photo.video_original_file.save(
-                        os.path.basename(filepath), django_file
-                    )
+                    photo.video_original_file.save(downloaded.name, downloaded)
                 else:
-                    photo.original_file.save(os.path.basename(filepath), django_file)
+                    # Saving the file saves the Photo, with its placeholder:
+                    photo.set_placeholder(downloaded)
+                    photo.original_file.save(downloaded.name, downloaded)
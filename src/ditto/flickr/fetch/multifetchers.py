@@ -1,7 +1,7 @@
 from ditto.flickr.models import Account, User
 
 from . import FetchError
-from .fetchers import PhotosetsFetcher, RecentPhotosFetcher
+from .fetchers import PhotosetsFetcher, RecentPhotosFetcher, UpdatedPhotosFetcher
 from .filesfetchers import OriginalFilesFetcher
 
 # Classes for fetching data from the API for ONE OR MORE Accounts.
@@ -13,6 +13,7 @@ from .filesfetchers import OriginalFilesFetcher
 #
 # MultiAccountFetcher
 #   RecentPhotosMultiAccountFetcher
+#   UpdatedPhotosMultiAccountFetcher
 #   PhotosetsMultiAccountFetcher
 #   OriginalFilesMultiAccountFetcher
 
@@ -94,10 +95,33 @@ class RecentPhotosMultiAccountFetcher(MultiAccountFetcher):
     went wrong) for each account.
     """
 
-    def fetch(self, days=None, start=None, end=None):
+    def fetch(self, days=None, start=None, end=None, workers=1):
         for account in self.accounts:
             self.return_value.append(
-                RecentPhotosFetcher(account).fetch(days=days, start=start, end=end)
+                RecentPhotosFetcher(account).fetch(
+                    days=days, start=start, end=end, workers=workers
+                )
+            )
+
+        return self.return_value
+
+
+class UpdatedPhotosMultiAccountFetcher(MultiAccountFetcher):
+    """For fetching photos that have changed since last time for ALL or ONE
+    account(s).
+
+    Usage:
+
+        results = UpdatedPhotosMultiAccountFetcher().fetch()
+
+    results will be a list of dicts containing info about what was fetched (or
+    went wrong) for each account.
+    """
+
+    def fetch(self, workers=1):
+        for account in self.accounts:
+            self.return_value.append(
+                UpdatedPhotosFetcher(account).fetch(workers=workers)
             )
 
         return self.return_value
@@ -132,10 +156,12 @@ class OriginalFilesMultiAccountFetcher(MultiAccountFetcher):
     went wrong) for each account.
     """
 
-    def fetch(self, *, fetch_all=False):
+    def fetch(self, *, fetch_all=False, workers=1, progress=None):
         for account in self.accounts:
             self.return_value.append(
-                OriginalFilesFetcher(account).fetch(fetch_all=fetch_all)
+                OriginalFilesFetcher(account).fetch(
+                    fetch_all=fetch_all, workers=workers, progress=progress
+                )
             )
 
         return self.return_value
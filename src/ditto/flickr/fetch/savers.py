@@ -1,11 +1,13 @@
-import contextlib
 import json
+from collections import defaultdict
 from datetime import datetime, timezone
 from zoneinfo import ZoneInfo
 
-from django.db.utils import IntegrityError
+from django.db import connection, transaction
 from taggit.models import Tag
 
+from ditto.core.models import TimelineItem
+from ditto.core.utils import bump_content_version
 from ditto.flickr.models import Photo, Photoset, User
 
 from . import FetchError
@@ -46,6 +48,46 @@ class SaveUtilsMixin:
         """
         return datetime.fromtimestamp(int(api_time), tz=timezone.utc)
 
+    def _upsert(self, model, objs, fields_list, unique_field="flickr_id"):
+        """Creates or updates lots of objects at once, with one query for
+        each different set of fields, rather than one or two per object.
+
+        Like update_or_create(), each existing object only has the fields we
+        have values for updated, so objects are grouped by their fields.
+
+        model -- eg, Photo.
+        objs -- A list of unsaved model instances.
+        fields_list -- A list of the names of the fields set on each of objs.
+        unique_field -- The name of the field identifying existing objects.
+        """
+        # Extra fields that are set by save(), or by the database, which the
+        # objects won't have in their fields:
+        extra_fields = {"time_modified"}
+        if hasattr(model, "summary"):
+            extra_fields.update(["summary", "post_year"])
+        if hasattr(model, "taken_year"):
+            extra_fields.add("taken_year")
+
+        # Only MySQL can't be told which field might conflict:
+        unique_fields = (
+            [unique_field]
+            if connection.features.supports_update_conflicts_with_target
+            else None
+        )
+
+        groups = defaultdict(dict)
+        for obj, fields in zip(objs, fields_list, strict=True):
+            # Keyed by unique_field, so any duplicates are only saved once:
+            groups[frozenset(fields)][getattr(obj, unique_field)] = obj
+
+        for fields, group in groups.items():
+            model.objects.bulk_create(
+                group.values(),
+                update_conflicts=True,
+                unique_fields=unique_fields,
+                update_fields=sorted((fields | extra_fields) - {unique_field}),
+            )
+
 
 class UserSaver(SaveUtilsMixin):
     """For creating/updating an individual User based on data from the API.
@@ -118,11 +160,15 @@ class UserSaver(SaveUtilsMixin):
 
 
 class PhotoSaver(SaveUtilsMixin):
-    """For creating/updating an individual Photo based on data from the API.
+    """For creating/updating Photos based on data from the API.
 
     Use like:
 
-        PhotoSaver().save_photo(data, fetch_time)
+        PhotoSaver().save_photo(data)
+
+    or, to save a whole page of photos with a handful of queries:
+
+        PhotoSaver().save_photos([data, data, data])
     """
 
     def __init__(self, *args, **kwargs):
@@ -144,6 +190,62 @@ class PhotoSaver(SaveUtilsMixin):
         Returns:
         The Photo object that was created or updated.
         """
+        return self.save_photos([photo])[0]
+
+    def save_photos(self, photos):
+        """Takes a list of dicts of photo data from the API, like save_photo()
+        expects, and creates or updates all their Photo objects and tags.
+
+        This takes a handful of queries for the whole list, rather than
+        several for every photo and tag. Because the Photos aren't saved with
+        their save() methods, their TimelineItems are updated here.
+
+        Returns:
+        A list of the Photo objects that were created or updated, in the same
+        order.
+        """
+        if not photos:
+            return []
+
+        objs = []
+        fields_list = []
+        for photo in photos:
+            fields = self._get_photo_fields(photo)
+            obj = Photo(**fields)
+            # What Photo.save() would do:
+            obj.summary = obj._make_summary()
+            obj.post_year = obj.post_time.year if obj.post_time else None
+            obj.taken_year = obj.taken_time.year if obj.taken_time else None
+            objs.append(obj)
+            fields_list.append(fields)
+
+        with transaction.atomic():
+            self._upsert(Photo, objs, fields_list)
+
+            # Get them all back, now they have IDs:
+            photo_objs = Photo.objects.defer_raw().in_bulk(
+                [obj.flickr_id for obj in objs], field_name="flickr_id"
+            )
+
+            self._save_tags(
+                [
+                    (photo_objs[obj.flickr_id], photo["info"]["tags"]["tag"])
+                    for obj, photo in zip(objs, photos, strict=True)
+                ]
+            )
+
+            TimelineItem.objects.update_for_items(photo_objs.values())
+
+        # Saving in bulk doesn't send the post_save signal that would do this:
+        bump_content_version("flickr")
+
+        return [photo_objs[obj.flickr_id] for obj in objs]
+
+    def _get_photo_fields(self, photo):
+        """Returns a dict of the Photo's fields and values, from the dict of
+        photo data that save_photo() expects. Only includes fields we have
+        data for.
+        """
 
         # photo['info']['urls'] = {
         #     'url': [ {'type':'photopage', '_content':'http...'} ]
@@ -162,7 +264,7 @@ class PhotoSaver(SaveUtilsMixin):
             "raw": json.dumps(photo["info"]),
             # Photo fields
             "user": photo["user_obj"],
-            "flickr_id": photo["info"]["id"],
+            "flickr_id": int(photo["info"]["id"]),
             "description": photo["info"]["description"]["_content"],
             "secret": photo["info"]["secret"],
             "original_secret": photo["info"]["originalsecret"],
@@ -271,87 +373,128 @@ class PhotoSaver(SaveUtilsMixin):
         except KeyError:
             pass
 
-        photo_obj, created = Photo.objects.update_or_create(
-            flickr_id=photo["info"]["id"], defaults=defaults
-        )
-
-        self._save_tags(photo_obj, photo["info"]["tags"]["tag"])
-
-        return photo_obj
+        return defaults
 
-    def _save_tags(self, photo_obj, tags_data):
+    def _save_tags(self, photos_tags):
         """
-        Adds/deletes tags for a photo.
+        Adds/deletes tags for some photos, with a few queries for all of them.
 
         Required Arguments
-          photo_obj: The Photo object we're altering tags for.
-          photo_user_obj: The User whose photo this is (because they're most
-                            likely to have created the tags.)
-          tags_data: A list of dicts about the tags, straight from the API.
+          photos_tags: A list of (photo_obj, tags_data) tuples:
+            photo_obj: The Photo object we're altering tags for.
+            tags_data: A list of dicts about its tags, straight from the API.
         """
+        through = Photo.tags.through
+
+        # In case the same photo is here more than once, use the last one:
+        photos_tags = list({p[0].pk: p for p in photos_tags}.values())
+
+        # The existing tag-photo relationships, like:
+        # {photo_pk: {tag_flickr_id: tagged_photo_pk}}
+        local_tags = defaultdict(dict)
+        for pk, photo_pk, flickr_id in through.objects.filter(
+            content_object__in=[photo_obj for photo_obj, tags_data in photos_tags]
+        ).values_list("pk", "content_object_id", "flickr_id"):
+            local_tags[photo_pk][flickr_id] = pk
+
+        # (photo_obj, tag) for tags that aren't currently on photos:
+        to_add = []
+        # Tag-photo relationships no longer on their photo on Flickr:
+        to_delete = []
+
+        for photo_obj, tags_data in photos_tags:
+            local_flickr_ids = local_tags[photo_obj.pk]
+            remote_flickr_ids = {tag["id"] for tag in tags_data}
+
+            to_add.extend(
+                (photo_obj, tag)
+                for tag in tags_data
+                if tag["id"] not in local_flickr_ids
+            )
+            to_delete.extend(
+                pk
+                for flickr_id, pk in local_flickr_ids.items()
+                if flickr_id not in remote_flickr_ids
+            )
+
+        if to_add:
+            tag_objs = self._get_or_create_tags(
+                {tag["_content"]: tag["raw"] for photo_obj, tag in to_add}
+            )
+            # In theory we'll already have fetched and saved data for all
+            # authors of these tags when fetching these photos' data.
+            authors = User.objects.in_bulk(
+                {tag["author"] for photo_obj, tag in to_add}, field_name="nsid"
+            )
+
+            tagged_photos = []
+            for photo_obj, tag in to_add:
+                try:
+                    author = authors[tag["author"]]
+                except KeyError as err:
+                    msg = (
+                        "Tried to add a Tag authored by a Flickr user "
+                        f"with NSID {tag['author']} who doesn't exist in the DB."
+                    )
+                    raise FetchError(msg) from err
+
+                tagged_photos.append(
+                    through(
+                        flickr_id=tag["id"],
+                        author=author,
+                        machine_tag=(tag["machine_tag"] == "1"),
+                        content_object=photo_obj,
+                        tag=tag_objs[tag["_content"]],
+                    )
+                )
+            through.objects.bulk_create(tagged_photos)
 
-        # The existing tag-photo relationships.
-        tagged_photos = Photo.tags.through.objects.filter(content_object=photo_obj)
+        if to_delete:
+            through.objects.filter(pk__in=to_delete).delete()
 
-        local_flickr_ids = set()
-        remote_flickr_ids = set()
+    def _get_or_create_tags(self, names):
+        """
+        Returns a dict of Tag objects, keyed by slug, creating any that don't
+        exist yet.
 
-        # Get the Flickr IDs of all the current tag-photo relationships.
-        for tagged_photo in tagged_photos:
-            local_flickr_ids.add(tagged_photo.flickr_id)
+        names -- A dict of the tags' names, keyed by their slugs.
+        """
+        tag_objs = Tag.objects.in_bulk(names, field_name="slug")
+
+        missing = {slug: name for slug, name in names.items() if slug not in tag_objs}
+        if missing:
+            # It's possible for there to be a tag with a different slug but
+            # the same name, which would cause an IntegrityError. So ignore
+            # those, and then fetch the existing Tags by name instead:
+            Tag.objects.bulk_create(
+                [Tag(slug=slug, name=name) for slug, name in missing.items()],
+                ignore_conflicts=True,
+            )
+            tag_objs.update(Tag.objects.in_bulk(missing, field_name="slug"))
+
+            tags_by_name = Tag.objects.in_bulk(
+                [name for slug, name in missing.items() if slug not in tag_objs],
+                field_name="name",
+            )
+            for slug, name in missing.items():
+                if slug not in tag_objs:
+                    tag_objs[slug] = tags_by_name[name]
+
+        return tag_objs
 
-        for tag in tags_data:
-            remote_flickr_ids.add(tag["id"])
 
-            if tag["id"] not in local_flickr_ids:
-                # This tag isn't currently on the photo, so add it.
-                try:
-                    tag_obj, tag_created = Tag.objects.get_or_create(
-                        slug=tag["_content"], defaults={"name": tag["raw"]}
-                    )
-                except IntegrityError:
-                    # It's possible for there to be a tag with a different
-                    # slug but the same name, which would cause an
-                    # IntegrityError.
-                    # In which case, just fetch the existing Tag by name:
-                    tag_obj = Tag.objects.get(name=tag["raw"])
-
-                # Who created this tag?
-                if tag["author"] == photo_obj.user.nsid:
-                    # The same person whose photo these tags are on.
-                    user = photo_obj.user
-                else:
-                    # In theory we'll already have fetched and saved data for
-                    # all authors of these tags when fetching this photo's
-                    # data.
-                    try:
-                        user = User.objects.get(nsid=tag["author"])
-                    except User.DoesNotExist as err:
-                        msg = (
-                            "Tried to add a Tag authored by a Flickr user "
-                            f"with NSID {tag['author']} who doesn't exist in the DB."
-                        )
-                        raise FetchError(msg) from err
-
-                pt_obj = Photo.tags.through(
-                    flickr_id=tag["id"],
-                    author=user,
-                    machine_tag=(tag["machine_tag"] == "1"),
-                    content_object=photo_obj,
-                    tag=tag_obj,
-                )
-                pt_obj.save()
+class PhotosetSaver(SaveUtilsMixin):
+    """For creating/updating Photosets based on data from the API.
 
-        flickr_ids_to_delete = local_flickr_ids.difference(remote_flickr_ids)
+    Use like:
 
-        # Finally, delete any tag-photo relationships which were identified
-        # above as no longer on the photo on Flickr.
-        for tagged_photo in tagged_photos:
-            if tagged_photo.flickr_id in flickr_ids_to_delete:
-                tagged_photo.delete()
+        PhotosetSaver().save_photoset(data)
 
+    or, to save several photosets with a handful of queries:
+
+        PhotosetSaver().save_photosets([data, data, data])
+    """
 
-class PhotosetSaver(SaveUtilsMixin):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
@@ -372,41 +515,80 @@ class PhotosetSaver(SaveUtilsMixin):
         Returns:
         The Photoset object that was created or updated.
         """
+        return self.save_photosets([photoset])[0]
 
-        ps = photoset["photoset"]
-
-        defaults = {
-            "fetch_time": photoset["fetch_time"],
-            "user": photoset["user_obj"],
-            "flickr_id": ps["id"],
-            "title": ps["title"]["_content"],
-            "description": ps["description"]["_content"],
-            "photo_count": ps["photos"],
-            "video_count": ps["videos"],
-            "view_count": ps["count_views"],
-            "comment_count": ps["count_comments"],
-            "last_update_time": self._unixtime_to_datetime(ps["date_update"]),
-            "flickr_created_time": self._unixtime_to_datetime(ps["date_create"]),
-            "raw": json.dumps(ps),
-            "photos_raw": json.dumps(photoset["photos"]),
-        }
+    def save_photosets(self, photosets):
+        """Takes a list of dicts of photoset data from the API, like
+        save_photoset() expects, and creates or updates all their Photoset
+        objects.
 
-        with contextlib.suppress(Photo.DoesNotExist):
-            defaults["primary_photo"] = Photo.objects.get(flickr_id=ps["primary"])
+        This takes a few queries for the whole list, plus a few for setting
+        each Photoset's photos, rather than one for every photo.
 
-        photoset_obj, created = Photoset.objects.update_or_create(
-            flickr_id=ps["id"], defaults=defaults
+        Returns:
+        A list of the Photoset objects that were created or updated, in the
+        same order.
+        """
+        if not photosets:
+            return []
+
+        # All the photosets' photos that we have in the DB:
+        photo_ids = set()
+        for photoset in photosets:
+            photo_ids.add(int(photoset["photoset"]["primary"]))
+            photo_ids.update(int(photo["id"]) for photo in photoset["photos"])
+        photo_objs = Photo.objects.only("pk", "flickr_id").in_bulk(
+            photo_ids, field_name="flickr_id"
         )
 
-        if photoset_obj:
-            # Add all the photoset's photos that we have in the DB to the
-            # photoset object.
-            photos = []
-            for photo in photoset["photos"]:
-                with contextlib.suppress(Photo.DoesNotExist):
-                    photos.append(Photo.objects.get(flickr_id=photo["id"]))
-
-            # Sets/updates the SortedManyToMany field of the photoset's photos:
-            photoset_obj.photos.set(photos)
-
-        return photoset_obj
+        objs = []
+        fields_list = []
+        for photoset in photosets:
+            ps = photoset["photoset"]
+
+            fields = {
+                "fetch_time": photoset["fetch_time"],
+                "user": photoset["user_obj"],
+                "flickr_id": int(ps["id"]),
+                "title": ps["title"]["_content"],
+                "description": ps["description"]["_content"],
+                "photo_count": ps["photos"],
+                "video_count": ps["videos"],
+                "view_count": ps["count_views"],
+                "comment_count": ps["count_comments"],
+                "last_update_time": self._unixtime_to_datetime(ps["date_update"]),
+                "flickr_created_time": self._unixtime_to_datetime(ps["date_create"]),
+                "raw": json.dumps(ps),
+                "photos_raw": json.dumps(photoset["photos"]),
+            }
+
+            if int(ps["primary"]) in photo_objs:
+                fields["primary_photo"] = photo_objs[int(ps["primary"])]
+
+            objs.append(Photoset(**fields))
+            fields_list.append(fields)
+
+        with transaction.atomic():
+            self._upsert(Photoset, objs, fields_list)
+
+            # Get them all back, now they have IDs:
+            photoset_objs = Photoset.objects.in_bulk(
+                [obj.flickr_id for obj in objs], field_name="flickr_id"
+            )
+
+            for obj, photoset in zip(objs, photosets, strict=True):
+                # Add all the photoset's photos that we have in the DB to the
+                # photoset object.
+                photos = [
+                    photo_objs[int(photo["id"])]
+                    for photo in photoset["photos"]
+                    if int(photo["id"]) in photo_objs
+                ]
+                # Sets/updates the SortedManyToMany field of the photoset's
+                # photos:
+                photoset_objs[obj.flickr_id].photos.set(photos)
+
+        # Saving in bulk doesn't send the post_save signal that would do this:
+        bump_content_version("flickr")
+
+        return [photoset_objs[obj.flickr_id] for obj in objs]
@@ -1,5 +1,12 @@
+import functools
+
 from imagekit import ImageSpec, register
+from imagekit.cachefiles.strategies import Optimistic
 from imagekit.processors import Adjust, ResizeToFill, ResizeToFit, Transpose
+from PIL import features
+
+from ditto.core.imagecache import ManifestSpecMixin
+from ditto.core.imageprocessors import DraftDownscale
 
 # Info about different Flickr image sizes:
 # https://www.flickr.com/services/api/misc.urls.html
@@ -7,10 +14,29 @@ from imagekit.processors import Adjust, ResizeToFill, ResizeToFit, Transpose
 # Also see ditto.flickr.models.Photo
 
 
+# Other formats that each size can also be made in, for browsers that
+# support them, with their MIME types and Pillow's options for saving them.
+# See variant_formats().
+VARIANT_FORMATS = {
+    "AVIF": {"mime_type": "image/avif", "options": {"quality": 60}},
+    "WEBP": {"mime_type": "image/webp", "options": {"quality": 75}},
+}
+
+
+@functools.cache
+def variant_formats():
+    "Returns the keys of VARIANT_FORMATS that this Pillow can save."
+    return [
+        image_format
+        for image_format in VARIANT_FORMATS
+        if features.check(image_format.lower())
+    ]
+
+
 # BASE CLASSES
 
 
-class FlickrSpec(ImageSpec):
+class FlickrSpec(ManifestSpecMixin, ImageSpec):
     "Base class for most specs. Keeps same proportions."
 
     format = "JPEG"
@@ -18,16 +44,25 @@ class FlickrSpec(ImageSpec):
     # If original image is smaller, don't enlarge it:
     upscale = False
 
-    def __init__(self, source):
+    def __init__(self, source, image_format=None):
         self.processors = [
+            DraftDownscale(self.width, self.height),
             Transpose(),
             ResizeToFit(self.width, self.height, upscale=self.upscale),
             Adjust(sharpness=2.0),
         ]
+        if image_format:
+            # eg "WEBP", one of VARIANT_FORMATS:
+            self.format = image_format
+            self.options = VARIANT_FORMATS[image_format]["options"]
+            # Don't make these when their URLs are used, or every photo on a
+            # page would mean making many images. generate_ditto_thumbnails
+            # makes them:
+            self.cachefile_strategy = Optimistic()
         super().__init__(source)
 
 
-class FlickrSquareSpec(ImageSpec):
+class FlickrSquareSpec(ManifestSpecMixin, ImageSpec):
     "Base class for the square specs. Crops to a square."
 
     format = "JPEG"
@@ -35,12 +70,21 @@ class FlickrSquareSpec(ImageSpec):
     # If original image is smaller, enlarge it to fill:
     upscale = True
 
-    def __init__(self, source):
+    def __init__(self, source, image_format=None):
         self.processors = [
+            DraftDownscale(self.size, self.size, fill=True),
             Transpose(),
             ResizeToFill(self.size, self.size, upscale=self.upscale),
             Adjust(sharpness=2.0),
         ]
+        if image_format:
+            # eg "WEBP", one of VARIANT_FORMATS:
+            self.format = image_format
+            self.options = VARIANT_FORMATS[image_format]["options"]
+            # Don't make these when their URLs are used, or every photo on a
+            # page would mean making many images. generate_ditto_thumbnails
+            # makes them:
+            self.cachefile_strategy = Optimistic()
         super().__init__(source)
 
 
@@ -29,11 +29,12 @@ class FetchPhotosCommand(FetchCommand):
     singular_noun = "Photo"
     plural_noun = "Photos"
 
-    # Child classes should supply some help text for the --days and
-    # --start/--end arguments:
+    # Child classes should supply some help text for the --days,
+    # --start/--end and --updated arguments:
     days_help = ""
     start_help = ""
     end_help = ""
+    updated_help = ""
 
     def add_arguments(self, parser):
         super().add_arguments(parser)
@@ -45,6 +46,18 @@ class FetchPhotosCommand(FetchCommand):
         )
         parser.add_argument("--end", action="store", default=None, help=self.end_help)
 
+        parser.add_argument(
+            "--updated", action="store_true", default=False, help=self.updated_help
+        )
+
+        parser.add_argument(
+            "--workers",
+            action="store",
+            type=int,
+            default=1,
+            help="How many photos to fetch extra data for at once (default 1)",
+        )
+
     def handle(self, *args, **options):
         # We might be fetching for a specific account or all (None).
         nsid = options["account"] if options["account"] else None
@@ -53,7 +66,15 @@ class FetchPhotosCommand(FetchCommand):
             msg = "You can't use --days with --start or --end"
             raise CommandError(msg)
 
-        if options["days"]:
+        if options["updated"]:
+            if options["days"] or options["start"] or options["end"]:
+                msg = "You can't use --updated with --days, --start or --end"
+                raise CommandError(msg)
+
+            results = self.fetch_updated_photos(nsid=nsid, workers=options["workers"])
+            self.output_results(results, options.get("verbosity", 1))
+
+        elif options["days"]:
             # Will be either 'all' or a number; make the number an int.
             if options["days"].isdigit():
                 options["days"] = int(options["days"])
@@ -61,26 +82,41 @@ class FetchPhotosCommand(FetchCommand):
                 msg = "--days should be an integer or 'all'."
                 raise CommandError(msg)
 
-            results = self.fetch_photos(nsid=nsid, days=options["days"])
+            results = self.fetch_photos(
+                nsid=nsid, days=options["days"], workers=options["workers"]
+            )
             self.output_results(results, options.get("verbosity", 1))
 
         elif options["start"] or options["end"]:
             results = self.fetch_photos(
-                nsid=nsid, start=options["start"], end=options["end"]
+                nsid=nsid,
+                start=options["start"],
+                end=options["end"],
+                workers=options["workers"],
             )
             self.output_results(results, options.get("verbosity", 1))
 
         elif options["account"]:
-            msg = "Specify --days, or --start and/or --end as well as --account."
+            msg = (
+                "Specify --days, --start and/or --end, or --updated as well as "
+                "--account."
+            )
             raise CommandError(msg)
 
         else:
-            msg = "Specify --days, or --start and/or --end."
+            msg = "Specify --days, --start and/or --end, or --updated."
             raise CommandError(msg)
 
-    def fetch_photos(self, nsid, days=None, start=None, end=None):
+    def fetch_photos(self, nsid, days=None, start=None, end=None, workers=1):
         """Child classes should override this method to call a method that
         fetches photos and returns results, eg:
             return RecentPhotosMultiAccountFetcher(nsid=nsid).fetch(days=days)
         """
         return {}
+
+    def fetch_updated_photos(self, nsid, workers=1):
+        """Child classes should override this method to call a method that
+        fetches photos changed since last time and returns results, eg:
+            return UpdatedPhotosMultiAccountFetcher(nsid=nsid).fetch()
+        """
+        return {}
@@ -1,3 +1,5 @@
+from django.core.management import call_command
+
 from ditto.flickr.fetch.multifetchers import OriginalFilesMultiAccountFetcher
 
 from . import FetchCommand
@@ -13,6 +15,12 @@ class Command(FetchCommand):
     For one account:
         ./manage.py fetch_flickr_originals --account=35034346050@N01
         ./manage.py fetch_flickr_originals --account=35034346050@N01 --all
+
+    To download several files at once:
+        ./manage.py fetch_flickr_originals --workers=8
+
+    To generate smaller versions of the images afterwards:
+        ./manage.py fetch_flickr_originals --thumbnails
     """
 
     help = "Fetches the original image files for one or all Flickr Accounts"
@@ -33,12 +41,47 @@ class Command(FetchCommand):
             ),
         )
 
+        parser.add_argument(
+            "--workers",
+            action="store",
+            type=int,
+            default=1,
+            help="How many files to download at once (default 1)",
+        )
+
+        parser.add_argument(
+            "--thumbnails",
+            action="store_true",
+            default=False,
+            help=(
+                "Afterwards, generate any smaller versions of the images that "
+                "don't already exist"
+            ),
+        )
+
     def handle(self, *args, **options):
         # We might be fetching for a specific account or all (None).
         nsid = options["account"] if options["account"] else None
 
-        results = self.fetch_files(nsid, fetch_all=options["all"])
-        self.output_results(results, options.get("verbosity", 1))
+        verbosity = options.get("verbosity", 1)
+        results = self.fetch_files(
+            nsid,
+            fetch_all=options["all"],
+            workers=options["workers"],
+            progress=self.output_progress if verbosity > 1 else None,
+        )
+        self.output_results(results, verbosity)
+
+        if options["thumbnails"]:
+            call_command(
+                "generate_ditto_thumbnails",
+                sizes=["flickr"],
+                verbosity=verbosity,
+                stdout=self.stdout,
+                stderr=self.stderr,
+            )
 
-    def fetch_files(self, nsid, *, fetch_all=False):
-        return OriginalFilesMultiAccountFetcher(nsid=nsid).fetch(fetch_all=fetch_all)
+    def fetch_files(self, nsid, *, fetch_all=False, workers=1, progress=None):
+        return OriginalFilesMultiAccountFetcher(nsid=nsid).fetch(
+            fetch_all=fetch_all, workers=workers, progress=progress
+        )
@@ -1,4 +1,7 @@
-from ditto.flickr.fetch.multifetchers import RecentPhotosMultiAccountFetcher
+from ditto.flickr.fetch.multifetchers import (
+    RecentPhotosMultiAccountFetcher,
+    UpdatedPhotosMultiAccountFetcher,
+)
 
 from . import FetchPhotosCommand
 
@@ -18,6 +21,14 @@ class Command(FetchPhotosCommand):
         ./manage.py fetch_flickr_photos --account=35034346050@N01 --days=all
         ./manage.py fetch_flickr_photos --account=35034346050@N01
             --start=2001-01-17 --end=2003-11-10
+
+    To fetch photos that have been changed on Flickr since the last time
+    this was done, whenever they were uploaded:
+        ./manage.py fetch_flickr_photos --updated
+        ./manage.py fetch_flickr_photos --account=35034346050@N01 --updated
+
+    To fetch the extra data about several photos at once:
+        ./manage.py fetch_flickr_photos --days=all --workers=4
     """
 
     help = "Fetches recent or all photos for one or all Flickr Accounts"
@@ -34,7 +45,15 @@ class Command(FetchPhotosCommand):
         "Cannot be used with --days, can be combined with --start."
     )
 
-    def fetch_photos(self, nsid, days=None, start=None, end=None):
+    updated_help = (
+        "Fetch photos changed on Flickr since the last time this was done. "
+        "Cannot be used with --days, --start or --end."
+    )
+
+    def fetch_photos(self, nsid, days=None, start=None, end=None, workers=1):
         return RecentPhotosMultiAccountFetcher(nsid=nsid).fetch(
-            days=days, start=start, end=end
+            days=days, start=start, end=end, workers=workers
         )
+
+    def fetch_updated_photos(self, nsid, workers=1):
+        return UpdatedPhotosMultiAccountFetcher(nsid=nsid).fetch(workers=workers)
@@ -1,10 +1,10 @@
 from django.db import models
 from taggit.managers import _TaggableManager
 
-from ditto.core.managers import PublicItemManager
+from ditto.core.managers import DittoItemManager, PublicItemManager
 
 
-class PhotosManager(models.Manager):
+class PhotosManager(DittoItemManager):
     """Returns public AND PRIVATE Photos posted by one of the Users with
     Accounts here.
     As opposed to just Photos, which includes Photos by any User that
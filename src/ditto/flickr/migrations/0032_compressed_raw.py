@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:57
+
+import ditto.core.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flickr', '0031_alter_photo_exif_lens_model'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='photo',
+            name='exif_raw',
+            field=ditto.core.fields.CompressedTextField(blank=True, help_text='The raw JSON from the API from flickr.photos.getExif.'),
+        ),
+        migrations.AlterField(
+            model_name='photo',
+            name='raw',
+            field=ditto.core.fields.CompressedTextField(blank=True, help_text='eg, the raw JSON from the API.'),
+        ),
+        migrations.AlterField(
+            model_name='photo',
+            name='sizes_raw',
+            field=ditto.core.fields.CompressedTextField(blank=True, help_text='The raw JSON from the API - flickr.photos.getSizes.'),
+        ),
+        migrations.AlterField(
+            model_name='photoset',
+            name='photos_raw',
+            field=ditto.core.fields.CompressedTextField(blank=True, help_text='The raw JSON from the API listing the photos.'),
+        ),
+        migrations.AlterField(
+            model_name='photoset',
+            name='raw',
+            field=ditto.core.fields.CompressedTextField(blank=True, help_text='The raw JSON from the API.'),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='raw',
+            field=ditto.core.fields.CompressedTextField(blank=True, help_text='The raw JSON from the API.'),
+        ),
+    ]
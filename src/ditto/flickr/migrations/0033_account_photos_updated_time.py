@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 08:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flickr', '0032_compressed_raw'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='account',
+            name='photos_updated_time',
+            field=models.DateTimeField(blank=True, help_text="The most recent time one of the Account's Photos was changed on Flickr, when updated Photos were last fetched.", null=True),
+        ),
+    ]
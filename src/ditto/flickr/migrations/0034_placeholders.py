@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-17 09:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("flickr", "0033_account_photos_updated_time"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="photo",
+            name="dominant_color",
+            field=models.CharField(
+                blank=True,
+                help_text="The image's most common colour, eg '#a1b2c3'. Set automatically.",
+                max_length=7,
+            ),
+        ),
+        migrations.AddField(
+            model_name="photo",
+            name="placeholder",
+            field=models.TextField(
+                blank=True,
+                help_text="A tiny version of the image, as a data: URI. Set automatically.",
+            ),
+        ),
+    ]
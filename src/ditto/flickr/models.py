@@ -8,7 +8,15 @@ from sortedm2m.fields import SortedManyToManyField
 from taggit.managers import TaggableManager
 from taggit.models import TaggedItemBase
 
-from ditto.core.models import DiffModelMixin, DittoItemModel, TimeStampedModelMixin
+from ditto.core.fields import CompressedTextField
+from ditto.core.imagecache import ImageLockError
+from ditto.core.managers import DittoItemManager
+from ditto.core.models import (
+    DiffModelMixin,
+    DittoItemModel,
+    ImagePlaceholderModelMixin,
+    TimeStampedModelMixin,
+)
 
 from . import app_settings, imagegenerators, managers
 
@@ -22,6 +30,14 @@ class Account(TimeStampedModelMixin, models.Model):
     is_active = models.BooleanField(
         default=True, help_text="If false, new Photos won't be fetched."
     )
+    photos_updated_time = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text=(
+            "The most recent time one of the Account's Photos was changed on "
+            "Flickr, when updated Photos were last fetched."
+        ),
+    )
 
     class Meta:
         ordering = ["user__realname"]
@@ -86,9 +102,11 @@ class ExtraPhotoManagers(models.Model):
         abstract = True
 
 
-class Photo(DittoItemModel, ExtraPhotoManagers):
+class Photo(ImagePlaceholderModelMixin, DittoItemModel, ExtraPhotoManagers):
     ditto_item_name = "flickr_photo"
 
+    timeline_prefetch_related = ("user__account_set",)
+
     # The keys in this dict are what we use internally, for method names and
     # for the sizes of PhotoDownloads.
     # The 'label's are used in Flickr's API to identify sizes.
@@ -334,7 +352,7 @@ class Photo(DittoItemModel, ExtraPhotoManagers):
 
     # SIZES ##################################################################
 
-    sizes_raw = models.TextField(
+    sizes_raw = CompressedTextField(
         blank=True, help_text="The raw JSON from the API - flickr.photos.getSizes."
     )
 
@@ -430,7 +448,7 @@ class Photo(DittoItemModel, ExtraPhotoManagers):
     # EXIF ###################################################################
 
     # EXIF data comes from a separate query, so store its JSON here.
-    exif_raw = models.TextField(
+    exif_raw = CompressedTextField(
         blank=True, help_text="The raw JSON from the API from flickr.photos.getExif."
     )
     exif_camera = models.CharField(blank=True, max_length=50)
@@ -492,6 +510,8 @@ class Photo(DittoItemModel, ExtraPhotoManagers):
         help_text="Only present for Videos.",
     )
 
+    raw_fields = ("raw", "sizes_raw", "exif_raw")
+
     class Meta:
         ordering = ("-post_time",)
 
@@ -511,6 +531,29 @@ class Photo(DittoItemModel, ExtraPhotoManagers):
             kwargs={"nsid": self.user.nsid, "flickr_id": self.flickr_id},
         )
 
+    def get_timeline_entries(self):
+        """
+        Like public_photo_objects, only Photos by Users with Accounts are
+        in the timeline, not those they've favorited.
+        """
+        if not self.user.account_set.all():
+            return []
+        return [
+            ("photo-uploaded", self.post_time, self.is_private),
+            ("photo-taken", self.taken_time, self.is_private),
+        ]
+
+    @classmethod
+    def get_daily_count_varieties(cls):
+        # The same as public_photo_objects, but without querying for Users yet:
+        photos = cls.public_objects.filter(
+            user__in=User.objects.filter(account__isnull=False)
+        )
+        return {
+            "photo-uploaded": (photos, "post_time", "user__nsid"),
+            "photo-taken": (photos, "taken_time", "user__nsid"),
+        }
+
     def get_next_public_by_post_time(self):
         "The next public Photo by this User, ordered by post_time."
         try:
@@ -632,6 +675,87 @@ class Photo(DittoItemModel, ExtraPhotoManagers):
         """
         return self._remote_video_url("video_original")
 
+    def variant_url(self, size, image_format):
+        """
+        The URL of one of the PHOTO_SIZES made in another format, for
+        browsers that support it.
+        size -- eg, 'small_320'.
+        image_format -- eg, 'WEBP'. One of imagegenerators.variant_formats().
+
+        These are made from the downloaded original file, so this returns
+        None unless FLICKR_USE_LOCAL_MEDIA is True and we have the file.
+        Unlike the JPEG sizes they aren't made when they're first used, so
+        it also returns None until the generate_ditto_thumbnails command
+        has made it.
+        """
+        if (
+            not app_settings.FLICKR_USE_LOCAL_MEDIA
+            or not self.original_file
+            or "generator" not in self.PHOTO_SIZES[size]
+            or image_format not in imagegenerators.variant_formats()
+        ):
+            return None
+        return self._size_url(size, image_format=image_format)
+
+    def has_local_image(self, size):
+        """
+        Whether one of the PHOTO_SIZES, eg 'small_320', has already been made
+        from the downloaded original file. Unlike the `*_url` properties,
+        this doesn't make the image if it hasn't been.
+        Always False unless FLICKR_USE_LOCAL_MEDIA is True.
+        """
+        if (
+            not app_settings.FLICKR_USE_LOCAL_MEDIA
+            or not self.original_file
+            or "generator" not in self.PHOTO_SIZES[size]
+        ):
+            return False
+        generator = self.PHOTO_SIZES[size]["generator"]
+        try:
+            file = ImageCacheFile(generator(source=self.original_file))
+            return file.cachefile_backend.exists(file)
+        except Exception:  # noqa: BLE001
+            # eg, something's wrong with the original file.
+            return False
+
+    def _size_url(self, size, *, is_video=False, image_format=None):
+        """
+        Returns the URL for one of the PHOTO_SIZES or VIDEO_SIZES, which is
+        what properties like `small_320_url` and `site_mp4_url` use, or for
+        one of the PHOTO_SIZES in a different image_format.
+
+        The URL is remembered on this instance, because making local ones
+        is slow, until one of the fields it's based on changes.
+        """
+        key = (
+            app_settings.FLICKR_USE_LOCAL_MEDIA,
+            self.original_file.name,
+            self.media,
+            self.permalink,
+            self.server,
+            self.flickr_id,
+            self.secret,
+            self.original_secret,
+            self.original_format,
+        )
+        urls = self.__dict__.setdefault("_size_urls", {})
+        try:
+            url_key, url = urls[(size, is_video, image_format)]
+        except KeyError:
+            pass
+        else:
+            if url_key == key:
+                return url
+
+        if is_video:
+            url = self._video_url(size)
+        elif image_format:
+            url = self._local_image_url(size, image_format)
+        else:
+            url = self._image_url(size)
+        urls[(size, is_video, image_format)] = (key, url)
+        return url
+
     def _image_url(self, size):
         """
         Helper for the photo url property methods.
@@ -643,10 +767,15 @@ class Photo(DittoItemModel, ExtraPhotoManagers):
         else:
             return self._remote_image_url(size)
 
-    def _local_image_url(self, size):
+    def _local_image_url(self, size, image_format=None):
         """
         Generate the URL of an image of a particular size, hosted locally,
         based on the original file (which must already be downloaded).
+        image_format -- None for JPEGs, or one of VARIANT_FORMATS.
+
+        If another process is making the image, returns the flickr.com URL
+        instead. If image_format is set, returns None if the image hasn't
+        been made yet.
         """
         if self.original_file:
             if size == "original":
@@ -654,9 +783,21 @@ class Photo(DittoItemModel, ExtraPhotoManagers):
             else:
                 generator = self.PHOTO_SIZES[size]["generator"]
                 try:
-                    image_generator = generator(source=self.original_file)
+                    if image_format:
+                        image_generator = generator(
+                            source=self.original_file, image_format=image_format
+                        )
+                    else:
+                        image_generator = generator(source=self.original_file)
                     result = ImageCacheFile(image_generator)
+                    if image_format and not result.cachefile_backend.exists(result):
+                        return None
                     return result.url
+                except ImageLockError:
+                    # Another process is still making it, so don't wait:
+                    if image_format:
+                        return None
+                    return self._remote_image_url(size)
                 except Exception:  # noqa: BLE001
                     # We have an original file but something's wrong with it.
                     # Might be 0 bytes or something.
@@ -713,37 +854,38 @@ class Photo(DittoItemModel, ExtraPhotoManagers):
             url_size = self.VIDEO_SIZES[size]["url_size"]
             return f"{self.permalink}play/{url_size}/{secret}/"
 
-    def __getattr__(self, name):
-        """
-        Enables us to use properties like 'small_320_url' or 'site_mp4_url'.
-        Will call the correct internal helper method to return the URL.
-        """
-        try:
-            # Split 'small_240_url' into ['small_240', 'url']
-            size, attr = name.rsplit("_", 1)
-        except ValueError:
-            self._raise_attr_error(type(self).__name__, name)
-
-        if attr == "url":
-            # eg video_original_url()
-            if size in self.VIDEO_SIZES:
-                return self._video_url(size)
-            elif size in self.PHOTO_SIZES:
-                return self._image_url(size)
-            else:
-                self._raise_attr_error(type(self).__name__, name)
-        else:
-            self._raise_attr_error(type(self).__name__, name)
-
-    def _raise_attr_error(self, obj, attr):
-        msg = "'{0}' object has no attribute '{1}'"
-        raise AttributeError(msg.format(obj, attr))
-
     def _summary_source(self):
         "Used to make the `summary` property."
         return self.description
 
 
+class SizeURL:
+    """
+    Descriptor for the URL of one of a Photo's PHOTO_SIZES or VIDEO_SIZES.
+
+    One is added to Photo for each size, eg `photo.small_320_url` or
+    `photo.site_mp4_url`.
+    """
+
+    def __init__(self, size, *, is_video=False):
+        self.size = size
+        self.is_video = is_video
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        return instance._size_url(self.size, is_video=self.is_video)
+
+
+for _size in Photo.PHOTO_SIZES:
+    setattr(Photo, f"{_size}_url", SizeURL(_size))
+
+for _size in Photo.VIDEO_SIZES:
+    setattr(Photo, f"{_size}_url", SizeURL(_size, is_video=True))
+
+del _size
+
+
 class Photoset(TimeStampedModelMixin, DiffModelMixin, models.Model):
     user = models.ForeignKey("User", on_delete=models.CASCADE)
     flickr_id = models.BigIntegerField(
@@ -785,14 +927,18 @@ class Photoset(TimeStampedModelMixin, DiffModelMixin, models.Model):
     fetch_time = models.DateTimeField(
         null=True, blank=True, help_text="The time the item's data was last fetched."
     )
-    raw = models.TextField(blank=True, help_text="The raw JSON from the API.")
-    photos_raw = models.TextField(
+    raw = CompressedTextField(blank=True, help_text="The raw JSON from the API.")
+    photos_raw = CompressedTextField(
         blank=True, help_text="The raw JSON from the API listing the photos."
     )
 
     # Returns ALL photos, public AND private.
     photos = SortedManyToManyField("Photo", related_name="photosets")
 
+    objects = DittoItemManager()
+
+    raw_fields = ("raw", "photos_raw")
+
     class Meta:
         ordering = ["-flickr_created_time"]
 
@@ -810,8 +956,8 @@ class Photoset(TimeStampedModelMixin, DiffModelMixin, models.Model):
         return f"https://www.flickr.com/photos/{self.user.nsid}/albums/{self.flickr_id}"
 
     def public_photos(self):
-        "Returns only public photos."
-        return self.photos.filter(is_private=False)
+        "Returns only public photos, without their raw_fields loaded."
+        return self.photos.filter(is_private=False).defer_raw()
 
 
 class User(TimeStampedModelMixin, DiffModelMixin, models.Model):
@@ -850,7 +996,7 @@ class User(TimeStampedModelMixin, DiffModelMixin, models.Model):
     fetch_time = models.DateTimeField(
         null=True, blank=True, help_text="The time the data was last fetched."
     )
-    raw = models.TextField(
+    raw = CompressedTextField(
         null=False, blank=True, help_text="The raw JSON from the API."
     )
     timezone_id = models.CharField(
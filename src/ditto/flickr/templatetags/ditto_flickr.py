@@ -2,13 +2,33 @@ from datetime import datetime, timezone
 from datetime import time as datetime_time
 
 from django import template
-from django.utils.html import format_html
+from django.db.models import Prefetch
+from django.utils.html import format_html, format_html_join
 
-from ditto.core.utils import get_annual_item_counts
+from ditto.core.models import DailyItemCount
+from ditto.flickr import app_settings
+from ditto.flickr.imagegenerators import VARIANT_FORMATS, variant_formats
 from ditto.flickr.models import Photo, Photoset
 
 register = template.Library()
 
+# The PHOTO_SIZES that keep the original's proportions, smallest first.
+SRCSET_SIZES = (
+    "thumbnail",
+    "small",
+    "small_320",
+    "medium",
+    "medium_640",
+    "medium_800",
+    "large",
+    "large_1600",
+    "large_2048",
+    "x_large_3k",
+    "x_large_4k",
+    "x_large_5k",
+    "x_large_6k",
+)
+
 
 @register.simple_tag
 def recent_photos(nsid=None, limit=10):
@@ -68,10 +88,12 @@ def photosets(nsid=None, limit=10):
                     Photosets for all Flickr users that have Accounts.
     limit -- Maximum number to fetch. Default is 10.
     """
-    photosets = Photoset.objects.all()
+    photosets = Photoset.objects.defer_raw()
     if nsid is not None:
         photosets = photosets.filter(user__nsid=nsid)
-    return photosets.prefetch_related("primary_photo", "user")[:limit]
+    return photosets.prefetch_related(
+        Prefetch("primary_photo", queryset=Photo.objects.defer_raw()), "user"
+    )[:limit]
 
 
 @register.simple_tag
@@ -112,11 +134,99 @@ def annual_photo_counts(nsid=None, count_by="post_time"):
         )
         raise ValueError(msg)
 
-    qs = Photo.public_photo_objects
+    variety_name = "photo-taken" if count_by == "taken_time" else "photo-uploaded"
 
-    if nsid is not None:
-        qs = qs.filter(user__nsid=nsid)
+    return DailyItemCount.objects.get_annual_counts("flickr", variety_name, nsid)
+
+
+@register.simple_tag
+def photo_srcset(photo, sizes=None, max_width=1024, image_format=None, size="small"):
+    """Returns the `srcset` attribute, and optionally `sizes`, for an <img> or
+    <source> element, listing each of the Photo's sizes up to max_width.
+    Uses the widths stored on the Photo, so no image files are opened.
+
+    When using local media, only lists the sizes that have already been
+    made, plus `size`, so that showing a page doesn't make every size of
+    every photo. The generate_ditto_thumbnails command makes the rest.
 
-    field_name = "taken_year" if count_by == "taken_time" else "post_year"
+    eg:
+        <img src="{{ photo.small_url }}" {% photo_srcset photo sizes="50vw" %}>
 
-    return get_annual_item_counts(qs, field_name)
+    Arguments:
+    photo -- A Photo.
+
+    Keyword arguments:
+    sizes -- Optional value of the `sizes` attribute, eg '50vw'.
+    max_width -- The widest size to include, or None for all. Default 1024.
+    image_format -- Optional, eg 'WEBP', one of VARIANT_FORMATS. If any of
+                    the Photo's sizes haven't been made in this format,
+                    returns an empty string.
+    size -- The size used for the <img>'s src, which is always listed.
+            Default 'small'.
+    """
+    candidates = []
+    widths = set()
+
+    for srcset_size in SRCSET_SIZES:
+        width = getattr(photo, f"{srcset_size}_width")
+        if not width or width in widths or (max_width and width > max_width):
+            continue
+
+        if image_format:
+            url = photo.variant_url(srcset_size, image_format)
+            if url is None:
+                return ""
+        elif (
+            app_settings.FLICKR_USE_LOCAL_MEDIA
+            and srcset_size != size
+            and not photo.has_local_image(srcset_size)
+        ):
+            continue
+        else:
+            url = getattr(photo, f"{srcset_size}_url")
+
+        widths.add(width)
+        candidates.append(f"{url} {width}w")
+
+    if not candidates:
+        return ""
+
+    html = format_html('srcset="{}"', ", ".join(candidates))
+    if sizes:
+        html = format_html('{} sizes="{}"', html, sizes)
+    return html
+
+
+@register.simple_tag
+def photo_sources(photo, sizes=None, max_width=1024):
+    """Returns a <source> element for each of the modern image formats that
+    Pillow can make, like WebP, to go in a <picture> element before the <img>.
+    Only when using local media, and only for formats whose images have
+    been made by the generate_ditto_thumbnails command; otherwise returns an
+    empty string.
+
+    eg:
+        <picture>
+            {% photo_sources photo sizes="50vw" %}
+            <img src="{{ photo.small_url }}" {% photo_srcset photo sizes="50vw" %}>
+        </picture>
+
+    Arguments and keyword arguments are the same as for photo_srcset.
+    """
+    if not app_settings.FLICKR_USE_LOCAL_MEDIA or not photo.original_file:
+        return ""
+
+    sources = []
+    for image_format in variant_formats():
+        srcset = photo_srcset(
+            photo, sizes=sizes, max_width=max_width, image_format=image_format
+        )
+        if srcset:
+            sources.append(
+                format_html(
+                    '<source type="{}" {}>',
+                    VARIANT_FORMATS[image_format]["mime_type"],
+                    srcset,
+                )
+            )
+    return format_html_join("\n", "{}", ((source,) for source in sources))
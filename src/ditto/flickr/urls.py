@@ -38,4 +38,14 @@ urlpatterns = [
         view=views.PhotoDetailView.as_view(),
         name="photo_detail",
     ),
+    re_path(
+        r"^(?P<nsid>[0-9N@]+)/(?P<flickr_id>[0-9]+)/original/$",
+        view=views.PhotoFileView.as_view(field_name="original_file"),
+        name="photo_original_file",
+    ),
+    re_path(
+        r"^(?P<nsid>[0-9N@]+)/(?P<flickr_id>[0-9]+)/video-original/$",
+        view=views.PhotoFileView.as_view(field_name="video_original_file"),
+        name="photo_video_original_file",
+    ),
 ]
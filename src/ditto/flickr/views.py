@@ -1,10 +1,11 @@
+from django.db.models import Prefetch
 from django.http import Http404
 from django.utils.translation import gettext as _
 from django.views.generic import DetailView, ListView
 from django.views.generic.detail import SingleObjectMixin
 from taggit.models import Tag
 
-from ditto.core.views import PaginatedListView
+from ditto.core.views import PaginatedListView, ProtectedFileView
 
 from .models import Account, Photo, Photoset, User
 
@@ -74,7 +75,9 @@ class HomeView(PhotosOrderMixin, PaginatedListView):
 
 class PhotosetListView(ListView):
     template_name = "flickr/photoset_list.html"
-    queryset = Photoset.objects.all().prefetch_related("primary_photo", "user")
+    queryset = Photoset.objects.defer_raw().prefetch_related(
+        Prefetch("primary_photo", queryset=Photo.objects.defer_raw()), "user"
+    )
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -125,6 +128,25 @@ class UserDetailView(PhotosOrderMixin, SingleUserMixin, PaginatedListView):
         return context
 
 
+class PhotoFileView(ProtectedFileView):
+    """Serves a Photo's downloaded original_file or video_original_file,
+    unless the Photo is private.
+    """
+
+    model = Photo
+
+    def get_object(self):
+        try:
+            return Photo.objects.select_related("user").get(
+                flickr_id=self.kwargs["flickr_id"], user__nsid=self.kwargs["nsid"]
+            )
+        except Photo.DoesNotExist as err:
+            raise Http404(_("No Photo found matching the query")) from err
+
+    def is_public(self, obj):
+        return not obj.is_private
+
+
 class PhotoDetailView(DetailView):
     """Show a single Photo. It might be posted by one of the Accounts, or might
     be a Photo by someone else, favorited.
@@ -228,7 +250,9 @@ class UserTagDetailView(PhotosOrderMixin, SingleUserMixin, PaginatedListView):
 
 class UserPhotosetListView(SingleUserMixin, ListView):
     template_name = "flickr/user_photoset_list.html"
-    queryset = Photoset.objects.all().prefetch_related("primary_photo", "user")
+    queryset = Photoset.objects.defer_raw().prefetch_related(
+        Prefetch("primary_photo", queryset=Photo.objects.defer_raw()), "user"
+    )
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
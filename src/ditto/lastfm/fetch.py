@@ -1,13 +1,14 @@
 import calendar
 import json
-import time
 import urllib
 from datetime import datetime, timedelta, timezone
 
 import requests
 
 from ditto import TITLE, VERSION
+from ditto.core.models import TimelineItem
 from ditto.core.utils import datetime_now
+from ditto.core.utils.ratelimit import get_rate_limiter
 
 from .models import Account, Album, Artist, Scrobble, Track
 from .utils import slugify_name
@@ -119,7 +120,6 @@ class ScrobblesFetcher:
         while self.page_number <= self.total_pages and self._not_failed():
             self._fetch_page()
             self.page_number += 1
-            time.sleep(0.5)
 
     def _fetch_page(self):
         """
@@ -135,11 +135,13 @@ class ScrobblesFetcher:
             self.return_value["messages"] = [str(e)]
             return
 
-        for scrobble in results:
-            if "date" in scrobble:
-                # Don't save nowplaying scrobbles, that have no 'date'.
-                self._save_scrobble(scrobble, fetch_time)
-                self.results_count += 1
+        # Update the timeline and daily counts once for the whole page:
+        with TimelineItem.objects.batch_updates():
+            for scrobble in results:
+                if "date" in scrobble:
+                    # Don't save nowplaying scrobbles, that have no 'date'.
+                    self._save_scrobble(scrobble, fetch_time)
+                    self.results_count += 1
 
         return
 
@@ -181,6 +183,8 @@ class ScrobblesFetcher:
 
         url = f"{LASTFM_API_ENDPOINT}?{query_string}"
 
+        get_rate_limiter("lastfm").wait()
+
         try:
             response = requests.get(
                 url,
@@ -51,9 +51,11 @@ class Account(TimeStampedModelMixin, models.Model):
         return bool(self.api_key)
 
     def get_recent_scrobbles(self, limit=10):
-        return self.scrobbles.prefetch_related("artist", "track").order_by(
-            "-post_time"
-        )[:limit]
+        return (
+            self.scrobbles.defer_raw()
+            .prefetch_related("artist", "track")
+            .order_by("-post_time")[:limit]
+        )
 
 
 class Album(TimeStampedModelMixin, models.Model):
@@ -286,6 +288,13 @@ class Scrobble(DittoItemModel, models.Model):
         )
         super().save(*args, **kwargs)
 
+    def get_timeline_entries(self):
+        return [("scrobble", self.post_time, self.is_private)]
+
+    @classmethod
+    def get_daily_count_varieties(cls):
+        return {"scrobble": (cls.objects.all(), "post_time", "account__username")}
+
     def _summary_source(self):
         "Used to make the `summary` property."
         return self.post_time.strftime("%Y-%m-%d %H:%M")
@@ -4,7 +4,7 @@ import datetime
 from django import template
 from django.conf import settings
 
-from ditto.core.utils import get_annual_item_counts
+from ditto.core.models import DailyItemCount
 from ditto.lastfm.models import Account, Album, Artist, Scrobble, Track
 
 register = template.Library()
@@ -262,7 +262,7 @@ def recent_scrobbles(account=None, limit=10):
         return account.get_recent_scrobbles(limit)
     else:
         return (
-            Scrobble.objects.all()
+            Scrobble.objects.defer_raw()
             .order_by("-post_time")
             .prefetch_related("artist", "track")[:limit]
         )
@@ -303,7 +303,7 @@ def day_scrobbles(date, account=None):
         # __date filter is only available from Django >= 1.9
         qs_kwargs["post_time__contains"] = date
 
-    qs = Scrobble.objects
+    qs = Scrobble.objects.defer_raw()
 
     if account:
         qs_kwargs["account"] = account
@@ -328,9 +328,6 @@ def annual_scrobble_counts(account=None):
         msg = f"account must be an Account instance, not a {type(account)}"
         raise TypeError(msg)
 
-    qs = Scrobble.objects
-
-    if account:
-        qs = qs.filter(account=account)
-
-    return get_annual_item_counts(qs)
+    return DailyItemCount.objects.get_annual_counts(
+        "lastfm", "scrobble", account.username if account else None
+    )
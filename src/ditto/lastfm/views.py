@@ -5,6 +5,7 @@ from django.utils.translation import gettext as _
 from django.views.generic import DetailView, TemplateView
 from django.views.generic.detail import SingleObjectMixin
 
+from ditto.core.paginator import KeysetPaginator
 from ditto.core.utils import datetime_now
 from ditto.core.views import PaginatedListView
 
@@ -40,10 +41,12 @@ class ScrobbleListView(AccountsMixin, PaginatedListView):
 
     template_name = "lastfm/scrobble_list.html"
     model = Scrobble
+    # There can be hundreds of thousands of Scrobbles:
+    paginator_class = KeysetPaginator
 
     def get_queryset(self):
         "Pre-fetch Artists and Tracks to reduce number of queries."
-        qs = super().get_queryset()
+        qs = super().get_queryset().defer_raw()
         return qs.prefetch_related("artist", "track")
 
 
@@ -307,13 +310,14 @@ class UserScrobbleListView(SingleAccountMixin, PaginatedListView):
 
     template_name = "lastfm/user_scrobble_list.html"
     model = Scrobble
+    paginator_class = KeysetPaginator
 
     def get_queryset(self):
         """
         All Scrobbles by this Account.
         And pre-fetch Artists and Tracks to reduce number of queries.
         """
-        queryset = super().get_queryset()
+        queryset = super().get_queryset().defer_raw()
         return queryset.filter(account=self.object).prefetch_related("artist", "track")
 
     def get_context_data(self, **kwargs):
@@ -4,7 +4,9 @@ from datetime import datetime, timezone
 
 import requests
 
+from ditto.core.models import TimelineItem
 from ditto.core.utils import datetime_now
+from ditto.core.utils.ratelimit import get_rate_limiter
 
 from .models import Account, Bookmark
 
@@ -120,6 +122,8 @@ class BookmarksFetcher:
 
         error_message = ""
 
+        get_rate_limiter("pinboard").wait()
+
         try:
             response = requests.get(final_url)
         except requests.exceptions.ConnectionError:
@@ -194,8 +198,10 @@ class BookmarksFetcher:
         bookmarks_data -- A list, each one data to create a single Bookmark.
         fetch_time -- The UTC time at which these bookmarks were fetched.
         """
-        for bookmark in bookmarks_data:
-            self._save_bookmark(bookmark, fetch_time, account)
+        # Update the timeline and daily counts once for all the bookmarks:
+        with TimelineItem.objects.batch_updates():
+            for bookmark in bookmarks_data:
+                self._save_bookmark(bookmark, fetch_time, account)
 
     def _save_bookmark(self, bookmark, fetch_time, account):
         """Takes data for a single bookmark from the API response and creates
@@ -1,15 +1,25 @@
 from django.db import models
 from taggit.managers import _TaggableManager
 
+from ditto.core.managers import DittoItemManager
 
-class PublicToreadManager(models.Manager):
-    """Returns public Bookmarks from any of the Accounts marked 'to_read'."""
+
+class PublicToreadManager(DittoItemManager):
+    """Returns public Bookmarks from any of the Accounts marked 'to_read'.
+    Doesn't load their raw_fields until they're accessed.
+    """
 
     def get_queryset(self):
-        return super().get_queryset().filter(is_private=False).filter(to_read=True)
+        return (
+            super()
+            .get_queryset()
+            .filter(is_private=False)
+            .filter(to_read=True)
+            .defer_raw()
+        )
 
 
-class ToreadManager(models.Manager):
+class ToreadManager(DittoItemManager):
     """Returns public AND PRIVATE Bookmarks from any of the Accounts marked
     'to_read'.
     """
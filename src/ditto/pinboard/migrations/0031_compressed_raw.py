@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:57
+
+import ditto.core.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pinboard', '0030_alter_bookmark_tags'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='bookmark',
+            name='raw',
+            field=ditto.core.fields.CompressedTextField(blank=True, help_text='eg, the raw JSON from the API.'),
+        ),
+    ]
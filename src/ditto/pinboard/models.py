@@ -223,6 +223,15 @@ class Bookmark(DittoItemModel, ExtraBookmarkManagers):
             kwargs={"username": self.account.username, "hash": self.url_hash},
         )
 
+    def get_timeline_entries(self):
+        return [("bookmark", self.post_time, self.is_private)]
+
+    @classmethod
+    def get_daily_count_varieties(cls):
+        return {
+            "bookmark": (cls.public_objects.all(), "post_time", "account__username")
+        }
+
     def get_next_public_by_post_time(self):
         "The next public Bookmark by this Account, ordered by post_time."
         try:
@@ -2,7 +2,7 @@ from datetime import datetime, time, timezone
 
 from django import template
 
-from ditto.core.utils import get_annual_item_counts
+from ditto.core.models import DailyItemCount
 from ditto.pinboard.models import Bookmark
 
 register = template.Library()
@@ -53,12 +53,7 @@ def annual_bookmark_counts(account=None):
     Keyword arguments:
     account -- An account username, 'philgyford', or None to fetch for all.
     """
-    bookmarks = Bookmark.public_objects
-
-    if account:
-        bookmarks = bookmarks.filter(account__username=account)
-
-    return get_annual_item_counts(bookmarks)
+    return DailyItemCount.objects.get_annual_counts("pinboard", "bookmark", account)
 
 
 @register.simple_tag
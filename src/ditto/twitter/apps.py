@@ -7,3 +7,6 @@ class DittoTwitterConfig(AppConfig):
 
     # Maintain pre Django 3.2 default behaviour:
     default_auto_field = "django.db.models.AutoField"
+
+    def ready(self):
+        import ditto.twitter.signals  # noqa: F401
@@ -1,11 +1,15 @@
-import os
-import time
+import functools
 
-from django.core.files import File
 from twython import Twython, TwythonError
 
+from ditto.core.models import TimelineItem
 from ditto.core.utils import datetime_now
-from ditto.core.utils.downloader import DownloadException, filedownloader
+from ditto.core.utils.downloader import (
+    DownloadException,
+    DownloadPool,
+    filedownloader,
+)
+from ditto.core.utils.ratelimit import get_rate_limiter
 from ditto.twitter.models import Media, Tweet, User
 
 from . import FetchError
@@ -18,6 +22,7 @@ from .savers import TweetSaver, UserSaver
 
 # CLASSES HERE:
 #
+# RateLimitedTwython
 # Fetch
 #   FetchVerify
 #   FetchLookup
@@ -29,6 +34,16 @@ from .savers import TweetSaver, UserSaver
 # FetchFiles
 
 
+class RateLimitedTwython(Twython):
+    """A Twython that waits for the shared Twitter RateLimiter before every
+    API call, so that all fetchers, in any thread, keep within the limit.
+    """
+
+    def request(self, *args, **kwargs):
+        get_rate_limiter("twitter").wait()
+        return super().request(*args, **kwargs)
+
+
 class Fetch:
     """Parent class for children that will call the Twitter API to fetch data
     for a single Account.
@@ -82,7 +97,7 @@ class Fetch:
             self.return_value["account"] = "Unsaved Account"
 
         if self.account.has_credentials():
-            self.api = Twython(
+            self.api = RateLimitedTwython(
                 self.account.consumer_key,
                 self.account.consumer_secret,
                 self.account.access_token,
@@ -223,7 +238,6 @@ class FetchLookup(Fetch):
         self.results_count += len(self.results)
 
         if self._more_to_fetch():
-            time.sleep(0.5)
             self._fetch_pages()
 
     def _more_to_fetch(self):
@@ -280,9 +294,11 @@ class FetchTweets(FetchLookup):
         )
 
     def _save_results(self):
-        for tweet in self.results:
-            tweet_obj = TweetSaver().save_tweet(tweet, self.fetch_time)
-            self.objects.append(tweet_obj)
+        # Update the timeline and daily counts once for the whole page:
+        with TimelineItem.objects.batch_updates():
+            for tweet in self.results:
+                tweet_obj = TweetSaver().save_tweet(tweet, self.fetch_time)
+                self.objects.append(tweet_obj)
 
 
 class FetchNewTweets(Fetch):
@@ -334,7 +350,6 @@ class FetchNewTweets(Fetch):
         self.results_count += len(self.results)
 
         if self._more_to_fetch():
-            time.sleep(0.5)
             self._fetch_pages()
 
     def _more_to_fetch(self):
@@ -389,9 +404,10 @@ class FetchTweetsRecent(FetchNewTweets):
         Tweet objects and the posters' User objects.
         Adds each new Tweet object to self.objects.
         """
-        for tweet in self.results:
-            tw = TweetSaver().save_tweet(tweet, self.fetch_time)
-            self.objects.append(tw)
+        with TimelineItem.objects.batch_updates():
+            for tweet in self.results:
+                tw = TweetSaver().save_tweet(tweet, self.fetch_time)
+                self.objects.append(tw)
 
 
 class FetchTweetsFavorite(FetchNewTweets):
@@ -433,11 +449,13 @@ class FetchTweetsFavorite(FetchNewTweets):
         Tweet objects and the posters' User objects.
         Adds each new Tweet object to self.objects.
         """
-        for tweet in self.results:
-            tw = TweetSaver().save_tweet(tweet, self.fetch_time)
-            # Associate this tweet with the Account's user:
-            self.account.user.favorites.add(tw)
-            self.objects.append(tw)
+        tweets = []
+        with TimelineItem.objects.batch_updates():
+            for tweet in self.results:
+                tweets.append(TweetSaver().save_tweet(tweet, self.fetch_time))
+            # Associate these tweets with the Account's user:
+            self.account.user.favorites.add(*tweets)
+        self.objects.extend(tweets)
 
 
 class FetchFiles:
@@ -465,28 +483,33 @@ class FetchFiles:
     # When fetching Tweets or Users this will be the total amount fetched.
     results_count = 0
 
-    def fetch(self, *, fetch_all=False):
+    def fetch(self, *, fetch_all=False, workers=1, progress=None):
         """
         Download and save original images for all Media objects
         (or just those that don't already have them).
 
         fetch_all -- Boolean. Fetch ALL images, even if we've already
                         got them?
+        workers -- Integer. How many files to download at once.
+        progress -- Optional function, called after each file with the
+                        number of files done so far and the total.
         """
 
-        self._fetch_files(fetch_all)
+        self._fetch_files(fetch_all, workers, progress)
 
         self.return_value["fetched"] = self.results_count
 
         return self.return_value
 
-    def _fetch_files(self, fetch_all):
+    def _fetch_files(self, fetch_all, workers=1, progress=None):
         """
         Download and save original images for all Media objects
         (or just those that don't already have them).
 
         fetch_all -- Boolean. Fetch ALL images, even if we've already
                         got them?
+        workers -- Integer. How many files to download at once.
+        progress -- Optional function, as for fetch().
         """
 
         media = Media.objects.all()
@@ -494,21 +517,44 @@ class FetchFiles:
         if not fetch_all:
             media = media.filter(image_file="")
 
-        error_messages = []
-
+        files = []
         for media_obj in media:
-            try:
-                self._fetch_and_save_file(media_obj=media_obj, media_type="image")
-                self.results_count += 1
-            except FetchError as e:
-                error_messages.append(str(e))
-
+            files.append((media_obj, "image"))
             if media_obj.media_type == "animated_gif":
+                files.append((media_obj, "mp4"))
+
+        error_messages = []
+
+        if workers > 1:
+            # Download in several threads but save them all in this one:
+            jobs = []
+            for media_obj, media_type in files:
+                url, acceptable_content_types = self._get_url(media_obj, media_type)
+                download = functools.partial(
+                    filedownloader.download, url, acceptable_content_types
+                )
+                jobs.append((url, download, (media_obj, media_type)))
+
+            pool = DownloadPool(workers=workers, progress=progress)
+            for (media_obj, media_type), future in pool.run(jobs):
                 try:
-                    self._fetch_and_save_file(media_obj=media_obj, media_type="mp4")
+                    downloaded = future.result()
+                except DownloadException as e:
+                    error_messages.append(str(e))
+                else:
+                    self._save_file(media_obj, media_type, downloaded)
+                    self.results_count += 1
+        else:
+            for i, (media_obj, media_type) in enumerate(files, start=1):
+                try:
+                    self._fetch_and_save_file(
+                        media_obj=media_obj, media_type=media_type
+                    )
                     self.results_count += 1
                 except FetchError as e:
                     error_messages.append(str(e))
+                if progress is not None:
+                    progress(i, len(files))
 
         if len(error_messages) > 0:
             self.return_value["success"] = False
@@ -526,7 +572,27 @@ class FetchFiles:
 
         Raises FetchError if something goes wrong.
         """
+        url, acceptable_content_types = self._get_url(media_obj, media_type)
 
+        try:
+            # Downloads the file into a temporary file:
+            downloaded = filedownloader.download(url, acceptable_content_types)
+        except DownloadException as err:
+            raise FetchError(err) from err
+
+        self._save_file(media_obj, media_type, downloaded)
+
+    def _get_url(self, media_obj, media_type):
+        """
+        Returns a tuple of the URL of a Media object's image or MP4 file and
+        a list of the content types it's allowed to have.
+
+        Expects:
+            media_obj -- A Media object.
+            media_type -- String, either 'image' or 'mp4'.
+
+        Raises FetchError if media_type is invalid.
+        """
         if media_type == "mp4":
             url = media_obj.mp4_url
             acceptable_content_types = [
@@ -544,19 +610,23 @@ class FetchFiles:
             msg = 'media_type should be "image" or "mp4"'
             raise FetchError(msg)
 
-        filepath = False
-        try:
-            # Saves the file to /tmp/:
-            filepath = filedownloader.download(url, acceptable_content_types)
-        except DownloadException as err:
-            raise FetchError(err) from err
+        return url, acceptable_content_types
 
-        if filepath:
-            # Reopen file and save to the Media object:
-            with open(filepath, "rb") as reopened_file:
-                django_file = File(reopened_file)
+    def _save_file(self, media_obj, media_type, downloaded):
+        """
+        Saves a downloaded image or MP4 file to the Media object.
 
+        Expects:
+            media_obj -- A Media object.
+            media_type -- String, either 'image' or 'mp4'.
+            downloaded -- A DownloadedFile, or None.
+        """
+        if downloaded:
+            # Closing it deletes the temporary file, if it wasn't moved:
+            with downloaded:
                 if media_type == "mp4":
-                    media_obj.mp4_file.save(os.path.basename(filepath), django_file)
+                    media_obj.mp4_file.save(downloaded.name, downloaded)
                 else:
-                    media_obj.image_file.save(os.path.basename(filepath), django_file)
+                    # Saving the file saves the Media, with its placeholder:
+                    media_obj.set_placeholder(downloaded)
+                    media_obj.image_file.save(downloaded.name, downloaded)
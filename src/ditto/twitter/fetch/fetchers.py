@@ -240,7 +240,7 @@ class FilesFetcher:
         fetcher = FilesFetcher()
         results = fetcher.fetch()
     or:
-        results = fetcher.fetch(fetch_all=True)
+        results = fetcher.fetch(fetch_all=True, workers=8)
 
     Doesn't do much - simply to preserve a similar interface to the other
     *Fetcher() classes that use the API and Accounts.
@@ -249,8 +249,10 @@ class FilesFetcher:
     def __init__(self):
         self.return_values = []
 
-    def fetch(self, *, fetch_all=False):
-        results = FetchFiles().fetch(fetch_all=fetch_all)
+    def fetch(self, *, fetch_all=False, workers=1, progress=None):
+        results = FetchFiles().fetch(
+            fetch_all=fetch_all, workers=workers, progress=progress
+        )
 
         # Return a list to behave similar to the other *Fetcher() classes that
         # can deal with multiple Accounts.
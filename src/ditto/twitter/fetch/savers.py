@@ -3,7 +3,6 @@ import os
 from datetime import datetime, timezone
 
 from django.conf import settings
-from django.core.files import File
 
 from ditto.core.utils import truncate_string
 from ditto.core.utils.downloader import DownloadException, filedownloader
@@ -130,15 +129,15 @@ class UserSaver(SaveUtilsMixin):
 
         # We don't have this image yet, so fetch and save it.
         try:
-            avatar_filepath = filedownloader.download(
+            downloaded = filedownloader.download(
                 user.profile_image_url_https,
                 ["image/jpeg", "image/jpg", "image/png", "image/gif"],
             )
-
-            with open(avatar_filepath, "rb") as f:
-                user.avatar.save(os.path.basename(avatar_filepath), File(f))
         except DownloadException:
             pass
+        else:
+            with downloaded:
+                user.avatar.save(downloaded.name, downloaded)
 
         return user
 
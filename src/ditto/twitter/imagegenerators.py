@@ -1,8 +1,11 @@
 from imagekit import ImageSpec, register
 from imagekit.processors import Adjust, ResizeToFill, ResizeToFit, Transpose
 
+from ditto.core.imagecache import ManifestSpecMixin
+from ditto.core.imageprocessors import DraftDownscale
 
-class TwitterSpec(ImageSpec):
+
+class TwitterSpec(ManifestSpecMixin, ImageSpec):
     "Base class for Medium and Small specs."
 
     format = "JPEG"
@@ -12,6 +15,7 @@ class TwitterSpec(ImageSpec):
 
     def __init__(self, source):
         self.processors = [
+            DraftDownscale(self.width, self.height),
             Transpose(),
             ResizeToFit(self.width, self.height, upscale=self.upscale),
             Adjust(sharpness=2.0),
@@ -43,13 +47,14 @@ class Small(TwitterSpec):
 register.generator("ditto_twitter:small", Small)
 
 
-class Thumbnail(ImageSpec):
+class Thumbnail(ManifestSpecMixin, ImageSpec):
     width = 150
     height = 150
     upscale = True
 
     def __init__(self, source):
         self.processors = [
+            DraftDownscale(self.width, self.height, fill=True),
             Transpose(),
             ResizeToFill(self.width, self.height, upscale=True),
             Adjust(sharpness=2.0),
@@ -4,6 +4,7 @@ from urllib.parse import urlparse
 
 from django.core.files import File
 
+from ditto.core.models import TimelineItem
 from ditto.core.utils import datetime_now
 
 from .fetch.savers import TweetSaver
@@ -97,9 +98,10 @@ class TweetIngester:
         if len(self.tweets_data) == 0:
             return
 
-        for tweet in self.tweets_data:
-            TweetSaver().save_tweet(tweet, self.fetch_time)
-            self.tweet_count += 1
+        with TimelineItem.objects.batch_updates():
+            for tweet in self.tweets_data:
+                TweetSaver().save_tweet(tweet, self.fetch_time)
+                self.tweet_count += 1
 
     def _save_media(self, directory):
         """Save media files.
@@ -203,11 +205,13 @@ class Version2TweetIngester(TweetIngester):
         if len(self.tweets_data) == 0:
             return
 
-        for tweet in self.tweets_data:
-            # Here we pass in our user_data too, so save_tweet() can use
-            # that in lieu of the data that is usually within each tweet's data.
-            TweetSaver().save_tweet(tweet["tweet"], self.fetch_time, self.user_data)
-            self.tweet_count += 1
+        with TimelineItem.objects.batch_updates():
+            for tweet in self.tweets_data:
+                # Here we pass in our user_data too, so save_tweet() can use
+                # that in lieu of the data that is usually within each tweet's
+                # data.
+                TweetSaver().save_tweet(tweet["tweet"], self.fetch_time, self.user_data)
+                self.tweet_count += 1
 
     def _save_media(self, directory):
         """
@@ -261,6 +265,7 @@ class Version2TweetIngester(TweetIngester):
                                         media_obj.mp4_file.save(filename, django_file)
                                         self.media_count += 1
                                     elif media_obj.media_type == "photo":
+                                        media_obj.set_placeholder(django_file)
                                         media_obj.image_file.save(filename, django_file)
                                         self.media_count += 1
 
@@ -1,3 +1,5 @@
+from django.core.management import call_command
+
 from ditto.core.management.commands import DittoBaseCommand
 from ditto.twitter.fetch.fetchers import FilesFetcher
 
@@ -9,6 +11,11 @@ class Command(DittoBaseCommand):
     ./manage.py fetch_twitter_files
     ./manage.py fetch_twitter_files --all
 
+    To download several files at once:
+    ./manage.py fetch_twitter_files --workers=8
+
+    To generate smaller versions of the images afterwards:
+    ./manage.py fetch_twitter_files --thumbnails
     """
 
     help = "Fetches images and Animated GIFs' video files from Twitter"
@@ -29,6 +36,38 @@ class Command(DittoBaseCommand):
             ),
         )
 
+        parser.add_argument(
+            "--workers",
+            action="store",
+            type=int,
+            default=1,
+            help="How many files to download at once (default 1)",
+        )
+
+        parser.add_argument(
+            "--thumbnails",
+            action="store_true",
+            default=False,
+            help=(
+                "Afterwards, generate any smaller versions of the images that "
+                "don't already exist"
+            ),
+        )
+
     def handle(self, *args, **options):
-        results = FilesFetcher().fetch(fetch_all=options["all"])
-        self.output_results(results, options.get("verbosity", 1))
+        verbosity = options.get("verbosity", 1)
+        results = FilesFetcher().fetch(
+            fetch_all=options["all"],
+            workers=options["workers"],
+            progress=self.output_progress if verbosity > 1 else None,
+        )
+        self.output_results(results, verbosity)
+
+        if options["thumbnails"]:
+            call_command(
+                "generate_ditto_thumbnails",
+                sizes=["twitter"],
+                verbosity=verbosity,
+                stdout=self.stdout,
+                stderr=self.stderr,
+            )
@@ -1,10 +1,12 @@
 from django.db import models
 
-from ditto.core.managers import PublicItemManager
+from ditto.core.managers import DittoItemManager, PublicItemManager
 
 
-class PublicFavoritesManager(models.Manager):
-    "Returns public Tweets favorited by any public Accounts."
+class PublicFavoritesManager(DittoItemManager):
+    """Returns public Tweets favorited by any public Accounts.
+    Doesn't load their raw_fields until they're accessed.
+    """
 
     def get_queryset(self):
         from .models import User
@@ -17,10 +19,11 @@ class PublicFavoritesManager(models.Manager):
             .filter(is_private=False)
             .filter(favoriting_users__in=users)
             .distinct()
+            .defer_raw()
         )
 
 
-class FavoritesManager(models.Manager):
+class FavoritesManager(DittoItemManager):
     "Returns public AND PRIVATE Tweets favorited by any of the Accounts."
 
     def get_queryset(self):
@@ -31,7 +34,7 @@ class FavoritesManager(models.Manager):
         return super().get_queryset().filter(favoriting_users__in=users).distinct()
 
 
-class TweetsManager(models.Manager):
+class TweetsManager(DittoItemManager):
     """Returns public AND PRIVATE Tweets posted by one of the Users with
     Accounts here.
     As opposed to just Tweets, which includes Tweets by any User that
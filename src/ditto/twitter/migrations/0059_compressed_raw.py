@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:57
+
+import ditto.core.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('twitter', '0058_alter_tweet_post_time'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='tweet',
+            name='raw',
+            field=ditto.core.fields.CompressedTextField(blank=True, help_text='eg, the raw JSON from the API.'),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='raw',
+            field=ditto.core.fields.CompressedTextField(blank=True, help_text='eg, the raw JSON from the API.'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-17 09:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("twitter", "0059_compressed_raw"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="media",
+            name="dominant_color",
+            field=models.CharField(
+                blank=True,
+                help_text="The image's most common colour, eg '#a1b2c3'. Set automatically.",
+                max_length=7,
+            ),
+        ),
+        migrations.AddField(
+            model_name="media",
+            name="placeholder",
+            field=models.TextField(
+                blank=True,
+                help_text="A tiny version of the image, as a data: URI. Set automatically.",
+            ),
+        ),
+    ]
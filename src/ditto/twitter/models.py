@@ -10,7 +10,16 @@ from django.templatetags.static import static
 from django.urls import reverse
 from imagekit.cachefiles import ImageCacheFile
 
-from ditto.core.models import DiffModelMixin, DittoItemModel, TimeStampedModelMixin
+from ditto.core.fields import CompressedTextField
+from ditto.core.imagecache import ImageLockError
+from ditto.core.models import (
+    DailyItemCount,
+    DiffModelMixin,
+    DittoItemModel,
+    ImagePlaceholderModelMixin,
+    TimelineItem,
+    TimeStampedModelMixin,
+)
 
 from . import app_settings, imagegenerators, managers
 from .utils import htmlify_description, htmlify_tweet
@@ -130,7 +139,7 @@ class Account(TimeStampedModelMixin, models.Model):
         )
 
 
-class Media(TimeStampedModelMixin, models.Model):
+class Media(ImagePlaceholderModelMixin, TimeStampedModelMixin, models.Model):
     """A photo, video or animated GIF attached to a Tweet.
 
     They have a bunch of common fields, and then some extra for Videos.
@@ -347,6 +356,8 @@ class Media(TimeStampedModelMixin, models.Model):
         Generate the URL of an image of a particular size, hosted locally,
         based on the original file (which must already be downloaded).
         size -- one of 'large', 'medium', 'small', or 'thumbnail'.
+
+        If another process is making the image, returns Twitter's URL instead.
         """
         if self.image_file:
             if size == "large":
@@ -358,6 +369,9 @@ class Media(TimeStampedModelMixin, models.Model):
                     image_generator = generator(source=self.image_file)
                     result = ImageCacheFile(image_generator)
                     return result.url
+                except ImageLockError:
+                    # Another process is still making it, so don't wait:
+                    return self._remote_image_url(size)
                 except Exception:  # noqa: BLE001
                     # We have an original file but something's wrong with it.
                     # Might be 0 bytes or something.
@@ -450,6 +464,11 @@ class Tweet(DittoItemModel, ExtraTweetManagers):
 
     ditto_item_name = "twitter_tweet"
 
+    timeline_prefetch_related = (
+        "user__account_set",
+        "favoriting_users__account_set",
+    )
+
     # Properties inherited from DittoItemModel:
     #
     # title         (CharField)
@@ -564,6 +583,47 @@ class Tweet(DittoItemModel, ExtraTweetManagers):
             },
         )
 
+    def get_timeline_entries(self):
+        """
+        Listed as a 'tweet' if posted by a User with an Account, and as a
+        'favorite' if favorited by any Users with Accounts. A favorite is
+        only public if the Tweet and at least one of those Users are public.
+        """
+        entries = []
+
+        if self.user.account_set.all():
+            entries.append(("tweet", self.post_time, self.is_private))
+
+        favoriting_users = [
+            user for user in self.favoriting_users.all() if user.account_set.all()
+        ]
+        if favoriting_users:
+            is_private = self.is_private or all(
+                user.is_private for user in favoriting_users
+            )
+            entries.append(("favorite", self.post_time, is_private))
+
+        return entries
+
+    @classmethod
+    def get_daily_count_varieties(cls):
+        """
+        Favorites are counted for each public User with an Account that
+        favorited them.
+        """
+        # The same as public_tweet_objects, but without querying for Users yet:
+        tweets = cls.public_objects.filter(
+            user__in=User.objects.filter(account__isnull=False)
+        )
+        return {
+            "tweet": (tweets, "post_time", "user__screen_name"),
+            "favorite": (
+                cls.public_favorite_objects.all(),
+                "post_time",
+                "favoriting_users__screen_name",
+            ),
+        }
+
     def get_next_public_by_post_time(self):
         "Next Tweet by this User, if they're public."
         try:
@@ -761,7 +821,7 @@ class User(TimeStampedModelMixin, DiffModelMixin, models.Model):
     fetch_time = models.DateTimeField(
         null=True, blank=True, help_text="The time the data was last fetched."
     )
-    raw = models.TextField(
+    raw = CompressedTextField(
         null=False, blank=True, help_text="eg, the raw JSON from the API."
     )
 
@@ -811,13 +871,30 @@ class User(TimeStampedModelMixin, DiffModelMixin, models.Model):
 
     def save(self, *args, **kwargs):
         """If the user's privacy status has changed, we need to change the
-        privacy of all their tweets
+        privacy of all their tweets, and the timeline entries and daily counts
+        of those tweets and of any they've favorited.
         And we also HTMLify their description.
         """
-        if self.get_field_diff("is_private") is not None:
+        privacy_changed = self.get_field_diff("is_private") is not None
+        screen_name_diff = self.get_field_diff("screen_name")
+        if privacy_changed:
             Tweet.objects.filter(user=self).update(is_private=self.is_private)
         self.make_description_html()
         super().save(*args, **kwargs)
+        if privacy_changed:
+            TimelineItem.objects.update_for_queryset(
+                Tweet.objects.filter(
+                    models.Q(user=self) | models.Q(favoriting_users=self)
+                ).distinct()
+            )
+            DailyItemCount.objects.update_for_items(
+                "favorite", Tweet.objects.filter(favoriting_users=self)
+            )
+        if screen_name_diff is not None and screen_name_diff[0]:
+            # The DailyItemCounts use screen_name to identify the account.
+            DailyItemCount.objects.filter(
+                app_name="twitter", account=screen_name_diff[0]
+            ).update(account=self.screen_name)
 
     def get_absolute_url(self):
         return reverse("twitter:user_detail", kwargs={"screen_name": self.screen_name})
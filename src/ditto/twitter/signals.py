@@ -0,0 +1,36 @@
+from django.db.models.signals import m2m_changed
+from django.dispatch import receiver
+
+from ditto.core.models import DailyItemCount, TimelineItem
+
+from .models import Tweet, User
+
+
+@receiver(
+    m2m_changed,
+    sender=User.favorites.through,
+    dispatch_uid="ditto.twitter.update_favorite_timeline_items",
+)
+def update_favorite_timeline_items(sender, instance, action, pk_set, **kwargs):
+    """
+    When Tweets are added to or removed from a User's favorites, update their
+    'favorite' TimelineItems and DailyItemCounts.
+    Handles both user.favorites.add(tweet) and tweet.favoriting_users.add(user).
+    """
+    if isinstance(instance, Tweet):
+        if action in ("post_add", "post_remove", "post_clear"):
+            TimelineItem.objects.update_for_item(instance)
+            DailyItemCount.objects.update_for_items("favorite", [instance])
+
+    elif action == "pre_clear":
+        # Remember which Tweets are affected, before they're removed:
+        instance._cleared_favorite_ids = list(
+            instance.favorites.values_list("pk", flat=True)
+        )
+
+    elif action in ("post_add", "post_remove", "post_clear"):
+        if action == "post_clear":
+            pk_set = instance.__dict__.pop("_cleared_favorite_ids", [])
+        tweets = Tweet.objects.filter(pk__in=pk_set)
+        TimelineItem.objects.update_for_queryset(tweets)
+        DailyItemCount.objects.update_for_items("favorite", tweets)
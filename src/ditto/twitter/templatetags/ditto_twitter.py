@@ -2,7 +2,7 @@ from datetime import datetime, time, timezone
 
 from django import template
 
-from ditto.core.utils import get_annual_item_counts
+from ditto.core.models import DailyItemCount
 from ditto.twitter.models import Tweet, User
 
 register = template.Library()
@@ -109,12 +109,7 @@ def annual_tweet_counts(screen_name=None):
                     all public Tweets.
     """
 
-    tweets = Tweet.public_tweet_objects
-
-    if screen_name is not None:
-        tweets = tweets.filter(user__screen_name=screen_name)
-
-    return get_annual_item_counts(tweets)
+    return DailyItemCount.objects.get_annual_counts("twitter", "tweet", screen_name)
 
 
 @register.simple_tag
@@ -130,13 +125,9 @@ def annual_favorite_counts(screen_name=None):
                     all public favorited Tweets.
     """
 
-    if screen_name is None:
-        tweets = Tweet.public_favorite_objects
-    else:
+    if screen_name is not None:
         user = User.objects.get(screen_name=screen_name)
         if user.is_private:
-            tweets = Tweet.objects.none()
-        else:
-            tweets = Tweet.public_favorite_objects.filter(favoriting_users=user)
+            return []
 
-    return get_annual_item_counts(tweets)
+    return DailyItemCount.objects.get_annual_counts("twitter", "favorite", screen_name)
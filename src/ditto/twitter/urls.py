@@ -7,6 +7,16 @@ app_name = "twitter"
 urlpatterns = [
     path("", view=views.HomeView.as_view(), name="home"),
     path("likes/", view=views.FavoriteListView.as_view(), name="favorite_list"),
+    re_path(
+        r"^media/(?P<twitter_id>[0-9]+)/image/$",
+        view=views.MediaFileView.as_view(field_name="image_file"),
+        name="media_image_file",
+    ),
+    re_path(
+        r"^media/(?P<twitter_id>[0-9]+)/mp4/$",
+        view=views.MediaFileView.as_view(field_name="mp4_file"),
+        name="media_mp4_file",
+    ),
     re_path(
         r"^(?P<screen_name>\w+)/$",
         view=views.UserDetailView.as_view(),
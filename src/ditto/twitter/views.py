@@ -1,9 +1,11 @@
+from django.http import Http404
+from django.utils.translation import gettext as _
 from django.views.generic import DetailView
 from django.views.generic.detail import SingleObjectMixin
 
-from ditto.core.views import PaginatedListView
+from ditto.core.views import PaginatedListView, ProtectedFileView
 
-from .models import Account, Tweet, User
+from .models import Account, Media, Tweet, User
 
 
 class HomeView(PaginatedListView):
@@ -111,3 +113,23 @@ class TweetDetailView(DetailView):
         except Account.DoesNotExist:
             context["account"] = None
         return context
+
+
+class MediaFileView(ProtectedFileView):
+    """Serves a Media's downloaded image_file or mp4_file, if it's in at least
+    one public Tweet, including public Tweets liked by public Accounts.
+    """
+
+    model = Media
+
+    def get_object(self):
+        try:
+            return Media.objects.get(twitter_id=self.kwargs["twitter_id"])
+        except Media.DoesNotExist as err:
+            raise Http404(_("No Media found matching the query")) from err
+
+    def is_public(self, obj):
+        return (
+            Tweet.public_objects.filter(media=obj).exists()
+            or Tweet.public_favorite_objects.filter(media=obj).exists()
+        )
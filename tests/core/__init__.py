@@ -1,4 +1,13 @@
+from contextlib import contextmanager
+from io import BytesIO
+
+from django.apps import apps
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+
 from ditto.core import app_settings
+from ditto.core.utils.downloader import DownloadedFile
 
 
 def override_app_settings(**test_settings):
@@ -40,3 +49,56 @@ def override_app_settings(**test_settings):
         return __override_app_settings
 
     return _override_app_settings
+
+
+@contextmanager
+def assert_raw_not_loaded():
+    """
+    A context manager that fails if any SELECT query run within it loads one
+    of the `raw_fields` of any model, eg Tweet.raw or Photo.exif_raw.
+
+    For checking that list views, template tags, etc, defer those fields:
+
+        from tests.core import assert_raw_not_loaded
+
+        with assert_raw_not_loaded():
+            self.client.get(reverse("twitter:home"))
+    """
+    quote = connection.ops.quote_name
+    columns = [
+        f"{quote(model._meta.db_table)}.{quote(model._meta.get_field(name).column)}"
+        for model in apps.get_models()
+        for name in getattr(model, "raw_fields", ())
+    ]
+
+    with CaptureQueriesContext(connection) as context:
+        yield
+
+    for query in context.captured_queries:
+        sql = query["sql"]
+        if not sql.startswith("SELECT"):
+            continue
+        for column in columns:
+            if column in sql:
+                msg = f"{column} was loaded by: {sql}"
+                raise AssertionError(msg)
+
+
+def make_downloaded_file(name, content=b"abc", content_type="image/jpeg"):
+    """
+    Returns a DownloadedFile like the one FileDownloader.download() returns,
+    for use as the return value of a mocked download().
+    """
+    downloaded = DownloadedFile(name, content_type, f"https://example.com/{name}")
+    downloaded.write(content)
+    downloaded.size = len(content)
+    downloaded.duration = 0.1
+    downloaded.seek(0)
+    return downloaded
+
+
+def make_jpeg(size=(40, 30), color="red"):
+    "Returns the bytes of a JPEG image of a single colour."
+    f = BytesIO()
+    Image.new("RGB", size, color).save(f, "JPEG")
+    return f.getvalue()
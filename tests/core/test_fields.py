@@ -0,0 +1,122 @@
+import json
+from unittest import skipIf
+
+from django.test import TestCase
+
+from ditto.core.checks import check_raw_compression
+from ditto.core.fields import compress_text, decompress_text, get_zstd
+from ditto.pinboard.factories import BookmarkFactory
+from ditto.pinboard.models import Bookmark
+from tests.core import override_app_settings
+
+RAW = json.dumps({"description": "Hello " * 100, "tags": ["a", "b"]})
+
+
+class CompressTextTestCase(TestCase):
+    def test_zlib(self):
+        compressed = compress_text(RAW, "zlib")
+        self.assertTrue(compressed.startswith("zlib:"))
+        self.assertLess(len(compressed), len(RAW))
+        self.assertEqual(decompress_text(compressed), RAW)
+
+    @skipIf(get_zstd() is None, "zstd is not available")
+    def test_zstd(self):
+        compressed = compress_text(RAW, "zstd")
+        self.assertTrue(compressed.startswith("zstd:"))
+        self.assertEqual(decompress_text(compressed), RAW)
+
+    def test_no_method(self):
+        self.assertEqual(compress_text(RAW, None), RAW)
+
+    def test_short_values(self):
+        "Values that wouldn't be any shorter aren't compressed"
+        self.assertEqual(compress_text("{}", "zlib"), "{}")
+        self.assertEqual(compress_text("", "zlib"), "")
+
+    def test_already_compressed(self):
+        compressed = compress_text(RAW, "zlib")
+        self.assertEqual(compress_text(compressed, "zlib"), compressed)
+
+    def test_unknown_method(self):
+        with self.assertRaises(ValueError):
+            compress_text(RAW, "gzip")
+
+    def test_decompress_plain(self):
+        self.assertEqual(decompress_text(RAW), RAW)
+        self.assertIsNone(decompress_text(None))
+
+
+class CompressedTextFieldTestCase(TestCase):
+    def stored_raw(self, bookmark):
+        return Bookmark.objects.filter(pk=bookmark.pk).values_list("raw", flat=True)[0]
+
+    def test_saves_compressed(self):
+        bookmark = BookmarkFactory(raw=RAW)
+        self.assertTrue(self.stored_raw(bookmark).startswith("zlib:"))
+        self.assertEqual(bookmark.raw, RAW)
+
+    @override_app_settings(CORE_RAW_COMPRESSION=None)
+    def test_saves_uncompressed(self):
+        bookmark = BookmarkFactory(raw=RAW)
+        self.assertEqual(self.stored_raw(bookmark), RAW)
+
+    def test_loads_lazily(self):
+        "The value isn't decompressed until it's accessed"
+        bookmark = Bookmark.objects.get(pk=BookmarkFactory(raw=RAW).pk)
+        self.assertTrue(bookmark.__dict__["raw"].startswith("zlib:"))
+        self.assertEqual(bookmark.raw, RAW)
+        self.assertEqual(bookmark.__dict__["raw"], RAW)
+
+    @override_app_settings(CORE_RAW_COMPRESSION=None)
+    def save_uncompressed(self, bookmark):
+        Bookmark.objects.filter(pk=bookmark.pk).update(raw=RAW)
+
+    def test_loads_uncompressed(self):
+        "Rows stored before compression was enabled can be read"
+        bookmark = BookmarkFactory()
+        self.save_uncompressed(bookmark)
+        self.assertEqual(self.stored_raw(bookmark), RAW)
+        self.assertEqual(Bookmark.objects.get(pk=bookmark.pk).raw, RAW)
+
+    def test_resave_unaccessed(self):
+        "Saving without accessing the value leaves it as it was"
+        bookmark = Bookmark.objects.get(pk=BookmarkFactory(raw=RAW).pk)
+        bookmark.title = "New title"
+        bookmark.save()
+        self.assertEqual(Bookmark.objects.get(pk=bookmark.pk).raw, RAW)
+
+    def test_update(self):
+        "queryset.update() compresses values too"
+        bookmark = BookmarkFactory()
+        Bookmark.objects.filter(pk=bookmark.pk).update(raw=RAW)
+        self.assertTrue(self.stored_raw(bookmark).startswith("zlib:"))
+
+    def test_diff(self):
+        "Changes are compared with the decompressed values"
+        bookmark = Bookmark.objects.get(pk=BookmarkFactory(raw=RAW).pk)
+        bookmark.raw = RAW
+        self.assertFalse(bookmark.has_changed)
+        bookmark.raw = "{}"
+        self.assertEqual(bookmark.diff, {"raw": (RAW, "{}")})
+
+    def test_deferred(self):
+        bookmark = Bookmark.objects.defer("raw").get(pk=BookmarkFactory(raw=RAW).pk)
+        self.assertEqual(bookmark.raw, RAW)
+
+
+class CheckRawCompressionTestCase(TestCase):
+    def test_default(self):
+        self.assertEqual(check_raw_compression(), [])
+
+    @override_app_settings(CORE_RAW_COMPRESSION="gzip")
+    def test_unknown_method(self):
+        errors = check_raw_compression()
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(errors[0].id, "ditto.core.E001")
+
+    @skipIf(get_zstd() is not None, "zstd is available")
+    @override_app_settings(CORE_RAW_COMPRESSION="zstd")
+    def test_zstd_unavailable(self):
+        errors = check_raw_compression()
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(errors[0].id, "ditto.core.E002")
@@ -0,0 +1,232 @@
+import fcntl
+import threading
+from unittest.mock import patch
+
+from django.test import TestCase
+from imagekit.cachefiles import ImageCacheFile
+from imagekit.cachefiles.backends import CacheFileState
+
+from ditto.core import imagecache
+from ditto.core.imagecache import (
+    ImageLockError,
+    LockingCacheFileBackend,
+    ManifestCacheFileBackend,
+    image_lock,
+)
+from ditto.core.models import GeneratedImage
+from ditto.flickr.factories import PhotoFactory
+from ditto.flickr.imagegenerators import Square, Thumbnail
+from tests.core import override_app_settings
+
+
+class ManifestCacheFileBackendTestCase(TestCase):
+    def setUp(self):
+        self.photo = PhotoFactory()
+
+    def make_file(self, backend=None):
+        return ImageCacheFile(
+            Square(source=self.photo.original_file),
+            cachefile_backend=backend or ManifestCacheFileBackend(),
+        )
+
+    def test_records_generated_file(self):
+        file = self.make_file()
+        file.generate()
+        image = GeneratedImage.objects.get()
+        self.assertEqual(image.name, file.name)
+        self.assertEqual(image.source_name, self.photo.original_file.name)
+        self.assertTrue(file.storage.exists(file.name))
+
+    def test_doesnt_check_storage_for_recorded_file(self):
+        "Once generated, a new backend should only need the manifest."
+        self.make_file().generate()
+        backend = ManifestCacheFileBackend()
+        file = self.make_file(backend)
+
+        with patch.object(file.storage, "exists") as exists:
+            with self.assertNumQueries(1):
+                url = file.url
+            # The second time, the backend remembers the file:
+            with self.assertNumQueries(0):
+                self.assertEqual(self.make_file(backend).url, url)
+        exists.assert_not_called()
+
+    def test_fetches_all_of_a_sources_images_at_once(self):
+        "One query finds all the images made from the same original."
+        self.make_file().generate()
+        thumbnail = Thumbnail(source=self.photo.original_file)
+        ImageCacheFile(
+            thumbnail, cachefile_backend=ManifestCacheFileBackend()
+        ).generate()
+        backend = ManifestCacheFileBackend()
+
+        with self.assertNumQueries(1):
+            self.assertTrue(backend.exists(self.make_file(backend)))
+            self.assertTrue(
+                backend.exists(ImageCacheFile(thumbnail, cachefile_backend=backend))
+            )
+
+    def test_forgets_sources_after_ttl(self):
+        backend = ManifestCacheFileBackend()
+        self.make_file(backend).generate()
+        with (
+            patch.object(imagecache, "MANIFEST_TTL", new=0),
+            self.assertNumQueries(1),
+        ):
+            self.assertTrue(backend.exists(self.make_file(backend)))
+
+    def test_remembers_limited_sources(self):
+        backend = ManifestCacheFileBackend()
+        other_photo = PhotoFactory()
+        with patch.object(imagecache, "MANIFEST_SOURCES", new=1):
+            self.make_file(backend).generate()
+            ImageCacheFile(
+                Square(source=other_photo.original_file), cachefile_backend=backend
+            ).generate()
+        self.assertEqual(list(backend._sources), [other_photo.original_file.name])
+
+    def test_records_existing_file(self):
+        "A file generated before the manifest was used should be recorded."
+        self.make_file().generate()
+        GeneratedImage.objects.all().delete()
+
+        file = self.make_file()
+        self.assertEqual(file.cachefile_backend.get_state(file), CacheFileState.EXISTS)
+        self.assertTrue(GeneratedImage.objects.filter(name=file.name).exists())
+
+    def test_forgets_file_that_does_not_exist(self):
+        file = self.make_file()
+        file.generate()
+        file.cachefile_backend.set_state(file, CacheFileState.DOES_NOT_EXIST)
+        self.assertFalse(GeneratedImage.objects.exists())
+        self.assertIsNone(
+            file.cachefile_backend.get_state(file, check_if_unknown=False)
+        )
+
+
+def hold_lock(name):
+    """
+    Locks the file that image_lock() uses for name, like another process
+    would, and returns the open file. Close it to release the lock.
+    """
+    with image_lock(name, 0):
+        pass
+    lock_dir = imagecache.os.path.join(
+        imagecache.tempfile.gettempdir(), "ditto-image-locks"
+    )
+    key = int(imagecache.hashlib.sha256(name.encode()).hexdigest(), 16)
+    f = open(f"{lock_dir}/{key % imagecache.LOCK_FILES}.lock", "a")  # noqa: SIM115
+    fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    return f
+
+
+class ImageLockTestCase(TestCase):
+    def test_not_locked(self):
+        with image_lock("a.jpg", 1) as waited:
+            self.assertFalse(waited)
+
+    def test_locked(self):
+        f = hold_lock("a.jpg")
+        self.addCleanup(f.close)
+        with self.assertRaises(ImageLockError), image_lock("a.jpg", 0.1):
+            pass
+
+    def test_waits_for_lock(self):
+        f = hold_lock("a.jpg")
+        timer = threading.Timer(0.1, f.close)
+        timer.start()
+        self.addCleanup(timer.cancel)
+        with image_lock("a.jpg", 5) as waited:
+            self.assertTrue(waited)
+
+    def test_released(self):
+        with image_lock("a.jpg", 0):
+            pass
+        with image_lock("a.jpg", 0) as waited:
+            self.assertFalse(waited)
+
+
+class LockingCacheFileBackendTestCase(TestCase):
+    def setUp(self):
+        self.photo = PhotoFactory()
+        self.file = ImageCacheFile(
+            Square(source=self.photo.original_file),
+            cachefile_backend=LockingCacheFileBackend(),
+        )
+
+    @override_app_settings(CORE_IMAGE_GENERATION_LOCK=True)
+    def test_generates(self):
+        self.file.generate()
+        self.assertTrue(self.file.storage.exists(self.file.name))
+
+    @override_app_settings(
+        CORE_IMAGE_GENERATION_LOCK=True, CORE_IMAGE_GENERATION_WAIT=0
+    )
+    def test_locked(self):
+        "If another process is making it, it shouldn't be made again."
+        f = hold_lock(self.file.name)
+        self.addCleanup(f.close)
+        with (
+            patch.object(self.file, "_generate") as generate,
+            self.assertRaises(ImageLockError),
+        ):
+            self.file.generate()
+        generate.assert_not_called()
+
+    @override_app_settings(
+        CORE_IMAGE_GENERATION_LOCK=True, CORE_IMAGE_GENERATION_WAIT=5
+    )
+    def test_uses_image_made_while_waiting(self):
+        f = hold_lock(self.file.name)
+
+        def finish():
+            # As if another process made it while this one was waiting:
+            ImageCacheFile(Square(source=self.photo.original_file))._generate()
+            f.close()
+
+        timer = threading.Timer(0.1, finish)
+        timer.start()
+        self.addCleanup(timer.cancel)
+        with patch.object(self.file, "_generate") as generate:
+            self.file.generate()
+        generate.assert_not_called()
+        self.assertTrue(self.file.cachefile_backend.exists(self.file))
+
+    @override_app_settings(CORE_IMAGE_GENERATION_LOCK=True)
+    def test_doesnt_lock_existing_image(self):
+        "Using an image that exists shouldn't wait for the lock."
+        self.file.generate()
+        with patch("ditto.core.imagecache.image_lock") as lock:
+            self.file.generate()
+        lock.assert_not_called()
+
+    @override_app_settings(CORE_IMAGE_GENERATION_LOCK=False)
+    def test_no_lock(self):
+        f = hold_lock(self.file.name)
+        self.addCleanup(f.close)
+        self.file.generate()
+        self.assertTrue(self.file.storage.exists(self.file.name))
+
+
+class ManifestSpecMixinTestCase(TestCase):
+    def setUp(self):
+        self.photo = PhotoFactory()
+
+    @override_app_settings(CORE_IMAGE_CACHE_MANIFEST=True)
+    def test_uses_manifest_backend(self):
+        spec = Square(source=self.photo.original_file)
+        self.assertIsInstance(spec.cachefile_backend, ManifestCacheFileBackend)
+
+    @override_app_settings(
+        CORE_IMAGE_CACHE_MANIFEST=False, CORE_IMAGE_GENERATION_LOCK=False
+    )
+    def test_uses_default_backend(self):
+        spec = Square(source=self.photo.original_file)
+        self.assertNotIsInstance(spec.cachefile_backend, LockingCacheFileBackend)
+
+    @override_app_settings(
+        CORE_IMAGE_CACHE_MANIFEST=False, CORE_IMAGE_GENERATION_LOCK=True
+    )
+    def test_uses_locking_backend(self):
+        spec = Square(source=self.photo.original_file)
+        self.assertIs(type(spec.cachefile_backend), LockingCacheFileBackend)
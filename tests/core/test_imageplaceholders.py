@@ -0,0 +1,56 @@
+import base64
+from io import BytesIO
+
+from django.test import SimpleTestCase
+from PIL import ExifTags, Image
+
+from ditto.core.imageplaceholders import get_dominant_color, make_placeholder
+from tests.core import make_jpeg
+
+
+def open_placeholder(placeholder):
+    "Returns the image in a placeholder's data: URI."
+    data = placeholder.removeprefix("data:image/jpeg;base64,")
+    return Image.open(BytesIO(base64.b64decode(data)))
+
+
+class MakePlaceholderTestCase(SimpleTestCase):
+    def test_placeholder(self):
+        placeholder, color = make_placeholder(BytesIO(make_jpeg((400, 300), "blue")))
+        self.assertTrue(placeholder.startswith("data:image/jpeg;base64,"))
+        self.assertEqual(open_placeholder(placeholder).size, (16, 12))
+        self.assertTrue(color.endswith(("ff", "fe")))
+
+    def test_rotated(self):
+        "It should use the image's EXIF orientation."
+        exif = Image.Exif()
+        exif[ExifTags.Base.Orientation] = 6
+        f = BytesIO()
+        Image.new("RGB", (400, 300), "blue").save(f, "JPEG", exif=exif)
+        placeholder, _ = make_placeholder(f)
+        self.assertEqual(open_placeholder(placeholder).size, (12, 16))
+
+    def test_other_formats(self):
+        f = BytesIO()
+        Image.new("RGBA", (40, 30), "green").save(f, "PNG")
+        placeholder, color = make_placeholder(f)
+        self.assertEqual(open_placeholder(placeholder).mode, "RGB")
+        self.assertEqual(len(color), 7)
+
+    def test_leaves_file_at_start(self):
+        f = BytesIO(make_jpeg())
+        f.seek(10)
+        make_placeholder(f)
+        self.assertEqual(f.tell(), 0)
+
+    def test_not_an_image(self):
+        f = BytesIO(b"Not an image")
+        self.assertEqual(make_placeholder(f), ("", ""))
+        self.assertEqual(f.tell(), 0)
+
+
+class GetDominantColorTestCase(SimpleTestCase):
+    def test_most_common_color(self):
+        img = Image.new("RGB", (10, 10), (255, 0, 0))
+        img.paste((0, 0, 255), (0, 0, 10, 4))
+        self.assertEqual(get_dominant_color(img), "#ff0000")
@@ -0,0 +1,72 @@
+from io import BytesIO
+
+from django.test import SimpleTestCase
+from PIL import ExifTags, Image
+
+from ditto.core.imageprocessors import DraftDownscale
+
+
+def make_image(size, image_format="JPEG", orientation=None):
+    "Returns an opened, but not yet loaded, image of the size and format."
+    exif = Image.Exif()
+    if orientation:
+        exif[ExifTags.Base.Orientation] = orientation
+    f = BytesIO()
+    Image.new("RGB", size, "red").save(f, image_format, exif=exif)
+    f.seek(0)
+    return Image.open(f)
+
+
+class DraftDownscaleTestCase(SimpleTestCase):
+    def test_jpeg_fill(self):
+        "It should decode at 1/8 scale to make a small square."
+        img = DraftDownscale(75, 75, fill=True).process(make_image((2000, 1500)))
+        self.assertEqual(img.size, (250, 188))
+
+    def test_jpeg_fit(self):
+        "It should keep the image at least twice the size it'll be resized to."
+        img = DraftDownscale(320, 320).process(make_image((2000, 1500)))
+        self.assertEqual(img.size, (1000, 750))
+
+    def test_jpeg_stays_a_jpeg(self):
+        "So that the Transpose processor can still read its EXIF data."
+        img = DraftDownscale(75, 75).process(make_image((2000, 1500), orientation=6))
+        self.assertEqual(img._getexif()[ExifTags.Base.Orientation], 6)
+
+    def test_small_image(self):
+        "It should leave images that aren't much bigger than needed alone."
+        original = make_image((500, 400))
+        img = DraftDownscale(320, 320).process(original)
+        self.assertIs(img, original)
+        self.assertEqual(img.size, (500, 400))
+
+    def test_reduces_other_formats(self):
+        img = DraftDownscale(320, 320).process(make_image((2000, 1500), "PNG"))
+        self.assertEqual(img.size, (667, 500))
+
+    def test_rotates_reduced_images(self):
+        "The reduced image has lost its EXIF data, so should already be rotated."
+        img = DraftDownscale(320, 320).process(
+            make_image((2000, 1500), "PNG", orientation=6)
+        )
+        self.assertEqual(img.size, (500, 667))
+
+    def test_rotates_reduced_images_clockwise(self):
+        "Orientation 6 means the image needs rotating 90 degrees clockwise."
+        original = Image.new("RGB", (2000, 1500), "red")
+        original.paste("blue", (0, 0, 1000, 1500))
+        exif = Image.Exif()
+        exif[ExifTags.Base.Orientation] = 6
+        f = BytesIO()
+        original.save(f, "PNG", exif=exif)
+        f.seek(0)
+        img = DraftDownscale(320, 320).process(Image.open(f))
+        # The left half is now the top half:
+        self.assertEqual(img.getpixel((250, 100)), (0, 0, 255))
+        self.assertEqual(img.getpixel((250, 600)), (255, 0, 0))
+
+    def test_target_size_of_rotated_image(self):
+        "The width and height should be swapped for rotated images."
+        processor = DraftDownscale(100, 400)
+        self.assertEqual(processor._get_target_size((4000, 2000), 1), (200, 100))
+        self.assertEqual(processor._get_target_size((4000, 2000), 6), (400, 200))
@@ -0,0 +1,285 @@
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from imagekit.cachefiles import ImageCacheFile
+
+from ditto.core.management.commands import DittoProcessPoolCommand
+from ditto.core.models import DailyItemCount, TimelineItem
+from ditto.core.utils import datetime_from_str
+from ditto.flickr.factories import PhotoFactory
+from ditto.flickr.imagegenerators import Square
+from ditto.flickr.models import Photo
+from ditto.pinboard.factories import BookmarkFactory
+from ditto.pinboard.models import Bookmark
+from ditto.twitter.factories import MediaFactory
+from tests.core import override_app_settings
+
+
+class RebuildDittoTimelineTestCase(TestCase):
+    def setUp(self):
+        self.out = StringIO()
+
+    def test_rebuilds(self):
+        BookmarkFactory.create_batch(2)
+        TimelineItem.objects.all().delete()
+        call_command("rebuild_ditto_timeline", stdout=self.out)
+        self.assertEqual(TimelineItem.objects.count(), 2)
+        self.assertIn("Created 2 Timeline Items", self.out.getvalue())
+
+    def test_no_output(self):
+        call_command("rebuild_ditto_timeline", verbosity=0, stdout=self.out)
+        self.assertEqual(self.out.getvalue(), "")
+
+
+class RebuildDittoDailyCountsTestCase(TestCase):
+    def setUp(self):
+        self.out = StringIO()
+
+    def test_rebuilds(self):
+        BookmarkFactory.create_batch(
+            2, post_time=datetime_from_str("2015-01-01 12:00:00")
+        )
+        DailyItemCount.objects.all().delete()
+        call_command("rebuild_ditto_daily_counts", stdout=self.out)
+        self.assertEqual(DailyItemCount.objects.count(), 2)
+        self.assertIn("Created 2 Daily Item Counts", self.out.getvalue())
+
+    def test_no_output(self):
+        call_command("rebuild_ditto_daily_counts", verbosity=0, stdout=self.out)
+        self.assertEqual(self.out.getvalue(), "")
+
+
+class CompressDittoRawTestCase(TestCase):
+    raw = '{"description": "%s"}' % ("Hello " * 100)
+
+    def setUp(self):
+        self.out = StringIO()
+
+    def stored(self, model, *fields):
+        return list(model.objects.order_by("pk").values_list(*fields))
+
+    @override_app_settings(CORE_RAW_COMPRESSION=None)
+    def make_uncompressed(self):
+        BookmarkFactory.create_batch(3, raw=self.raw)
+        PhotoFactory(raw=self.raw, exif_raw=self.raw, sizes_raw="{}")
+
+    def test_compresses(self):
+        self.make_uncompressed()
+        call_command("compress_ditto_raw", batch_size=2, stdout=self.out)
+
+        for (raw,) in self.stored(Bookmark, "raw"):
+            self.assertTrue(raw.startswith("zlib:"))
+        [(raw, exif_raw, sizes_raw)] = self.stored(
+            Photo, "raw", "exif_raw", "sizes_raw"
+        )
+        self.assertTrue(raw.startswith("zlib:"))
+        self.assertTrue(exif_raw.startswith("zlib:"))
+        # Too short to be worth compressing:
+        self.assertEqual(sizes_raw, "{}")
+
+        self.assertEqual(Bookmark.objects.first().raw, self.raw)
+        self.assertIn("pinboard.Bookmark: Updated 3 bookmarks", self.out.getvalue())
+        self.assertIn("flickr.Photo: Updated 1 photos", self.out.getvalue())
+
+    def test_already_compressed(self):
+        BookmarkFactory.create_batch(2, raw=self.raw)
+        call_command("compress_ditto_raw", stdout=self.out)
+        self.assertIn("pinboard.Bookmark: Updated 0 bookmarks", self.out.getvalue())
+
+    def test_decompresses(self):
+        BookmarkFactory.create_batch(2, raw=self.raw)
+        call_command("compress_ditto_raw", decompress=True, stdout=self.out)
+        self.assertEqual(self.stored(Bookmark, "raw"), [(self.raw,), (self.raw,)])
+        self.assertIn("pinboard.Bookmark: Updated 2 bookmarks", self.out.getvalue())
+
+    def test_no_output(self):
+        call_command("compress_ditto_raw", verbosity=0, stdout=self.out)
+        self.assertEqual(self.out.getvalue(), "")
+
+
+class GenerateDittoThumbnailsTestCase(TestCase):
+    def setUp(self):
+        self.out = StringIO()
+        self.out_err = StringIO()
+
+    def generate(self, *args, **kwargs):
+        kwargs.setdefault("workers", 1)
+        call_command(
+            "generate_ditto_thumbnails",
+            *args,
+            stdout=self.out,
+            stderr=self.out_err,
+            **kwargs,
+        )
+
+    def square_file(self, photo):
+        return ImageCacheFile(Square(source=photo.original_file))
+
+    def test_generates(self):
+        photo = PhotoFactory()
+        self.generate(sizes=["flickr:square"])
+        file = self.square_file(photo)
+        self.assertTrue(file.storage.exists(file.name))
+        self.assertIn(
+            "Generated 1 Image, skipped 0 that already existed", self.out.getvalue()
+        )
+
+    def test_generates_all_of_an_apps_sizes(self):
+        MediaFactory()
+        self.generate(sizes=["twitter"])
+        self.assertIn("Generated 3 Images", self.out.getvalue())
+
+    def test_generates_other_formats(self):
+        PhotoFactory()
+        self.generate(sizes=["flickr:square_webp"])
+        self.assertIn("Generated 1 Image", self.out.getvalue())
+
+    def test_skips_existing(self):
+        PhotoFactory()
+        self.generate(sizes=["flickr:square"])
+        self.generate(sizes=["flickr:square"])
+        self.assertIn(
+            "Generated 0 Images, skipped 1 that already existed", self.out.getvalue()
+        )
+
+    def test_force(self):
+        PhotoFactory()
+        self.generate(sizes=["flickr:square"])
+        self.generate("--force", sizes=["flickr:square"])
+        self.assertIn(
+            "Generated 1 Image, skipped 0 that already existed", self.out.getvalue()
+        )
+
+    def test_skips_items_without_originals(self):
+        PhotoFactory(original_file="")
+        self.generate(sizes=["flickr:square"])
+        self.assertIn("Generated 0 Images, skipped 0", self.out.getvalue())
+
+    def test_error_output(self):
+        PhotoFactory(original_file="flickr/missing.jpg")
+        self.generate(sizes=["flickr:square"])
+        self.assertIn(
+            "Failed to generate Images: flickr/missing.jpg", self.out_err.getvalue()
+        )
+
+    def test_invalid_app(self):
+        with self.assertRaises(CommandError):
+            self.generate(sizes=["pinboard"])
+
+    def test_invalid_size(self):
+        with self.assertRaises(CommandError):
+            self.generate(sizes=["flickr:enormous"])
+
+    def test_workers(self):
+        "It should generate the images in several processes."
+        photos = PhotoFactory.create_batch(2)
+        self.generate(sizes=["flickr:square"], workers=2)
+        self.assertIn("Generated 2 Images", self.out.getvalue())
+        for photo in photos:
+            file = self.square_file(photo)
+            self.assertTrue(file.storage.exists(file.name))
+
+    def test_no_output(self):
+        PhotoFactory()
+        self.generate(sizes=["flickr:square"], verbosity=0)
+        self.assertEqual(self.out.getvalue(), "")
+
+
+class GenerateDittoPlaceholdersTestCase(TestCase):
+    def setUp(self):
+        self.out = StringIO()
+        self.out_err = StringIO()
+
+    def generate(self, *args, **kwargs):
+        kwargs.setdefault("workers", 1)
+        call_command(
+            "generate_ditto_placeholders",
+            *args,
+            stdout=self.out,
+            stderr=self.out_err,
+            **kwargs,
+        )
+
+    def test_sets_placeholders(self):
+        photo = PhotoFactory()
+        media = MediaFactory()
+        self.generate()
+        photo.refresh_from_db()
+        media.refresh_from_db()
+        self.assertTrue(photo.placeholder.startswith("data:image/jpeg;base64,"))
+        self.assertEqual(len(photo.dominant_color), 7)
+        self.assertTrue(media.placeholder.startswith("data:image/jpeg;base64,"))
+        self.assertIn("Set 2 Placeholders", self.out.getvalue())
+
+    def test_one_app(self):
+        PhotoFactory()
+        media = MediaFactory()
+        self.generate(app_names=["flickr"])
+        media.refresh_from_db()
+        self.assertEqual(media.placeholder, "")
+        self.assertIn("Set 1 Placeholder", self.out.getvalue())
+
+    def test_skips_existing(self):
+        PhotoFactory(placeholder="data:image/jpeg;base64,abc=")
+        self.generate(app_names=["flickr"])
+        self.assertIn("Set 0 Placeholders", self.out.getvalue())
+
+    def test_force(self):
+        photo = PhotoFactory(placeholder="data:image/jpeg;base64,abc=")
+        self.generate("--force", app_names=["flickr"])
+        photo.refresh_from_db()
+        self.assertNotEqual(photo.placeholder, "data:image/jpeg;base64,abc=")
+
+    def test_skips_items_without_originals(self):
+        PhotoFactory(original_file="")
+        self.generate(app_names=["flickr"])
+        self.assertIn("Set 0 Placeholders", self.out.getvalue())
+
+    def test_error_output(self):
+        PhotoFactory(original_file="flickr/missing.jpg")
+        self.generate(app_names=["flickr"])
+        self.assertIn(
+            "Failed to set Placeholders: flickr/missing.jpg", self.out_err.getvalue()
+        )
+
+    def test_invalid_app(self):
+        with self.assertRaises(CommandError):
+            self.generate(app_names=["pinboard"])
+
+    def test_workers(self):
+        "It should make the placeholders in several processes."
+        photos = PhotoFactory.create_batch(3)
+        self.generate(app_names=["flickr"], workers=2, batch_size=2)
+        self.assertIn("Set 3 Placeholders", self.out.getvalue())
+        for photo in photos:
+            photo.refresh_from_db()
+            self.assertNotEqual(photo.placeholder, "")
+
+    def test_no_output(self):
+        PhotoFactory()
+        self.generate(verbosity=0)
+        self.assertEqual(self.out.getvalue(), "")
+
+
+class DittoProcessPoolCommandTestCase(TestCase):
+    def setUp(self):
+        self.command = DittoProcessPoolCommand()
+
+    def test_workers(self):
+        self.assertEqual(self.command.get_workers({"workers": 3}), 3)
+
+    @patch("os.cpu_count", return_value=4)
+    def test_default_workers(self, cpu_count):
+        self.assertEqual(self.command.get_workers({"workers": None}), 4)
+
+    def test_run_tasks(self):
+        "Results are in the same order as the tasks."
+        results = self.command.run_tasks(max, [(1, 2), (5, 3), (4, 4)], 1)
+        self.assertEqual(list(results), [2, 5, 4])
+
+    def test_run_tasks_in_processes(self):
+        results = self.command.run_tasks(max, [(1, 2), (5, 3), (4, 4)], 2)
+        self.assertEqual(list(results), [2, 5, 4])
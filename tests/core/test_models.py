@@ -0,0 +1,842 @@
+import datetime
+from unittest.mock import patch
+
+from django.apps import apps
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from ditto.core.managers import _day_runs
+from ditto.core.models import DailyItemCount, TimelineItem
+from ditto.core.signals import fill_daily_counts, fill_timeline
+from ditto.core.utils import datetime_from_str
+from ditto.flickr import factories as flickrfactories
+from ditto.flickr.models import Photo
+from ditto.lastfm import factories as lastfmfactories
+from ditto.pinboard import factories as pinboardfactories
+from ditto.pinboard.models import Bookmark
+from ditto.twitter import factories as twitterfactories
+
+
+class DiffModelMixinTestCase(TestCase):
+    def setUp(self):
+        bookmark = pinboardfactories.BookmarkFactory(title="Old title")
+        self.bookmark = Bookmark.objects.get(pk=bookmark.pk)
+
+    def test_no_changes(self):
+        self.assertFalse(self.bookmark.has_changed)
+        self.assertEqual(self.bookmark.diff, {})
+
+    def test_changes(self):
+        self.bookmark.title = "New title"
+        self.assertTrue(self.bookmark.has_changed)
+        self.assertEqual(list(self.bookmark.changed_fields), ["title"])
+        self.assertEqual(
+            self.bookmark.get_field_diff("title"), ("Old title", "New title")
+        )
+
+    def test_changed_back(self):
+        "Setting a field twice still compares with its initial value"
+        self.bookmark.title = "New title"
+        self.bookmark.title = "Old title"
+        self.assertFalse(self.bookmark.has_changed)
+
+    def test_foreign_key(self):
+        "Uses the field's name and the related objects' IDs"
+        old_account = self.bookmark.account
+        new_account = pinboardfactories.AccountFactory()
+        self.bookmark.account = new_account
+        self.assertEqual(
+            self.bookmark.get_field_diff("account"), (old_account.pk, new_account.pk)
+        )
+
+    def test_new_object(self):
+        "Values set when creating the object aren't changes"
+        bookmark = Bookmark(title="Hello")
+        self.assertFalse(bookmark.has_changed)
+        bookmark.title = "Bye"
+        self.assertEqual(bookmark.get_field_diff("title"), ("Hello", "Bye"))
+
+    def test_save_resets(self):
+        self.bookmark.title = "New title"
+        self.bookmark.save()
+        self.assertFalse(self.bookmark.has_changed)
+
+    def test_deferred_fields(self):
+        "Objects can be loaded with deferred fields, which aren't tracked"
+        bookmark = Bookmark.objects.defer("raw").get(pk=self.bookmark.pk)
+        with self.assertNumQueries(0):
+            bookmark.raw = "{}"
+            self.assertFalse(bookmark.has_changed)
+
+
+class DittoItemQuerySetTestCase(TestCase):
+    def setUp(self):
+        pinboardfactories.BookmarkFactory(raw='{"a": 1}', is_private=False)
+
+    def test_public_objects_defer_raw(self):
+        "public_objects shouldn't load the raw fields until they're accessed"
+        bookmark = Bookmark.public_objects.get()
+        self.assertEqual(bookmark.get_deferred_fields(), {"raw"})
+        self.assertEqual(bookmark.raw, '{"a": 1}')
+
+    def test_objects_load_raw(self):
+        "objects loads all fields"
+        bookmark = Bookmark.objects.get()
+        self.assertEqual(bookmark.get_deferred_fields(), set())
+
+    def test_defer_raw(self):
+        bookmark = Bookmark.objects.defer_raw().get()
+        self.assertEqual(bookmark.get_deferred_fields(), {"raw"})
+
+    def test_defer_raw_photo(self):
+        "Photos have several raw fields"
+        flickrfactories.PhotoFactory()
+        photo = Photo.objects.defer_raw().get()
+        self.assertEqual(photo.get_deferred_fields(), {"raw", "sizes_raw", "exif_raw"})
+
+    def test_with_raw(self):
+        "with_raw() opts back in to loading the raw fields"
+        bookmark = Bookmark.public_objects.with_raw().get()
+        self.assertEqual(bookmark.get_deferred_fields(), set())
+        self.assertEqual(bookmark.raw, '{"a": 1}')
+
+    def test_save_deferred(self):
+        "Saving an item with deferred raw fields doesn't blank them"
+        bookmark = Bookmark.public_objects.get()
+        bookmark.title = "New title"
+        bookmark.save()
+        bookmark = Bookmark.objects.get()
+        self.assertEqual(bookmark.title, "New title")
+        self.assertEqual(bookmark.raw, '{"a": 1}')
+
+
+class TimelineItemTestCase(TestCase):
+    def test_str(self):
+        item = TimelineItem(app_name="twitter", variety_name="tweet", object_id=3)
+        self.assertEqual(str(item), "twitter tweet 3")
+
+    def test_ordering(self):
+        "Most recent first"
+        bookmark_1 = pinboardfactories.BookmarkFactory(
+            post_time=datetime_from_str("2015-01-01 12:00:00")
+        )
+        bookmark_2 = pinboardfactories.BookmarkFactory(
+            post_time=datetime_from_str("2016-01-01 12:00:00")
+        )
+        items = TimelineItem.objects.all()
+        self.assertEqual(items[0].object_id, bookmark_2.pk)
+        self.assertEqual(items[1].object_id, bookmark_1.pk)
+
+
+class TimelineItemFlickrTestCase(TestCase):
+    def setUp(self):
+        self.user = flickrfactories.AccountFactory().user
+
+    def test_creates_items(self):
+        "Creates both uploaded and taken items"
+        photo = flickrfactories.PhotoFactory(
+            user=self.user,
+            post_time=datetime_from_str("2016-01-01 12:00:00"),
+            taken_time=datetime_from_str("2015-06-01 12:00:00"),
+        )
+        uploaded = TimelineItem.objects.get(variety_name="photo-uploaded")
+        self.assertEqual(uploaded.app_name, "flickr")
+        self.assertEqual(uploaded.object_id, photo.pk)
+        self.assertEqual(uploaded.post_time, photo.post_time)
+        self.assertFalse(uploaded.is_private)
+        taken = TimelineItem.objects.get(variety_name="photo-taken")
+        self.assertEqual(taken.post_time, photo.taken_time)
+
+    def test_updates_items(self):
+        photo = flickrfactories.PhotoFactory(user=self.user, is_private=False)
+        photo.is_private = True
+        photo.save()
+        self.assertEqual(TimelineItem.objects.count(), 2)
+        self.assertEqual(TimelineItem.public_objects.count(), 0)
+
+    def test_deletes_items(self):
+        photo = flickrfactories.PhotoFactory()
+        photo.delete()
+        self.assertEqual(TimelineItem.objects.count(), 0)
+
+    def test_deletes_items_for_queryset(self):
+        flickrfactories.PhotoFactory.create_batch(2, user=self.user)
+        photo = flickrfactories.PhotoFactory(user=self.user)
+        photo.__class__.objects.exclude(pk=photo.pk).delete()
+        self.assertEqual(
+            set(TimelineItem.objects.values_list("object_id", flat=True)),
+            {photo.pk},
+        )
+
+    def test_no_items_without_account(self):
+        "Photos by Users without Accounts, eg favorites, aren't included"
+        flickrfactories.PhotoFactory()
+        self.assertEqual(TimelineItem.objects.count(), 0)
+
+
+class TimelineItemLastfmTestCase(TestCase):
+    def test_creates_item(self):
+        scrobble = lastfmfactories.ScrobbleFactory()
+        item = TimelineItem.objects.get()
+        self.assertEqual(item.app_name, "lastfm")
+        self.assertEqual(item.variety_name, "scrobble")
+        self.assertEqual(item.object_id, scrobble.pk)
+
+
+class TimelineItemPinboardTestCase(TestCase):
+    def test_creates_item(self):
+        bookmark = pinboardfactories.BookmarkFactory(is_private=True)
+        item = TimelineItem.objects.get()
+        self.assertEqual(item.app_name, "pinboard")
+        self.assertEqual(item.variety_name, "bookmark")
+        self.assertEqual(item.object_id, bookmark.pk)
+        self.assertTrue(item.is_private)
+
+
+class TimelineItemTwitterTestCase(TestCase):
+    def setUp(self):
+        self.account = twitterfactories.AccountFactory()
+
+    def test_tweet_with_account(self):
+        tweet = twitterfactories.TweetFactory(user=self.account.user)
+        item = TimelineItem.objects.get()
+        self.assertEqual(item.app_name, "twitter")
+        self.assertEqual(item.variety_name, "tweet")
+        self.assertEqual(item.object_id, tweet.pk)
+
+    def test_tweet_without_account(self):
+        "Tweets by Users without Accounts aren't included"
+        twitterfactories.TweetFactory()
+        self.assertEqual(TimelineItem.objects.count(), 0)
+
+    def test_favorite_added(self):
+        tweet = twitterfactories.TweetFactory()
+        self.account.user.favorites.add(tweet)
+        item = TimelineItem.objects.get()
+        self.assertEqual(item.variety_name, "favorite")
+        self.assertEqual(item.object_id, tweet.pk)
+        self.assertFalse(item.is_private)
+
+    def test_favorite_added_reverse(self):
+        tweet = twitterfactories.TweetFactory()
+        tweet.favoriting_users.add(self.account.user)
+        item = TimelineItem.objects.get()
+        self.assertEqual(item.variety_name, "favorite")
+
+    def test_favorite_removed(self):
+        tweet = twitterfactories.TweetFactory()
+        self.account.user.favorites.add(tweet)
+        self.account.user.favorites.remove(tweet)
+        self.assertEqual(TimelineItem.objects.count(), 0)
+
+    def test_favorites_cleared(self):
+        tweets = twitterfactories.TweetFactory.create_batch(2)
+        self.account.user.favorites.add(*tweets)
+        self.account.user.favorites.clear()
+        self.assertEqual(TimelineItem.objects.count(), 0)
+
+    def test_favorite_private_user(self):
+        "A favorite is private if only favorited by private Users"
+        tweet = twitterfactories.TweetFactory()
+        self.account.user.favorites.add(tweet)
+        self.account.user.is_private = True
+        self.account.user.save()
+        item = TimelineItem.objects.get()
+        self.assertTrue(item.is_private)
+
+    def test_user_privacy_changes_tweets(self):
+        twitterfactories.TweetFactory.create_batch(2, user=self.account.user)
+        self.account.user.is_private = True
+        self.account.user.save()
+        self.assertEqual(TimelineItem.objects.count(), 2)
+        self.assertEqual(TimelineItem.public_objects.count(), 0)
+
+
+class TimelineManagerRebuildTestCase(TestCase):
+    def test_rebuild(self):
+        "Creates items for all apps, including ones that were missing"
+        account = twitterfactories.AccountFactory()
+        twitterfactories.TweetFactory(user=account.user)
+        flickrfactories.PhotoFactory(user=flickrfactories.AccountFactory().user)
+        lastfmfactories.ScrobbleFactory()
+        pinboardfactories.BookmarkFactory()
+        TimelineItem.objects.all().delete()
+
+        count = TimelineItem.objects.rebuild()
+
+        self.assertEqual(count, 5)
+        self.assertEqual(
+            set(TimelineItem.objects.values_list("app_name", "variety_name")),
+            {
+                ("flickr", "photo-uploaded"),
+                ("flickr", "photo-taken"),
+                ("lastfm", "scrobble"),
+                ("pinboard", "bookmark"),
+                ("twitter", "tweet"),
+            },
+        )
+
+    def test_rebuild_after_account_added(self):
+        "Tweets are included if their User's Account was added later"
+        user = twitterfactories.UserFactory()
+        twitterfactories.TweetFactory(
+            user=user, post_time=datetime_from_str("2015-01-01 12:00:00")
+        )
+        twitterfactories.AccountFactory(user=user)
+        self.assertEqual(TimelineItem.objects.count(), 0)
+        TimelineItem.objects.rebuild()
+        self.assertEqual(TimelineItem.objects.count(), 1)
+
+    def test_rebuild_removes_old_items(self):
+        TimelineItem.objects.create(
+            app_name="pinboard",
+            variety_name="bookmark",
+            object_id=123,
+            post_time=datetime.datetime.now(tz=datetime.timezone.utc),
+        )
+        TimelineItem.objects.rebuild()
+        self.assertEqual(TimelineItem.objects.count(), 0)
+
+
+class FillTimelineTestCase(TestCase):
+    "After migrating, the timeline should be created if it's missing."
+
+    def migrated(self):
+        fill_timeline(sender=apps.get_app_config("ditto_core"), verbosity=0)
+
+    def test_fills_empty_timeline(self):
+        pinboardfactories.BookmarkFactory.create_batch(2)
+        TimelineItem.objects.all().delete()
+        self.migrated()
+        self.assertEqual(TimelineItem.objects.count(), 2)
+
+    def test_leaves_existing_timeline(self):
+        bookmark = pinboardfactories.BookmarkFactory()
+        pinboardfactories.BookmarkFactory()
+        TimelineItem.objects.filter(object_id=bookmark.pk).delete()
+        self.migrated()
+        self.assertEqual(TimelineItem.objects.count(), 1)
+
+    def test_other_apps(self):
+        pinboardfactories.BookmarkFactory()
+        TimelineItem.objects.all().delete()
+        fill_timeline(sender=apps.get_app_config("pinboard"), verbosity=0)
+        self.assertEqual(TimelineItem.objects.count(), 0)
+
+
+class FillDailyCountsTestCase(TestCase):
+    "After migrating, the DailyItemCounts should be created if they're missing."
+
+    def migrated(self):
+        fill_daily_counts(sender=apps.get_app_config("ditto_core"), verbosity=0)
+
+    def test_fills_empty_counts(self):
+        pinboardfactories.BookmarkFactory.create_batch(
+            2,
+            account=pinboardfactories.AccountFactory(),
+            post_time=datetime_from_str("2015-01-01 12:00:00"),
+        )
+        DailyItemCount.objects.all().delete()
+        self.migrated()
+        self.assertEqual(DailyItemCount.objects.get().count, 2)
+
+    def test_leaves_existing_counts(self):
+        pinboardfactories.BookmarkFactory(
+            post_time=datetime_from_str("2015-01-01 12:00:00")
+        )
+        pinboardfactories.BookmarkFactory(
+            post_time=datetime_from_str("2015-01-02 12:00:00")
+        )
+        DailyItemCount.objects.filter(date=datetime.date(2015, 1, 1)).delete()
+        self.migrated()
+        self.assertEqual(DailyItemCount.objects.count(), 1)
+
+    def test_other_apps(self):
+        pinboardfactories.BookmarkFactory()
+        DailyItemCount.objects.all().delete()
+        fill_daily_counts(sender=apps.get_app_config("pinboard"), verbosity=0)
+        self.assertFalse(DailyItemCount.objects.exists())
+
+
+class TimelineManagerUpdateForItemsTestCase(TestCase):
+    def test_update_for_items(self):
+        "Creates, updates and deletes the items' TimelineItems"
+        user = flickrfactories.AccountFactory().user
+        photo_1 = flickrfactories.PhotoFactory(user=user, is_private=False)
+        photo_2 = flickrfactories.PhotoFactory(user=user)
+        photo_3 = flickrfactories.PhotoFactory(user=user)
+        # As if they'd all been changed without calling save():
+        TimelineItem.objects.filter(object_id=photo_2.pk).delete()
+        photo_1.is_private = True
+        photo_3.taken_time = None
+
+        TimelineItem.objects.update_for_items([photo_1, photo_2, photo_3])
+
+        self.assertEqual(
+            sorted(TimelineItem.objects.values_list("object_id", "variety_name")),
+            sorted(
+                [
+                    (photo_1.pk, "photo-taken"),
+                    (photo_1.pk, "photo-uploaded"),
+                    (photo_2.pk, "photo-taken"),
+                    (photo_2.pk, "photo-uploaded"),
+                    (photo_3.pk, "photo-uploaded"),
+                ]
+            ),
+        )
+        self.assertEqual(
+            TimelineItem.public_objects.filter(object_id=photo_1.pk).count(), 0
+        )
+
+    def test_update_for_items_queries(self):
+        "The number of queries doesn't depend on the number of items"
+        post_time = datetime_from_str("2016-01-01 12:00:00")
+        # Different Users, so that their Accounts have to be fetched:
+        photos = [
+            flickrfactories.PhotoFactory(
+                user=flickrfactories.AccountFactory().user,
+                post_time=post_time,
+                taken_time=post_time,
+            )
+            for _ in range(3)
+        ]
+        TimelineItem.objects.all().delete()
+
+        with CaptureQueriesContext(connection) as one_item:
+            TimelineItem.objects.update_for_items(photos[:1])
+        with CaptureQueriesContext(connection) as two_items:
+            TimelineItem.objects.update_for_items(photos[1:])
+
+        self.assertEqual(len(one_item), len(two_items))
+        self.assertEqual(TimelineItem.objects.count(), 6)
+
+
+class TimelineManagerBatchUpdatesTestCase(TestCase):
+    def test_updates_at_end(self):
+        "Items saved within the block get their TimelineItems when it ends"
+        account = pinboardfactories.AccountFactory()
+        with TimelineItem.objects.batch_updates():
+            bookmarks = pinboardfactories.BookmarkFactory.create_batch(
+                3, account=account
+            )
+            self.assertEqual(TimelineItem.objects.count(), 0)
+            self.assertEqual(DailyItemCount.objects.count(), 0)
+
+        self.assertEqual(
+            sorted(TimelineItem.objects.values_list("object_id", flat=True)),
+            sorted(b.pk for b in bookmarks),
+        )
+        self.assertEqual(sum(DailyItemCount.objects.values_list("count", flat=True)), 3)
+
+    def test_queries(self):
+        "The number of timeline queries doesn't depend on the number of items"
+        account = pinboardfactories.AccountFactory()
+        post_time = datetime_from_str("2016-01-01 12:00:00")
+        bookmarks = pinboardfactories.BookmarkFactory.create_batch(
+            3, account=account, post_time=post_time
+        )
+        TimelineItem.objects.all().delete()
+
+        with (
+            CaptureQueriesContext(connection) as one_item,
+            TimelineItem.objects.batch_updates(),
+        ):
+            bookmarks[0].save()
+        with (
+            CaptureQueriesContext(connection) as two_items,
+            TimelineItem.objects.batch_updates(),
+        ):
+            bookmarks[1].save()
+            bookmarks[2].save()
+
+        # One more UPDATE query for the extra Bookmark, and nothing else:
+        self.assertEqual(len(two_items), len(one_item) + 1)
+        self.assertEqual(TimelineItem.objects.count(), 3)
+
+    def test_nested(self):
+        "Only the outermost block updates the TimelineItems"
+        with TimelineItem.objects.batch_updates():
+            with TimelineItem.objects.batch_updates():
+                bookmark = pinboardfactories.BookmarkFactory()
+            self.assertEqual(TimelineItem.objects.count(), 0)
+        self.assertEqual(
+            list(TimelineItem.objects.values_list("object_id", flat=True)),
+            [bookmark.pk],
+        )
+
+    def test_deleted_items(self):
+        "Items deleted within the block don't get TimelineItems"
+        with TimelineItem.objects.batch_updates():
+            bookmark = pinboardfactories.BookmarkFactory()
+            bookmark.delete()
+        self.assertEqual(TimelineItem.objects.count(), 0)
+
+    def test_chunks(self):
+        "Updates items part way through if there are lots of them"
+        with (
+            patch.object(TimelineItem.objects, "_batch_chunk_size", new=2),
+            TimelineItem.objects.batch_updates(),
+        ):
+            pinboardfactories.BookmarkFactory.create_batch(3)
+            self.assertEqual(TimelineItem.objects.count(), 2)
+        self.assertEqual(TimelineItem.objects.count(), 3)
+
+
+class TimelineManagerDayCountsTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.day = datetime.date(2015, 1, 1)
+        self.bookmark = pinboardfactories.BookmarkFactory(
+            post_time=datetime_from_str("2015-01-01 12:00:00")
+        )
+        lastfmfactories.ScrobbleFactory(
+            post_time=datetime_from_str("2015-01-01 13:00:00")
+        )
+        # Different days:
+        pinboardfactories.BookmarkFactory(
+            post_time=datetime_from_str("2014-12-31 23:00:00")
+        )
+        pinboardfactories.BookmarkFactory(
+            post_time=datetime_from_str("2015-01-02 01:00:00")
+        )
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_counts(self):
+        self.assertEqual(
+            TimelineItem.objects.get_day_counts(self.day),
+            {("pinboard", "bookmark"): 1, ("lastfm", "scrobble"): 1},
+        )
+
+    def test_excludes_private(self):
+        self.bookmark.is_private = True
+        self.bookmark.save()
+        self.assertEqual(
+            TimelineItem.objects.get_day_counts(self.day),
+            {("lastfm", "scrobble"): 1},
+        )
+
+    def test_past_days_are_cached(self):
+        TimelineItem.objects.get_day_counts(self.day)
+        with self.assertNumQueries(0):
+            TimelineItem.objects.get_day_counts(self.day)
+
+    def test_today_is_not_cached(self):
+        today = datetime.datetime.now(tz=datetime.timezone.utc).date()
+        TimelineItem.objects.get_day_counts(today)
+        with self.assertNumQueries(1):
+            TimelineItem.objects.get_day_counts(today)
+
+    def test_forgets_counts_when_item_added(self):
+        TimelineItem.objects.get_day_counts(self.day)
+        pinboardfactories.BookmarkFactory(
+            post_time=datetime_from_str("2015-01-01 14:00:00")
+        )
+        counts = TimelineItem.objects.get_day_counts(self.day)
+        self.assertEqual(counts[("pinboard", "bookmark")], 2)
+
+    def test_forgets_counts_when_item_changed(self):
+        TimelineItem.objects.get_day_counts(self.day)
+        self.bookmark.is_private = True
+        self.bookmark.save()
+        counts = TimelineItem.objects.get_day_counts(self.day)
+        self.assertNotIn(("pinboard", "bookmark"), counts)
+
+    def test_forgets_counts_when_item_moved(self):
+        "Both the old and new days' counts are forgotten"
+        TimelineItem.objects.get_day_counts(self.day)
+        TimelineItem.objects.get_day_counts(datetime.date(2015, 1, 2))
+        self.bookmark.post_time = datetime_from_str("2015-01-02 12:00:00")
+        self.bookmark.save()
+        self.assertNotIn(
+            ("pinboard", "bookmark"), TimelineItem.objects.get_day_counts(self.day)
+        )
+        self.assertEqual(
+            TimelineItem.objects.get_day_counts(datetime.date(2015, 1, 2)),
+            {("pinboard", "bookmark"): 2},
+        )
+
+    def test_forgets_counts_when_item_deleted(self):
+        TimelineItem.objects.get_day_counts(self.day)
+        self.bookmark.delete()
+        self.assertNotIn(
+            ("pinboard", "bookmark"), TimelineItem.objects.get_day_counts(self.day)
+        )
+
+    def test_forgets_counts_when_rebuilt(self):
+        TimelineItem.objects.get_day_counts(self.day)
+        self.bookmark.__class__.objects.filter(pk=self.bookmark.pk).update(
+            is_private=True
+        )
+        TimelineItem.objects.rebuild()
+        self.assertNotIn(
+            ("pinboard", "bookmark"), TimelineItem.objects.get_day_counts(self.day)
+        )
+
+
+class DailyItemCountTestCase(TestCase):
+    def counts(self, app_name, variety_name):
+        "Returns a dict like {(account, date): count}"
+        return {
+            (c.account, c.date): c.count
+            for c in DailyItemCount.objects.filter(
+                app_name=app_name, variety_name=variety_name
+            )
+        }
+
+    def test_str(self):
+        count = DailyItemCount(
+            app_name="pinboard",
+            variety_name="bookmark",
+            account="terry",
+            date=datetime.date(2015, 1, 1),
+        )
+        self.assertEqual(str(count), "pinboard bookmark terry 2015-01-01")
+
+    def test_adds_counts(self):
+        account = pinboardfactories.AccountFactory(username="terry")
+        pinboardfactories.BookmarkFactory.create_batch(
+            2, account=account, post_time=datetime_from_str("2015-01-01 12:00:00")
+        )
+        self.assertEqual(
+            self.counts("pinboard", "bookmark"),
+            {("terry", datetime.date(2015, 1, 1)): 2},
+        )
+
+    def test_updates_counts(self):
+        "Both the old and new days are counted again"
+        account = pinboardfactories.AccountFactory(username="terry")
+        bookmark = pinboardfactories.BookmarkFactory(
+            account=account, post_time=datetime_from_str("2015-01-01 12:00:00")
+        )
+        bookmark.post_time = datetime_from_str("2015-01-02 12:00:00")
+        bookmark.save()
+        self.assertEqual(
+            self.counts("pinboard", "bookmark"),
+            {("terry", datetime.date(2015, 1, 2)): 1},
+        )
+
+    def test_excludes_private(self):
+        account = pinboardfactories.AccountFactory(username="terry")
+        bookmark = pinboardfactories.BookmarkFactory(
+            account=account, post_time=datetime_from_str("2015-01-01 12:00:00")
+        )
+        bookmark.is_private = True
+        bookmark.save()
+        self.assertEqual(self.counts("pinboard", "bookmark"), {})
+
+    def test_deletes_counts(self):
+        bookmarks = pinboardfactories.BookmarkFactory.create_batch(
+            2, post_time=datetime_from_str("2015-01-01 12:00:00")
+        )
+        bookmarks[0].delete()
+        bookmarks[1].delete()
+        self.assertEqual(self.counts("pinboard", "bookmark"), {})
+
+    def test_flickr_photos(self):
+        "Only Photos by Users with Accounts are counted"
+        user = flickrfactories.UserFactory(nsid="12345678@N01")
+        flickrfactories.AccountFactory(user=user)
+        flickrfactories.PhotoFactory(
+            user=user,
+            post_time=datetime_from_str("2016-01-01 12:00:00"),
+            taken_time=datetime_from_str("2015-01-01 12:00:00"),
+        )
+        flickrfactories.PhotoFactory(
+            post_time=datetime_from_str("2016-01-01 12:00:00"),
+        )
+        self.assertEqual(
+            self.counts("flickr", "photo-uploaded"),
+            {("12345678@N01", datetime.date(2016, 1, 1)): 1},
+        )
+        self.assertEqual(
+            self.counts("flickr", "photo-taken"),
+            {("12345678@N01", datetime.date(2015, 1, 1)): 1},
+        )
+
+    def test_twitter_favorites(self):
+        "Counted for each public User with an Account who favorited the Tweet"
+        user_1 = twitterfactories.UserFactory(screen_name="terry")
+        user_2 = twitterfactories.UserFactory(screen_name="bob")
+        twitterfactories.AccountFactory(user=user_1)
+        twitterfactories.AccountFactory(user=user_2)
+        tweet = twitterfactories.TweetFactory(
+            post_time=datetime_from_str("2015-01-01 12:00:00")
+        )
+        day = datetime.date(2015, 1, 1)
+
+        user_1.favorites.add(tweet)
+        self.assertEqual(self.counts("twitter", "favorite"), {("terry", day): 1})
+
+        tweet.favoriting_users.add(user_2)
+        self.assertEqual(
+            self.counts("twitter", "favorite"), {("terry", day): 1, ("bob", day): 1}
+        )
+
+        user_1.favorites.remove(tweet)
+        self.assertEqual(self.counts("twitter", "favorite"), {("bob", day): 1})
+
+        user_2.is_private = True
+        user_2.save()
+        self.assertEqual(self.counts("twitter", "favorite"), {})
+
+    def test_twitter_screen_name_changes(self):
+        user = twitterfactories.UserFactory(screen_name="terry")
+        twitterfactories.AccountFactory(user=user)
+        twitterfactories.TweetFactory(
+            user=user, post_time=datetime_from_str("2015-01-01 12:00:00")
+        )
+        user.screen_name = "bob"
+        user.save()
+        self.assertEqual(
+            self.counts("twitter", "tweet"), {("bob", datetime.date(2015, 1, 1)): 1}
+        )
+
+    def test_rebuild(self):
+        "Creates counts for all apps, including ones that were missing"
+        account = twitterfactories.AccountFactory()
+        twitterfactories.TweetFactory.create_batch(
+            2, user=account.user, post_time=datetime_from_str("2015-01-01 12:00:00")
+        )
+        lastfmfactories.ScrobbleFactory(
+            post_time=datetime_from_str("2015-01-02 12:00:00")
+        )
+        pinboardfactories.BookmarkFactory(
+            post_time=datetime_from_str("2015-01-03 12:00:00")
+        )
+        DailyItemCount.objects.all().delete()
+
+        count = DailyItemCount.objects.rebuild()
+
+        self.assertEqual(count, 3)
+        self.assertEqual(
+            set(
+                DailyItemCount.objects.values_list(
+                    "app_name", "variety_name", "date", "count"
+                )
+            ),
+            {
+                ("twitter", "tweet", datetime.date(2015, 1, 1), 2),
+                ("lastfm", "scrobble", datetime.date(2015, 1, 2), 1),
+                ("pinboard", "bookmark", datetime.date(2015, 1, 3), 1),
+            },
+        )
+
+    def test_rebuild_after_account_added(self):
+        "Tweets are counted if their User's Account was added later"
+        user = twitterfactories.UserFactory()
+        twitterfactories.TweetFactory(
+            user=user, post_time=datetime_from_str("2015-01-01 12:00:00")
+        )
+        twitterfactories.AccountFactory(user=user)
+        self.assertEqual(DailyItemCount.objects.count(), 0)
+        DailyItemCount.objects.rebuild()
+        self.assertEqual(DailyItemCount.objects.count(), 1)
+
+
+class DailyItemCountManagerTestCase(TestCase):
+    def setUp(self):
+        account_1 = pinboardfactories.AccountFactory(username="terry")
+        account_2 = pinboardfactories.AccountFactory(username="bob")
+        pinboardfactories.BookmarkFactory.create_batch(
+            2, account=account_1, post_time=datetime_from_str("2015-01-01 12:00:00")
+        )
+        pinboardfactories.BookmarkFactory(
+            account=account_2, post_time=datetime_from_str("2015-01-01 12:00:00")
+        )
+        pinboardfactories.BookmarkFactory(
+            account=account_1, post_time=datetime_from_str("2017-12-31 12:00:00")
+        )
+        lastfmfactories.ScrobbleFactory(
+            post_time=datetime_from_str("2015-01-01 12:00:00")
+        )
+
+    def test_annual_counts(self):
+        "Includes years with no items"
+        self.assertEqual(
+            DailyItemCount.objects.get_annual_counts("pinboard", "bookmark"),
+            [
+                {"year": 2015, "count": 3},
+                {"year": 2016, "count": 0},
+                {"year": 2017, "count": 1},
+            ],
+        )
+
+    def test_annual_counts_for_account(self):
+        self.assertEqual(
+            DailyItemCount.objects.get_annual_counts("pinboard", "bookmark", "bob"),
+            [{"year": 2015, "count": 1}],
+        )
+
+    def test_annual_counts_empty(self):
+        self.assertEqual(
+            DailyItemCount.objects.get_annual_counts("twitter", "tweet"), []
+        )
+
+    def test_daily_counts(self):
+        "Has every day of the year, summing all apps"
+        counts = DailyItemCount.objects.get_daily_counts(2015)
+        self.assertEqual(len(counts), 365)
+        self.assertEqual(counts[0], {"date": datetime.date(2015, 1, 1), "count": 4})
+        self.assertEqual(counts[1], {"date": datetime.date(2015, 1, 2), "count": 0})
+        self.assertEqual(counts[-1]["date"], datetime.date(2015, 12, 31))
+
+    def test_daily_counts_leap_year(self):
+        self.assertEqual(len(DailyItemCount.objects.get_daily_counts(2016)), 366)
+
+    def test_daily_counts_filtered(self):
+        counts = DailyItemCount.objects.get_daily_counts(
+            2015, app_name="pinboard", variety_name="bookmark", account="terry"
+        )
+        self.assertEqual(counts[0]["count"], 2)
+
+    def test_update_days(self):
+        "Only the items on the days being updated are counted."
+        DailyItemCount.objects.all().delete()
+        with CaptureQueriesContext(connection) as queries:
+            DailyItemCount.objects.update_days(
+                "pinboard",
+                "bookmark",
+                [datetime.date(2015, 1, 1), datetime.date(2017, 12, 31)],
+            )
+        self.assertEqual(
+            DailyItemCount.objects.get_annual_counts("pinboard", "bookmark"),
+            [
+                {"year": 2015, "count": 3},
+                {"year": 2016, "count": 0},
+                {"year": 2017, "count": 1},
+            ],
+        )
+        count_sql = next(q["sql"] for q in queries if "COUNT(" in q["sql"])
+        # One range for each day, not one from 2015 to 2017:
+        self.assertIn("2015-01-02", count_sql)
+        self.assertIn("2017-12-31", count_sql)
+
+    def test_day_runs(self):
+        "Consecutive days are grouped together."
+        runs = list(
+            _day_runs(
+                [
+                    datetime.date(2015, 1, 3),
+                    datetime.date(2015, 1, 1),
+                    datetime.date(2015, 1, 2),
+                    datetime.date(2015, 1, 5),
+                ]
+            )
+        )
+        self.assertEqual(
+            runs,
+            [
+                (
+                    datetime_from_str("2015-01-01 00:00:00"),
+                    datetime_from_str("2015-01-04 00:00:00"),
+                ),
+                (
+                    datetime_from_str("2015-01-05 00:00:00"),
+                    datetime_from_str("2015-01-06 00:00:00"),
+                ),
+            ],
+        )
@@ -1,7 +1,23 @@
-from django.core import paginator as django_paginator
-from django.test import TestCase
+import datetime
+from unittest.mock import patch
 
-from ditto.core.paginator import DiggPaginator
+from django.core import paginator as django_paginator
+from django.core.cache import cache
+from django.db import connection
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+
+from ditto.core.paginator import (
+    CachedCount,
+    DiggPaginator,
+    EstimatedCount,
+    KeysetPaginator,
+)
+from ditto.core.utils import datetime_from_str
+from ditto.pinboard.factories import BookmarkFactory
+from ditto.pinboard.models import Bookmark
+from ditto.pinboard.views import HomeView as PinboardHomeView
+from tests.core import override_app_settings
 
 
 class PaginatorTestCase(TestCase):
@@ -159,3 +175,295 @@ class PaginatorTestCase(TestCase):
     def test_padding_sanity_check(self):
         with self.assertRaises(ValueError):
             DiggPaginator(range(1, 1000), 10, body=5, padding=3)
+
+
+class CountProviderTestCase(TestCase):
+    def test_count_provider(self):
+        "Uses the count_provider's count"
+        p = DiggPaginator(range(1, 1000), 10, body=5, count_provider=lambda x: 50)
+        self.assertEqual(p.count, 50)
+        self.assertEqual(p.num_pages, 5)
+
+
+class CachedCountTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        BookmarkFactory.create_batch(3)
+
+    def test_count(self):
+        self.assertEqual(CachedCount()(Bookmark.public_objects.all()), 3)
+
+    def test_caches_count(self):
+        CachedCount()(Bookmark.public_objects.all())
+        with self.assertNumQueries(0):
+            self.assertEqual(CachedCount()(Bookmark.public_objects.all()), 3)
+
+    def test_different_querysets(self):
+        "Different QuerySets have different counts"
+        BookmarkFactory(is_private=True)
+        self.assertEqual(CachedCount()(Bookmark.public_objects.all()), 3)
+        self.assertEqual(CachedCount()(Bookmark.objects.all()), 4)
+
+    def test_invalidated_by_save(self):
+        CachedCount()(Bookmark.public_objects.all())
+        BookmarkFactory()
+        self.assertEqual(CachedCount()(Bookmark.public_objects.all()), 4)
+
+    def test_invalidated_by_delete(self):
+        CachedCount()(Bookmark.public_objects.all())
+        Bookmark.objects.first().delete()
+        self.assertEqual(CachedCount()(Bookmark.public_objects.all()), 2)
+
+    def test_empty_queryset(self):
+        self.assertEqual(CachedCount()(Bookmark.objects.none()), 0)
+
+    def test_list(self):
+        self.assertEqual(CachedCount()([1, 2]), 2)
+
+    def test_paginator(self):
+        p = DiggPaginator(
+            Bookmark.public_objects.all(), 2, body=5, count_provider=CachedCount()
+        )
+        self.assertEqual(p.num_pages, 2)
+
+    @override_app_settings(CORE_COUNT_CACHE_TIMEOUT=60)
+    def test_timeout_setting(self):
+        "The setting is read when counting, not when it's created."
+        self.assertEqual(CachedCount().timeout, 60)
+        self.assertEqual(CachedCount(timeout=5).timeout, 5)
+
+    def test_list_views_use_it(self):
+        "PaginatedListViews only count the items once."
+        view = PinboardHomeView.as_view()
+        factory = RequestFactory()
+        view(factory.get("/pinboard/")).render()
+        with CaptureQueriesContext(connection) as queries:
+            view(factory.get("/pinboard/")).render()
+        self.assertFalse(any("__count" in q["sql"] for q in queries))
+
+
+class EstimatedCountTestCase(TestCase):
+    def setUp(self):
+        BookmarkFactory.create_batch(3)
+
+    @patch.object(EstimatedCount, "_estimate_table_rows")
+    def test_estimate(self, estimate):
+        "Uses the estimate for unfiltered QuerySets"
+        estimate.return_value = 20000
+        self.assertEqual(EstimatedCount()(Bookmark.objects.all()), 20000)
+
+    @patch.object(EstimatedCount, "_estimate_table_rows")
+    def test_filtered(self, estimate):
+        "Counts filtered QuerySets"
+        estimate.return_value = 20000
+        self.assertEqual(EstimatedCount()(Bookmark.public_objects.all()), 3)
+        estimate.assert_not_called()
+
+    @patch.object(EstimatedCount, "_estimate_table_rows")
+    def test_below_threshold(self, estimate):
+        "Counts if the estimate is small"
+        estimate.return_value = 20
+        self.assertEqual(EstimatedCount()(Bookmark.objects.all()), 3)
+
+    def test_unsupported_database(self):
+        "Counts if the database can't provide an estimate (SQLite)"
+        self.assertEqual(EstimatedCount()(Bookmark.objects.all()), 3)
+
+    def test_fallback(self):
+        "Uses the fallback count_provider if it can't estimate"
+        self.assertEqual(
+            EstimatedCount(fallback=lambda x: 99)(Bookmark.objects.all()), 99
+        )
+
+
+class KeysetPaginatorTestCase(TestCase):
+    def setUp(self):
+        # 25 Bookmarks, one per day, and two at the same time as the 10th.
+        start = datetime_from_str("2015-01-01 12:00:00")
+        self.bookmarks = [
+            BookmarkFactory(post_time=start + datetime.timedelta(days=n))
+            for n in range(23)
+        ]
+        self.bookmarks.extend(
+            BookmarkFactory.create_batch(2, post_time=self.bookmarks[9].post_time)
+        )
+        # The order they should be listed in:
+        self.ordered = list(Bookmark.objects.order_by("-post_time", "-pk"))
+        self.paginator = KeysetPaginator(Bookmark.objects.all(), 10)
+
+    def test_first_page(self):
+        p = self.paginator.page(1)
+        self.assertEqual(list(p), self.ordered[:10])
+        self.assertEqual(p.number, 1)
+        self.assertFalse(p.has_previous())
+        self.assertTrue(p.has_next())
+        self.assertEqual(p.page_range, [1, False, "last"])
+
+    def test_next_pages(self):
+        "Following the next pages gets every item once, in order."
+        p = self.paginator.page(1)
+        items = list(p)
+        while p.has_next():
+            p = self.paginator.page(p.next_page_number())
+            items.extend(p)
+        self.assertEqual(items, self.ordered)
+
+    def test_previous_pages(self):
+        "Following the previous pages from the second page gets the first page."
+        p = self.paginator.page(self.paginator.page(1).next_page_number())
+        self.assertEqual(list(p), self.ordered[10:20])
+        self.assertIsNone(p.number)
+        self.assertEqual(p.page_range, [1, False, "last"])
+        p = self.paginator.page(p.previous_page_number())
+        self.assertEqual(list(p), self.ordered[:10])
+        self.assertFalse(p.has_previous())
+
+    def test_last_page(self):
+        p = self.paginator.page("last")
+        self.assertEqual(list(p), self.ordered[-10:])
+        self.assertEqual(p.number, "last")
+        self.assertTrue(p.has_previous())
+        self.assertFalse(p.has_next())
+        self.assertEqual(p.page_range, [1, False, "last"])
+
+    def test_numbered_page(self):
+        "Old-style page numbers still work"
+        p = self.paginator.page(2)
+        self.assertEqual(list(p), self.ordered[10:20])
+        self.assertEqual(p.page_range, [1, False, 2, False, "last"])
+
+    def test_ascending_ordering(self):
+        paginator = KeysetPaginator(Bookmark.objects.order_by("post_time"), 10)
+        p = paginator.page(paginator.page(1).next_page_number())
+        self.assertEqual(list(p), list(reversed(self.ordered))[10:20])
+
+    def test_no_queries_for_count(self):
+        "Doesn't count the items."
+        with self.assertNumQueries(1):
+            self.paginator.page(1)
+
+    def test_invalid_cursor(self):
+        with self.assertRaises(django_paginator.InvalidPage):
+            self.paginator.page("a.nonsense")
+
+    def test_invalid_cursor_softlimit(self):
+        "Returns the first page"
+        p = self.paginator.page("a.nonsense", softlimit=True)
+        self.assertEqual(list(p), self.ordered[:10])
+
+    def test_cursor_for_different_ordering_softlimit(self):
+        "A cursor from a differently-ordered list returns the first page"
+        other = KeysetPaginator(Bookmark.objects.order_by("-pk"), 10)
+        token = other.page(1).next_page_number()
+        p = self.paginator.page(token, softlimit=True)
+        self.assertEqual(list(p), self.ordered[:10])
+
+    def test_too_high_page_number(self):
+        with self.assertRaises(django_paginator.EmptyPage):
+            self.paginator.page(99)
+
+    def test_too_high_page_number_softlimit(self):
+        "Returns the last page"
+        p = self.paginator.page(99, softlimit=True)
+        self.assertEqual(list(p), self.ordered[-10:])
+
+    def test_empty_first_page(self):
+        p = KeysetPaginator(Bookmark.objects.none().order_by("-post_time"), 10).page(1)
+        self.assertEqual(len(p), 0)
+        self.assertFalse(p.has_other_pages())
+
+    def test_unordered_queryset(self):
+        with self.assertRaises(ValueError):
+            KeysetPaginator(Bookmark.objects.order_by(), 10)
+
+    def test_count(self):
+        self.assertEqual(self.paginator.count, 25)
+
+    def test_count_provider(self):
+        paginator = KeysetPaginator(
+            Bookmark.objects.all(), 10, count_provider=lambda x: 99
+        )
+        self.assertEqual(paginator.count, 99)
+
+    def test_count_is_cached(self):
+        cache.clear()
+        self.assertEqual(self.paginator.count, 25)
+        with self.assertNumQueries(0):
+            KeysetPaginator(Bookmark.objects.all(), 10).count  # noqa: B018
+
+    def test_first_page_indexes(self):
+        p = self.paginator.page(1)
+        self.assertEqual(p.start_index(), 1)
+        self.assertEqual(p.end_index(), 10)
+
+    def test_numbered_page_indexes(self):
+        p = self.paginator.page(2)
+        self.assertEqual(p.start_index(), 11)
+        self.assertEqual(p.end_index(), 20)
+
+    def test_last_page_indexes(self):
+        p = self.paginator.page("last")
+        self.assertEqual(p.start_index(), 16)
+        self.assertEqual(p.end_index(), 25)
+
+    def test_cursor_page_indexes(self):
+        "Pages fetched with a cursor don't know their position."
+        p = self.paginator.page(self.paginator.page(1).next_page_number())
+        self.assertIsNone(p.start_index())
+        self.assertIsNone(p.end_index())
+
+    def test_empty_page_indexes(self):
+        p = KeysetPaginator(Bookmark.objects.none().order_by("-post_time"), 10).page(1)
+        self.assertEqual(p.start_index(), 0)
+        self.assertEqual(p.end_index(), 0)
+
+
+class KeysetPaginatedListViewTestCase(TestCase):
+    "Using KeysetPaginator in a PaginatedListView."
+
+    def setUp(self):
+        BookmarkFactory.create_batch(60)
+
+        class KeysetHomeView(PinboardHomeView):
+            paginator_class = KeysetPaginator
+
+        self.view = KeysetHomeView.as_view()
+        self.factory = RequestFactory()
+
+    def test_first_page(self):
+        response = self.view(self.factory.get("/pinboard/"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context_data["bookmark_list"]), 50)
+        self.assertTrue(response.context_data["is_paginated"])
+
+    def test_next_page(self):
+        response = self.view(self.factory.get("/pinboard/"))
+        token = response.context_data["page_obj"].next_page_number()
+        response = self.view(self.factory.get("/pinboard/", {"p": token}))
+        self.assertEqual(len(response.context_data["bookmark_list"]), 10)
+        self.assertFalse(response.context_data["page_obj"].has_next())
+
+    def test_last_page(self):
+        response = self.view(self.factory.get("/pinboard/", {"p": "last"}))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context_data["page_obj"].number, "last")
+
+    def test_renders_links(self):
+        response = self.view(self.factory.get("/pinboard/"))
+        response.render()
+        token = response.context_data["page_obj"].next_page_number()
+        self.assertContains(response, f"?p={token}")
+        self.assertContains(response, "?p=last")
+
+    def test_renders_top_pagination_after_first_page(self):
+        "Pages after the first have pagination above and below the list."
+        response = self.view(self.factory.get("/pinboard/"))
+        token = response.context_data["page_obj"].next_page_number()
+        response = self.view(self.factory.get("/pinboard/", {"p": token}))
+        response.render()
+        self.assertContains(response, '<ul class="pagination">', count=2)
+
+    def test_renders_top_pagination_on_last_page(self):
+        response = self.view(self.factory.get("/pinboard/", {"p": "last"}))
+        response.render()
+        self.assertContains(response, '<ul class="pagination">', count=2)
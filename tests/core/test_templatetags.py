@@ -6,12 +6,15 @@ from freezegun import freeze_time
 
 from ditto.core.apps import Apps
 from ditto.core.templatetags.ditto_core import (
+    daily_item_counts,
     display_time,
     get_enabled_apps,
+    placeholder_style,
     query_string,
     width_height,
 )
-from ditto.core.utils import datetime_now
+from ditto.core.utils import datetime_from_str, datetime_now
+from ditto.pinboard.factories import BookmarkFactory
 
 from . import override_app_settings
 
@@ -37,6 +40,16 @@ class GetEnabledAppsTestCase(TestCase):
         self.assertEqual(enabled_apps[3], "twitter")
 
 
+class DailyItemCountsTestCase(TestCase):
+    def test_counts(self):
+        BookmarkFactory.create_batch(
+            2, post_time=datetime_from_str("2015-01-02 12:00:00")
+        )
+        counts = daily_item_counts(2015, app_name="pinboard")
+        self.assertEqual(len(counts), 365)
+        self.assertEqual(counts[1]["count"], 2)
+
+
 class QueryStringTestCase(TestCase):
     def test_adds_arg(self):
         "It adds your key/value to the existing GET string."
@@ -86,6 +99,24 @@ class WidthHeightTestCase(TestCase):
         self.assertEqual(width_height(250, 300, 200, 200), 'width="167" height="200"')
 
 
+class PlaceholderStyleTestCase(TestCase):
+    def test_placeholder(self):
+        item = Mock(placeholder="data:image/jpeg;base64,abc=", dominant_color="#a1b2c3")
+        self.assertEqual(
+            placeholder_style(item),
+            'style="background: #a1b2c3 url(data:image/jpeg;base64,abc=) '
+            '50% / cover no-repeat"',
+        )
+
+    def test_dominant_color_only(self):
+        item = Mock(placeholder="", dominant_color="#a1b2c3")
+        self.assertEqual(placeholder_style(item), 'style="background-color: #a1b2c3"')
+
+    def test_no_placeholder(self):
+        item = Mock(placeholder="", dominant_color="")
+        self.assertEqual(placeholder_style(item), "")
+
+
 class DisplayTimeTestCase(TestCase):
     @freeze_time("2015-08-14 13:34:56")
     def test_returns_time_with_no_link(self):
@@ -1,12 +1,39 @@
+import base64
+import hashlib
+import os
+import re
+import threading
+import time
 from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
 
 import responses
+from django.core.files.storage import FileSystemStorage
 from django.test import TestCase
 from freezegun import freeze_time
 from requests.exceptions import HTTPError
 
-from ditto.core.utils import datetime_from_str, datetime_now, truncate_string
-from ditto.core.utils.downloader import DownloadException, filedownloader
+from ditto.core import app_settings
+from ditto.core.utils import (
+    bump_content_version,
+    datetime_from_str,
+    datetime_now,
+    get_content_version,
+    truncate_string,
+)
+from ditto.core.utils.downloader import (
+    DownloadedFile,
+    DownloadException,
+    DownloadPool,
+    PartialDownload,
+    filedownloader,
+    get_digests,
+)
+from ditto.core.utils.ratelimit import RateLimiter, get_rate_limiter
+from ditto.pinboard.factories import BookmarkFactory
+from tests.core import override_app_settings
 
 
 class DatetimeNowTestCase(TestCase):
@@ -178,22 +205,45 @@ class FileDownloaderTestCase(TestCase):
 
             return filedownloader.download(self.url, ["image/jpeg"])
 
-    # @responses.activate
-    # @patch.object(filedownloader, 'make_filename')
-    # def test_downloads_file(self, make_filename):
-    # """
-    # Streams a jpg, saves it to /tmp/, returns the path,
-    # calls _make_filename_for_download().
-    # """"
-    # make_filename.return_value = 'marmite.jpg'
+    @responses.activate
+    def test_downloads_file(self):
+        "Streams a jpg into a temporary file and returns a DownloadedFile."
+        with open("tests/core/fixtures/images/marmite.jpg", "rb") as f:
+            content = f.read()
+
+        with self.do_download() as downloaded:
+            self.assertIsInstance(downloaded, DownloadedFile)
+            self.assertEqual(len(responses.calls), 1)
+            self.assertEqual(downloaded.name, "27006033235_caa438b3b8_o.jpg")
+            self.assertEqual(downloaded.content_type, "image/jpeg")
+            self.assertEqual(downloaded.url, self.url)
+            self.assertEqual(downloaded.size, len(content))
+            self.assertGreaterEqual(downloaded.duration, 0)
+            self.assertTrue(os.path.isfile(downloaded.temporary_file_path()))
+            self.assertEqual(downloaded.read(), content)
 
-    # filepath = self.do_download()
+        # Closing it deletes the temporary file:
+        self.assertFalse(os.path.exists(downloaded.temporary_file_path()))
 
-    # self.assertTrue(os.path.isfile(filepath))
-    # self.assertEqual(len(responses.calls), 1)
-    # self.assertEqual(filepath, '/tmp/marmite.jpg')
-    # make_filename.assert_called_once_with(self.url,
-    # {'Content-Type': 'image/jpeg', 'Transfer-Encoding': 'chunked'})
+    @responses.activate
+    def test_reuses_session(self):
+        "All downloads use the same requests Session."
+        self.do_download().close()
+        session = filedownloader.session
+        self.do_download().close()
+        self.assertIs(filedownloader.session, session)
+
+    @responses.activate
+    def test_saving_moves_file(self):
+        "Saving it to the file system moves the temporary file into place."
+        media_root = self.enterContext(TemporaryDirectory())
+        storage = FileSystemStorage(location=media_root)
+        with self.do_download() as downloaded:
+            temp_filepath = downloaded.temporary_file_path()
+            name = storage.save(downloaded.name, downloaded)
+
+        self.assertFalse(os.path.exists(temp_filepath))
+        self.assertEqual(storage.size(name), downloaded.size)
 
     @responses.activate
     def test_raises_error_on_get_failure(self):
@@ -227,3 +277,293 @@ class FileDownloaderTestCase(TestCase):
             {"Content-Disposition": "attachment; filename=26348530105.mov"},
         )
         self.assertEqual(filename, "26348530105.mov")
+
+
+class FlakyFileHandler(BaseHTTPRequestHandler):
+    """
+    Serves the server's content, with support for Range requests, but only
+    sends the first drop_after bytes of each response before closing the
+    connection.
+    """
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append(dict(self.headers))
+
+        start, status = 0, 200
+        m = re.match(r"bytes=(\d+)-$", self.headers.get("Range", ""))
+        if m and self.headers.get("If-Range") in (None, server.etag):
+            start, status = int(m.group(1)), 206
+        body = server.content[start:]
+
+        self.send_response(status)
+        self.send_header("Content-Type", "video/mp4")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Content-Disposition", "attachment; filename=video.mp4")
+        self.send_header("ETag", server.etag)
+        self.send_header("Repr-Digest", server.digest)
+        if status == 206:
+            total = len(server.content)
+            self.send_header("Content-Range", f"bytes {start}-{total - 1}/{total}")
+        self.end_headers()
+
+        if server.drop_after is not None:
+            body = body[: server.drop_after]
+            self.close_connection = True
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class ResumableDownloadTestCase(TestCase):
+    "Downloading from a local server that drops connections part way through."
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), FlakyFileHandler)
+        self.server.requests = []
+        self.server.drop_after = 30000
+        self.set_content(os.urandom(100000), '"v1"')
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+        port = self.server.server_address[1]
+        # Like a Flickr video URL, with no filename:
+        self.url = f"http://127.0.0.1:{port}/photos/bob/123/play/orig/abc/"
+
+        partial_dir = self.enterContext(TemporaryDirectory())
+        self.enterContext(
+            patch.object(app_settings, "CORE_DOWNLOADS_PARTIAL_DIR", partial_dir)
+        )
+
+    def set_content(self, content, etag):
+        self.server.content = content
+        self.server.etag = etag
+        digest = base64.b64encode(hashlib.sha256(content).digest()).decode()
+        self.server.digest = f"sha-256=:{digest}:"
+
+    def download(self):
+        return filedownloader.download(self.url, ["video/mp4"], resume=True)
+
+    def test_resumes_after_dropped_connections(self):
+        with self.download() as downloaded:
+            self.assertEqual(downloaded.read(), self.server.content)
+            self.assertEqual(downloaded.name, "video.mp4")
+            self.assertEqual(downloaded.size, 100000)
+
+        requests = self.server.requests
+        self.assertEqual(len(requests), 4)
+        self.assertNotIn("Range", requests[0])
+        self.assertEqual(requests[1]["Range"], "bytes=30000-")
+        self.assertEqual(requests[1]["If-Range"], '"v1"')
+        self.assertEqual(requests[3]["Range"], "bytes=90000-")
+        # The partial file and its ledger have gone:
+        self.assertFalse(os.path.exists(PartialDownload(self.url).path))
+        self.assertFalse(os.path.exists(PartialDownload(self.url).ledger_path))
+
+    @patch.object(filedownloader, "resume_attempts", 0)
+    def test_resumes_next_time(self):
+        "If it gives up, the next download carries on from there."
+        with self.assertRaises(DownloadException):
+            self.download()
+        partial = PartialDownload(self.url)
+        self.assertEqual(partial.size, 30000)
+        self.assertEqual(partial.info["size"], 100000)
+
+        self.server.drop_after = None
+        with self.download() as downloaded:
+            self.assertEqual(downloaded.read(), self.server.content)
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertEqual(self.server.requests[1]["Range"], "bytes=30000-")
+
+    @patch.object(filedownloader, "resume_attempts", 0)
+    def test_starts_again_if_file_changed(self):
+        "If the file's ETag has changed, the server sends all of the new one."
+        with self.assertRaises(DownloadException):
+            self.download()
+
+        self.set_content(os.urandom(50000), '"v2"')
+        self.server.drop_after = None
+        with self.download() as downloaded:
+            self.assertEqual(downloaded.read(), self.server.content)
+            self.assertEqual(downloaded.size, 50000)
+
+    def test_checksum_mismatch(self):
+        "If the checksum doesn't match, it raises and discards the file."
+        self.server.digest = "sha-256=:" + base64.b64encode(b"x" * 32).decode() + ":"
+        with self.assertRaises(DownloadException):
+            self.download()
+        self.assertFalse(os.path.exists(PartialDownload(self.url).path))
+
+    def test_get_digests(self):
+        digest = base64.b64encode(b"\x01\x02").decode()
+        self.assertEqual(
+            get_digests({"Digest": f"SHA-256={digest}", "Content-MD5": digest}),
+            {"sha256": "0102", "md5": "0102"},
+        )
+        self.assertEqual(
+            get_digests({"Content-MD5": digest}, whole_body=False),
+            {},
+        )
+
+
+class DownloadPoolTestCase(TestCase):
+    def make_jobs(self, urls, func=None):
+        return [
+            (url, func or (lambda url=url: url.upper()), i)
+            for i, url in enumerate(urls)
+        ]
+
+    def test_returns_all_results(self):
+        urls = [f"https://example.com/{i}.jpg" for i in range(10)]
+        results = {
+            data: future.result()
+            for data, future in DownloadPool(workers=4).run(self.make_jobs(urls))
+        }
+        self.assertEqual(results, {i: url.upper() for i, url in enumerate(urls)})
+
+    def test_in_turn_with_one_worker(self):
+        "With one worker, jobs are run in the calling thread, in order"
+        threads = []
+        jobs = self.make_jobs(
+            ["https://a.com/1", "https://a.com/2"],
+            func=lambda: threads.append(threading.current_thread()),
+        )
+        results = [data for data, _ in DownloadPool(workers=1).run(jobs)]
+        self.assertEqual(results, [0, 1])
+        self.assertEqual(threads, [threading.current_thread()] * 2)
+
+    def test_exceptions(self):
+        "Exceptions are raised by future.result()"
+
+        def fail():
+            msg = "Oops"
+            raise DownloadException(msg)
+
+        for workers in (1, 2):
+            jobs = self.make_jobs(["https://a.com/1"], func=fail)
+            [(_, future)] = list(DownloadPool(workers=workers).run(jobs))
+            with self.assertRaises(DownloadException):
+                future.result()
+
+    def test_progress(self):
+        progress = []
+        jobs = self.make_jobs([f"https://a.com/{i}" for i in range(3)])
+        pool = DownloadPool(workers=2, progress=lambda *args: progress.append(args))
+        list(pool.run(jobs))
+        self.assertEqual(progress, [(1, 3), (2, 3), (3, 3)])
+
+    def test_per_host_limit(self):
+        "No more than per_host jobs run at once for one host"
+        lock = threading.Lock()
+        running = {"a.com": 0, "b.com": 0}
+        most = {"a.com": 0, "b.com": 0}
+
+        def job(host):
+            with lock:
+                running[host] += 1
+                most[host] = max(most[host], running[host])
+            time.sleep(0.01)
+            with lock:
+                running[host] -= 1
+
+        jobs = [
+            (f"https://{host}/{i}", lambda host=host: job(host), i)
+            for i in range(6)
+            for host in ("a.com", "b.com")
+        ]
+        list(DownloadPool(workers=6, per_host=2).run(jobs))
+        self.assertEqual(most, {"a.com": 2, "b.com": 2})
+
+
+class RateLimiterTestCase(TestCase):
+    def setUp(self):
+        # A clock that only moves when we sleep:
+        self.now = 1000.0
+        self.sleeps = []
+
+        def sleep(seconds):
+            self.sleeps.append(seconds)
+            self.now += seconds
+
+        self.enterContext(patch("time.monotonic", lambda: self.now))
+        self.enterContext(patch("time.sleep", sleep))
+
+    def test_burst(self):
+        "Up to burst calls can be made without waiting."
+        limiter = RateLimiter(2, burst=3)
+        self.assertEqual([limiter.wait() for _ in range(3)], [0, 0, 0])
+        self.assertEqual(limiter.wait(), 0.5)
+        self.assertEqual(self.sleeps, [0.5])
+
+    def test_rate(self):
+        "After the burst, calls are spaced out at the rate."
+        limiter = RateLimiter(4)
+        for _ in range(5):
+            limiter.wait()
+        self.assertEqual(self.sleeps, [0.25, 0.25, 0.25, 0.25])
+
+    def test_slow_requests(self):
+        "Time spent making requests counts towards the wait."
+        limiter = RateLimiter(2)
+        limiter.wait()
+        self.now += 0.4  # A slow request.
+        self.assertAlmostEqual(limiter.wait(), 0.1)
+        self.now += 1  # A very slow request.
+        self.assertEqual(limiter.wait(), 0)
+
+    def test_no_limit(self):
+        limiter = RateLimiter(None)
+        self.assertEqual([limiter.wait() for _ in range(10)], [0] * 10)
+        self.assertEqual(self.sleeps, [])
+
+    def test_shared_by_threads(self):
+        "Threads reserve their turns, rather than all waiting for the same one."
+        # So that the clock doesn't move while they wait:
+        self.enterContext(patch("time.sleep"))
+        limiter = RateLimiter(2)
+        waits = []
+        threads = [
+            threading.Thread(target=lambda: waits.append(limiter.wait()))
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sorted(waits), [0, 0.5, 1.0, 1.5])
+
+
+class GetRateLimiterTestCase(TestCase):
+    @override_app_settings(
+        CORE_RATE_LIMITS={"flickr": {"per_second": 1, "burst": 5}, "lastfm": None}
+    )
+    def test_get_rate_limiter(self):
+        limiter = get_rate_limiter("flickr")
+        self.assertEqual((limiter.rate, limiter.burst), (1, 5))
+        self.assertIs(get_rate_limiter("flickr"), limiter)
+        self.assertIsNone(get_rate_limiter("lastfm").rate)
+        self.assertIsNone(get_rate_limiter("unknown").rate)
+
+
+class ContentVersionTestCase(TestCase):
+    def test_get_content_version(self):
+        "Returns the same version each time"
+        self.assertEqual(
+            get_content_version("pinboard"), get_content_version("pinboard")
+        )
+
+    def test_bump_content_version(self):
+        version = get_content_version("pinboard")
+        bump_content_version("pinboard")
+        self.assertNotEqual(get_content_version("pinboard"), version)
+
+    def test_bumped_on_save(self):
+        "Saving a model in a Ditto app bumps that app's version"
+        pinboard_version = get_content_version("pinboard")
+        twitter_version = get_content_version("twitter")
+        BookmarkFactory()
+        self.assertNotEqual(get_content_version("pinboard"), pinboard_version)
+        self.assertEqual(get_content_version("twitter"), twitter_version)
@@ -2,14 +2,17 @@ import datetime
 from unittest.mock import patch
 
 from django.apps import apps
-from django.test import TestCase
+from django.contrib.auth.models import User
+from django.test import RequestFactory, TestCase
 from django.urls import reverse
 
 from ditto.core.utils import datetime_from_str
 from ditto.flickr import factories as flickrfactories
+from ditto.flickr.views import PhotoFileView
 from ditto.lastfm import factories as lastfmfactories
 from ditto.pinboard import factories as pinboardfactories
 from ditto.twitter import factories as twitterfactories
+from tests.core import assert_raw_not_loaded, override_app_settings
 
 
 class DittoViewTests(TestCase):
@@ -20,6 +23,19 @@ class DittoViewTests(TestCase):
         self.assertTemplateUsed(response, "ditto/home.html")
         self.assertTemplateUsed(response, "ditto/base.html")
 
+    def test_home_defers_raw(self):
+        "No items' raw JSON should be loaded to list them."
+        flickr_account = flickrfactories.AccountFactory()
+        flickrfactories.PhotoFactory.create_batch(2, user=flickr_account.user)
+        lastfmfactories.ScrobbleFactory.create_batch(2)
+        pinboardfactories.BookmarkFactory.create_batch(2)
+        twitter_account = twitterfactories.AccountFactory()
+        twitterfactories.TweetFactory.create_batch(2, user=twitter_account.user)
+        with assert_raw_not_loaded():
+            response = self.client.get(reverse("ditto:home"))
+        # 2 photos, 2 bookmarks, 2 tweets:
+        self.assertEqual(len(response.context["object_list"]), 6)
+
     def test_home_context(self):
         flickr_accounts = flickrfactories.AccountFactory.create_batch(2)
         flickrfactories.PhotoFactory.create_batch(2, user=flickr_accounts[0].user)
@@ -42,8 +58,9 @@ class DittoViewTests(TestCase):
 
     def test_home_privacy_flickr(self):
         "Overall home page does not display private Photos"
-        public_photo = flickrfactories.PhotoFactory(is_private=False)
-        flickrfactories.PhotoFactory(is_private=True)
+        user = flickrfactories.AccountFactory().user
+        public_photo = flickrfactories.PhotoFactory(user=user, is_private=False)
+        flickrfactories.PhotoFactory(user=user, is_private=True)
         response = self.client.get(reverse("ditto:home"))
 
         self.assertEqual(len(response.context["object_list"]), 1)
@@ -77,6 +94,33 @@ class DittoViewTests(TestCase):
         self.assertEqual(tweets[0].pk, public_tweet_2.pk)
         self.assertEqual(tweets[1].pk, public_tweet_1.pk)
 
+    def test_home_excludes_replies(self):
+        "Overall home page does not display Tweets that are replies"
+        account = twitterfactories.AccountFactory()
+        tweet = twitterfactories.TweetFactory(user=account.user)
+        twitterfactories.TweetFactory(user=account.user, in_reply_to_screen_name="bob")
+        response = self.client.get(reverse("ditto:home"))
+
+        self.assertEqual(len(response.context["object_list"]), 1)
+        self.assertEqual(response.context["object_list"][0].pk, tweet.pk)
+
+    def test_home_ordering(self):
+        "Items from all apps are in reverse chronological order"
+        photo = flickrfactories.PhotoFactory(
+            user=flickrfactories.AccountFactory().user,
+            post_time=datetime_from_str("2015-01-01 12:00:00"),
+        )
+        bookmark = pinboardfactories.BookmarkFactory(
+            post_time=datetime_from_str("2015-01-03 12:00:00")
+        )
+        account = twitterfactories.AccountFactory()
+        tweet = twitterfactories.TweetFactory(
+            user=account.user, post_time=datetime_from_str("2015-01-02 12:00:00")
+        )
+        response = self.client.get(reverse("ditto:home"))
+
+        self.assertEqual(response.context["object_list"], [bookmark, tweet, photo])
+
     def test_home_no_flickr(self):
         "Shouldn't try to get photos if flickr app isn't installed"
         with patch.object(apps, "is_installed") as mock_method:
@@ -184,6 +228,33 @@ class DittoViewTests(TestCase):
     # self.assertEqual(response.context['bookmark_list'][0].pk, bookmark_2.pk)
 
 
+class DailyCountsViewTestCase(TestCase):
+    def setUp(self):
+        pinboardfactories.BookmarkFactory.create_batch(
+            2, post_time=datetime_from_str("2015-01-02 12:00:00")
+        )
+        lastfmfactories.ScrobbleFactory(
+            post_time=datetime_from_str("2015-01-02 12:00:00")
+        )
+        self.url = reverse("ditto:daily_counts", kwargs={"year": "2015"})
+
+    def test_response(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["year"], 2015)
+        self.assertEqual(len(data["counts"]), 365)
+        self.assertEqual(data["counts"][1], {"date": "2015-01-02", "count": 3})
+
+    def test_response_for_app(self):
+        response = self.client.get(self.url, {"app": "pinboard", "variety": "bookmark"})
+        self.assertEqual(response.json()["counts"][1]["count"], 2)
+
+    def test_invalid_app(self):
+        response = self.client.get(self.url, {"app": "nope"})
+        self.assertEqual(response.status_code, 404)
+
+
 class DittoDayArchiveTestCase(TestCase):
     def setUp(self):
         self.today = datetime_from_str("2015-11-10 12:00:00")
@@ -274,6 +345,37 @@ class DittoDayArchiveTestCase(TestCase):
         self.assertEqual(response.context["next_day"], self.tomorrow.date())
         self.assertTrue("variety_counts" in response.context)
 
+    def test_day_variety_counts(self):
+        response = self.client.get(self.make_url("pinboard", "bookmarks"))
+        counts = {
+            (c["app_name"], c["variety_name"]): c["count"]
+            for c in response.context["variety_counts"]
+        }
+        self.assertEqual(
+            counts,
+            {
+                ("flickr", "photo-uploaded"): 1,
+                ("flickr", "photo-taken"): 0,
+                ("lastfm", "scrobble"): 1,
+                ("pinboard", "bookmark"): 1,
+                ("twitter", "tweet"): 1,
+                ("twitter", "favorite"): 1,
+            },
+        )
+
+    def test_day_variety_counts_privacy(self):
+        "Private items aren't counted"
+        self.bookmark_1.is_private = True
+        self.bookmark_1.save()
+        response = self.client.get(self.make_url("pinboard", "bookmarks"))
+        bookmark_count = [
+            c
+            for c in response.context["variety_counts"]
+            if c["variety_name"] == "bookmark"
+        ][0]
+        self.assertEqual(bookmark_count["count"], 0)
+        self.assertTrue(bookmark_count["is_active"])
+
     def test_day_context_flickr_photos_uploaded(self):
         response = self.client.get(self.make_url("flickr", "photos"))
         self.assertTrue("date_field" in response.context)
@@ -350,3 +452,56 @@ class DittoDayArchiveTestCase(TestCase):
         self.favorite_1.user.save()
         response = self.client.get(self.make_url("twitter", "likes"))
         self.assertEqual(0, len(response.context["twitter_favorite_list"]))
+
+
+class ProtectedFileViewTestCase(TestCase):
+    "Using the Flickr PhotoFileView to test how files are sent."
+
+    def setUp(self):
+        self.photo = flickrfactories.PhotoFactory()
+        self.url = reverse(
+            "flickr:photo_original_file",
+            kwargs={"nsid": self.photo.user.nsid, "flickr_id": self.photo.flickr_id},
+        )
+
+    @override_app_settings(CORE_SENDFILE_HEADER=None)
+    def test_sends_file(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "image/jpeg")
+        self.assertEqual(
+            b"".join(response.streaming_content), self.photo.original_file.read()
+        )
+
+    @override_app_settings(
+        CORE_SENDFILE_HEADER="X-Accel-Redirect",
+        CORE_SENDFILE_ACCEL_PREFIX="/protected/",
+    )
+    def test_x_accel_redirect(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response["X-Accel-Redirect"], f"/protected/{self.photo.original_file.name}"
+        )
+        self.assertEqual(response["Content-Type"], "image/jpeg")
+        self.assertEqual(response.content, b"")
+
+    @override_app_settings(CORE_SENDFILE_HEADER="X-Sendfile")
+    def test_x_sendfile(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["X-Sendfile"], self.photo.original_file.path)
+        self.assertEqual(response.content, b"")
+
+    @override_app_settings(CORE_SENDFILE_HEADER="X-Sendfile")
+    def test_private_file(self):
+        "Private files should be sent to users with permission, uncached."
+        self.photo.is_private = True
+        self.photo.save()
+        request = RequestFactory().get(self.url)
+        request.user = User.objects.create_superuser("bob", "bob@example.com", "pw")
+        response = PhotoFileView.as_view(field_name="original_file")(
+            request, nsid=self.photo.user.nsid, flickr_id=self.photo.flickr_id
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("private", response["Cache-Control"])
@@ -48,6 +48,7 @@ class FlickrFetchTestCase(TestCase):
         "photos.getInfo": "photos_getinfo.json",
         "photos.getSizes": "photos_getsizes.json",
         "photos.getExif": "photos_getexif.json",
+        "photos.recentlyUpdated": "photos_recentlyupdated.json",
         "test.login": "test_login.json",
         # Variation including video sizes:
         "photos.getSizes_video": "photos_getsizes_video.json",
@@ -167,10 +168,17 @@ class FlickrFetchTestCase(TestCase):
                 "min_upload_date": "946684800",
                 "page": "1",
                 "per_page": "500",
+                "extras": "last_update,views",
             },
             "photos.getInfo": {"photo_id": "26069027966"},
             "photos.getSizes": {"photo_id": "26069027966"},
             "photos.getExif": {"photo_id": "26069027966"},
+            "photos.recentlyUpdated": {
+                "min_date": "946684800",
+                "page": "1",
+                "per_page": "500",
+                "extras": "last_update,views",
+            },
             "photosets.getList": {
                 "user_id": "35034346050@N01",
                 "page": "1",
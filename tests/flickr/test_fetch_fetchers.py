@@ -1,25 +1,29 @@
 import json
-import os
-from datetime import datetime, timezone
-from tempfile import NamedTemporaryFile, TemporaryDirectory
+import threading
+from datetime import datetime, timedelta, timezone
+from tempfile import TemporaryDirectory
 from unittest.mock import call, patch
 
 from freezegun import freeze_time
 
 from ditto.core.utils import datetime_now
 from ditto.core.utils.downloader import filedownloader
-from ditto.flickr.factories import AccountFactory, UserFactory
+from ditto.core.utils.ratelimit import RateLimiter
+from ditto.flickr import app_settings
+from ditto.flickr.factories import AccountFactory, PhotoFactory, UserFactory
 from ditto.flickr.fetch import FetchError
 from ditto.flickr.fetch.fetchers import (
     Fetcher,
     PhotosetsFetcher,
     PhotosFetcher,
     RecentPhotosFetcher,
+    UpdatedPhotosFetcher,
     UserFetcher,
     UserIdFetcher,
 )
 from ditto.flickr.fetch.savers import PhotoSaver, PhotosetSaver, UserSaver
-from ditto.flickr.models import User
+from ditto.flickr.models import Photo, User
+from tests.core import make_downloaded_file
 
 from .test_fetch import FlickrFetchTestCase
 
@@ -117,6 +121,12 @@ class UserIdFetcherTestCase(FlickrFetchTestCase):
         self.assertFalse(result["success"])
         self.assertIn("messages", result)
 
+    @patch.object(RateLimiter, "wait")
+    def test_waits_for_rate_limiter(self, wait):
+        self.expect_response("test.login")
+        UserIdFetcher(account=self.account).fetch()
+        wait.assert_called_once_with()
+
     def test_returns_id(self):
         self.expect_response("test.login")
         result = UserIdFetcher(account=self.account).fetch()
@@ -168,10 +178,7 @@ class UserFetcherTestCase(FlickrFetchTestCase):
     def test_downloads_and_saves_avatar(self, download):
         "Should call download() and save avatar when fetching user."
         with self.settings(MEDIA_ROOT=self.enterContext(TemporaryDirectory())):
-            # Make a temporary file, like download() would make:
-            temp_file = self.enterContext(NamedTemporaryFile(mode="rb", suffix="jpg"))
-            temp_filepath = temp_file.name
-            download.return_value = temp_filepath
+            download.return_value = make_downloaded_file("avatar.jpg")
 
             self.expect_response("people.getInfo")
             UserFetcher(account=self.account).fetch(nsid="35034346050@N01")
@@ -183,8 +190,33 @@ class UserFetcherTestCase(FlickrFetchTestCase):
                 ["image/jpeg", "image/jpg", "image/png", "image/gif"],
             )
 
-            path = os.path.basename(temp_filepath)
-            self.assertEqual(user.avatar, f"flickr/60/50/35034346050N01/avatars/{path}")
+            self.assertEqual(
+                user.avatar, "flickr/60/50/35034346050N01/avatars/avatar.jpg"
+            )
+
+    @patch.object(UserFetcher, "_fetch_and_save_avatar")
+    def test_doesnt_download_unchanged_avatar(self, fetch_avatar):
+        "If the user's icon hasn't changed since last time, it's not fetched."
+        UserFactory(nsid="35034346050@N01", iconserver=7420, iconfarm=8)
+        self.expect_response("people.getInfo")
+        UserFetcher(account=self.account).fetch(nsid="35034346050@N01")
+        self.assertFalse(fetch_avatar.called)
+
+    @patch.object(UserFetcher, "_fetch_and_save_avatar")
+    def test_downloads_changed_avatar(self, fetch_avatar):
+        "If the user's icon has changed since last time, it's fetched."
+        UserFactory(nsid="35034346050@N01", iconserver=1234, iconfarm=8)
+        self.expect_response("people.getInfo")
+        UserFetcher(account=self.account).fetch(nsid="35034346050@N01")
+        fetch_avatar.assert_called_once()
+
+    @patch.object(UserFetcher, "_fetch_and_save_avatar")
+    def test_downloads_missing_avatar(self, fetch_avatar):
+        "If we don't have the user's avatar file, it's fetched."
+        UserFactory(nsid="35034346050@N01", iconserver=7420, iconfarm=8, avatar="")
+        self.expect_response("people.getInfo")
+        UserFetcher(account=self.account).fetch(nsid="35034346050@N01")
+        fetch_avatar.assert_called_once()
 
     def test_returns_correct_success_result(self):
         self.expect_response("people.getInfo")
@@ -254,13 +286,135 @@ class PhotosFetcherTestCase(FlickrFetchTestCase):
         fetch_photo_sizes.assert_has_calls(calls)
         fetch_photo_exif.assert_has_calls(calls)
 
+    @patch.object(PhotosFetcher, "_fetch_photo_info")
+    @patch.object(PhotosFetcher, "_fetch_photo_sizes")
+    @patch.object(PhotosFetcher, "_fetch_photo_exif")
+    def test_skips_unchanged_photos(
+        self, fetch_photo_exif, fetch_photo_sizes, fetch_photo_info
+    ):
+        "It shouldn't fetch extra data for photos unchanged since last time."
+        # The same lastupdate as in the fixture:
+        PhotoFactory(
+            flickr_id=25822158530,
+            last_update_time=datetime.fromtimestamp(1459776071, tz=timezone.utc),
+        )
+        # Updated on Flickr since we fetched it:
+        PhotoFactory(
+            flickr_id=26069027966,
+            last_update_time=datetime.fromtimestamp(1459000000, tz=timezone.utc),
+        )
+        self.expect_response("people.getInfo")
+        self.fetcher.results = self.load_fixture("people.getPhotos")["photos"]["photo"]
+        self.fetcher._fetch_extra()
+        calls = [call("26069027966"), call("25822102530")]
+        fetch_photo_info.assert_has_calls(calls)
+        self.assertEqual(fetch_photo_info.call_count, 2)
+        self.assertEqual(
+            [photo["info"] for photo in self.fetcher.results],
+            [fetch_photo_info.return_value] * 2,
+        )
+
+    def test_skipping_unchanged_photos_updates_view_counts(self):
+        PhotoFactory(
+            flickr_id=25822158530,
+            last_update_time=datetime.fromtimestamp(1459776071, tz=timezone.utc),
+            view_count=20,
+        )
+        self.fetcher.results = self.load_fixture("people.getPhotos")["photos"]["photo"]
+        self.fetcher._skip_unchanged_photos()
+        self.assertEqual(Photo.objects.get(flickr_id=25822158530).view_count, 55)
+        self.assertEqual(
+            [photo["id"] for photo in self.fetcher.results],
+            ["26069027966", "25822102530"],
+        )
+
+    def test_doesnt_skip_photos_without_lastupdate(self):
+        "If the list of photos came without lastupdates, nothing is skipped."
+        PhotoFactory(
+            flickr_id=25822158530,
+            last_update_time=datetime.fromtimestamp(1459776071, tz=timezone.utc),
+        )
+        results = self.load_fixture("people.getPhotos")["photos"]["photo"]
+        for photo in results:
+            del photo["lastupdate"]
+        self.fetcher.results = results
+        self.fetcher._skip_unchanged_photos()
+        self.assertEqual(len(self.fetcher.results), 3)
+
+    @patch.object(PhotoSaver, "save_photo")
+    @patch.object(PhotosFetcher, "_fetch_photo_data")
+    def test_fetches_extra_photo_data_concurrently(self, fetch_photo_data, save_photo):
+        """With several workers, the data is fetched in other threads, and each
+        photo is saved, in this thread, as soon as its data arrives."""
+        info = self.load_fixture("photos.getInfo")["photo"]
+        fetch_threads = []
+        save_threads = []
+
+        def fetch(photo_id):
+            fetch_threads.append(threading.current_thread())
+            return {"info": {**info, "id": photo_id}, "sizes": {}, "exif": {}}
+
+        fetch_photo_data.side_effect = fetch
+        save_photo.side_effect = lambda photo: save_threads.append(
+            threading.current_thread()
+        )
+
+        user = UserFactory(nsid="35034346050@N01")
+        self.fetcher.fetched_users = {
+            "12345678901@N01": UserFactory(),
+            "35034346050@N01": user,
+        }
+        self.fetcher.workers = 3
+        self.fetcher.results = self.load_fixture("people.getPhotos")["photos"]["photo"]
+        self.fetcher._fetch_extra()
+
+        self.assertEqual(
+            {c.args[0]["info"]["id"] for c in save_photo.call_args_list},
+            {"25822158530", "26069027966", "25822102530"},
+        )
+        self.assertEqual(save_photo.call_args_list[0].args[0]["user_obj"], user)
+        self.assertNotIn(threading.current_thread(), fetch_threads)
+        self.assertEqual(save_threads, [threading.current_thread()] * 3)
+        self.assertEqual(self.fetcher.results_count, 3)
+        # There's nothing left for _save_results() to save:
+        self.assertEqual(self.fetcher.results, [])
+
+    @patch.object(PhotosFetcher, "_fetch_photo_data")
+    def test_fetches_extra_photo_data_concurrently_error(self, fetch_photo_data):
+        fetch_photo_data.side_effect = FetchError("Oh dear")
+        self.fetcher.workers = 3
+        self.fetcher.results = self.load_fixture("people.getPhotos")["photos"]["photo"]
+        with self.assertRaises(FetchError):
+            self.fetcher._fetch_extra()
+
+    @patch.object(PhotosFetcher, "_fetch_photo_info")
+    @patch.object(PhotosFetcher, "_fetch_photo_sizes")
+    @patch.object(PhotosFetcher, "_fetch_photo_exif")
+    def test_fetch_photo_data(
+        self, fetch_photo_exif, fetch_photo_sizes, fetch_photo_info
+    ):
+        "It only calls the API, leaving tag authors to be fetched later."
+        data = self.fetcher._fetch_photo_data("26069027966")
+        fetch_photo_info.assert_called_once_with("26069027966", fetch_tag_authors=False)
+        self.assertEqual(
+            data,
+            {
+                "info": fetch_photo_info.return_value,
+                "sizes": fetch_photo_sizes.return_value,
+                "exif": fetch_photo_exif.return_value,
+            },
+        )
+
     @freeze_time("2015-08-14 12:00:00", tz_offset=-8)
     @patch.object(UserFetcher, "_fetch_and_save_avatar")
     @patch.object(UserSaver, "save_user")
     def test_fetch_user_if_missing_fetches(self, save_user, fetch_avatar):
         """If the user isn't in fetched_users, it is fetched and saved."""
 
-        save_user.return_value = UserFactory.create(nsid="35034346050@N01")
+        # Fetched longer ago than FLICKR_USER_CACHE_TTL:
+        save_user.return_value = UserFactory.create(
+            nsid="35034346050@N01", fetch_time=datetime_now() - timedelta(days=30)
+        )
 
         self.expect_response("people.getInfo")
         user_data = self.load_fixture("people.getInfo")["person"]
@@ -281,6 +435,36 @@ class PhotosFetcherTestCase(FlickrFetchTestCase):
         self.fetcher._fetch_user_if_missing("35034346050@N01")
         self.assertFalse(save_user.called)
 
+    @patch.object(UserSaver, "save_user")
+    def test_fetch_user_if_missing_uses_recently_fetched_user(self, save_user):
+        "If the user was fetched within FLICKR_USER_CACHE_TTL it's not fetched."
+        user = UserFactory(nsid="35034346050@N01", fetch_time=datetime_now())
+        self.fetcher._fetch_user_if_missing("35034346050@N01")
+        self.assertFalse(save_user.called)
+        self.assertEqual(self.fetcher.fetched_users, {"35034346050@N01": user})
+
+    @patch.object(UserFetcher, "_fetch_and_save_avatar")
+    def test_fetch_user_if_missing_with_no_ttl(self, fetch_avatar):
+        "If FLICKR_USER_CACHE_TTL is 0, users are always fetched."
+        UserFactory(nsid="35034346050@N01", fetch_time=datetime_now())
+        self.expect_response("people.getInfo")
+        with patch.object(app_settings, "FLICKR_USER_CACHE_TTL", 0):
+            self.fetcher._fetch_user_if_missing("35034346050@N01")
+
+    @patch.object(PhotosFetcher, "_fetch_photo_info")
+    @patch.object(PhotosFetcher, "_fetch_photo_sizes")
+    @patch.object(PhotosFetcher, "_fetch_photo_exif")
+    def test_fetch_extra_uses_recently_fetched_owners(
+        self, fetch_photo_exif, fetch_photo_sizes, fetch_photo_info
+    ):
+        "Recently fetched owners are got from the DB in one query."
+        user = UserFactory(nsid="35034346050@N01", fetch_time=datetime_now())
+        self.fetcher.results = self.load_fixture("people.getPhotos")["photos"]["photo"]
+        # Checking for unchanged photos, and getting the owner:
+        with self.assertNumQueries(2):
+            self.fetcher._fetch_extra()
+        self.assertEqual(self.fetcher.results[0]["user_obj"], user)
+
     def test_fetch_user_if_missing_raises_error(self):
         "If there was an error fetching the user's Info"
         self.expect_response(
@@ -394,8 +578,8 @@ class RecentPhotosFetcherTestCase(FlickrFetchTestCase):
             self.fetcher._call_api()
 
     @patch.object(PhotosFetcher, "_fetch_extra")
-    @patch.object(PhotoSaver, "save_photo")
-    def test_fetches_multiple_pages(self, save_photo, fetch_extra):
+    @patch.object(PhotoSaver, "save_photos")
+    def test_fetches_multiple_pages(self, save_photos, fetch_extra):
         """If the response from the API says there's more than 1 page of
         results _fetch_pages() should fetch them all."""
         # Alter our default response fixture to set the number of pages to 3:
@@ -413,6 +597,11 @@ class RecentPhotosFetcherTestCase(FlickrFetchTestCase):
             # Our fixture has 3 photos, so we should now have 9:
             self.assertEqual(results["fetched"], 9)
 
+    @patch.object(PhotosFetcher, "_fetch_pages")
+    def test_sets_workers(self, fetch_pages):
+        self.fetcher.fetch(days=3, workers=4)
+        self.assertEqual(self.fetcher.workers, 4)
+
     @patch.object(PhotosFetcher, "_fetch_pages")
     def test_calls_fetch_pages(self, fetch_pages):
         """Check that it uses the _fetch_pages() method we tested above,
@@ -422,9 +611,9 @@ class RecentPhotosFetcherTestCase(FlickrFetchTestCase):
         fetch_pages.assert_called_once_with()
 
     @freeze_time("2015-08-14 12:00:00", tz_offset=-8)
-    @patch.object(PhotoSaver, "save_photo")
+    @patch.object(PhotoSaver, "save_photos")
     @patch.object(PhotosFetcher, "_fetch_extra")
-    def test_fetches_recent_days(self, save_photo, fetch_extra):
+    def test_fetches_recent_days(self, save_photos, fetch_extra):
         "Should only ask for photos from recent days, if number of days is set."
         self.expect_response(
             "people.getPhotos", params={"min_upload_date": "1439265600"}
@@ -434,23 +623,119 @@ class RecentPhotosFetcherTestCase(FlickrFetchTestCase):
             self.fetcher.fetch(days=3)
 
     @freeze_time("2015-08-14 12:00:00", tz_offset=-8)
-    @patch.object(PhotoSaver, "save_photo")
+    @patch.object(PhotoSaver, "save_photos")
     @patch.object(PhotosFetcher, "_fetch_photo_info")
     @patch.object(PhotosFetcher, "_fetch_photo_sizes")
     @patch.object(PhotosFetcher, "_fetch_photo_exif")
     def test_saves_photos(
-        self, fetch_photo_info, fetch_photo_sizes, fetch_photo_exif, save_photo
+        self, fetch_photo_info, fetch_photo_sizes, fetch_photo_exif, save_photos
     ):
-        """It should call save_photos() for each photo it fetches."""
+        """It should call save_photos() with all the photos it fetches."""
+        # The owner, the Account's user, was fetched recently enough that
+        # it's not fetched again:
         self.expect_response("people.getPhotos")
-        self.expect_response("people.getInfo")
         with patch("time.sleep"):
             results = self.fetcher.fetch(days="all")
-            self.assertEqual(save_photo.call_count, 3)
+            save_photos.assert_called_once()
+            self.assertEqual(len(save_photos.call_args.args[0]), 3)
             self.assertTrue(results["success"])
             self.assertEqual(results["fetched"], 3)
 
 
+class UpdatedPhotosFetcherTestCase(FlickrFetchTestCase):
+    def setUp(self):
+        super().setUp()
+        self.account = AccountFactory(
+            api_key="1234", api_secret="9876", user=UserFactory(nsid="35034346050@N01")
+        )
+        self.fetcher = UpdatedPhotosFetcher(account=self.account)
+
+    def test_inherits_from_fetcher(self):
+        self.assertTrue(issubclass(UpdatedPhotosFetcher, PhotosFetcher))
+
+    def test_call_api_error(self):
+        "_call_api() should throw an error if there's an API error."
+        self.expect_response(
+            "photos.recentlyUpdated",
+            body='{"stat": "fail", "code": 1, "message": "Required arguments missing"}',
+        )
+
+        with self.assertRaises(FetchError):
+            self.fetcher._call_api()
+
+    @patch.object(PhotosFetcher, "_fetch_extra")
+    @patch.object(PhotoSaver, "save_photos")
+    def test_fetches_multiple_pages(self, save_photos, fetch_extra):
+        body = self.load_fixture("photos.recentlyUpdated")
+        body["photos"]["pages"] = 2
+        body = json.dumps(body)
+        self.expect_response("photos.recentlyUpdated", body=body)
+        self.expect_response("photos.recentlyUpdated", body=body, params={"page": "2"})
+        results = self.fetcher.fetch()
+        self.assertEqual(results["fetched"], 4)
+
+    @patch.object(PhotosFetcher, "_fetch_extra")
+    @patch.object(PhotoSaver, "save_photos")
+    def test_fetches_since_photos_updated_time(self, save_photos, fetch_extra):
+        "It should only ask for photos updated since the Account's time."
+        self.account.photos_updated_time = datetime(
+            2016, 4, 1, 12, 0, 0, tzinfo=timezone.utc
+        )
+        self.account.save()
+        self.expect_response(
+            "photos.recentlyUpdated", params={"min_date": "1459512000"}
+        )
+        UpdatedPhotosFetcher(account=self.account).fetch()
+
+    @patch.object(PhotosFetcher, "_fetch_extra")
+    @patch.object(PhotoSaver, "save_photos")
+    def test_sets_photos_updated_time(self, save_photos, fetch_extra):
+        "The Account's time should be the latest lastupdate in the results."
+        self.expect_response("photos.recentlyUpdated")
+        results = self.fetcher.fetch()
+        self.assertTrue(results["success"])
+        self.account.refresh_from_db()
+        self.assertEqual(
+            self.account.photos_updated_time,
+            datetime.fromtimestamp(1459810231, tz=timezone.utc),
+        )
+
+    @patch.object(PhotosFetcher, "_fetch_extra")
+    def test_doesnt_set_photos_updated_time_on_failure(self, fetch_extra):
+        "If anything failed, we should fetch the same photos next time."
+        fetch_extra.side_effect = FetchError("Oh dear")
+        self.expect_response("photos.recentlyUpdated")
+        results = self.fetcher.fetch()
+        self.assertFalse(results["success"])
+        self.account.refresh_from_db()
+        self.assertIsNone(self.account.photos_updated_time)
+
+    @patch.object(PhotosFetcher, "_fetch_pages")
+    def test_sets_workers(self, fetch_pages):
+        self.fetcher.fetch(workers=4)
+        self.assertEqual(self.fetcher.workers, 4)
+
+    @patch.object(PhotoSaver, "save_photos")
+    @patch.object(PhotosFetcher, "_fetch_photo_info")
+    @patch.object(PhotosFetcher, "_fetch_photo_sizes")
+    @patch.object(PhotosFetcher, "_fetch_photo_exif")
+    def test_saves_changed_photos(
+        self, fetch_photo_exif, fetch_photo_sizes, fetch_photo_info, save_photos
+    ):
+        "It should save the photos that have changed since we fetched them."
+        # We've already fetched this one since it was changed:
+        PhotoFactory(
+            flickr_id=25822158530,
+            last_update_time=datetime.fromtimestamp(1459776071, tz=timezone.utc),
+        )
+        self.expect_response("photos.recentlyUpdated")
+        results = self.fetcher.fetch()
+        fetch_photo_info.assert_called_once_with("26069027966")
+        save_photos.assert_called_once()
+        self.assertEqual(len(save_photos.call_args.args[0]), 1)
+        self.assertEqual(results["fetched"], 1)
+
+
 class PhotosetsFetcherTestCase(FlickrFetchTestCase):
     def setUp(self):
         super().setUp()
@@ -529,14 +814,15 @@ class PhotosetsFetcherTestCase(FlickrFetchTestCase):
             self.fetcher.fetch()
 
     @freeze_time("2015-08-14 12:00:00", tz_offset=-8)
-    @patch.object(PhotosetSaver, "save_photoset")
+    @patch.object(PhotosetSaver, "save_photosets")
     @patch.object(PhotosetsFetcher, "_fetch_photos_in_photoset")
-    def test_saves_photosets(self, fetch_photos, save_photoset):
-        """It should call save_photoset() for each photoset it fetches."""
+    def test_saves_photosets(self, fetch_photos, save_photosets):
+        """It should call save_photosets() with all the photosets it fetches."""
         self.expect_response("photosets.getList")
         with patch("time.sleep"):
             results = self.fetcher.fetch()
-            self.assertEqual(save_photoset.call_count, 3)
+            save_photosets.assert_called_once()
+            self.assertEqual(len(save_photosets.call_args.args[0]), 3)
             self.assertTrue(results["success"])
             self.assertEqual(results["fetched"], 3)
 
@@ -1,6 +1,5 @@
-import os
 from datetime import datetime, timezone
-from tempfile import NamedTemporaryFile, TemporaryDirectory
+from tempfile import TemporaryDirectory
 from unittest.mock import call, patch
 
 from django.test import TestCase
@@ -9,6 +8,7 @@ from ditto.core.utils.downloader import DownloadException, filedownloader
 from ditto.flickr.factories import AccountFactory, PhotoFactory, UserFactory
 from ditto.flickr.fetch import FetchError
 from ditto.flickr.fetch.filesfetchers import OriginalFilesFetcher
+from tests.core import make_downloaded_file, make_jpeg
 
 
 class FilesFetcherTestCase(TestCase):
@@ -115,6 +115,38 @@ class FilesFetcherTestCase(TestCase):
         self.assertEqual(len(results["messages"]), 3)
         self.assertEqual(results["messages"][0], "Oh dear")
 
+    @patch.object(OriginalFilesFetcher, "_save_file")
+    @patch.object(filedownloader, "download")
+    def test_fetches_with_workers(self, download, save_file):
+        "Downloads files in several threads, and saves them all."
+        download.side_effect = lambda url, types, **kwargs: f"/tmp/{url[-20:]}"
+        progress = []
+        results = self.fetcher.fetch(
+            workers=3, progress=lambda done, total: progress.append((done, total))
+        )
+        self.assertTrue(results["success"])
+        self.assertEqual(results["fetched"], 3)
+        self.assertEqual(download.call_count, 3)
+        self.assertEqual(
+            {(c.args[0].pk, c.args[1]) for c in save_file.call_args_list},
+            {
+                (self.photo_2.pk, "photo"),
+                (self.video_2.pk, "photo"),
+                (self.video_2.pk, "video"),
+            },
+        )
+        self.assertEqual(progress, [(1, 3), (2, 3), (3, 3)])
+
+    @patch.object(OriginalFilesFetcher, "_save_file")
+    @patch.object(filedownloader, "download")
+    def test_error_results_with_workers(self, download, save_file):
+        download.side_effect = DownloadException("Oh dear")
+        results = self.fetcher.fetch(workers=3)
+        self.assertFalse(results["success"])
+        self.assertEqual(results["fetched"], 0)
+        self.assertEqual(results["messages"], ["Oh dear", "Oh dear", "Oh dear"])
+        save_file.assert_not_called()
+
     @patch.object(filedownloader, "download")
     def test_downloads_photo(self, download):
         "Calls the download method correctly for photos."
@@ -125,6 +157,7 @@ class FilesFetcherTestCase(TestCase):
                 call(
                     self.photo_2.remote_original_url,
                     ["image/jpeg", "image/jpg", "image/png", "image/gif"],
+                    resume=False,
                 )
             ]
         )
@@ -135,7 +168,7 @@ class FilesFetcherTestCase(TestCase):
         download.return_value = False
         self.fetcher._fetch_and_save_file(self.video_2, "video")
         download.assert_has_calls(
-            [call(self.video_2.video_original_url, ["video/mp4"])]
+            [call(self.video_2.video_original_url, ["video/mp4"], resume=True)]
         )
 
     @patch.object(filedownloader, "download")
@@ -148,10 +181,7 @@ class FilesFetcherTestCase(TestCase):
     @patch.object(filedownloader, "download")
     def test_saves_downloaded_photo_file(self, download):
         with self.settings(MEDIA_ROOT=self.enterContext(TemporaryDirectory())):
-            # Make a temporary file, like download() would make:
-            temp_file = self.enterContext(NamedTemporaryFile(mode="rb", suffix="jpg"))
-            temp_filepath = temp_file.name
-            download.return_value = temp_filepath
+            download.return_value = make_downloaded_file("12345678.jpg")
 
             self.fetcher._fetch_and_save_file(self.photo_2, "photo")
             nsid = self.photo_2.user.nsid
@@ -162,17 +192,28 @@ class FilesFetcherTestCase(TestCase):
                     nsid[-4:-2],
                     nsid[-2:],
                     self.photo_2.user.nsid.replace("@", ""),
-                    os.path.basename(temp_filepath),
+                    "12345678.jpg",
                 ),
             )
 
+    @patch.object(filedownloader, "download")
+    def test_sets_placeholder_of_downloaded_photo_file(self, download):
+        with self.settings(MEDIA_ROOT=self.enterContext(TemporaryDirectory())):
+            download.return_value = make_downloaded_file("12345678.jpg", make_jpeg())
+
+            self.fetcher._fetch_and_save_file(self.photo_2, "photo")
+            self.photo_2.refresh_from_db()
+            self.assertTrue(
+                self.photo_2.placeholder.startswith("data:image/jpeg;base64,")
+            )
+            self.assertTrue(self.photo_2.dominant_color.startswith("#f"))
+            # The whole file should still have been saved:
+            self.assertEqual(self.photo_2.original_file.size, len(make_jpeg()))
+
     @patch.object(filedownloader, "download")
     def test_saves_downloaded_video_file(self, download):
         with self.settings(MEDIA_ROOT=self.enterContext(TemporaryDirectory())):
-            # Make a temporary file, like download() would make:
-            temp_file = self.enterContext(NamedTemporaryFile(mode="rb", suffix="mp4"))
-            temp_filepath = temp_file.name
-            download.return_value = temp_filepath
+            download.return_value = make_downloaded_file("12345678.mp4")
 
             self.fetcher._fetch_and_save_file(self.video_2, "video")
             nsid = self.video_2.user.nsid
@@ -183,6 +224,6 @@ class FilesFetcherTestCase(TestCase):
                     nsid[-4:-2],
                     nsid[-2:],
                     self.video_2.user.nsid.replace("@", ""),
-                    os.path.basename(temp_filepath),
+                    "12345678.mp4",
                 ),
             )
@@ -2,13 +2,18 @@ from unittest.mock import call, patch
 
 from ditto.flickr.factories import AccountFactory, UserFactory
 from ditto.flickr.fetch import FetchError
-from ditto.flickr.fetch.fetchers import PhotosetsFetcher, RecentPhotosFetcher
+from ditto.flickr.fetch.fetchers import (
+    PhotosetsFetcher,
+    RecentPhotosFetcher,
+    UpdatedPhotosFetcher,
+)
 from ditto.flickr.fetch.filesfetchers import OriginalFilesFetcher
 from ditto.flickr.fetch.multifetchers import (
     MultiAccountFetcher,
     OriginalFilesMultiAccountFetcher,
     PhotosetsMultiAccountFetcher,
     RecentPhotosMultiAccountFetcher,
+    UpdatedPhotosMultiAccountFetcher,
 )
 
 from .test_fetch import FlickrFetchTestCase
@@ -88,7 +93,10 @@ class RecentPhotosMultiAccountFetcherTestCase(MultiAccountFetcherTestCase):
         "RecentPhotosFetcher.fetch() should be called twice."
         RecentPhotosMultiAccountFetcher().fetch(days=3)
         fetch.assert_has_calls(
-            [call(days=3, start=None, end=None), call(days=3, start=None, end=None)]
+            [
+                call(days=3, start=None, end=None, workers=1),
+                call(days=3, start=None, end=None, workers=1),
+            ]
         )
 
     @patch.object(RecentPhotosFetcher, "fetch")
@@ -103,6 +111,33 @@ class RecentPhotosMultiAccountFetcherTestCase(MultiAccountFetcherTestCase):
         self.assertEqual(return_value[0]["account"], "bob")
 
 
+class UpdatedPhotosMultiAccountFetcherTestCase(MultiAccountFetcherTestCase):
+    @patch.object(UpdatedPhotosFetcher, "__init__")
+    @patch.object(UpdatedPhotosFetcher, "fetch")
+    def test_inits_fetcher_with_active_accounts(self, fetch, init):
+        "UpdatedPhotosFetcher should be called with 2 active accounts."
+        init.return_value = None
+        UpdatedPhotosMultiAccountFetcher().fetch()
+        init.assert_has_calls([call(self.account_1), call(self.account_2)])
+
+    @patch.object(UpdatedPhotosFetcher, "fetch")
+    def test_calls_fetch_for_active_accounts(self, fetch):
+        "UpdatedPhotosFetcher.fetch() should be called twice."
+        UpdatedPhotosMultiAccountFetcher().fetch(workers=2)
+        fetch.assert_has_calls([call(workers=2), call(workers=2)])
+
+    @patch.object(UpdatedPhotosFetcher, "fetch")
+    def test_returns_list_of_return_values(self, fetch):
+        "Should return a list of the dicts that UpdatedPhotosFetcher.fetch() returns"
+        ret = {"success": True, "account": "bob", "fetched": 7}
+        fetch.side_effect = [ret, ret]
+
+        return_value = UpdatedPhotosMultiAccountFetcher().fetch()
+
+        self.assertEqual(len(return_value), 2)
+        self.assertEqual(return_value[0]["account"], "bob")
+
+
 class PhotosetsMultiAccountFetcherTestCase(MultiAccountFetcherTestCase):
     @patch.object(PhotosetsFetcher, "__init__")
     @patch.object(PhotosetsFetcher, "fetch")
@@ -143,13 +178,23 @@ class OriginalFilesMultiAccountFetcherTestCase(MultiAccountFetcherTestCase):
     def test_calls_fetch_for_active_accounts(self, fetch):
         "OriginalFilesFetcher.fetch() should be called twice."
         OriginalFilesMultiAccountFetcher().fetch()
-        fetch.assert_has_calls([call(fetch_all=False), call(fetch_all=False)])
+        fetch.assert_has_calls(
+            [
+                call(fetch_all=False, workers=1, progress=None),
+                call(fetch_all=False, workers=1, progress=None),
+            ]
+        )
 
     @patch.object(OriginalFilesFetcher, "fetch")
     def test_calls_fetch_with_fetch_all_param(self, fetch):
         "fetch() should pass on the fetch_all param"
         OriginalFilesMultiAccountFetcher().fetch(fetch_all=True)
-        fetch.assert_has_calls([call(fetch_all=True), call(fetch_all=True)])
+        fetch.assert_has_calls(
+            [
+                call(fetch_all=True, workers=1, progress=None),
+                call(fetch_all=True, workers=1, progress=None),
+            ]
+        )
 
     @patch.object(OriginalFilesFetcher, "fetch")
     def test_returns_list_of_return_values(self, fetch):
@@ -4,10 +4,13 @@ from decimal import Decimal
 from unittest.mock import patch
 from zoneinfo import ZoneInfo
 
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from freezegun import freeze_time
 from taggit.models import Tag
 
-from ditto.flickr.factories import PhotoFactory, UserFactory
+from ditto.core.models import TimelineItem
+from ditto.flickr.factories import AccountFactory, PhotoFactory, UserFactory
 from ditto.flickr.fetch import FetchError
 from ditto.flickr.fetch.savers import PhotoSaver, PhotosetSaver, UserSaver
 from ditto.flickr.models import Photo, Photoset, TaggedPhoto, User
@@ -214,7 +217,7 @@ class PhotoSaverTestCase(FlickrFetchTestCase):
         self.assertEqual(photo.exif_focal_length, "38 mm")
         self.assertEqual(photo.exif_iso, 100)
 
-        save_tags.assert_called_once_with(photo, photo_data["info"]["tags"]["tag"])
+        save_tags.assert_called_once_with([(photo, photo_data["info"]["tags"]["tag"])])
 
     @patch.object(PhotoSaver, "_save_tags")
     def test_saves_photo_with_no_exif(self, save_tags):
@@ -293,7 +296,7 @@ class PhotoSaverTestCase(FlickrFetchTestCase):
         user_2 = UserFactory(nsid="12345678901@N01")
         photo = PhotoFactory(user=user_1)
 
-        PhotoSaver()._save_tags(photo, photo_info_data["tags"]["tag"])
+        PhotoSaver()._save_tags([(photo, photo_info_data["tags"]["tag"])])
 
         tags = photo.tags.all()
         tagged_photos = TaggedPhoto.objects.filter(content_object=photo)
@@ -337,7 +340,7 @@ class PhotoSaverTestCase(FlickrFetchTestCase):
         self.assertEqual(len(tag_slugs), 1)
 
         # Save new tags:
-        PhotoSaver()._save_tags(photo, photo_info_data["tags"]["tag"])
+        PhotoSaver()._save_tags([(photo, photo_info_data["tags"]["tag"])])
         tag_slugs = photo.tags.slugs()
 
         # Check that first tag has gone and the rest are there:
@@ -349,7 +352,7 @@ class PhotoSaverTestCase(FlickrFetchTestCase):
         photo = PhotoFactory()
 
         with self.assertRaises(FetchError):
-            PhotoSaver()._save_tags(photo, photo_info_data["tags"]["tag"])
+            PhotoSaver()._save_tags([(photo, photo_info_data["tags"]["tag"])])
 
     @patch.object(PhotoSaver, "_save_tags")
     def test_handles_photos_with_no_location(self, save_tags):
@@ -363,6 +366,99 @@ class PhotoSaverTestCase(FlickrFetchTestCase):
         self.assertEqual(photo.latitude, None)
         self.assertEqual(photo.longitude, None)
 
+    def make_photos_data(self, count):
+        """Makes a list of the dicts of data that save_photos() expects, for
+        several different photos, all with the same tags."""
+        photo_data = self.make_photo_data()
+        UserFactory(nsid="12345678901@N01")
+        photos_data = []
+        for n in range(count):
+            info = self.load_fixture("photos.getInfo")["photo"]
+            info["id"] = str(26069027966 + n)
+            for tag in info["tags"]["tag"]:
+                tag["id"] = f"{tag['id']}-{n}"
+            photos_data.append({**photo_data, "info": info})
+        return photos_data
+
+    def test_save_photos(self):
+        "It should save all the photos and their tags, returning the Photos."
+        photos_data = self.make_photos_data(3)
+        AccountFactory(user=photos_data[0]["user_obj"])
+        photos = PhotoSaver().save_photos(photos_data)
+
+        self.assertEqual(
+            [photo.flickr_id for photo in photos],
+            [26069027966, 26069027967, 26069027968],
+        )
+        self.assertEqual(Photo.objects.count(), 3)
+        self.assertEqual(TaggedPhoto.objects.count(), 21)
+        self.assertEqual(Tag.objects.count(), 7)
+        self.assertEqual(photos[0].taken_year, 2016)
+        self.assertEqual(photos[0].post_year, 2016)
+        # Both the uploaded and taken items for each photo:
+        self.assertEqual(TimelineItem.objects.count(), 6)
+
+    def test_save_photos_without_account(self):
+        "Photos by Users without Accounts shouldn't be in the timeline."
+        PhotoSaver().save_photos(self.make_photos_data(2))
+        self.assertEqual(TimelineItem.objects.count(), 0)
+
+    def test_save_photos_queries(self):
+        "The number of queries doesn't depend on the number of photos or tags."
+        photos_data = self.make_photos_data(5)
+        # So that the Tags exist for both of the saves we're counting:
+        PhotoSaver().save_photos(photos_data[:1])
+
+        with CaptureQueriesContext(connection) as one_photo:
+            PhotoSaver().save_photos(photos_data[1:2])
+        with CaptureQueriesContext(connection) as three_photos:
+            PhotoSaver().save_photos(photos_data[2:])
+
+        self.assertEqual(len(one_photo), len(three_photos))
+        self.assertEqual(TaggedPhoto.objects.count(), 35)
+
+    def test_save_photos_updates_existing_photos(self):
+        "Existing photos should be updated and keep their other data."
+        photos_data = self.make_photos_data(2)
+        existing = PhotoFactory(
+            flickr_id=26069027967, title="Old title", original_file="old.jpg"
+        )
+
+        PhotoSaver().save_photos(photos_data)
+
+        photo = Photo.objects.get(pk=existing.pk)
+        self.assertEqual(photo.title, "Dore Abbey")
+        self.assertEqual(photo.original_file.name, "old.jpg")
+        self.assertEqual(photo.time_created, existing.time_created)
+        self.assertEqual(Photo.objects.count(), 2)
+
+    @patch.object(PhotoSaver, "_save_tags")
+    def test_save_photos_only_updates_fields_in_data(self, save_tags):
+        "Like update_or_create(), only fields we have data for are changed."
+        existing = PhotoFactory(flickr_id=26069027966, latitude=Decimal("51.5"))
+        photo_data = self.make_photo_data()
+        del photo_data["info"]["location"]
+        del photo_data["info"]["geoperms"]
+
+        PhotoSaver().save_photos([photo_data])
+
+        self.assertEqual(Photo.objects.get(pk=existing.pk).latitude, Decimal("51.5"))
+
+    def test_creates_tags_with_existing_name(self):
+        "If a Tag with a new tag's name exists, with a different slug, use it."
+        photo_info_data = self.load_fixture("photos.getInfo")["photo"]
+        user_1 = UserFactory(nsid="35034346050@N01")
+        UserFactory(nsid="12345678901@N01")
+        photo = PhotoFactory(user=user_1)
+        tag = Tag.objects.create(slug="abbey-dore", name="Abbey Dore")
+
+        PhotoSaver()._save_tags([(photo, photo_info_data["tags"]["tag"])])
+
+        self.assertEqual(
+            TaggedPhoto.objects.get(flickr_id="5827-26069027966-1200699").tag, tag
+        )
+        self.assertEqual(photo.tags.count(), 7)
+
 
 class PhotosetSaverTestCase(FlickrFetchTestCase):
     def make_photoset_object(self, photoset_data):
@@ -451,6 +547,42 @@ class PhotosetSaverTestCase(FlickrFetchTestCase):
         self.assertEqual(photos[2].flickr_id, photo_ids[2])
         self.assertEqual(photos[4].flickr_id, photo_ids[4])
 
+    def test_save_photosets(self):
+        "It should save all the photosets, returning the Photosets."
+        for photo in self.load_fixture("photosets.getPhotos")["photoset"]["photo"]:
+            PhotoFactory(flickr_id=photo["id"])
+        photoset_data_1 = self.make_photoset_data()
+        photoset_data_2 = {
+            **photoset_data_1,
+            "photoset": {**photoset_data_1["photoset"], "id": "72157662491524213"},
+        }
+
+        photosets = PhotosetSaver().save_photosets([photoset_data_1, photoset_data_2])
+
+        self.assertEqual(
+            [photoset.flickr_id for photoset in photosets],
+            [72157665648859705, 72157662491524213],
+        )
+        self.assertEqual(photosets[0].photos.count(), 5)
+        self.assertEqual(photosets[1].photos.count(), 5)
+
+    def test_save_photosets_queries(self):
+        "The number of queries doesn't depend on the number of photos."
+        photos = self.load_fixture("photosets.getPhotos")["photoset"]["photo"]
+        photoset_data = self.make_photoset_data()
+
+        PhotoFactory(flickr_id=photos[0]["id"])
+        with CaptureQueriesContext(connection) as one_photo:
+            PhotosetSaver().save_photosets([photoset_data])
+
+        Photoset.objects.all().delete()
+        for photo in photos[1:]:
+            PhotoFactory(flickr_id=photo["id"])
+        with CaptureQueriesContext(connection) as five_photos:
+            PhotosetSaver().save_photosets([photoset_data])
+
+        self.assertEqual(len(one_photo), len(five_photos))
+
     def test_skips_photos_not_in_db(self):
         "If we don't have a photo in the db, it's not added to photoset."
 
@@ -98,7 +98,9 @@ class FetchFlickrOriginalsTestCase(TestCase):
     def test_sends_all_true_to_fetcher_with_account(self, fetcher):
         call_command("fetch_flickr_originals", "--all", account="99999999999@N99")
         fetcher.assert_called_with(nsid="99999999999@N99")
-        fetcher.return_value.fetch.assert_called_with(fetch_all=True)
+        fetcher.return_value.fetch.assert_called_with(
+            fetch_all=True, workers=1, progress=None
+        )
 
     @patch(
         "ditto.flickr.management.commands.fetch_flickr_originals.OriginalFilesMultiAccountFetcher"
@@ -106,7 +108,9 @@ class FetchFlickrOriginalsTestCase(TestCase):
     def test_sends_all_true_to_fetcher_no_account(self, fetcher):
         call_command("fetch_flickr_originals", "--all")
         fetcher.assert_called_with(nsid=None)
-        fetcher.return_value.fetch.assert_called_with(fetch_all=True)
+        fetcher.return_value.fetch.assert_called_with(
+            fetch_all=True, workers=1, progress=None
+        )
 
     @patch(
         "ditto.flickr.management.commands.fetch_flickr_originals.OriginalFilesMultiAccountFetcher"
@@ -114,7 +118,30 @@ class FetchFlickrOriginalsTestCase(TestCase):
     def test_sends_all_false_to_fetcher(self, fetcher):
         call_command("fetch_flickr_originals")
         fetcher.assert_called_with(nsid=None)
-        fetcher.return_value.fetch.assert_called_with(fetch_all=False)
+        fetcher.return_value.fetch.assert_called_with(
+            fetch_all=False, workers=1, progress=None
+        )
+
+    @patch(
+        "ditto.flickr.management.commands.fetch_flickr_originals.OriginalFilesMultiAccountFetcher"
+    )
+    def test_sends_workers_to_fetcher(self, fetcher):
+        call_command("fetch_flickr_originals", workers=8)
+        fetcher.return_value.fetch.assert_called_with(
+            fetch_all=False, workers=8, progress=None
+        )
+
+    @patch(
+        "ditto.flickr.management.commands.fetch_flickr_originals.OriginalFilesMultiAccountFetcher"
+    )
+    def test_progress_output_verbosity_2(self, fetcher):
+        def fetch(**kwargs):
+            kwargs["progress"](1, 2)
+            return [{"account": "Phil Gyford", "success": True, "fetched": 2}]
+
+        fetcher.return_value.fetch.side_effect = fetch
+        call_command("fetch_flickr_originals", verbosity=2, stdout=self.out)
+        self.assertIn("Finished 1 of 2 Files", self.out.getvalue())
 
     @patch(
         "ditto.flickr.management.commands.fetch_flickr_originals.OriginalFilesMultiAccountFetcher"
@@ -148,6 +175,26 @@ class FetchFlickrOriginalsTestCase(TestCase):
             "Phil Gyford: Failed to fetch Files: Oops", self.out_err.getvalue()
         )
 
+    @patch("ditto.flickr.management.commands.fetch_flickr_originals.call_command")
+    @patch(
+        "ditto.flickr.management.commands.fetch_flickr_originals.OriginalFilesMultiAccountFetcher"
+    )
+    def test_generates_thumbnails(self, fetcher, call):
+        fetcher.return_value.fetch.return_value = []
+        call_command("fetch_flickr_originals", "--thumbnails", stdout=self.out)
+        call.assert_called_once()
+        self.assertEqual(call.call_args[0], ("generate_ditto_thumbnails",))
+        self.assertEqual(call.call_args[1]["sizes"], ["flickr"])
+
+    @patch("ditto.flickr.management.commands.fetch_flickr_originals.call_command")
+    @patch(
+        "ditto.flickr.management.commands.fetch_flickr_originals.OriginalFilesMultiAccountFetcher"
+    )
+    def test_doesnt_generate_thumbnails_by_default(self, fetcher, call):
+        fetcher.return_value.fetch.return_value = []
+        call_command("fetch_flickr_originals", stdout=self.out)
+        call.assert_not_called()
+
 
 class FetchFlickrPhotosTestCase(TestCase):
     def setUp(self):
@@ -184,7 +231,9 @@ class FetchFlickrPhotosTestCase(TestCase):
     def test_sends_days_to_fetcher_with_account(self, fetcher):
         call_command("fetch_flickr_photos", account="99999999999@N99", days="4")
         fetcher.assert_called_with(nsid="99999999999@N99")
-        fetcher.return_value.fetch.assert_called_with(days=4, start=None, end=None)
+        fetcher.return_value.fetch.assert_called_with(
+            days=4, start=None, end=None, workers=1
+        )
 
     @patch(
         "ditto.flickr.management.commands.fetch_flickr_photos.RecentPhotosMultiAccountFetcher"
@@ -192,7 +241,9 @@ class FetchFlickrPhotosTestCase(TestCase):
     def test_sends_days_to_fetcher_no_account(self, fetcher):
         call_command("fetch_flickr_photos", days="4")
         fetcher.assert_called_with(nsid=None)
-        fetcher.return_value.fetch.assert_called_with(days=4, start=None, end=None)
+        fetcher.return_value.fetch.assert_called_with(
+            days=4, start=None, end=None, workers=1
+        )
 
     @patch(
         "ditto.flickr.management.commands.fetch_flickr_photos.RecentPhotosMultiAccountFetcher"
@@ -200,7 +251,9 @@ class FetchFlickrPhotosTestCase(TestCase):
     def test_sends_all_to_fetcher_with_account(self, fetcher):
         call_command("fetch_flickr_photos", account="99999999999@N99", days="all")
         fetcher.assert_called_with(nsid="99999999999@N99")
-        fetcher.return_value.fetch.assert_called_with(days="all", start=None, end=None)
+        fetcher.return_value.fetch.assert_called_with(
+            days="all", start=None, end=None, workers=1
+        )
 
     # Sending --start argument
 
@@ -213,7 +266,7 @@ class FetchFlickrPhotosTestCase(TestCase):
         )
         fetcher.assert_called_with(nsid="99999999999@N99")
         fetcher.return_value.fetch.assert_called_with(
-            days=None, start="2022-01-31", end=None
+            days=None, start="2022-01-31", end=None, workers=1
         )
 
     @patch(
@@ -223,7 +276,7 @@ class FetchFlickrPhotosTestCase(TestCase):
         call_command("fetch_flickr_photos", start="2022-01-31")
         fetcher.assert_called_with(nsid=None)
         fetcher.return_value.fetch.assert_called_with(
-            days=None, start="2022-01-31", end=None
+            days=None, start="2022-01-31", end=None, workers=1
         )
 
     # Sending --end argument
@@ -235,7 +288,7 @@ class FetchFlickrPhotosTestCase(TestCase):
         call_command("fetch_flickr_photos", account="99999999999@N99", end="2022-01-31")
         fetcher.assert_called_with(nsid="99999999999@N99")
         fetcher.return_value.fetch.assert_called_with(
-            days=None, start=None, end="2022-01-31"
+            days=None, start=None, end="2022-01-31", workers=1
         )
 
     @patch(
@@ -245,7 +298,7 @@ class FetchFlickrPhotosTestCase(TestCase):
         call_command("fetch_flickr_photos", end="2022-01-31")
         fetcher.assert_called_with(nsid=None)
         fetcher.return_value.fetch.assert_called_with(
-            days=None, start=None, end="2022-01-31"
+            days=None, start=None, end="2022-01-31", workers=1
         )
 
     # Sending --start and --end arguments
@@ -262,7 +315,7 @@ class FetchFlickrPhotosTestCase(TestCase):
         )
         fetcher.assert_called_with(nsid="99999999999@N99")
         fetcher.return_value.fetch.assert_called_with(
-            days=None, start="2022-01-31", end="2022-02-14"
+            days=None, start="2022-01-31", end="2022-02-14", workers=1
         )
 
     @patch(
@@ -272,9 +325,50 @@ class FetchFlickrPhotosTestCase(TestCase):
         call_command("fetch_flickr_photos", start="2022-01-31", end="2022-02-14")
         fetcher.assert_called_with(nsid=None)
         fetcher.return_value.fetch.assert_called_with(
-            days=None, start="2022-01-31", end="2022-02-14"
+            days=None, start="2022-01-31", end="2022-02-14", workers=1
         )
 
+    @patch(
+        "ditto.flickr.management.commands.fetch_flickr_photos.RecentPhotosMultiAccountFetcher"
+    )
+    def test_sends_workers_to_fetcher(self, fetcher):
+        call_command("fetch_flickr_photos", days="4", workers=4)
+        fetcher.return_value.fetch.assert_called_with(
+            days=4, start=None, end=None, workers=4
+        )
+
+    # Sending --updated argument
+
+    @patch(
+        "ditto.flickr.management.commands.fetch_flickr_photos.UpdatedPhotosMultiAccountFetcher"
+    )
+    def test_sends_updated_to_fetcher_with_account(self, fetcher):
+        call_command("fetch_flickr_photos", account="99999999999@N99", updated=True)
+        fetcher.assert_called_with(nsid="99999999999@N99")
+        fetcher.return_value.fetch.assert_called_with(workers=1)
+
+    @patch(
+        "ditto.flickr.management.commands.fetch_flickr_photos.UpdatedPhotosMultiAccountFetcher"
+    )
+    def test_sends_updated_to_fetcher_with_no_account(self, fetcher):
+        call_command("fetch_flickr_photos", updated=True, workers=3)
+        fetcher.assert_called_with(nsid=None)
+        fetcher.return_value.fetch.assert_called_with(workers=3)
+
+    def test_fail_with_updated_and_days(self):
+        with self.assertRaises(CommandError):
+            call_command("fetch_flickr_photos", updated=True, days="4")
+
+    @patch(
+        "ditto.flickr.management.commands.fetch_flickr_photos.UpdatedPhotosMultiAccountFetcher"
+    )
+    def test_updated_success_output(self, fetcher):
+        fetcher.return_value.fetch.return_value = [
+            {"account": "Phil Gyford", "success": True, "fetched": "3"}
+        ]
+        call_command("fetch_flickr_photos", updated=True, stdout=self.out)
+        self.assertIn("Phil Gyford: Fetched 3 Photos", self.out.getvalue())
+
     # Outputs
 
     @patch(
@@ -1,10 +1,12 @@
 import os
 from datetime import datetime, timezone
+from functools import partial
 from unittest.mock import Mock, patch
 
 from django.db import IntegrityError
 from django.test import TestCase
 
+from ditto.core.imagecache import ImageLockError, generate_images
 from ditto.core.utils import datetime_from_str
 from ditto.flickr import app_settings
 from ditto.flickr.factories import (
@@ -465,6 +467,30 @@ class PhotoUrlsRemoteTestCase(PhotoUrlsTestCase):
         for _size, prop in self.video_sizes.items():
             self.assertIsNone(getattr(photo, prop))
 
+    def test_variant_url(self):
+        "We can only make other formats from downloaded files."
+        photo = PhotoFactory()
+        self.assertIsNone(photo.variant_url("small", "WEBP"))
+
+    def test_image_url_changes_with_photo(self):
+        "A remembered URL shouldn't be used if the photo's data has changed."
+        photo = PhotoFactory(server="1234", flickr_id=4567, secret="9876")
+        self.assertEqual(
+            photo.small_url, "https://live.staticflickr.com/1234/4567_9876_m.jpg"
+        )
+        photo.secret = "5555"
+        self.assertEqual(
+            photo.small_url, "https://live.staticflickr.com/1234/4567_5555_m.jpg"
+        )
+
+    def test_image_url_changes_with_setting(self):
+        "A remembered URL shouldn't be used if FLICKR_USE_LOCAL_MEDIA changes."
+        photo = PhotoFactory(server="1234", flickr_id=4567, secret="9876")
+        remote_url = photo.small_url
+        with patch.object(app_settings, "FLICKR_USE_LOCAL_MEDIA", new=True):
+            self.assertNotEqual(photo.small_url, remote_url)
+        self.assertEqual(photo.small_url, remote_url)
+
 
 class PhotoUrlsLocalTestCase(PhotoUrlsTestCase):
     "Testing the URLs of photos and videos when we're using local original files."
@@ -536,6 +562,60 @@ class PhotoUrlsLocalTestCase(PhotoUrlsTestCase):
             secret = 7777 if size == "orig" else 9876
             self.assertEqual(getattr(photo, prop), f"{permalink}play/{size}/{secret}/")
 
+    def make_variant(self, size, image_format):
+        generator = Photo.PHOTO_SIZES[size]["generator"]
+        generate_images(
+            self.photo.original_file, [partial(generator, image_format=image_format)]
+        )
+
+    def test_variant_url(self):
+        self.make_variant("small", "WEBP")
+        self.assertRegex(
+            self.photo.variant_url("small", "WEBP"),
+            r"CACHE/images/flickr/34/56/123456N01/photos/2015/08/14/example[^/]*/[^\.]+\.webp",
+        )
+
+    def test_variant_url_for_square(self):
+        self.make_variant("square", "WEBP")
+        self.assertTrue(self.photo.variant_url("square", "WEBP").endswith(".webp"))
+
+    def test_has_local_image(self):
+        self.assertFalse(self.photo.has_local_image("small"))
+        generate_images(
+            self.photo.original_file, [Photo.PHOTO_SIZES["small"]["generator"]]
+        )
+        self.assertTrue(self.photo.has_local_image("small"))
+
+    def test_has_local_image_original(self):
+        "There's no generator for the original size."
+        self.assertFalse(self.photo.has_local_image("original"))
+
+    def test_variant_url_not_made(self):
+        "Variants aren't made when their URLs are used."
+        with patch("imagekit.cachefiles.ImageCacheFile.generate") as generate:
+            self.assertIsNone(self.photo.variant_url("small", "WEBP"))
+        generate.assert_not_called()
+
+    def test_variant_url_for_original(self):
+        "There's no generator for the original size."
+        self.assertIsNone(self.photo.variant_url("original", "WEBP"))
+
+    def test_variant_url_invalid_format(self):
+        self.assertIsNone(self.photo.variant_url("small", "GIF"))
+
+    def test_variant_url_when_original_missing(self):
+        photo = PhotoFactory(original_file="")
+        self.assertIsNone(photo.variant_url("small", "WEBP"))
+
+    def test_image_url_is_remembered(self):
+        "The cached image file should only be made once per size."
+        with patch("ditto.flickr.models.ImageCacheFile") as cache_file:
+            cache_file.return_value.url = "/media/CACHE/small.jpg"
+            self.assertEqual(self.photo.small_url, "/media/CACHE/small.jpg")
+            self.assertEqual(self.photo.small_url, "/media/CACHE/small.jpg")
+            self.assertEqual(self.photo.medium_url, "/media/CACHE/small.jpg")
+        self.assertEqual(cache_file.call_count, 2)
+
     def test_image_url_when_original_missing(self):
         "If we have no original file, we should use the 'missing' image."
         photo = PhotoFactory(original_file="")
@@ -553,6 +633,16 @@ class PhotoUrlsLocalTestCase(PhotoUrlsTestCase):
                 self.photo.small_url, "/static/ditto-core/img/original_error.jpg"
             )
 
+    def test_image_being_made(self):
+        "If another process is making the image, use flickr.com's."
+        generator = Mock(side_effect=ImageLockError("Locked"))
+        photo_sizes = {"small": {"generator": generator, "suffix": "m"}}
+        with patch.dict("ditto.flickr.models.Photo.PHOTO_SIZES", photo_sizes):
+            self.assertEqual(
+                self.photo.small_url, self.photo._remote_image_url("small")
+            )
+            self.assertIsNone(self.photo._local_image_url("small", "WEBP"))
+
 
 class PhotoNextPrevTestCase(TestCase):
     def setUp(self):
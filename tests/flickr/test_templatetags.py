@@ -1,14 +1,20 @@
 from datetime import date, datetime, timedelta, timezone
+from functools import partial
+from unittest.mock import patch
 
 from django.test import TestCase
 
+from ditto.core.imagecache import generate_images
 from ditto.core.utils import datetime_from_str
+from ditto.flickr import app_settings
 from ditto.flickr.factories import (
     AccountFactory,
     PhotoFactory,
     PhotosetFactory,
     UserFactory,
 )
+from ditto.flickr.imagegenerators import variant_formats
+from ditto.flickr.models import Photo
 from ditto.flickr.templatetags import ditto_flickr
 
 
@@ -250,3 +256,128 @@ class AnnualPhotoCountsTakenTimeTestCase(TestCase):
         self.assertEqual(len(photos), 4)
         self.assertEqual(photos[2]["year"], 2017)
         self.assertEqual(photos[2]["count"], 0)
+
+
+def make_variants(photo, sizes, image_formats):
+    "Makes the images of these sizes of photo in each of the image_formats."
+    generate_images(
+        photo.original_file,
+        [
+            partial(Photo.PHOTO_SIZES[size]["generator"], image_format=image_format)
+            for size in sizes
+            for image_format in image_formats
+        ],
+    )
+
+
+class PhotoSrcsetTestCase(TestCase):
+    def setUp(self):
+        self.photo = PhotoFactory(server="1234", flickr_id=4567, secret="9876")
+
+    def test_srcset(self):
+        self.assertEqual(
+            ditto_flickr.photo_srcset(self.photo, max_width=320),
+            'srcset="https://live.staticflickr.com/1234/4567_9876_t.jpg 100w, '
+            "https://live.staticflickr.com/1234/4567_9876_m.jpg 240w, "
+            'https://live.staticflickr.com/1234/4567_9876_n.jpg 320w"',
+        )
+
+    def test_default_max_width(self):
+        srcset = ditto_flickr.photo_srcset(self.photo)
+        self.assertIn("_b.jpg 1024w", srcset)
+        self.assertNotIn("1600w", srcset)
+
+    def test_no_max_width(self):
+        srcset = ditto_flickr.photo_srcset(self.photo, max_width=None)
+        self.assertIn("_6k.jpg 6000w", srcset)
+
+    def test_sizes(self):
+        srcset = ditto_flickr.photo_srcset(self.photo, sizes="50vw", max_width=100)
+        self.assertTrue(srcset.endswith('100w" sizes="50vw"'))
+
+    def test_skips_missing_and_repeated_sizes(self):
+        "eg, if the original is small, several sizes might be the same width."
+        self.photo.small_width = None
+        self.photo.medium_width = 320
+        srcset = ditto_flickr.photo_srcset(self.photo, max_width=500)
+        self.assertNotIn("240w", srcset)
+        self.assertEqual(srcset.count("320w"), 1)
+        self.assertIn("_n.jpg 320w", srcset)
+
+    def test_no_sizes(self):
+        self.assertEqual(ditto_flickr.photo_srcset(self.photo, max_width=50), "")
+
+    def test_image_format_when_remote(self):
+        "There are no WebP images on Flickr."
+        self.assertEqual(ditto_flickr.photo_srcset(self.photo, image_format="WEBP"), "")
+
+    def test_image_format_when_local(self):
+        make_variants(self.photo, ["thumbnail", "small", "small_320"], ["WEBP"])
+        with patch.object(app_settings, "FLICKR_USE_LOCAL_MEDIA", new=True):
+            srcset = ditto_flickr.photo_srcset(
+                self.photo, max_width=320, image_format="WEBP"
+            )
+        self.assertRegex(srcset, r"^srcset=\"/media/CACHE/images/flickr/.*\.webp 100w")
+        self.assertEqual(srcset.count(".webp"), 3)
+
+    def test_local_only_made_sizes(self):
+        "With local media, lists sizes that have been made, and the src's size."
+        generate_images(
+            self.photo.original_file,
+            [Photo.PHOTO_SIZES["thumbnail"]["generator"]],
+        )
+        with (
+            patch.object(app_settings, "FLICKR_USE_LOCAL_MEDIA", new=True),
+            patch(
+                "ditto.flickr.templatetags.ditto_flickr.SRCSET_SIZES",
+                new=("thumbnail", "small_320"),
+            ),
+            patch("imagekit.cachefiles.ImageCacheFile._generate") as generate,
+        ):
+            srcset = ditto_flickr.photo_srcset(self.photo, max_width=640, size="small")
+        self.assertIn(" 100w", srcset)
+        self.assertNotIn("320w", srcset)
+        generate.assert_not_called()
+
+    def test_local_includes_src_size(self):
+        with patch.object(app_settings, "FLICKR_USE_LOCAL_MEDIA", new=True):
+            srcset = ditto_flickr.photo_srcset(self.photo, max_width=640)
+        self.assertRegex(
+            srcset, r"^srcset=\"/media/CACHE/images/flickr/.*\.jpg 240w\"$"
+        )
+
+    def test_image_format_when_not_made(self):
+        "Nothing if any of the sizes hasn't been made in this format."
+        make_variants(self.photo, ["thumbnail", "small"], ["WEBP"])
+        with patch.object(app_settings, "FLICKR_USE_LOCAL_MEDIA", new=True):
+            srcset = ditto_flickr.photo_srcset(
+                self.photo, max_width=320, image_format="WEBP"
+            )
+        self.assertEqual(srcset, "")
+
+
+class PhotoSourcesTestCase(TestCase):
+    def setUp(self):
+        self.photo = PhotoFactory()
+
+    def test_remote(self):
+        self.assertEqual(ditto_flickr.photo_sources(self.photo), "")
+
+    @patch.object(app_settings, "FLICKR_USE_LOCAL_MEDIA", new=True)
+    def test_local(self):
+        make_variants(self.photo, ["thumbnail"], variant_formats())
+        sources = ditto_flickr.photo_sources(self.photo, sizes="50vw", max_width=100)
+        self.assertIn("WEBP", variant_formats())
+        self.assertIn('<source type="image/webp" srcset="/media/', sources)
+        self.assertEqual(sources.count("<source "), len(variant_formats()))
+        self.assertEqual(sources.count('sizes="50vw"'), len(variant_formats()))
+
+    @patch.object(app_settings, "FLICKR_USE_LOCAL_MEDIA", new=True)
+    def test_local_not_made(self):
+        "Nothing until the variants have been made."
+        self.assertEqual(ditto_flickr.photo_sources(self.photo, max_width=100), "")
+
+    @patch.object(app_settings, "FLICKR_USE_LOCAL_MEDIA", new=True)
+    def test_local_without_original(self):
+        self.photo.original_file = ""
+        self.assertEqual(ditto_flickr.photo_sources(self.photo), "")
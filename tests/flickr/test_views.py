@@ -12,6 +12,7 @@ from ditto.flickr.factories import (
     TaggedPhotoFactory,
     UserFactory,
 )
+from tests.core import assert_raw_not_loaded
 
 
 class HomeViewTests(TestCase):
@@ -23,6 +24,14 @@ class HomeViewTests(TestCase):
         self.assertTemplateUsed(response, "flickr/base.html")
         self.assertTemplateUsed(response, "ditto/base.html")
 
+    def test_home_defers_raw(self):
+        "The Photos' raw JSON shouldn't be loaded to list them."
+        account = AccountFactory()
+        PhotoFactory.create_batch(3, user=account.user)
+        with assert_raw_not_loaded():
+            response = self.client.get(reverse("flickr:home"))
+        self.assertEqual(len(response.context["photo_list"]), 3)
+
     def test_home_context(self):
         "The Flickr home page sends the correct data to templates"
         accounts = AccountFactory.create_batch(3)
@@ -275,6 +284,43 @@ class PhotoDetailViewTests(TestCase):
         self.assertEqual(response.status_code, 404)
 
 
+class PhotoFileViewTests(TestCase):
+    def get(self, photo, name="photo_original_file", nsid=None):
+        return self.client.get(
+            reverse(
+                f"flickr:{name}",
+                kwargs={
+                    "nsid": nsid or photo.user.nsid,
+                    "flickr_id": photo.flickr_id,
+                },
+            )
+        )
+
+    def test_original_file(self):
+        response = self.get(PhotoFactory())
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "image/jpeg")
+
+    def test_video_original_file(self):
+        response = self.get(PhotoFactory(media="video"), "photo_video_original_file")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "video/quicktime")
+
+    def test_privacy(self):
+        "It doesn't send private Photos' files"
+        response = self.get(PhotoFactory(is_private=True))
+        self.assertEqual(response.status_code, 404)
+
+    def test_no_file(self):
+        response = self.get(PhotoFactory(original_file=""))
+        self.assertEqual(response.status_code, 404)
+
+    def test_404(self):
+        "Should 404 with mis-matched user and photo IDs"
+        response = self.get(PhotoFactory(), nsid=UserFactory().nsid)
+        self.assertEqual(response.status_code, 404)
+
+
 class TagViewTests(TestCase):
     """Have a bit more set up than the other tests, so may as well share it."""
 
@@ -555,6 +601,14 @@ class PhotosetViewTests(TestCase):
         self.assertTemplateUsed(response, "flickr/base.html")
         self.assertTemplateUsed(response, "ditto/base.html")
 
+    def test_photoset_list_defers_raw(self):
+        "The Photosets' and primary Photos' raw JSON shouldn't be loaded."
+        self.photoset_1.primary_photo = self.photos_1[1]
+        self.photoset_1.save()
+        with assert_raw_not_loaded():
+            response = self.client.get(reverse("flickr:photoset_list"))
+        self.assertEqual(len(response.context["photoset_list"]), 3)
+
     def test_photoset_list_context(self):
         "Sends the correct data to templates"
         response = self.client.get(reverse("flickr:photoset_list"))
@@ -6,7 +6,9 @@ import responses
 from django.test import TestCase
 from freezegun import freeze_time
 
+from ditto.core.models import TimelineItem
 from ditto.core.utils import datetime_now
+from ditto.core.utils.ratelimit import RateLimiter
 from ditto.lastfm.factories import (
     AccountFactory,
     AlbumFactory,
@@ -243,6 +245,18 @@ class ScrobblesFetcherSendTestCase(TestCase):
         self.assertIn("page=1", responses.calls[0].request.url)
         self.assertIn("page=2", responses.calls[1].request.url)
 
+    @responses.activate
+    @patch.object(RateLimiter, "wait")
+    def test_waits_for_rate_limiter(self, wait):
+        "Waits before requesting each page."
+        body = self.load_fixture("user_getrecenttracks")
+        body["recenttracks"]["@attr"]["totalPages"] = "2"
+        self.add_recent_tracks_response(body=json.dumps(body))
+        body["recenttracks"]["@attr"]["page"] = "2"
+        self.add_recent_tracks_response(body=json.dumps(body), page=2)
+        self.fetcher.fetch()
+        self.assertEqual(wait.call_count, 2)
+
     @responses.activate
     def test_returns_correct_scrobble_count(self):
         "Should return the number of scrobbles fetched."
@@ -381,6 +395,20 @@ class ScrobblesFetcherSendTestCase(TestCase):
         # We have this many finished scrobbles in our JSON fixture:
         self.assertEqual(len(scrobbles), 3)
 
+    @responses.activate
+    def test_updates_timeline_once_per_page(self):
+        "The page's TimelineItems are updated together, after saving it"
+        self.add_recent_tracks_response()
+        with patch.object(
+            TimelineItem.objects,
+            "update_for_items",
+            wraps=TimelineItem.objects.update_for_items,
+        ) as update_for_items:
+            self.fetcher.fetch()
+        update_for_items.assert_called_once()
+        self.assertEqual(len(update_for_items.call_args[0][0]), 3)
+        self.assertEqual(TimelineItem.objects.count(), 3)
+
     @responses.activate
     def test_updates_existing_scrobbles(self):
         "Updates existing scrobble objects"
@@ -2,6 +2,7 @@ from django.test import TestCase
 from django.urls import reverse
 from freezegun import freeze_time
 
+from ditto.core.paginator import KeysetPaginator
 from ditto.core.utils import datetime_from_str
 from ditto.lastfm.factories import (
     AccountFactory,
@@ -10,6 +11,7 @@ from ditto.lastfm.factories import (
     ScrobbleFactory,
     TrackFactory,
 )
+from tests.core import assert_raw_not_loaded
 
 # from ditto.lastfm.models import *
 
@@ -323,6 +325,36 @@ class ScrobbleListViewTests(TestCase):
         self.assertEqual(len(response.context["account_list"]), 3)
         self.assertIn("scrobble_list", response.context)
 
+    def test_defers_raw(self):
+        "The Scrobbles' raw JSON shouldn't be loaded to list them."
+        ScrobbleFactory.create_batch(3)
+        with assert_raw_not_loaded():
+            response = self.client.get(reverse("lastfm:scrobble_list"))
+        self.assertEqual(len(response.context["scrobble_list"]), 3)
+
+    def test_keyset_pagination(self):
+        "Following the next pages gets every Scrobble once."
+        scrobbles = ScrobbleFactory.create_batch(60)
+        response = self.client.get(reverse("lastfm:scrobble_list"))
+        page_obj = response.context["page_obj"]
+        self.assertIsInstance(page_obj.paginator, KeysetPaginator)
+        self.assertEqual(page_obj.paginator.count, 60)
+        listed = list(response.context["scrobble_list"])
+        token = page_obj.next_page_number()
+        self.assertContains(response, f"?p={token}")
+
+        response = self.client.get(reverse("lastfm:scrobble_list"), {"p": token})
+        self.assertEqual(response.status_code, 200)
+        listed.extend(response.context["scrobble_list"])
+        self.assertFalse(response.context["page_obj"].has_next())
+        self.assertEqual(sorted(s.pk for s in listed), sorted(s.pk for s in scrobbles))
+
+    def test_last_page(self):
+        ScrobbleFactory.create_batch(60)
+        response = self.client.get(reverse("lastfm:scrobble_list"), {"p": "last"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["page_obj"].start_index(), 11)
+
 
 class TrackDetailViewTests(TestCase):
     def setUp(self):
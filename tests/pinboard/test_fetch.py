@@ -12,6 +12,8 @@ from requests.exceptions import (
     TooManyRedirects,
 )
 
+from ditto.core.models import TimelineItem
+from ditto.core.utils.ratelimit import RateLimiter
 from ditto.pinboard.factories import AccountFactory, BookmarkFactory
 from ditto.pinboard.fetch import (
     AllBookmarksFetcher,
@@ -152,6 +154,16 @@ class FetchTypesTestRemoteCase(FetchTestCase):
         self.assertEqual(result[1]["account"], "testuser")
         self.assertEqual(result[1]["fetched"], 3)
 
+    @responses.activate
+    @patch.object(RateLimiter, "wait")
+    def test_waits_for_rate_limiter(self, wait):
+        "Waits before fetching for each account."
+        self.add_response(
+            body=self.make_success_body(num_posts=3, username="philgyford")
+        )
+        DateBookmarksFetcher().fetch(post_date="2015-06-18")
+        self.assertEqual(wait.call_count, 2)
+
     # Check potential errors.
 
     @responses.activate
@@ -367,6 +379,26 @@ class FetchTypesSaveTestCase(FetchTestCase):
         self.assertIsInstance(bookmarks[1].tags.first(), BookmarkTag)
         self.assertEqual(sorted(list(bookmarks[1].tags.slugs()))[0], "fonts")
 
+    def test_save_bookmarks_updates_timeline_once(self):
+        "The bookmarks' TimelineItems are updated together, after saving them"
+        account = Account.objects.get(pk=1)
+        bookmarks_data = self.get_bookmarks_from_json()["bookmarks"]
+
+        with patch.object(
+            TimelineItem.objects,
+            "update_for_items",
+            wraps=TimelineItem.objects.update_for_items,
+        ) as update_for_items:
+            BookmarksFetcher()._save_bookmarks(
+                account=account,
+                bookmarks_data=bookmarks_data,
+                fetch_time=datetime.now(tz=timezone.utc),
+            )
+
+        update_for_items.assert_called_once()
+        self.assertEqual(len(update_for_items.call_args[0][0]), 2)
+        self.assertEqual(TimelineItem.objects.count(), 2)
+
     @freeze_time("2015-07-01 12:00:00", tz_offset=-8)
     def test_update_bookmarks(self):
         """Ensure that when saving a Bookmark that already exists, we update
@@ -2,6 +2,7 @@ from django.test import TestCase
 from django.urls import reverse
 
 from ditto.pinboard.factories import AccountFactory, BookmarkFactory
+from tests.core import assert_raw_not_loaded
 
 
 class PinboardViewTests(TestCase):
@@ -33,6 +34,20 @@ class PinboardViewTests(TestCase):
             [10, 9, 8, 7, 6, 5, 4, 3, 2, 1],
         )
 
+    def test_home_defers_raw(self):
+        "The Bookmarks' raw JSON shouldn't be loaded to list them."
+        BookmarkFactory.create_batch(3)
+        with assert_raw_not_loaded():
+            response = self.client.get(reverse("pinboard:home"))
+        self.assertEqual(len(response.context["bookmark_list"]), 3)
+
+    def test_toread_defers_raw(self):
+        "The Bookmarks' raw JSON shouldn't be loaded to list them."
+        BookmarkFactory.create_batch(3, to_read=True)
+        with assert_raw_not_loaded():
+            response = self.client.get(reverse("pinboard:toread"))
+        self.assertEqual(len(response.context["bookmark_list"]), 3)
+
     def test_home_privacy(self):
         """Only public bookmarks should appear."""
         public_bookmark_1 = BookmarkFactory(is_private=False)
@@ -70,3 +70,11 @@ STATIC_URL = "/static/"
 MEDIA_ROOT = tempfile.mkdtemp()
 
 MEDIA_URL = "/media/"
+
+# So that tests don't wait between calls to the (mocked) APIs:
+DITTO_CORE_RATE_LIMITS = {
+    "flickr": None,
+    "lastfm": None,
+    "pinboard": None,
+    "twitter": None,
+}
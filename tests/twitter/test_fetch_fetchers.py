@@ -1,13 +1,14 @@
 import json
-import os
-from tempfile import NamedTemporaryFile, TemporaryDirectory
+from tempfile import TemporaryDirectory
 from unittest.mock import call, patch
 
 import responses
 from django.http import QueryDict
 from django.test import TestCase
 
+from ditto.core.models import TimelineItem
 from ditto.core.utils.downloader import DownloadException, filedownloader
+from ditto.core.utils.ratelimit import RateLimiter
 from ditto.twitter.factories import (
     AccountFactory,
     AccountWithCredentialsFactory,
@@ -37,6 +38,7 @@ from ditto.twitter.fetch.fetchers import (
 )
 from ditto.twitter.fetch.savers import TweetSaver, UserSaver
 from ditto.twitter.models import Account, Tweet, User
+from tests.core import make_downloaded_file, make_jpeg
 
 from .test_fetch import FetchTwitterTestCase
 
@@ -244,6 +246,19 @@ class RecentTweetsFetcherTestCase(TwitterFetcherTestCase):
         # Our sample tweets are from a different user, so there'll now be 3:
         self.assertEqual(User.objects.count(), 3)
 
+    @responses.activate
+    def test_updates_timeline_once(self):
+        "The Tweets' TimelineItems are updated together, after saving them"
+        self.add_response(body=self.make_response_body())
+        with patch.object(
+            TimelineItem.objects,
+            "update_for_items",
+            wraps=TimelineItem.objects.update_for_items,
+        ) as update_for_items:
+            RecentTweetsFetcher(screen_name="jill").fetch()
+        update_for_items.assert_called_once()
+        self.assertEqual(len(update_for_items.call_args[0][0]), 3)
+
     @responses.activate
     @patch.object(TweetSaver, "save_tweet")
     def test_saves_correct_tweet_data(self, save_tweet):
@@ -448,6 +463,14 @@ class FavoriteTweetsFetcherTestCase(TwitterFetcherTestCase):
         self.assertIsInstance(jills_faves[0], Tweet)
         self.assertEqual(jills_faves[0].twitter_id, 300)
 
+    @responses.activate
+    def test_creates_favorite_timeline_items(self):
+        self.add_response(body=self.make_response_body())
+        FavoriteTweetsFetcher(screen_name="jill").fetch()
+        self.assertEqual(
+            TimelineItem.objects.filter(variety_name="favorite").count(), 3
+        )
+
     @responses.activate
     @patch.object(filedownloader, "download")
     def test_fetches_multiple_pages_for_new(self, download):
@@ -803,6 +826,16 @@ class FetchVerifyTestCase(FetchTwitterTestCase):
             responses.calls[0].request.url,
         )
 
+    @responses.activate
+    @patch.object(UserSaver, "_fetch_and_save_avatar")
+    @patch.object(RateLimiter, "wait")
+    def test_waits_for_rate_limiter(self, wait, fetch_avatar):
+        fetch_avatar.side_effect = lambda value: value
+        self.add_response(body=self.make_response_body())
+        account = AccountWithCredentialsFactory.build(id=4, user=None)
+        FetchVerify(account=account).fetch()
+        wait.assert_called_once_with()
+
     @responses.activate
     @patch.object(UserSaver, "_fetch_and_save_avatar")
     def test_fetch_for_account_updates(self, fetch_avatar):
@@ -876,12 +909,12 @@ class FilesFetcherTestCase(TestCase):
     @patch.object(FetchFiles, "fetch")
     def test_calls_fetch_files(self, fetch):
         FilesFetcher().fetch()
-        fetch.assert_has_calls([call(fetch_all=False)])
+        fetch.assert_has_calls([call(fetch_all=False, workers=1, progress=None)])
 
     @patch.object(FetchFiles, "fetch")
     def test_calls_fetch_files_with_all(self, fetch):
         FilesFetcher().fetch(fetch_all=True)
-        fetch.assert_has_calls([call(fetch_all=True)])
+        fetch.assert_has_calls([call(fetch_all=True, workers=1, progress=None)])
 
     @patch.object(FetchFiles, "_fetch_and_save_file")
     def test_calls_fetch_and_save_missing(self, fetch_and_save_file):
@@ -933,6 +966,31 @@ class FilesFetcherTestCase(TestCase):
         self.assertEqual(len(results[0]["messages"]), 4)
         self.assertEqual(results[0]["messages"][0], "Oh dear")
 
+    @patch.object(FetchFiles, "_save_file")
+    @patch.object(filedownloader, "download")
+    def test_fetches_with_workers(self, download, save_file):
+        "Downloads files in several threads, and saves them all."
+        download.side_effect = lambda url, types: f"/tmp/{url[-20:]}"
+        progress = []
+        results = FilesFetcher().fetch(
+            workers=3, progress=lambda done, total: progress.append((done, total))
+        )
+        self.assertTrue(results[0]["success"])
+        self.assertEqual(results[0]["fetched"], 4)
+        self.assertEqual(download.call_count, 4)
+        self.assertEqual(save_file.call_count, 4)
+        self.assertEqual(progress, [(1, 4), (2, 4), (3, 4), (4, 4)])
+
+    @patch.object(FetchFiles, "_save_file")
+    @patch.object(filedownloader, "download")
+    def test_error_results_with_workers(self, download, save_file):
+        download.side_effect = DownloadException("Oh dear")
+        results = FilesFetcher().fetch(workers=3)
+        self.assertFalse(results[0]["success"])
+        self.assertEqual(results[0]["fetched"], 0)
+        self.assertEqual(len(results[0]["messages"]), 4)
+        save_file.assert_not_called()
+
     @patch.object(filedownloader, "download")
     def test_downloads_image(self, download):
         "Calls the download method correctly for images."
@@ -968,33 +1026,31 @@ class FilesFetcherTestCase(TestCase):
     @patch.object(filedownloader, "download")
     def test_saves_downloaded_image_file(self, download):
         with self.settings(MEDIA_ROOT=self.enterContext(TemporaryDirectory())):
-            # Make a temporary file, like download() would make:
-            temp_file = self.enterContext(NamedTemporaryFile(mode="rb", suffix="jpg"))
-            temp_filepath = temp_file.name
-            download.return_value = temp_filepath
+            download.return_value = make_downloaded_file("12345678.jpg")
 
             FetchFiles()._fetch_and_save_file(self.image, "image")
             self.assertEqual(
                 self.image.image_file.name,
-                (
-                    f"twitter/media/{temp_filepath[-4:-2]}/{temp_filepath[-2:]}/"
-                    f"{os.path.basename(temp_filepath)}"
-                ),
+                "twitter/media/56/78/12345678.jpg",
             )
 
+    @patch.object(filedownloader, "download")
+    def test_sets_placeholder_of_downloaded_image_file(self, download):
+        with self.settings(MEDIA_ROOT=self.enterContext(TemporaryDirectory())):
+            download.return_value = make_downloaded_file("12345678.jpg", make_jpeg())
+
+            FetchFiles()._fetch_and_save_file(self.image, "image")
+            self.image.refresh_from_db()
+            self.assertTrue(self.image.placeholder.startswith("data:image/jpeg"))
+            self.assertEqual(self.image.image_file.size, len(make_jpeg()))
+
     @patch.object(filedownloader, "download")
     def test_saves_downloaded_mp4_file(self, download):
         with self.settings(MEDIA_ROOT=self.enterContext(TemporaryDirectory())):
-            # Make a temporary file, like download() would make:
-            temp_file = self.enterContext(NamedTemporaryFile(mode="rb", suffix="mp4"))
-            temp_filepath = temp_file.name
-            download.return_value = temp_filepath
+            download.return_value = make_downloaded_file("12345678.mp4")
 
             FetchFiles()._fetch_and_save_file(self.animated_gif, "mp4")
             self.assertEqual(
                 self.animated_gif.mp4_file.name,
-                (
-                    f"twitter/media/{temp_filepath[-4:-2]}/{temp_filepath[-2:]}/"
-                    f"{os.path.basename(temp_filepath)}"
-                ),
+                "twitter/media/56/78/12345678.mp4",
             )
@@ -2,7 +2,7 @@ import json
 import os
 from datetime import datetime, timezone
 from decimal import Decimal
-from tempfile import NamedTemporaryFile, TemporaryDirectory
+from tempfile import TemporaryDirectory
 from unittest.mock import patch
 
 from freezegun import freeze_time
@@ -11,6 +11,7 @@ from ditto.core.utils import datetime_now
 from ditto.core.utils.downloader import DownloadException, filedownloader
 from ditto.twitter.fetch.savers import TweetSaver, UserSaver
 from ditto.twitter.models import Media, Tweet, User
+from tests.core import make_downloaded_file
 
 from .test_fetch import FetchTwitterTestCase
 
@@ -478,9 +479,7 @@ class UserSaverTestCase(FetchTwitterTestCase):
     def test_downloads_and_saves_avatar(self, download):
         "Should call download() and save avatar."
         with self.settings(MEDIA_ROOT=self.enterContext(TemporaryDirectory())):
-            # Make a temporary file, like download() would make:
-            temp_file = self.enterContext(NamedTemporaryFile(mode="rb", suffix="jpg"))
-            download.return_value = temp_file.name
+            download.return_value = make_downloaded_file("avatar.jpg")
 
             user_data = self.make_user_data()
             saved_user = UserSaver().save_user(user_data, datetime_now())
@@ -490,8 +489,9 @@ class UserSaverTestCase(FetchTwitterTestCase):
                 ["image/jpeg", "image/jpg", "image/png", "image/gif"],
             )
 
-            path = os.path.basename(temp_file.name)
-            self.assertEqual(saved_user.avatar, f"twitter/avatars/25/52/12552/{path}")
+            self.assertEqual(
+                saved_user.avatar, "twitter/avatars/25/52/12552/avatar.jpg"
+            )
 
     @patch.object(filedownloader, "download")
     @patch.object(os.path, "exists")
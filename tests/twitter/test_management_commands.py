@@ -275,8 +275,9 @@ class ImportTweetsVersion2(TestCase):
 
     def test_fails_with_invalid_directory(self):
         "Test fails with invalid directory"
-        with patch("os.path.isdir", return_value=False), self.assertRaises(
-            CommandError
+        with (
+            patch("os.path.isdir", return_value=False),
+            self.assertRaises(CommandError),
         ):
             call_command(
                 "import_twitter_tweets", path="/wrong/path", archive_version="v2"
@@ -492,13 +493,34 @@ class FetchFiles(TestCase):
     def test_sends_all_true_to_fetcher(self, fetcher):
         call_command("fetch_twitter_files", "--all")
         fetcher.assert_called_with()
-        fetcher.return_value.fetch.assert_called_with(fetch_all=True)
+        fetcher.return_value.fetch.assert_called_with(
+            fetch_all=True, workers=1, progress=None
+        )
 
     @patch("ditto.twitter.management.commands.fetch_twitter_files.FilesFetcher")
     def test_sends_all_false_to_fetcher(self, fetcher):
         call_command("fetch_twitter_files")
         fetcher.assert_called_with()
-        fetcher.return_value.fetch.assert_called_with(fetch_all=False)
+        fetcher.return_value.fetch.assert_called_with(
+            fetch_all=False, workers=1, progress=None
+        )
+
+    @patch("ditto.twitter.management.commands.fetch_twitter_files.FilesFetcher")
+    def test_sends_workers_to_fetcher(self, fetcher):
+        call_command("fetch_twitter_files", workers=8)
+        fetcher.return_value.fetch.assert_called_with(
+            fetch_all=False, workers=8, progress=None
+        )
+
+    @patch("ditto.twitter.management.commands.fetch_twitter_files.FilesFetcher")
+    def test_progress_output_verbosity_2(self, fetcher):
+        def fetch(**kwargs):
+            kwargs["progress"](1, 2)
+            return [{"success": True, "fetched": 2}]
+
+        fetcher.return_value.fetch.side_effect = fetch
+        call_command("fetch_twitter_files", verbosity=2, stdout=self.out)
+        self.assertIn("Finished 1 of 2 Files", self.out.getvalue())
 
     @patch("ditto.twitter.management.commands.fetch_twitter_files.FilesFetcher")
     def test_success_output(self, fetcher):
@@ -519,3 +541,12 @@ class FetchFiles(TestCase):
         ]
         call_command("fetch_twitter_files", stdout=self.out, stderr=self.out_err)
         self.assertIn("Failed to fetch Files: Oops", self.out_err.getvalue())
+
+    @patch("ditto.twitter.management.commands.fetch_twitter_files.call_command")
+    @patch("ditto.twitter.management.commands.fetch_twitter_files.FilesFetcher")
+    def test_generates_thumbnails(self, fetcher, call):
+        fetcher.return_value.fetch.return_value = []
+        call_command("fetch_twitter_files", "--thumbnails", stdout=self.out)
+        call.assert_called_once()
+        self.assertEqual(call.call_args[0], ("generate_ditto_thumbnails",))
+        self.assertEqual(call.call_args[1]["sizes"], ["twitter"])
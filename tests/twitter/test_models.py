@@ -7,6 +7,7 @@ from django.db import IntegrityError
 from django.test import TestCase
 from django.urls import reverse
 
+from ditto.core.imagecache import ImageLockError
 from ditto.core.utils import datetime_from_str
 from ditto.twitter import app_settings
 from ditto.twitter.factories import (
@@ -295,6 +296,14 @@ class PhotoLocalTestCase(TestCase):
                 photo.small_url, "/static/ditto-core/img/original_error.jpg"
             )
 
+    def test_image_being_made(self):
+        "If another process is making the image, use Twitter's."
+        photo = PhotoFactory(image_url="http://www.example.org/image.jpg")
+        generator = Mock(side_effect=ImageLockError("Locked"))
+        image_sizes = {"small": {"generator": generator}}
+        with patch.dict("ditto.twitter.models.Media.IMAGE_SIZES", image_sizes):
+            self.assertEqual(photo.small_url, "http://www.example.org/image.jpg:small")
+
 
 class VideoTestCase(TestCase):
     "Most things are the same for photos and videos, so not re-testing here."
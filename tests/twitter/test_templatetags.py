@@ -267,14 +267,15 @@ class AnnualFavoriteCountsTestCase(TestCase):
         self.assertEqual(tweets[1]["count"], 3)
 
     def test_response_for_public_account(self):
+        "Only counts the Tweets this account favorited."
         tweets = ditto_twitter.annual_favorite_counts(
             screen_name=self.user_1.screen_name
         )
         self.assertEqual(len(tweets), 2)
         self.assertEqual(tweets[0]["year"], 2015)
-        self.assertEqual(tweets[0]["count"], 4)
+        self.assertEqual(tweets[0]["count"], 3)
         self.assertEqual(tweets[1]["year"], 2016)
-        self.assertEqual(tweets[1]["count"], 3)
+        self.assertEqual(tweets[1]["count"], 2)
 
     def test_response_for_private_account(self):
         tweets = ditto_twitter.annual_favorite_counts(
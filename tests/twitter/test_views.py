@@ -2,6 +2,7 @@ from django.test import TestCase
 from django.urls import reverse
 
 from ditto.twitter import factories
+from tests.core import assert_raw_not_loaded
 
 
 class ViewTests(TestCase):
@@ -50,6 +51,14 @@ class ViewTests(TestCase):
         self.assertEqual(tweets[0].pk, public_tweet_2.pk)
         self.assertEqual(tweets[1].pk, public_tweet_1.pk)
 
+    def test_home_defers_raw(self):
+        "The Tweets' raw JSON shouldn't be loaded to list them."
+        account = factories.AccountFactory()
+        factories.TweetFactory.create_batch(3, user=account.user)
+        with assert_raw_not_loaded():
+            response = self.client.get(reverse("twitter:home"))
+        self.assertEqual(len(response.context["tweet_list"]), 3)
+
     def test_favorite_list_templates(self):
         "The Twitter favorites page uses the correct templates"
         response = self.client.get(reverse("twitter:favorite_list"))
@@ -84,6 +93,14 @@ class ViewTests(TestCase):
             ],
         )
 
+    def test_favorite_list_defers_raw(self):
+        "The Tweets' raw JSON shouldn't be loaded to list them."
+        account = factories.AccountFactory()
+        account.user.favorites.add(*factories.TweetFactory.create_batch(3))
+        with assert_raw_not_loaded():
+            response = self.client.get(reverse("twitter:favorite_list"))
+        self.assertEqual(len(response.context["tweet_list"]), 3)
+
     def test_favorite_list_privacy_tweets(self):
         "Only public Tweets should appear."
         private_user = factories.UserFactory(is_private=True)
@@ -349,3 +366,51 @@ class ViewTests(TestCase):
         )
         self.assertIn("tweet", response.context)
         self.assertIsNone(response.context["tweet"])
+
+
+class MediaFileViewTests(TestCase):
+    def get(self, media, name="media_image_file"):
+        return self.client.get(
+            reverse(f"twitter:{name}", kwargs={"twitter_id": media.twitter_id})
+        )
+
+    def test_image_file(self):
+        media = factories.PhotoFactory()
+        media.tweets.add(factories.TweetFactory())
+        response = self.get(media)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "image/jpeg")
+
+    def test_mp4_file(self):
+        media = factories.AnimatedGifFactory()
+        media.tweets.add(factories.TweetFactory())
+        response = self.get(media, "media_mp4_file")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "video/mp4")
+
+    def test_liked_tweet(self):
+        "It sends files from public Tweets liked by an Account"
+        media = factories.PhotoFactory()
+        tweet = factories.TweetFactory()
+        media.tweets.add(tweet)
+        factories.AccountFactory(user=factories.UserFactory()).user.favorites.add(tweet)
+        response = self.get(media)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "image/jpeg")
+
+    def test_privacy(self):
+        "It doesn't send files that are only in private Tweets"
+        media = factories.PhotoFactory()
+        user = factories.UserFactory(is_private=True)
+        media.tweets.add(factories.TweetFactory(user=user))
+        response = self.get(media)
+        self.assertEqual(response.status_code, 404)
+
+    def test_no_tweets(self):
+        response = self.get(factories.PhotoFactory())
+        self.assertEqual(response.status_code, 404)
+
+    def test_no_file(self):
+        media = factories.PhotoFactory(image_file="")
+        media.tweets.add(factories.TweetFactory())
+        self.assertEqual(self.get(media).status_code, 404)